@@ -5,8 +5,10 @@ from collections import Iterable
 import debug
 from base.hierarchy_layout import layout as hierarchy_layout, get_purpose
 from base import hierarchy_spice
+from base import profiler
 from base import utils
 from base.geometry import rectangle
+from base.geometry_summary import GeometrySummary
 from base.vector import vector
 from globals import OPTS
 from tech import drc, info
@@ -40,6 +42,10 @@ class design(hierarchy_spice.spice, hierarchy_layout):
     num_poly_dummies = info.get("num_poly_dummies", int(has_dummy))
     has_pwell = info["has_pwell"]
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        profiler.instrument_class(cls)
+
     def __init__(self, name):
         self.gds_file = os.path.join(OPTS.openram_tech, "gds_lib", name + ".gds")
         self.sp_file = os.path.join(OPTS.openram_tech, "sp_lib", name + ".sp")
@@ -320,6 +326,33 @@ class design(hierarchy_spice.spice, hierarchy_layout):
         if self.gds.from_file:
             return self.get_gds_layer_rects(layer, purpose, recursive=recursive)
 
+        shapes = self.get_own_layer_shapes(layer)
+        if recursive or insts:
+            if insts is None:
+                insts = self.insts
+            for inst in insts:
+                shapes.extend(inst.get_layer_shapes(layer, purpose, recursive))
+        return shapes
+
+    def get_layer_shapes_summary(self, layer, purpose=None, recursive=False):
+        """Shapes of get_layer_shapes as a GeometrySummary cached until the layout changes"""
+        # subclasses with custom get_layer_shapes may depend on the child instances
+        custom_shapes = (self.gds.from_file or
+                         type(self).get_layer_shapes is not design.get_layer_shapes)
+
+        def create():
+            if custom_shapes:
+                return GeometrySummary.from_rects(self.get_layer_shapes(layer, purpose, recursive))
+            summaries = [GeometrySummary.from_rects(self.get_own_layer_shapes(layer))]
+            if recursive:
+                summaries.extend(inst.get_layer_shapes_summary(layer, purpose, recursive)
+                                 for inst in self.insts)
+            return GeometrySummary.concatenate(summaries)
+        return self.get_geometry_summary(("shapes", layer, purpose, recursive), create)
+
+    def get_own_layer_shapes(self, layer):
+        """Rectangles and pins on layer at this level of the hierarchy"""
+
         def filter_match(x):
             if isinstance(x, rectangle):
                 if layer is None:
@@ -338,13 +371,7 @@ class design(hierarchy_spice.spice, hierarchy_layout):
                                            layerPurpose=layer_purpose,
                                            offset=pin.ll(), width=pin.rx() - pin.lx(),
                                            height=pin.uy() - pin.by()))
-        shapes = list(filter(filter_match, self.objs + pin_rects))
-        if recursive or insts:
-            if insts is None:
-                insts = self.insts
-            for inst in insts:
-                shapes.extend(inst.get_layer_shapes(layer, purpose, recursive))
-        return shapes
+        return list(filter(filter_match, self.objs + pin_rects))
 
     def get_max_shape(self, layer, prop_name, recursive=False):
         shapes = self.get_layer_shapes(layer, recursive=recursive)
@@ -548,40 +575,44 @@ class design(hierarchy_spice.spice, hierarchy_layout):
     def DRC_LVS(self, final_verification=False):
         """Checks both DRC and LVS for a module"""
         import verify
-        if OPTS.check_lvsdrc:
-            tempspice = OPTS.openram_temp + "/temp.sp"
-            tempgds = OPTS.openram_temp + "/temp.gds"
-            self.sp_write(tempspice)
-            self.gds_write(tempgds)
-            debug.check(verify.run_drc(self.name, tempgds, exception_group=self.__class__.__name__) == 0,
-                        "DRC failed for {0}".format(self.name))
-            debug.check(verify.run_lvs(self.name, tempgds, tempspice, final_verification) == 0,
-                        "LVS failed for {0}".format(self.name))
-            os.remove(tempspice)
-            os.remove(tempgds)
+        if OPTS.check_lvsdrc and OPTS.hierarchical_verification:
+            verify.get_hierarchical_verifier().verify(self, final_verification)
+        elif OPTS.check_lvsdrc:
+            with verify.verification_workspace(self.name) as work_dir:
+                tempspice = os.path.join(work_dir, "temp.sp")
+                tempgds = os.path.join(work_dir, "temp.gds")
+                self.sp_write(tempspice)
+                self.gds_write(tempgds)
+                debug.check(verify.run_drc(self.name, tempgds, exception_group=self.__class__.__name__) == 0,
+                            "DRC failed for {0}".format(self.name))
+                debug.check(verify.run_lvs(self.name, tempgds, tempspice, final_verification) == 0,
+                            "LVS failed for {0}".format(self.name))
 
     def DRC(self):
         """Checks DRC for a module"""
         import verify
-        if OPTS.check_lvsdrc:
-            tempgds = OPTS.openram_temp + "/temp.gds"
-            self.gds_write(tempgds)
-            debug.check(verify.run_drc(self.name, tempgds, exception_group=self.__class__.__name__) == 0,
-                        "DRC failed for {0}".format(self.name))
-            os.remove(tempgds)
+        if OPTS.check_lvsdrc and OPTS.hierarchical_verification:
+            verify.get_hierarchical_verifier().verify(self, drc=True, lvs=False)
+        elif OPTS.check_lvsdrc:
+            with verify.verification_workspace(self.name) as work_dir:
+                tempgds = os.path.join(work_dir, "temp.gds")
+                self.gds_write(tempgds)
+                debug.check(verify.run_drc(self.name, tempgds, exception_group=self.__class__.__name__) == 0,
+                            "DRC failed for {0}".format(self.name))
 
     def LVS(self, final_verification=False):
         """Checks LVS for a module"""
         import verify
-        if OPTS.check_lvsdrc:
-            tempspice = OPTS.openram_temp + "/temp.sp"
-            tempgds = OPTS.openram_temp + "/temp.gds"
-            self.sp_write(tempspice)
-            self.gds_write(tempgds)
-            debug.check(verify.run_lvs(self.name, tempgds, tempspice, final_verification) == 0,
-                        "LVS failed for {0}".format(self.name))
-            os.remove(tempspice)
-            os.remove(tempgds)
+        if OPTS.check_lvsdrc and OPTS.hierarchical_verification:
+            verify.get_hierarchical_verifier().verify(self, final_verification, drc=False, lvs=True)
+        elif OPTS.check_lvsdrc:
+            with verify.verification_workspace(self.name) as work_dir:
+                tempspice = os.path.join(work_dir, "temp.sp")
+                tempgds = os.path.join(work_dir, "temp.gds")
+                self.sp_write(tempspice)
+                self.gds_write(tempgds)
+                debug.check(verify.run_lvs(self.name, tempgds, tempspice, final_verification) == 0,
+                            "LVS failed for {0}".format(self.name))
 
     def __str__(self):
         """ override print function output """
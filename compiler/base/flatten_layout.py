@@ -58,6 +58,7 @@ def flatten_rects(self: design, insts: InstList = None,
                   if inst_index not in inst_indices]
     self.conns = [conn for conn_index, conn in enumerate(self.conns)
                   if conn_index not in inst_indices]
+    self.invalidate_geometry()
 
 
 def flatten_subckts(self: design, insts: InstList = None,
@@ -78,3 +79,4 @@ def remove_layer_shapes(self: design, layers=None):
             if isinstance(obj, rectangle) and obj.layerNumber == layer_num:
                 self.objs[i] = None
     self.objs = [x for x in self.objs if x]
+    self.invalidate_geometry()
@@ -184,12 +184,23 @@ class instance(geometry):
             else:
                 return []
         else:
+            return list(self.iter_blockages(layer))
 
-            blockages = self.mod.get_blockages(layer)
-            new_blockages = []
-            for b in blockages:
-                new_blockages.append(self.transform_coords(b,self.offset, mirr, angle))
-            return new_blockages
+    def iter_blockages(self, layer):
+        """ Generate the blockages of get_blockages without building intermediate lists """
+        if self.mod.is_library_cell:
+            yield from self.get_blockages(layer)
+            return
+        yield from self.get_blockages_summary(layer).get_blockages()
+
+    def get_blockages_summary(self, layer):
+        """ Blockages of the module's cached summary transformed by the instance placement """
+        from base.geometry_summary import GeometrySummary
+        if self.mod.is_library_cell:
+            return GeometrySummary.from_blockages(self.get_blockages(layer))
+        angle, mirr = self.get_angle_mirror()
+        summary = self.mod.get_blockages_summary(layer)
+        return summary.transform(self.offset, mirr, angle)
         
     def gds_write_file(self, new_layout):
         """Recursively writes all the sub-modules in this instance"""
@@ -232,20 +243,13 @@ class instance(geometry):
         return new_pins
 
     def get_layer_shapes(self, layer, purpose=None, recursive=False):
+        return self.get_layer_shapes_summary(layer, purpose, recursive).get_rects()
+
+    def get_layer_shapes_summary(self, layer, purpose=None, recursive=False):
+        """ Shapes of the module's cached summary transformed by the instance placement """
         angle, mirr = self.get_angle_mirror()
-        rects = self.mod.get_layer_shapes(layer, purpose, recursive)
-        results = []
-        for rect in rects:
-            rect = copy.copy(rect)
-            ll, ur = self.transform_coords([rect.ll(), rect.ur()], self.offset, mirr, angle)
-            rect.boundary = [ll, ur]
-            rect.normalize()
-            rect.offset = rect.ll()
-            rect.width = rect.rx() - rect.lx()
-            rect.height = rect.uy() - rect.by()
-            rect.size = vector(rect.width, rect.height)
-            results.append(rect)
-        return results
+        summary = self.mod.get_layer_shapes_summary(layer, purpose, recursive)
+        return summary.transform(self.offset, mirr, angle, normalize=True)
 
     def get_max_shape(self, layer, prop_name, recursive=False):
         shapes = self.get_layer_shapes(layer, recursive=recursive)
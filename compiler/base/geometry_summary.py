@@ -0,0 +1,83 @@
+"""
+Per-module summaries of the layout geometry on one layer.
+A summary holds the shapes of a module in the module's coordinates as an (N, 4) array of
+(x1, y1, x2, y2) corners together with the geometry each row was created from.
+The summary of an instance is the summary of its module transformed by the instance placement
+so each module is only traversed once per layer query and parents compose the cached
+summaries of their children.
+"""
+import copy
+import math
+
+import numpy as np
+
+from base.vector import vector
+
+
+class GeometrySummary:
+    def __init__(self, corners, sources=None):
+        """
+        :param corners: (N, 4) array of (x1, y1, x2, y2)
+        :param sources: geometries the corners were derived from, None for blockages
+        """
+        self.corners = np.asarray(corners, dtype=float).reshape(-1, 4)
+        self.sources = sources
+
+    def __len__(self):
+        return len(self.corners)
+
+    @staticmethod
+    def from_rects(rects):
+        rects = list(rects)
+        corners = [[rect.ll()[0], rect.ll()[1], rect.ur()[0], rect.ur()[1]] for rect in rects]
+        return GeometrySummary(corners, rects)
+
+    @staticmethod
+    def from_blockages(blockages):
+        return GeometrySummary([[first[0], first[1], second[0], second[1]]
+                                for first, second in blockages])
+
+    @staticmethod
+    def concatenate(summaries):
+        summaries = [x for x in summaries if len(x) > 0]
+        if len(summaries) == 0:
+            return GeometrySummary([], [])
+        if len(summaries) == 1:
+            return summaries[0]
+        corners = np.concatenate([x.corners for x in summaries])
+        if any(x.sources is None for x in summaries):
+            return GeometrySummary(corners)
+        sources = []
+        for summary in summaries:
+            sources.extend(summary.sources)
+        return GeometrySummary(corners, sources)
+
+    def transform(self, offset, mirr, angle, normalize=False):
+        """Flip, rotate and shift using the same operations as geometry.transform_coords
+        so the results match the shape by shape transforms exactly"""
+        cos, sin = math.cos(angle), math.sin(angle)
+        x, y = self.corners[:, [0, 2]], self.corners[:, [1, 3]]
+        new_x = x * cos - y * mirr * sin + offset[0]
+        new_y = x * sin + y * mirr * cos + offset[1]
+        if normalize:
+            new_x.sort(axis=1)
+            new_y.sort(axis=1)
+        corners = np.stack([new_x[:, 0], new_y[:, 0], new_x[:, 1], new_y[:, 1]], axis=1)
+        return GeometrySummary(corners, self.sources)
+
+    def get_blockages(self):
+        """Blockages as two corner lists like geometry.transform_coords"""
+        return self.corners.reshape(-1, 2, 2).tolist()
+
+    def get_rects(self):
+        """Copies of the source rectangles moved to the summary corners"""
+        results = []
+        for (x1, y1, x2, y2), source in zip(self.corners.tolist(), self.sources):
+            rect = copy.copy(source)
+            rect.boundary = [vector(x1, y1), vector(x2, y2)]
+            rect.offset = rect.ll()
+            rect.width = x2 - x1
+            rect.height = y2 - y1
+            rect.size = vector(rect.width, rect.height)
+            results.append(rect)
+        return results
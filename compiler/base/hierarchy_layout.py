@@ -5,6 +5,8 @@ import os
 import debug
 from base import geometry
 from base import lef
+from base import profiler
+from base.geometry_summary import GeometrySummary
 from base.pin_layout import pin_layout
 from base.vector import vector
 from gdsMill import gdsMill
@@ -50,6 +52,9 @@ class layout(lef.lef):
         self.pin_map = {}    # Holds name->pin_layout map for all pins
         self.visited = False # Flag for traversing the hierarchy 
         self.is_library_cell = False # Flag for library cells
+        self.geometry_version = 0  # Incremented when the geometry of the module or its children changes
+        self.geometry_parents = {}  # Holds id->module for modules with instances of this module
+        self.geometry_summaries = {}  # Holds (query)->(geometry token, GeometrySummary)
         self.gds_read()
 
     ############################################################
@@ -141,12 +146,47 @@ class layout(lef.lef):
             pin_list = self.pin_map[pin_name]
             for pin in pin_list:
                 pin.rect = [pin.ll() - offset, pin.ur() - offset]
+        self.invalidate_geometry()
+
+    def invalidate_geometry(self):
+        """ Discard the cached geometry summaries of this module and of every module above it.
+        Called by the layout API, needed after changing existing objs, insts or pins in place """
+        visited = set()
+        modules = [self]
+        while modules:
+            module = modules.pop()
+            if id(module) in visited:
+                continue
+            visited.add(id(module))
+            module.geometry_version += 1
+            modules.extend(module.geometry_parents.values())
+
+    def get_geometry_token(self):
+        """ Cheap fingerprint of the geometry of the module and its children. Changes when the
+        geometry is changed through the layout API or when objs, insts or pins are replaced """
+        return (self.geometry_version, id(self.objs), len(self.objs), id(self.pins),
+                len(self.pins), id(self.insts), len(self.insts))
+
+    def get_geometry_summary(self, query, create):
+        """ Return the cached GeometrySummary for query or create() it if the geometry has changed
+        :param query: hashable description of the query
+        :param create: function which computes the summary
+        """
+        token = self.get_geometry_token()
+        cached = self.geometry_summaries.get(query)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        summary = create()
+        self.geometry_summaries[query] = (token, summary)
+        return summary
 
     def add_inst(self, name, mod, offset=None, mirror="R0", rotate=0) -> geometry.instance:
         """Adds an instance of a mod to this module"""
         if offset is None:
             offset = vector(0, 0)
         self.insts.append(geometry.instance(name, mod, offset, mirror, rotate))
+        mod.geometry_parents[id(self)] = self
+        self.invalidate_geometry()
         debug.info(3, "adding instance {}".format(self.insts[-1]))
 
         if (OPTS.debug_level >= 4):
@@ -178,6 +218,7 @@ class layout(lef.lef):
             else:
                 layer_purpose = get_purpose(layer_purpose)
             self.objs.append(geometry.rectangle(layer_num, offset, width, height, layerPurpose=layer_purpose))
+            self.invalidate_geometry()
             return self.objs[-1]
         return None
 
@@ -192,6 +233,7 @@ class layout(lef.lef):
         corrected_offset = offset - vector(0.5*width,0.5*height)
         if layer_num >= 0:
             self.objs.append(geometry.rectangle(layer_num, corrected_offset, width, height, layerPurpose=get_purpose(layer)))
+            self.invalidate_geometry()
             return self.objs[-1]
         return None
 
@@ -273,6 +315,7 @@ class layout(lef.lef):
     def remove_layout_pin(self, text):
         """Delete a labeled pin (or all pins of the same name)"""
         self.pin_map[text.lower()]=[]
+        self.invalidate_geometry()
         
     def add_layout_pin(self, text, layer, offset, width=None, height=None):
         """Create a labeled pin """
@@ -295,6 +338,7 @@ class layout(lef.lef):
             self.pin_map[text].append(new_pin)
         except KeyError:
             self.pin_map[text] = [new_pin]
+        self.invalidate_geometry()
 
         return new_pin
 
@@ -528,6 +572,7 @@ class layout(lef.lef):
                     pin.gds_write_file(newLayout)
         self.visited = True
 
+    @profiler.profile_method("gds")
     def gds_write(self, gds_name):
         """Write the entire gds of the object to the file."""
         debug.info(3, "Writing to {0}".format(gds_name))
@@ -568,26 +613,37 @@ class layout(lef.lef):
         Write all of the obstacles in the current (and children) modules to the lef file 
         Do not write the pins since they aren't obstructions.
         """
+        return list(self.iter_blockages(layer, top_level))
+
+    def iter_blockages(self, layer, top_level=False):
+        """ Generate the blockages of get_blockages without building intermediate lists """
         if type(layer)==str:
             layer_num = techlayer[layer]
         else:
             layer_num = layer
-            
-        blockages = []
+
         for i in self.objs:
-            blockages += i.get_blockages(layer_num)
+            yield from i.get_blockages(layer_num)
         for i in self.insts:
-            blockages += i.get_blockages(layer_num)
+            yield from i.iter_blockages(layer_num)
         # Must add pin blockages to non-top cells
         if not top_level:
-            blockages += self.get_pin_blockages(layer_num)
-        return blockages
+            yield from self.get_pin_blockages(layer_num)
+
+    def get_blockages_summary(self, layer_num):
+        """ Blockages of a non-top-level block as a cached GeometrySummary """
+        def create():
+            summaries = [GeometrySummary.from_blockages(blockage for obj in self.objs
+                                                        for blockage in obj.get_blockages(layer_num))]
+            summaries.extend(inst.get_blockages_summary(layer_num) for inst in self.insts)
+            summaries.append(GeometrySummary.from_blockages(self.get_pin_blockages(layer_num)))
+            return GeometrySummary.concatenate(summaries)
+        return self.get_geometry_summary(("blockages", layer_num), create)
 
     def get_pin_blockages(self, layer_num):
         """ Return the pin shapes as blockages for non-top-level blocks. """
         # FIXME: We don't have a body contact in ptx, so just ignore it for now
-        import copy
-        pin_names = copy.deepcopy(self.pins)
+        pin_names = list(self.pins)
         class_name = self.__class__.__name__
         if class_name == "ptx":
             pin_names.remove("B")
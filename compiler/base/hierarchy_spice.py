@@ -1,9 +1,13 @@
 import io
 import math
 import os
+from functools import lru_cache
 from typing import Union, List, Tuple
 
+import numpy as np
+
 import debug
+from base import profiler
 from base import verilog
 from base.spice_parser import SpiceParser
 from characterizer.characterization_data import load_data
@@ -15,6 +19,13 @@ POWER = "POWER"
 GROUND = "GROUND"
 
 
+@lru_cache(maxsize=1)
+def get_delay_params():
+    """Technology delay params class, wire RC lookups use its classmethods"""
+    from tech import delay_params_class
+    return delay_params_class()
+
+
 class spice(verilog.verilog):
     """
     This provides a set of useful generic types for hierarchy
@@ -247,6 +258,7 @@ class spice(verilog.verilog):
 
         sp.write("\n")
 
+    @profiler.profile_method("spice")
     def sp_write(self, spname):
         """Writes the spice to files"""
         debug.info(3, "Writing to {0}".format(spname))
@@ -324,14 +336,14 @@ class spice(verilog.verilog):
 
     def compute_pin_wire_cap(self, pin_name, wire_length=0.0):
         """Computes wire cap due to pin only"""
-        wire_cap = 0
-        for pin in self.get_pins(pin_name):
-            pin_width = min(pin.width(), pin.height())
-
-            pin_length = max(pin.width(), pin.height(), wire_length)
-
-            wire_cap += self.get_wire_cap(pin.layer, pin_width, pin_length)
-        return wire_cap
+        pins = self.get_pins(pin_name)
+        if not pins:
+            return 0
+        layers = [pin.layer for pin in pins]
+        pin_widths = [min(pin.width(), pin.height()) for pin in pins]
+        pin_lengths = [max(pin.width(), pin.height(), wire_length) for pin in pins]
+        wire_caps, _ = self.get_wire_rc_batch(layers, pin_widths, pin_lengths)
+        return float(wire_caps.sum())
 
     def compute_input_cap(self, pin_name, wire_length: float = 0.0):
         """Compute unit capacitance in F for pin_name and wire_length"""
@@ -364,8 +376,7 @@ class spice(verilog.verilog):
         :param wire_length: in um
         :return: res in ohm
         """
-        from tech import delay_params_class
-        unit_cap, res = delay_params_class().get_rc(layer=wire_layer, width=wire_width)
+        unit_cap, res = get_delay_params().get_rc(layer=wire_layer, width=wire_width)
         return res * wire_length
 
     def get_wire_cap(self, wire_layer: str, wire_width: float, wire_length: float):
@@ -376,10 +387,22 @@ class spice(verilog.verilog):
         :param wire_length: in um
         :return: cap in F
         """
-        from tech import delay_params_class
-        unit_cap, res = delay_params_class().get_rc(layer=wire_layer, width=wire_width)
+        unit_cap, res = get_delay_params().get_rc(layer=wire_layer, width=wire_width)
         return unit_cap * wire_length
 
+    @staticmethod
+    def get_wire_rc_batch(wire_layers, wire_widths, wire_lengths):
+        """
+        Return caps and resistances for multiple wires in one lookup
+        :param wire_layers: layer name per wire
+        :param wire_widths: in um
+        :param wire_lengths: in um
+        :return: (caps in F, res in ohm) as numpy arrays
+        """
+        unit_caps, unit_res = get_delay_params().get_rc_batch(wire_layers, wire_widths)
+        wire_lengths = np.asarray(wire_lengths, dtype=float)
+        return unit_caps * wire_lengths, unit_res * wire_lengths
+
     def group_pin_instances_by_mod(self, pin_name):
         # Group by instance mod
         instances_groups = {}
@@ -537,26 +560,22 @@ class spice(verilog.verilog):
         :param beta: 1/ (gm * driver_res) (unitless)
         :param alpha: ratio of input slew to tau
         :param switch_threshold: Switch threshold
-        :return: delay, slew_out
+        :return: delay, slew_out. tau, beta and alpha may be numpy arrays
         """
-        delay = tau * math.sqrt((math.log(switch_threshold))**2 +
-                                2 * alpha * beta * (1 - switch_threshold))
+        delay = tau * np.sqrt((np.log(switch_threshold))**2 +
+                              2 * alpha * beta * (1 - switch_threshold))
         slew_out = delay / (1 - switch_threshold)
         return delay, slew_out
 
     @staticmethod
     def distributed_delay(cap_per_stage, res_per_stage, num_stages,
                           driver_res, driver_gm, other_caps, slew_in):
-        """http://bwrcs.eecs.berkeley.edu/Classes/icdesign/ee141_f01/Notes/chapter4.pdf Pg. 125, 127"""
+        """http://bwrcs.eecs.berkeley.edu/Classes/icdesign/ee141_f01/Notes/chapter4.pdf Pg. 125, 127
+        driver_res may be a numpy array, driver_gm and slew_in don't affect the delay"""
         total_r = res_per_stage * num_stages
         total_distributed_c = cap_per_stage * num_stages
         total_c = total_distributed_c + other_caps
 
-        tau = driver_res * total_c + 0.5 * total_r * total_distributed_c
-        beta = 1 / (driver_gm * driver_res)
-        alpha = slew_in / tau
-        delay, slew_out = spice.horowitz_delay(tau, beta, alpha)
-
         delay = 0.69 * driver_res * total_c + 0.38 * total_r * total_distributed_c
         slew_out = total_r * total_c
         return delay, slew_out
@@ -0,0 +1,80 @@
+"""
+Record the time spent importing each top level package (OPTS.report_import_times).
+builtins.__import__ is wrapped so the self time of each newly loaded module,
+excluding the modules it imports, is added to its top level package e.g. numpy, characterizer.
+Modules which are already loaded only pay a sys.modules lookup.
+"""
+import builtins
+import importlib.util
+import sys
+import time
+
+original_import = None
+package_times = {}
+package_counts = {}
+stack = []
+
+
+def get_absolute_name(name, import_globals, level):
+    if level == 0:
+        return name
+    package = (import_globals or {}).get("__package__") or ""
+    try:
+        return importlib.util.resolve_name("." * level + name, package)
+    except (ImportError, ValueError):
+        return name
+
+
+def timed_import(name, import_globals=None, import_locals=None, fromlist=(), level=0):
+    full_name = get_absolute_name(name, import_globals, level)
+    if full_name in sys.modules or not full_name:
+        return original_import(name, import_globals, import_locals, fromlist, level)
+    entry = [full_name, 0.0]
+    stack.append(entry)
+    start = time.perf_counter()
+    try:
+        return original_import(name, import_globals, import_locals, fromlist, level)
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            stack[-1][1] += duration
+        package = full_name.split(".")[0]
+        package_times[package] = package_times.get(package, 0.0) + duration - entry[1]
+        package_counts[package] = package_counts.get(package, 0) + 1
+
+
+def install():
+    """Start timing imports, calling install again is a no-op"""
+    global original_import
+    if original_import is not None:
+        return
+    original_import = builtins.__import__
+    builtins.__import__ = timed_import
+
+
+def uninstall():
+    global original_import
+    if original_import is None:
+        return
+    builtins.__import__ = original_import
+    original_import = None
+
+
+def is_installed():
+    return original_import is not None
+
+
+def get_package_times():
+    """(package, self time in seconds, number of imports) sorted by time"""
+    return sorted([(key, value, package_counts[key]) for key, value in package_times.items()],
+                  key=lambda x: x[1], reverse=True)
+
+
+def format_report(max_rows=20):
+    times = get_package_times()
+    lines = ["{:<40} {:>10} {:>8}".format("Package", "Time (s)", "Imports")]
+    for package, duration, count in times[:max_rows]:
+        lines.append("{:<40} {:>10.3f} {:>8}".format(package, duration, count))
+    lines.append("{:<40} {:>10.3f}".format("Total", sum(x[1] for x in times)))
+    return "\n".join(lines)
@@ -1,5 +1,10 @@
 # find open space in a module given the layer
-from base.utils import round_to_grid
+import bisect
+
+import numpy as np
+
+import tech
+from base.utils import round_to_grid, round_array_to_grid
 from base.design import design
 
 HORIZONTAL = "horizontal"
@@ -30,41 +35,108 @@ def validate_clearances(clearances):
     return results
 
 
-def find_clearances(module: design, layer, direction=HORIZONTAL, existing=None, region=None,
-                    recursive=True, recursive_insts=None):
-    if existing is None:
-        edge = module.width if direction == HORIZONTAL else module.height
-        existing = [(0, round_to_grid(edge))]
-        full_range = existing[0]
+def get_layer_extents(module: design, layer, recursive=True, recursive_insts=None):
+    """(N, 4) array of (lx, by, rx, uy) of layer shapes considered by find_clearances"""
+    summaries = [module.get_layer_shapes_summary(layer, recursive=recursive)]
+    if recursive_insts:
+        summaries.extend(inst.get_layer_shapes_summary(layer, recursive=True)
+                         for inst in recursive_insts)
+    return np.concatenate([x.corners for x in summaries])
+
+
+def get_blocked_ranges(extents, direction, region, full_range):
+    """
+    Disjoint sorted blocked ranges along direction of rects overlapping region and full_range.
+    Zero length ranges are kept since they split clearances.
+    :param extents: (N, 4) array of (lx, by, rx, uy)
+    """
+    if direction == HORIZONTAL:
+        edge_columns, region_columns = [0, 2], [1, 3]
     else:
-        full_range = (min(map(min, existing)), max(map(max, existing)))
-    if region is None:
-        edge = module.width if direction == VERTICAL else module.height
-        region = (0, round_to_grid(edge))
+        edge_columns, region_columns = [1, 3], [0, 2]
+    region = sorted(region)
+    full_range = sorted(full_range)
+    # pre-filter with unrounded values, the exact check uses the rounded extremities
+    grid = tech.drc["grid"]
+    region_edges = extents[:, region_columns]
+    edges = extents[:, edge_columns]
+    candidates = ((region_edges.min(axis=1) <= region[1] + grid) &
+                  (region_edges.max(axis=1) >= region[0] - grid) &
+                  (edges.min(axis=1) <= full_range[1] + grid) &
+                  (edges.max(axis=1) >= full_range[0] - grid))
+    region_edges = round_array_to_grid(region_edges[candidates])
+    edges = round_array_to_grid(edges[candidates])
+    # get_range_overlap of closed ranges
+    valid = ((region_edges.min(axis=1) <= region[1]) & (region_edges.max(axis=1) >= region[0]) &
+             (edges.min(axis=1) <= full_range[1]) & (edges.max(axis=1) >= full_range[0]))
+    edges = edges[valid]
+    edges = edges[np.argsort(edges[:, 0], kind="stable")].tolist()
 
-    rects = module.get_layer_shapes(layer, recursive=recursive)
-    if recursive_insts:
-        for inst in recursive_insts:
-            rects.extend(inst.get_layer_shapes(layer, recursive=True))
-    for rect in rects:
-        # ensure rect is within considered range
-        region_edges = get_extremities(rect, HORIZONTAL if direction == VERTICAL else VERTICAL)
-        if not get_range_overlap(region_edges, region):
-            continue
-
-        edges = get_extremities(rect, direction)
-        if not get_range_overlap(full_range, edges):
-            continue
-
-        new_clearances = []
+    blocked = []
+    for start, end in edges:
+        if blocked and start <= blocked[-1][1]:
+            blocked[-1][1] = max(blocked[-1][1], end)
+        else:
+            blocked.append([start, end])
+    return blocked
+
+
+def subtract_blocked_ranges(clearance, blocked, blocked_ends):
+    """Split clearance by the blocked ranges which overlap it, dropping empty ranges"""
+    clearance_start, clearance_end = clearance
+    if clearance_end <= clearance_start:
+        # empty clearances are only removed when there are blockages
+        return [] if blocked else [clearance]
+    results = []
+    start = clearance_start
+    index = bisect.bisect_left(blocked_ends, clearance_start)
+    while index < len(blocked) and blocked[index][0] <= clearance_end:
+        blocked_start, blocked_end = blocked[index]
+        if blocked_start > start:
+            results.append((start, blocked_start))
+        start = max(start, blocked_end)
+        index += 1
+    if clearance_end > start:
+        results.append((start, clearance_end))
+    return results
+
+
+def find_clearances_batch(module: design, queries, direction=HORIZONTAL, recursive=True,
+                          recursive_insts=None):
+    """
+    find_clearances for several layers or regions, the shapes of each layer are only fetched once
+    :param queries: list of (layer, region, existing), region and existing can be None
+    :return: list of clearances for each query
+    """
+    layer_extents = {}
+    results = []
+    for layer, region, existing in queries:
+        if existing is None:
+            edge = module.width if direction == HORIZONTAL else module.height
+            existing = [(0, round_to_grid(edge))]
+            full_range = existing[0]
+        else:
+            full_range = (min(map(min, existing)), max(map(max, existing)))
+        if region is None:
+            edge = module.width if direction == VERTICAL else module.height
+            region = (0, round_to_grid(edge))
+
+        if layer not in layer_extents:
+            layer_extents[layer] = get_layer_extents(module, layer, recursive, recursive_insts)
+        blocked = get_blocked_ranges(layer_extents[layer], direction, region, full_range)
+        blocked_ends = [x[1] for x in blocked]
+        clearances = []
         for clearance in existing:
-            if get_range_overlap(clearance, edges):
-                if clearance[0] <= edges[0]:
-                    new_clearances.extend([(clearance[0], edges[0]), (edges[1], clearance[1])])
-                else:
-                    new_clearances.append((edges[1], clearance[1]))
-            else:
-                new_clearances.append(clearance)
-        existing = validate_clearances(new_clearances)
-
-    return existing
+            clearances.extend(subtract_blocked_ranges(clearance, blocked, blocked_ends))
+        results.append(clearances)
+    return results
+
+
+def find_clearances(module: design, layer, direction=HORIZONTAL, existing=None, region=None,
+                    recursive=True, recursive_insts=None):
+    """
+    Ranges along direction of existing (the full module by default) which are not blocked by
+    shapes on layer within region of the perpendicular direction
+    """
+    return find_clearances_batch(module, [(layer, region, existing)], direction, recursive,
+                                 recursive_insts)[0]
@@ -1,4 +1,116 @@
+import math
+import os
+import time
+from array import array
+
+import numpy as np
+
 import debug
+from base import profiler
+from globals import OPTS
+
+# maximum size of the boolean raster used to merge the rectangles in one band of a layer
+MAX_MERGE_CELLS = 2 ** 26
+
+
+def collect_rectangles(blockages, units, resolution=None):
+    """
+    Blockages as an (N, 4) array of (x1, y1, x2, y2) in database units.
+    :param blockages: iterable of two corner blockages in microns
+    :param units: database units per micron
+    :param resolution: grid in microns, rectangles are expanded to the grid if specified
+    """
+    coordinates = array("q")
+    step = int(round(resolution * units)) if resolution else None
+    for first, second in blockages:
+        x1, x2 = sorted([first[0], second[0]])
+        y1, y2 = sorted([first[1], second[1]])
+        if step:
+            coordinates.extend([math.floor(round(x1 * units) / step) * step,
+                                math.floor(round(y1 * units) / step) * step,
+                                math.ceil(round(x2 * units) / step) * step,
+                                math.ceil(round(y2 * units) / step) * step])
+        else:
+            coordinates.extend([round(x1 * units), round(y1 * units),
+                                round(x2 * units), round(y2 * units)])
+    return np.frombuffer(coordinates, dtype=np.int64).reshape(-1, 4)
+
+
+def merge_rectangles(rects, max_cells=MAX_MERGE_CELLS):
+    """
+    Rectilinear union of rects as non-overlapping rectangles.
+    The union is rasterized on the rectangles' (compressed) coordinates and decomposed into
+    vertical runs which are extended across columns while unchanged. Both orientations are
+    decomposed and the one with fewer rectangles is used. If the input rectangles are
+    fewer (e.g. a few large overlapping rectangles), the unique input rectangles are returned.
+    The x range is split into bands so the raster has at most max_cells cells,
+    rectangles aren't merged across bands.
+    :param rects: (N, 4) array of (x1, y1, x2, y2) with x1 <= x2 and y1 <= y2
+    :return: (M, 4) array of rectangles with the same union
+    """
+    rects = rects[(rects[:, 2] > rects[:, 0]) & (rects[:, 3] > rects[:, 1])]
+    if len(rects) == 0:
+        return rects
+    rects = np.unique(rects, axis=0)
+    vertical = merge_columns(rects, max_cells)
+    horizontal = merge_columns(rects[:, [1, 0, 3, 2]], max_cells)[:, [1, 0, 3, 2]]
+    return min([vertical, horizontal, rects], key=len)
+
+
+def merge_columns(rects, max_cells):
+    x_coordinates = np.unique(rects[:, [0, 2]])
+    num_y = len(np.unique(rects[:, [1, 3]]))
+    band_columns = max(1, max_cells // num_y)
+
+    results = []
+    for band_start in range(0, len(x_coordinates) - 1, band_columns):
+        band_end = min(band_start + band_columns, len(x_coordinates) - 1)
+        band_x = x_coordinates[band_start:band_end + 1]
+        band_rects = rects[(rects[:, 0] < band_x[-1]) & (rects[:, 2] > band_x[0])]
+        results.extend(merge_band(band_rects, band_x))
+    return np.array(sorted(results), dtype=np.int64).reshape(-1, 4)
+
+
+def merge_band(rects, x_coordinates):
+    y_coordinates = np.unique(rects[:, [1, 3]])
+    # raster cell (i, j) is x_coordinates[i] -> x_coordinates[i + 1], same for y
+    raster = np.zeros((len(x_coordinates) - 1, len(y_coordinates) + 1), dtype=bool)
+    x_start = np.searchsorted(x_coordinates, np.maximum(rects[:, 0], x_coordinates[0]))
+    x_end = np.searchsorted(x_coordinates, np.minimum(rects[:, 2], x_coordinates[-1]))
+    y_start = np.searchsorted(y_coordinates, rects[:, 1])
+    y_end = np.searchsorted(y_coordinates, rects[:, 3])
+    for x1, x2, y1, y2 in zip(x_start.tolist(), x_end.tolist(), y_start.tolist(), y_end.tolist()):
+        raster[x1:x2, y1:y2] = True
+
+    # the extra (always False) last row terminates runs at the top
+    edges = np.diff(raster.astype(np.int8), axis=1, prepend=0)
+    same_as_previous = np.concatenate([[False], np.all(raster[1:] == raster[:-1], axis=1)])
+
+    results = []
+    open_runs = {}  # (y start index, y end index) -> start column
+    for column in np.flatnonzero(~same_as_previous).tolist() + [len(raster)]:
+        if column < len(raster):
+            column_edges = edges[column]
+            runs = set(zip(np.flatnonzero(column_edges == 1).tolist(),
+                           np.flatnonzero(column_edges == -1).tolist()))
+        else:
+            runs = set()
+        for run in [x for x in open_runs if x not in runs]:
+            results.append((x_coordinates[open_runs.pop(run)], y_coordinates[run[0]],
+                            x_coordinates[column], y_coordinates[run[1]]))
+        for run in runs:
+            open_runs.setdefault(run, column)
+    return results
+
+
+def get_peak_memory():
+    """ Peak resident memory of the process in MB """
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
 
 class lef(object):
@@ -12,11 +124,14 @@ class lef(object):
         # These are the layers of the obstructions
         self.lef_layers = layers
 
+    @profiler.profile_method("lef")
     def lef_write(self, lef_name):
         """Write the entire lef of the object to the file."""
         debug.info(3, "Writing to {0}".format(lef_name))
+        start_time = time.time()
 
         self.indent = "" # To maintain the indent level easily
+        self.lef_stats = {"obstructions": {}}
 
         self.lef  = open(lef_name, "w")
         self.lef_write_header()
@@ -25,6 +140,13 @@ class lef(object):
         self.lef_write_obstructions()
         self.lef_write_footer()
         self.lef.close()
+
+        self.lef_stats.update({"size": os.path.getsize(lef_name),
+                               "time": time.time() - start_time,
+                               "peak_memory": get_peak_memory()})
+        debug.info(1, "LEF {0}: {1:.3g} MB in {2:.3g}s, peak memory {3:.4g} MB".format(
+            lef_name, self.lef_stats["size"] / 1e6, self.lef_stats["time"],
+            self.lef_stats["peak_memory"]))
         
     def lef_write_header(self):
         """ Header of LEF file """
@@ -96,12 +218,26 @@ class lef(object):
         for layer in self.lef_layers:
             self.lef.write("{0}LAYER  {1} ;\n".format(self.indent,layer))
             self.indent += "   "
-            blockages = self.get_blockages(layer,True)
-            for b in blockages:
-                self.lef_write_rect(b)
+            if OPTS.lef_merge_obstructions:
+                self.lef_write_merged_obstructions(layer)
+            else:
+                for b in self.iter_blockages(layer, True):
+                    self.lef_write_rect(b)
             self.indent = self.indent[:-3]
         self.lef.write("{0}END\n".format(self.indent))
 
+    def lef_write_merged_obstructions(self, layer):
+        """ Write the union of the layer's blockages, optionally on a coarse grid """
+        rects = collect_rectangles(self.iter_blockages(layer, True), self.lef_units,
+                                   OPTS.lef_obstruction_resolution)
+        merged = merge_rectangles(rects)
+        self.lef_stats["obstructions"][layer] = (len(rects), len(merged))
+        debug.info(2, "LEF layer {0}: {1} blockages merged into {2} rectangles".format(
+            layer, len(rects), len(merged)))
+        line_format = self.indent + "RECT  {0} {1} {2} {3} ;\n"
+        # coordinates are already in database units
+        self.lef.write("".join(line_format.format(*rect) for rect in merged.tolist()))
+
     def lef_write_rect(self, rect):
         """ Write a LEF rectangle """
         self.lef.write("{0}RECT ".format(self.indent)) 
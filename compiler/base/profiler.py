@@ -0,0 +1,210 @@
+"""
+Opt-in profiler for compiler runs (OPTS.profile).
+
+Records the wall time and peak RSS of module creation (__init__, create_netlist, create_layout,
+add_pins, routing), spice/GDS/LEF writing, DRC/LVS/PEX and optimizer calls for each module class
+and module name. The spans are saved in the Chrome trace event format which can be loaded in
+chrome://tracing, Perfetto or speedscope as a flame graph.
+When disabled, the instrumented functions only check a module level flag.
+"""
+import functools
+import json
+import os
+import resource
+import threading
+import time
+
+import debug
+
+# category of the methods of design subclasses which are recorded,
+# __init__ is recorded as "create" and methods starting with ROUTE_PREFIX as "routing"
+PROFILED_METHODS = {"create_netlist": "netlist", "create_modules": "netlist",
+                    "add_pins": "netlist", "create_layout": "layout", "add_modules": "layout",
+                    "add_layout_pins": "layout"}
+ROUTE_PREFIX = "route_"
+
+enabled = False
+events = []
+start_time = 0.0
+lock = threading.Lock()
+thread_data = threading.local()
+
+
+def start():
+    """Clear previous events and start recording"""
+    global enabled, start_time
+    with lock:
+        events.clear()
+        start_time = time.perf_counter()
+        enabled = True
+
+
+def stop():
+    global enabled
+    enabled = False
+
+
+def is_enabled():
+    return enabled
+
+
+def get_peak_rss():
+    """Peak resident set size of the process in MB (ru_maxrss is in KB on linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_stack():
+    stack = getattr(thread_data, "stack", None)
+    if stack is None:
+        stack = thread_data.stack = []
+    return stack
+
+
+class Span:
+    def __init__(self, name, category, key=None, obj=None, **args):
+        """
+        :param name: event name e.g. class.method
+        :param category: phase e.g. layout, spice, verification
+        :param key: identifies the object the span is for, nested spans with the same
+                    name and key are merged into the outer span e.g. super().__init__ calls
+        :param obj: module the span is for, its name is saved when the span ends
+                    since the name is set in __init__
+        :param args: extra information saved with the event
+        """
+        self.name = name
+        self.category = category
+        self.key = key
+        self.obj = obj
+        self.args = args
+        self.recorded = False
+
+    def __enter__(self):
+        if not enabled:
+            return self
+        stack = get_stack()
+        if (self.key is not None and stack and stack[-1].key == self.key and
+                stack[-1].category == self.category):
+            return self
+        self.recorded = True
+        self.children_duration = 0.0
+        self.start_rss = get_peak_rss()
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self.recorded:
+            return False
+        end = time.perf_counter()
+        duration = end - self.start
+        stack = get_stack()
+        stack.pop()
+        if stack:
+            stack[-1].children_duration += duration
+        peak_rss = get_peak_rss()
+        args = dict(self.args)
+        if self.obj is not None:
+            args["module"] = getattr(self.obj, "name", None)
+        args.update({"peak_rss_mb": peak_rss, "peak_rss_increase_mb": peak_rss - self.start_rss,
+                     "self_time_s": duration - self.children_duration})
+        if exc_type is not None:
+            args["exception"] = exc_type.__name__
+        event = {"name": self.name, "cat": self.category, "ph": "X",
+                 "ts": (self.start - start_time) * 1e6, "dur": duration * 1e6,
+                 "pid": os.getpid(), "tid": threading.get_ident(), "args": args}
+        with lock:
+            events.append(event)
+        return False
+
+
+def span(name, category, **args):
+    return Span(name, category, **args)
+
+
+def profile_function(category, name=None, module_arg=None):
+    """
+    Decorator to record calls of a function
+    :param module_arg: index of the positional argument with the module name e.g. run_drc
+    """
+    def decorator(func):
+        event_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            span_args = {}
+            if module_arg is not None and len(args) > module_arg:
+                span_args["module"] = args[module_arg]
+            with Span(event_name, category, **span_args):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profile_method(category, name=None):
+    """Decorator to record calls of a method with the class and name of the object"""
+    def decorator(func):
+        method_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not enabled:
+                return func(self, *args, **kwargs)
+            class_name = self.__class__.__name__
+            with Span("{}.{}".format(class_name, method_name), category,
+                      key=(id(self), method_name), obj=self, module_class=class_name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_class(cls):
+    """Record __init__ and the creation and routing methods defined in cls"""
+    for attr_name, value in list(vars(cls).items()):
+        if not callable(value) or not hasattr(value, "__code__"):
+            continue  # static/class methods and attributes
+        if attr_name == "__init__":
+            category = "create"
+        elif attr_name in PROFILED_METHODS:
+            category = PROFILED_METHODS[attr_name]
+        elif attr_name.startswith(ROUTE_PREFIX):
+            category = "routing"
+        else:
+            continue
+        setattr(cls, attr_name, profile_method(category)(value))
+
+
+def get_summary():
+    """Total and self time per (category, name) sorted by total time"""
+    summary = {}
+    for event in list(events):
+        key = (event["cat"], event["name"])
+        entry = summary.setdefault(key, {"category": event["cat"], "name": event["name"],
+                                         "count": 0, "total_time": 0.0, "self_time": 0.0,
+                                         "peak_rss_mb": 0.0})
+        entry["count"] += 1
+        entry["total_time"] += event["dur"] * 1e-6
+        entry["self_time"] += event["args"]["self_time_s"]
+        entry["peak_rss_mb"] = max(entry["peak_rss_mb"], event["args"]["peak_rss_mb"])
+    return sorted(summary.values(), key=lambda x: x["total_time"], reverse=True)
+
+
+def format_summary(max_rows=20):
+    lines = ["{:<60} {:<14} {:>6} {:>10} {:>10} {:>10}".format(
+        "Name", "Category", "Count", "Total (s)", "Self (s)", "Peak (MB)")]
+    for entry in get_summary()[:max_rows]:
+        lines.append("{:<60} {:<14} {:>6} {:>10.3f} {:>10.3f} {:>10.1f}".format(
+            entry["name"][:60], entry["category"], entry["count"], entry["total_time"],
+            entry["self_time"], entry["peak_rss_mb"]))
+    return "\n".join(lines)
+
+
+def write_trace(file_name):
+    """Save the events in the Chrome trace event format"""
+    with lock:
+        trace = {"traceEvents": list(events), "displayTimeUnit": "ms",
+                 "otherData": {"summary": get_summary()}}
+    with open(file_name, "w") as f:
+        json.dump(trace, f)
+    debug.info(1, "Profile trace saved to {}".format(file_name))
@@ -4,11 +4,12 @@ import math
 import os
 import random
 import subprocess
-import time
 from functools import lru_cache
 from importlib import reload
 from typing import List, TYPE_CHECKING
 
+import numpy as np
+
 import globals
 import tech
 from base.geometry import rectangle
@@ -75,6 +76,23 @@ def round_to_grid(number):
     number_off = number_grid * grid
     return number_off
 
+
+def round_array_to_grid(values):
+    """
+    round_to_grid of each element of values, returns a float array of the same shape.
+    Each unique value is rounded with round_to_grid so results match scalar comparisons exactly
+    """
+    values = np.asarray(values, dtype=float)
+    unique_values, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round_to_grid(x) for x in unique_values.tolist()], dtype=float)
+    return rounded[inverse].reshape(values.shape)
+
+def modified_since(file_name, start_time):
+    """Whether file_name was modified at or after start_time (from time.time())
+    start_time is truncated to whole seconds since modification times may have coarse resolution"""
+    return os.path.getmtime(file_name) >= int(start_time)
+
+
 def snap_to_grid(offset):
     """
     Changes the coodrinate to match the grid settings
@@ -378,10 +396,7 @@ def run_command(command, stdout_file, stderror_file, verbose_level=1, cwd=None):
                 stdout_f.write(line)
 
     if process is not None:
-        while process.poll() is None:
-            # Process hasn't exited yet, let's wait some
-            time.sleep(0.5)
-        return process.returncode
+        return process.wait()
     else:
         return -1
 
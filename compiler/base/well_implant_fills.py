@@ -1,5 +1,7 @@
 from typing import List, Union
 
+import numpy as np
+
 import debug
 import tech
 from base import contact
@@ -71,6 +73,11 @@ def get_default_fill_layers():
     return layers, purposes
 
 
+def get_rect_extents(rects):
+    """(N, 4) array of (lx, by, rx, uy) for rects"""
+    return np.array([[x.lx(), x.by(), x.rx(), x.uy()] for x in rects], dtype=float).reshape(-1, 4)
+
+
 def create_wells_and_implants_fills(left_mod: design_inst, right_mod: design_inst,
                                     layers=None, purposes=None):
     """
@@ -98,34 +105,40 @@ def create_wells_and_implants_fills(left_mod: design_inst, right_mod: design_ins
 
         left_mod_rects = left_mod.get_layer_shapes(layer, purpose=purpose, recursive=True)
         right_mod_rects = right_mod.get_layer_shapes(layer, purpose=purpose, recursive=True)
-
-        for left_mod_rect in left_mod_rects:
-            if (round_g(left_mod_rect.rx()) < round_g(left_mod.width) and
-                    isinstance(left_mod, design)):
-                continue
-            # find right mod rect which overlaps
-            for right_mod_rect in right_mod_rects:
-                if round_g(right_mod_rect.lx()) > 0 and isinstance(right_mod, design):
-                    continue
-                if isinstance(left_mod, instance):
-                    if round_g(right_mod_rect.lx()) > round_g(right_mod.lx()):
-                        continue
-                    if round_g(left_mod_rect.rx()) < round_g(left_mod.rx()):
-                        continue
-                    if round_g(right_mod_rect.lx()) <= round_g(left_mod_rect.lx()):  # overlap
-                        continue
-
-                if left_mod_rect.by() < right_mod_rect.by():
-                    lowest_rect, highest_rect = left_mod_rect, right_mod_rect
-                else:
-                    lowest_rect, highest_rect = right_mod_rect, left_mod_rect
-                if lowest_rect.uy() < highest_rect.by():  # no overlap
-                    continue
-                rect_top = min(right_mod_rect.uy(), left_mod_rect.uy())
-                rect_bottom = max(right_mod_rect.by(), left_mod_rect.by())
-
-                fill_rect = (layer, rect_bottom, rect_top, left_mod_rect, right_mod_rect)
-                all_fills.append(fill_rect)
+        if not left_mod_rects or not right_mod_rects:
+            continue
+        left_lx, left_by, left_rx, left_uy = get_rect_extents(left_mod_rects).T
+        right_lx, right_by, right_rx, right_uy = get_rect_extents(right_mod_rects).T
+        left_rx_grid = utils.round_array_to_grid(left_rx)
+        right_lx_grid = utils.round_array_to_grid(right_lx)
+
+        # rows are left rects and columns are right rects
+        left_valid = np.ones(len(left_mod_rects), dtype=bool)
+        right_valid = np.ones(len(right_mod_rects), dtype=bool)
+        if isinstance(left_mod, design):
+            left_valid &= left_rx_grid >= round_g(left_mod.width)
+        if isinstance(right_mod, design):
+            right_valid &= right_lx_grid <= 0
+        candidates = left_valid[:, None] & right_valid[None, :]
+        if isinstance(left_mod, instance):
+            candidates &= (right_lx_grid <= round_g(right_mod.lx()))[None, :]
+            candidates &= (left_rx_grid >= round_g(left_mod.rx()))[:, None]
+            # overlap
+            candidates &= right_lx_grid[None, :] > utils.round_array_to_grid(left_lx)[:, None]
+
+        left_is_lowest = left_by[:, None] < right_by[None, :]
+        lowest_uy = np.where(left_is_lowest, left_uy[:, None], right_uy[None, :])
+        highest_by = np.where(left_is_lowest, right_by[None, :], left_by[:, None])
+        candidates &= lowest_uy >= highest_by
+
+        for left_index, right_index in zip(*np.nonzero(candidates)):
+            left_mod_rect = left_mod_rects[left_index]
+            right_mod_rect = right_mod_rects[right_index]
+            rect_top = min(right_mod_rect.uy(), left_mod_rect.uy())
+            rect_bottom = max(right_mod_rect.by(), left_mod_rect.by())
+
+            fill_rect = (layer, rect_bottom, rect_top, left_mod_rect, right_mod_rect)
+            all_fills.append(fill_rect)
     return all_fills
 
 
@@ -344,6 +357,112 @@ def evaluate_well_active_enclosure_spacing(top_module: design, bottom_module: de
     return min_space
 
 
+def get_spaces_by_width_and_length(layer, max_widths, min_widths, run_lengths, min_heights):
+    """design.get_space_by_width_and_length for arrays of rect pairs.
+    Rules are applied from lowest to highest priority so higher priority spaces overwrite"""
+    rules = [(None, lambda: design.get_space(layer, prefix=None))]
+    for prefix in ["parallel", "wide"]:
+        width_threshold = design.get_drc_by_layer(layer, prefix + "_width_threshold")
+        length_threshold = design.get_drc_by_layer(layer, prefix + "_length_threshold")
+        if width_threshold is not None and length_threshold is not None:
+            mask = (max_widths >= width_threshold) & (run_lengths >= length_threshold)
+            rules.append((mask, lambda prefix_=prefix: design.get_space(layer, prefix_)))
+    if "metal" in layer:
+        line_end_threshold = design.get_drc_by_layer(layer, "line_end_threshold")
+        if line_end_threshold:
+            rules.append((min_heights < line_end_threshold,
+                          lambda: design.get_line_end_space(layer)))
+    if "implant" in layer:
+        thin_threshold = design.get_drc_by_layer(layer, "thin_threshold")
+        if thin_threshold:
+            rules.append((min_widths < thin_threshold,
+                          lambda: design.get_space(layer, prefix="thin")))
+
+    spaces = np.zeros(len(max_widths))
+    unassigned = np.ones(len(max_widths), dtype=bool)
+    # spaces are only looked up for rules that are used
+    for mask, get_space in reversed(rules):
+        mask = unassigned if mask is None else mask & unassigned
+        if np.any(mask):
+            spaces[mask] = get_space()
+            unassigned &= ~mask
+    return spaces
+
+
+def get_first_space_increase(min_space, clearances, spaces, wide_space, permit_overlap):
+    """Index of the first pair which increases min_space when the pairs are evaluated in order.
+    Pairs whose clearance is larger than wide_space and overlapping implants are skipped"""
+    total_clearances = clearances + min_space
+    valid = (total_clearances <= wide_space) & (spaces > min_space)
+    if permit_overlap:
+        valid &= total_clearances > 0
+    indices = np.flatnonzero(valid)
+    return indices[0] if len(indices) else None
+
+
+def evaluate_layer_vertical_spacing(layer, top_rects, bottom_rects, top_module: design,
+                                    bottom_module: design, min_space, num_cols):
+    """
+    Evaluate minimum space between the bottom rects of top_module and the top rects of bottom_module
+    :param top_rects: (N, 4) array of (lx, by, rx, uy) of the top module
+    :param bottom_rects: (M, 4) array of (lx, by, rx, uy) of the bottom module
+    :return: updated min_space
+    """
+    wide_space = design.get_wide_space(layer)
+
+    top_rects = top_rects[top_rects[:, 1] < wide_space]
+    top_rects = top_rects[np.argsort(top_rects[:, 1], kind="stable")]
+    bottom_rects = bottom_rects[bottom_rects[:, 3] > bottom_module.height - wide_space]
+    bottom_rects = bottom_rects[np.argsort(-bottom_rects[:, 3], kind="stable")]
+    if len(top_rects) == 0 or len(bottom_rects) == 0:
+        return min_space
+
+    # rows are bottom rects and columns are top rects, ravel gives the evaluation order
+    top_lx, top_by, top_rx, top_uy = [x[None, :] for x in top_rects.T]
+    bottom_lx, bottom_by, bottom_rx, bottom_uy = [x[:, None] for x in bottom_rects.T]
+    top_clearance = top_by
+    bottom_clearance = bottom_module.height - bottom_uy
+    clearances = (top_clearance + bottom_clearance).ravel()
+
+    top_widths, bottom_widths = top_rx - top_lx, bottom_rx - bottom_lx
+    top_heights, bottom_heights = top_uy - top_by, bottom_uy - bottom_by
+    max_widths = np.maximum(bottom_widths, top_widths).ravel()
+    min_widths = np.minimum(bottom_widths, top_widths).ravel()
+    min_heights = np.minimum(bottom_heights, top_heights).ravel()
+
+    # the right most rect is the top rect if the lx are equal
+    top_is_right = top_lx >= bottom_lx
+    top_is_left = top_lx <= bottom_lx
+    right_lx = np.where(top_is_right, top_lx, bottom_lx)
+    right_rx = np.where(top_is_right, top_rx, bottom_rx)
+    left_rx = np.where(top_is_left, top_rx, bottom_rx)
+    run_lengths = np.minimum(np.abs(right_rx), np.abs(left_rx - right_lx))
+    full_width = (bottom_widths >= bottom_module.width) & (top_widths >= top_module.width)
+    run_lengths = np.where(full_width, num_cols * bottom_module.width, run_lengths).ravel()
+
+    # TODO look up table POLY DRC rules
+    if layer in [POLY, PO_DUMMY]:
+        is_horizontal = np.broadcast_to(top_widths > top_heights,
+                                        (len(bottom_rects), len(top_rects))).ravel()
+        target_spaces = np.where(is_horizontal, bottom_module.poly_space,
+                                 bottom_module.poly_vert_space)
+    else:
+        target_spaces = get_spaces_by_width_and_length(layer, max_widths, min_widths,
+                                                       run_lengths, min_heights)
+    evaluated_spaces = (-top_clearance + -bottom_clearance).ravel() + target_spaces
+
+    # min_space increases as pairs are evaluated which changes the pairs that are skipped
+    permit_overlap = layer in [NIMP, PIMP]
+    start = 0
+    while True:
+        index = get_first_space_increase(min_space, clearances[start:],
+                                         evaluated_spaces[start:], wide_space, permit_overlap)
+        if index is None:
+            return min_space
+        min_space = float(evaluated_spaces[start + index])
+        start += index + 1
+
+
 def evaluate_vertical_module_spacing(top_modules: List[design_inst],
                                      bottom_modules: List[design_inst],
                                      layers=None, min_space=None, num_cols=64):
@@ -379,61 +498,11 @@ def evaluate_vertical_module_spacing(top_modules: List[design_inst],
                             evaluate_well_active_enclosure_spacing(top_module, bottom_module,
                                                                    min_space))
             for layer in layers:
-
-                wide_space = design.get_wide_space(layer)
-
-                top_rects = top_inst.get_layer_shapes(layer, recursive=True)
-                top_rects = [x for x in top_rects if x.by() < wide_space]
-                top_rects = list(sorted(top_rects, key=lambda x: x.by()))
-
-                bottom_rects = bottom_inst.get_layer_shapes(layer, recursive=True)
-                bottom_rects = [x for x in bottom_rects
-                                if x.uy() > bottom_module.height - wide_space]
-                bottom_rects = list(sorted(bottom_rects, key=lambda x: x.uy(), reverse=True))
-                if not (top_rects or bottom_rects):  # layer does not exist
-                    continue
-
-                for bottom_rect in bottom_rects:
-                    bottom_clearance = bottom_module.height - bottom_rect.uy()
-                    for top_rect in top_rects:
-                        # don't bother if spacing is greater than wide spacing
-                        top_clearance = top_rect.by()
-                        total_clearance = top_clearance + bottom_clearance + min_space
-                        if total_clearance > wide_space:
-                            continue
-                        # permit overlaps for implants
-                        if layer in [NIMP, PIMP] and total_clearance <= 0:
-                            continue
-                        # else calculate desired space, note the width/height flip since vertical space is needed
-                        widths = [bottom_rect.rx() - bottom_rect.lx(),
-                                  top_rect.rx() - top_rect.lx()]
-                        heights = [bottom_rect.uy() - bottom_rect.by(),
-                                   top_rect.uy() - top_rect.by()]
-
-                        if ((bottom_rect.rx() - bottom_rect.lx()) >= bottom_module.width and
-                                (top_rect.rx() - top_rect.lx()) >= top_module.width):
-                            run_length = num_cols * bottom_module.width
-                        else:
-                            right_most = max([top_rect, bottom_rect], key=lambda x: x.lx())
-                            left_most = min([top_rect, bottom_rect], key=lambda x: x.lx())
-                            run_length = min(abs(right_most.rx()),
-                                             abs(left_most.rx() - right_most.lx()))
-
-                        target_space = design. \
-                            get_space_by_width_and_length(layer,
-                                                          max_width=max(widths),
-                                                          min_width=min(widths),
-                                                          run_length=run_length,
-                                                          heights=heights)
-                        # TODO look up table POLY DRC rules
-                        if layer in [POLY, PO_DUMMY]:
-                            if top_rect.rx() - top_rect.lx() > top_rect.uy() - top_rect.by():
-                                target_space = bottom_module.poly_space
-                            else:
-                                target_space = bottom_module.poly_vert_space
-                        evaluated_space = -top_clearance + -bottom_clearance + target_space
-                        if evaluated_space > min_space:
-                            min_space = evaluated_space
+                top_rects = top_inst.get_layer_shapes_summary(layer, recursive=True).corners
+                bottom_rects = bottom_inst.get_layer_shapes_summary(layer, recursive=True).corners
+                min_space = evaluate_layer_vertical_spacing(layer, top_rects, bottom_rects,
+                                                            top_module, bottom_module,
+                                                            min_space, num_cols)
     # nwell to tap active
     tap_to_nwell = tech.drc.get("nwell_to_tap_active_space",
                                 tech.drc.get("nwell_to_active_space", 0))
@@ -1,5 +1,4 @@
 from globals import find_exe, get_tool
-from characterizer.simulation.spice_characterizer import SpiceCharacterizer
 from .lib import *
 from .setup_hold import *
 
@@ -22,10 +21,26 @@ if not OPTS.analytical_delay:
     if OPTS.spice_exe == "":
         debug.error("No recognizable spice version found. Unable to perform characterization.", 1)
 
-    if OPTS.spice_name in ["hspice", "spectre"]:
+    if OPTS.spice_name not in ["hspice", "spectre"]:
+        raise ValueError(f"Invalid spice reader for spice name {OPTS.spice_name}")
+
+# the simulation classes and spice readers are imported on first use
+# remove the ones loaded before a reload since the spice options may have changed
+globals().pop("SpiceReader", None)
+
+
+def __getattr__(name):
+    if name == "SpiceCharacterizer":
+        from characterizer.simulation.spice_characterizer import SpiceCharacterizer
+        globals()["SpiceCharacterizer"] = SpiceCharacterizer
+        return SpiceCharacterizer
+    elif (name == "SpiceReader" and not OPTS.analytical_delay and
+          OPTS.spice_name in ["hspice", "spectre"]):
         try:
             from characterizer.simulation.psf_reader import PsfReader as SpiceReader
         except:
             debug.warning(f"Invalid spice reader for spice name {OPTS.spice_name}")
-    else:
-        raise ValueError(f"Invalid spice reader for spice name {OPTS.spice_name}")
+        else:
+            globals()["SpiceReader"] = SpiceReader
+            return SpiceReader
+    raise AttributeError(f"module {__name__} has no attribute {name}")
@@ -0,0 +1,129 @@
+"""
+Process pool for independent characterization jobs (corners, slew/load points).
+
+Every job runs in its own temp directory with a frozen copy of the options taken when the job
+was created so simulations don't overwrite each other's stimulus/measurement files and
+option changes made by one job (e.g. OPTS.trim_netlist) aren't seen by the others.
+Workers are forked so the (unpicklable) sram and job functions are inherited, only the job
+index is sent to the workers and results are returned in job order.
+"""
+import copy
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+import debug
+from globals import OPTS
+
+# jobs of the current run_jobs call, inherited by forked workers
+_active_jobs = []
+
+
+class CharacterizationJob:
+    def __init__(self, name, func, *args, **kwargs):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.options = freeze_options(vars(OPTS))
+
+
+def freeze_options(options):
+    frozen = {}
+    for key, value in options.items():
+        try:
+            frozen[key] = copy.deepcopy(value)
+        except TypeError:
+            # e.g. modules imported by config files are shared
+            frozen[key] = value
+    return frozen
+
+
+def get_num_workers(num_workers=None):
+    if num_workers is None:
+        num_workers = OPTS.num_characterization_workers
+    return max(1, num_workers or os.cpu_count() or 1)
+
+
+@contextmanager
+def job_environment(job):
+    """Apply job's frozen options and a unique temp dir, restoring the previous state after.
+    The temp dir is removed if the job succeeds otherwise it's preserved for debugging"""
+    previous_options = vars(OPTS).copy()
+    previous_input_dir = os.environ.get("NGSPICE_INPUT_DIR")
+
+    jobs_root = os.path.join(job.options["openram_temp"], "characterization")
+    os.makedirs(jobs_root, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=f"{job.name}_", dir=jobs_root)
+
+    vars(OPTS).clear()
+    vars(OPTS).update(freeze_options(job.options))
+    OPTS.openram_temp = work_dir
+    if OPTS.spice_name == "ngspice":
+        os.environ["NGSPICE_INPUT_DIR"] = work_dir
+    try:
+        yield work_dir
+    finally:
+        vars(OPTS).clear()
+        vars(OPTS).update(previous_options)
+        if previous_input_dir is None:
+            os.environ.pop("NGSPICE_INPUT_DIR", None)
+        else:
+            os.environ["NGSPICE_INPUT_DIR"] = previous_input_dir
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_job(job_index):
+    job = _active_jobs[job_index]
+    start_time = time.time()
+    with job_environment(job):
+        result = job.func(*job.args, **job.kwargs)
+    debug.info(2, "Characterization job %s completed in %.3gs", job.name, time.time() - start_time)
+    return result
+
+
+def in_worker():
+    """Pool workers are daemons which can't start their own pool"""
+    return multiprocessing.current_process().daemon
+
+
+def get_num_search_points():
+    """Number of candidates to simulate concurrently in each round of a bracket search"""
+    if in_worker():
+        return 1
+    return get_num_workers()
+
+
+def map_candidates(name, func, candidates):
+    """Evaluate func for each candidate, concurrently if there is more than one candidate"""
+    if len(candidates) == 1:
+        return [func(candidates[0])]
+    jobs = [CharacterizationJob(name, func, candidate) for candidate in candidates]
+    return run_jobs(jobs, num_workers=len(jobs))
+
+
+def run_jobs(jobs, num_workers=None):
+    """Run jobs concurrently using up to num_workers processes
+    :return: list of job results in the same order as jobs"""
+    global _active_jobs
+    jobs = list(jobs)
+    num_workers = min(get_num_workers(num_workers), len(jobs))
+    if num_workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        debug.warning("Parallel characterization requires 'fork', running jobs serially")
+        num_workers = 1
+    if num_workers > 1 and in_worker():
+        num_workers = 1
+    debug.info(1, "Running %d characterization jobs with %d workers", len(jobs), num_workers)
+
+    previous_jobs = _active_jobs
+    _active_jobs = jobs
+    try:
+        if num_workers <= 1:
+            return [run_job(i) for i in range(len(jobs))]
+        with multiprocessing.get_context("fork").Pool(num_workers) as pool:
+            return pool.map(run_job, range(len(jobs)), chunksize=1)
+    finally:
+        _active_jobs = previous_jobs
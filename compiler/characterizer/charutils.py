@@ -4,12 +4,98 @@ import re
 import debug
 from globals import OPTS
 
+# separates the measurements of each point of a simulator-native parameter sweep
+SWEEP_MARKER = "sweep_point"
+
 
 def relative_compare(value1, value2, error_tolerance=0.001):
     """ This is used to compare relative values for convergence. """
     return (abs(value1 - value2) / max(value1, value2) <= error_tolerance)
 
 
+def secant_search(evaluate, lower, upper, lower_margin=None, upper_margin=None,
+                  error_tolerance=0.05, time_out=25):
+    """
+    Find the smallest value in (lower, upper] for which 'evaluate' succeeds.
+    Uses a safeguarded regula falsi (Illinois) step on the measured margins,
+    falling back to bisection when a margin couldn't be measured.
+    :param evaluate: value -> (success, margin). margin <= 0 on success, > 0 on failure,
+                     None if it couldn't be measured
+    :param lower: value known to fail
+    :param upper: value known to succeed
+    :param lower_margin: margin at lower if known
+    :param upper_margin: margin at upper if known
+    :return: smallest successful value within error_tolerance
+    """
+    min_step = 0.1  # keep candidates away from the bracket edges to guarantee progress
+    last_side = None
+    while not relative_compare(upper, lower, error_tolerance=error_tolerance):
+        time_out -= 1
+        if time_out <= 0:
+            debug.error("Timed out, could not converge on minimum value.", 2)
+
+        span = upper - lower
+        if lower_margin is None or upper_margin is None or lower_margin <= upper_margin:
+            candidate = 0.5 * (lower + upper)
+        else:
+            candidate = upper - upper_margin * span / (upper_margin - lower_margin)
+            # step slightly past the estimated root towards the side that hasn't moved
+            # so an accurate estimate closes the bracket from both sides
+            bias = 0.4 * error_tolerance * candidate
+            candidate += bias if last_side == "lower" else -bias
+            candidate = min(max(candidate, lower + min_step * span), upper - min_step * span)
+
+        debug.info(1, "Secant search: {0} (ub: {1} lb: {2})".format(candidate, upper, lower))
+        success, margin = evaluate(candidate)
+        if success:
+            upper, upper_margin = candidate, margin
+            if last_side == "upper" and lower_margin is not None:
+                lower_margin *= 0.5
+            last_side = "upper"
+        else:
+            lower, lower_margin = candidate, margin
+            if last_side == "lower" and upper_margin is not None:
+                upper_margin *= 0.5
+            last_side = "lower"
+    return upper
+
+
+def multi_point_search(evaluate, feasible, infeasible, num_points=1, error_tolerance=0.001,
+                       time_out=None):
+    """
+    Find the boundary between feasible and infeasible values.
+    Each round evaluates num_points evenly spaced candidates between the bounds
+    (which may be run concurrently) shrinking the bracket by a factor of num_points + 1.
+    num_points=1 is a bisection.
+    :param evaluate: list of candidates -> list of (success, result) for each candidate
+    :param feasible: value known to succeed
+    :param infeasible: value known to fail, can be smaller or larger than feasible
+    :param time_out: maximum number of rounds
+    :return: (feasible value within error_tolerance of infeasible value,
+              result of feasible value or None if the initial feasible value was never moved)
+    """
+    feasible_result = None
+    while True:
+        if time_out is not None:
+            time_out -= 1
+            if time_out <= 0:
+                debug.error("Timed out, could not converge on minimum value.", 2)
+
+        step = (infeasible - feasible) / (num_points + 1)
+        candidates = [feasible + (i + 1) * step for i in range(num_points)]
+        debug.info(2, "Multi-point search: {0} (feasible: {1} infeasible: {2})".format(
+            candidates, feasible, infeasible))
+        # candidates are ordered from the feasible side, stop at the first failure
+        for candidate, (success, result) in zip(candidates, evaluate(candidates)):
+            if not success:
+                infeasible = candidate
+                break
+            feasible, feasible_result = candidate, result
+
+        if relative_compare(feasible, infeasible, error_tolerance=error_tolerance):
+            return feasible, feasible_result
+
+
 def get_measurement_file():
     if OPTS.spice_name == "xa":
         # customsim has a different output file name
@@ -36,19 +122,71 @@ def get_sim_file():
         return "timing.lis"
 
 
-def parse_output(filename, key, find_max=True, sim_dir=None):
-    """Parses a hspice output.lis file for a key value"""
-    re_pattern = r"{0}\s*=\s*(-?\d+.?\d*[e]?[-+]?[0-9]*\S*)\s+.*".format(key)
-    full_filename = get_measurement_file()
+def get_sweep_sim_file(index):
+    """Waveform file of a sweep point"""
+    if OPTS.spice_name == "spectre":
+        from .stimuli import ParameterSweep
+        return "{}-{:03d}_{}".format(ParameterSweep.name, index, get_sim_file())
+    elif OPTS.spice_name == "hspice":
+        return "timing.tr{}".format(index)
+    return get_sim_file()
+
+
+def read_measurement_file(file_name, sim_dir=None):
     if sim_dir:
-        full_filename = os.path.join(sim_dir, full_filename)
+        file_name = os.path.join(sim_dir, file_name)
     try:
-        f = open(full_filename, "rt")
+        f = open(file_name, "rt")
     except IOError:
-        debug.error("Unable to open spice output file: {0}".format(full_filename), 1)
+        debug.error("Unable to open spice output file: {0}".format(file_name), 1)
     else:
         with f:
-            contents = f.read()
+            return f.read()
+
+
+def split_sweep_measurements(contents, num_points):
+    """Split measurements written to a single file into each sweep point's measurements"""
+    starts = [x.start() for x in re.finditer(r"^.*{}\s*=\s*\d+".format(SWEEP_MARKER), contents,
+                                             flags=re.MULTILINE)]
+    if len(starts) != num_points:
+        # Measurements are written in the same order for each point
+        # so each point starts at a repeat of the first measurement
+        names = re.finditer(r"^\s*(\w+)\s*=", contents, flags=re.MULTILINE)
+        first_name = next(names, None)
+        if first_name is not None:
+            starts = [first_name.start()] + [x.start() for x in names
+                                             if x.group(1) == first_name.group(1)]
+    debug.check(len(starts) == num_points,
+                "Found {} of {} sweep points in measurements".format(len(starts), num_points))
+    ends = starts[1:] + [len(contents)]
+    return [contents[start:end] for start, end in zip(starts, ends)]
+
+
+def load_sweep_measurements(num_points, sim_dir=None):
+    """Measurement file contents for each point of a parameter sweep"""
+    if OPTS.spice_name == "hspice":
+        # each .ALTER writes its own measurement file
+        return [read_measurement_file("timing.mt{}".format(i), sim_dir) for i in range(num_points)]
+    contents = read_measurement_file(get_measurement_file(), sim_dir)
+    if num_points == 1:
+        return [contents]
+    return split_sweep_measurements(contents, num_points)
+
+
+def parse_sweep_output(key, num_points, find_max=True, sim_dir=None):
+    """Parse key value for each point of a parameter sweep"""
+    return [parse_output_contents(contents, key, find_max)
+            for contents in load_sweep_measurements(num_points, sim_dir)]
+
+
+def parse_output(filename, key, find_max=True, sim_dir=None):
+    """Parses a hspice output.lis file for a key value"""
+    contents = read_measurement_file(get_measurement_file(), sim_dir)
+    return parse_output_contents(contents, key, find_max)
+
+
+def parse_output_contents(contents, key, find_max=True):
+    re_pattern = r"{0}\s*=\s*(-?\d+.?\d*[e]?[-+]?[0-9]*\S*)\s+.*".format(key)
     # val = re.search(r"{0}\s*=\s*(-?\d+.?\d*\S*)\s+.*".format(key), contents)
     vals = re.findall(re_pattern, contents, flags=re.IGNORECASE)
     vals_float = list(map(convert_to_float, vals))
@@ -5,6 +5,7 @@ import numpy as np
 
 import debug
 import tech
+from base import profiler
 from base.design import METAL3, METAL2
 from base.geometry import instance, rectangle
 from base.pin_layout import pin_layout
@@ -23,6 +24,7 @@ class ControlBufferOptimizer:
     def __init__(self, bank: BaselineBank):
         self.bank = bank
 
+    @profiler.profile_method("optimization")
     def run_optimizations(self):
         run_optimizations_ = getattr(OPTS, 'run_optimizations', False)
         if not run_optimizations_:
@@ -586,6 +588,7 @@ class ControlBufferOptimizer:
         if is_precharge:
             upper_bounds[-1] = OPTS.max_precharge_size
 
+    @profiler.profile_method("optimization")
     def optimize_config(self, optimization_func, buffer_stages_str, initial_stages, is_precharge,
                         method):
         """Run actual optimization using scipy.minimize
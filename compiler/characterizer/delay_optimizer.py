@@ -1,7 +1,6 @@
 from typing import List
 
 import numpy as np
-from scipy.optimize import Bounds, minimize
 
 import debug
 from characterizer.delay_loads import DistributedLoad, InverterLoad, ParasiticLoad, WireLoad, PrechargeLoad, NandLoad, \
@@ -213,6 +212,7 @@ class LoadOptimizer:
         :param bounds: bounds for each delay stage
         :return: numpy array of buffer sizes
         """
+        from scipy.optimize import Bounds, minimize
         initial_guess = np.asarray(initial_guess)
         num_variables = len(initial_guess)
 
@@ -237,6 +237,7 @@ class LoadOptimizer:
         :param method: scipy optimization method e.g. SLSQP, COBYLA
         :return: numpy array of buffer sizes
         """
+        from scipy.optimize import Bounds, minimize
 
         initial_guess = np.asarray(initial_guess)
         num_variables = len(initial_guess)
@@ -1,7 +1,10 @@
 from abc import ABC
+from functools import lru_cache
 from itertools import groupby
 from typing import List
 
+import numpy as np
+
 from tech import drc, spice, layer as tech_layers
 
 
@@ -35,6 +38,9 @@ class DelayParamsBase(ABC):
     min_width = drc["minwidth_metal1"]
     min_space = drc["metal1_to_metal1"]
     rc_map = {}
+    # layer -> (sorted widths, width definition order, [sorted spaces per width],
+    #           [space definition order per width], [[RC per space] per width])
+    rc_tables = {}
 
     @classmethod
     def initialize(cls):
@@ -58,6 +64,49 @@ class DelayParamsBase(ABC):
                         width_map[rc_param.space] = rc_param
                     layer_map[width] = width_map
                 cls.rc_map[layer] = layer_map
+                cls.rc_tables[layer] = cls.create_rc_table(layer_map)
+
+    @staticmethod
+    def sort_keys(value_map):
+        """Sorted keys of value_map and the position of each sorted key in the definition order"""
+        definition_order = list(value_map.keys())
+        keys = sorted(definition_order)
+        return np.array(keys), np.array([definition_order.index(x) for x in keys])
+
+    @staticmethod
+    def create_rc_table(layer_map):
+        """Sort widths and spaces so closest matches can be found using np.searchsorted"""
+        widths, width_order = DelayParamsBase.sort_keys(layer_map)
+        spaces = []
+        space_orders = []
+        rc_params = []
+        for width in widths:
+            width_map = layer_map[width]
+            width_spaces, space_order = DelayParamsBase.sort_keys(width_map)
+            spaces.append(width_spaces)
+            space_orders.append(space_order)
+            rc_params.append([width_map[space] for space in width_spaces])
+        return widths, width_order, spaces, space_orders, rc_params
+
+    @staticmethod
+    def find_closest_indices(sorted_values, values, order=None):
+        """
+        Indices of closest entries in sorted_values
+        :param order: definition order of sorted_values, ties go to the entry defined first
+                      like min(values, key=distance) over the definition order.
+                      Ties go to the smaller value if order isn't specified
+        """
+        values = np.asarray(values)
+        upper = np.clip(np.searchsorted(sorted_values, values), 1, len(sorted_values) - 1)
+        if len(sorted_values) == 1:
+            return np.zeros_like(upper)
+        lower = upper - 1
+        upper_distance = sorted_values[upper] - values
+        lower_distance = values - sorted_values[lower]
+        use_upper = upper_distance < lower_distance
+        if order is not None:
+            use_upper |= (upper_distance == lower_distance) & (order[upper] < order[lower])
+        return np.where(use_upper, upper, lower)
 
     @classmethod
     def get_routing_layers(cls):
@@ -69,6 +118,7 @@ class DelayParamsBase(ABC):
         return ["metal{}".format(i) for i in metal_layer_suffixes]
 
     @classmethod
+    @lru_cache(maxsize=1024)
     def get_rc(cls, layer=None, width=None, space=None):
         """Return cap in F per um and r in ohm per micron """
         if not cls.rc_map:
@@ -85,10 +135,50 @@ class DelayParamsBase(ABC):
         r = rc_def.res / width
         return c, r
 
+    @classmethod
+    def get_rc_batch(cls, layers, widths, spaces=None):
+        """
+        Vectorized version of get_rc
+        :param layers: layer name per wire
+        :param widths: wire widths in um, zero or nan entries default to min_width
+        :param spaces: wire spaces in um, zero or nan entries default to min_space
+        :return: (cap in F per um, res in ohm per um) as numpy arrays
+        """
+        if not cls.rc_map:
+            cls.initialize()
+        widths = np.nan_to_num(np.asarray(widths, dtype=float), nan=0.0)
+        widths = np.where(widths == 0, cls.min_width, widths)
+        if spaces is None:
+            spaces = np.full_like(widths, cls.min_space)
+        else:
+            spaces = np.nan_to_num(np.asarray(spaces, dtype=float), nan=0.0)
+            spaces = np.where(spaces == 0, cls.min_space, spaces)
+        layers = np.asarray([layer or "metal1" for layer in layers])
+
+        unit_caps = np.zeros_like(widths)
+        unit_res = np.zeros_like(widths)
+        for layer in np.unique(layers):
+            layer_indices = np.flatnonzero(layers == layer)
+            layer_widths, width_order, layer_spaces, space_orders, rc_params = \
+                cls.rc_tables[layer]
+            width_indices = cls.find_closest_indices(layer_widths, widths[layer_indices],
+                                                     width_order)
+            for width_index in np.unique(width_indices):
+                wire_indices = layer_indices[width_indices == width_index]
+                space_indices = cls.find_closest_indices(layer_spaces[width_index],
+                                                         spaces[wire_indices],
+                                                         space_orders[width_index])
+                width_rc = rc_params[width_index]
+                unit_caps[wire_indices] = [width_rc[i].cap for i in space_indices]
+                unit_res[wire_indices] = [width_rc[i].res for i in space_indices]
+        return unit_caps * widths, unit_res / widths
+
     @classmethod
     def find_closest(cls, layer, width, space) -> RC:
-        layer_map = cls.rc_map[layer]
-        closest_width = min(layer_map.keys(), key=lambda x: abs(x - width))
-        width_map = layer_map[closest_width]
-        closest_space = min(width_map.keys(), key=lambda x: abs(x - space))
-        return width_map[closest_space]
+        if not cls.rc_map:
+            cls.initialize()
+        widths, width_order, spaces, space_orders, rc_params = cls.rc_tables[layer]
+        width_index = int(cls.find_closest_indices(widths, width, width_order))
+        space_index = int(cls.find_closest_indices(spaces[width_index], space,
+                                                   space_orders[width_index]))
+        return rc_params[width_index][space_index]
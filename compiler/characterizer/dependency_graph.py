@@ -6,12 +6,17 @@ TODO
     - More systematic pin length computation, currently uses max(pin_length, min(cell_width, cell_height))
     - Distributed loads are not detected if the nesting hierarchy is greater than one -> Implement flatenning load hierarchy to fix
 """
+import copy
 import math
+import operator
+from collections import deque
 from typing import List, Tuple, Dict, Union
 
+import numpy as np
+
 import debug
 from base.design import design
-from base.hierarchy_spice import OUTPUT, INOUT, INPUT, delay_data
+from base.hierarchy_spice import OUTPUT, INOUT, INPUT, delay_data, spice
 
 
 class ModuleConn(tuple):
@@ -30,6 +35,75 @@ class ModuleConn(tuple):
         return self.__str__()
 
 
+class ConnectivityIndex:
+    """Lookup tables for the connections of a module's instances
+    Built once and cached on the module by 'get_connectivity_index'
+    Connections are edited by appending (connect_inst), by replacing module.conns
+    or by replacing an instance's connection list so the index keeps references to both"""
+
+    def __init__(self, module: design):
+        self.module = module
+        self.conns = module.conns
+        self.conn_lists = list(module.conns)
+        self.conn_indices = {}  # type: Dict[Tuple[str], int]
+        self.instances = {}
+        # lower case net -> [(instance index, child pin)], first occurrence per instance
+        self.net_connections = {}  # type: Dict[str, List[Tuple[int, str]]]
+        # net -> [(instance index, conn position)], all occurrences
+        self.net_positions = {}  # type: Dict[str, List[Tuple[int, int]]]
+        self.pin_dirs = {}
+
+        for inst_index, (inst, conn) in enumerate(zip(module.insts, module.conns)):
+            self.conn_indices.setdefault(tuple(conn), inst_index)
+            self.instances.setdefault(inst.name.lower().strip(), inst)
+            seen_nets = set()
+            for position, net in enumerate(conn):
+                self.net_positions.setdefault(net, []).append((inst_index, position))
+                net_lower = net.lower()
+                if net_lower in seen_nets:
+                    continue
+                seen_nets.add(net_lower)
+                child_pin = inst.mod.pins[position]
+                self.net_connections.setdefault(net_lower, []).append((inst_index, child_pin))
+
+    def is_valid(self):
+        conns = self.module.conns
+        return (conns is self.conns and len(conns) == len(self.conn_lists) and
+                all(map(operator.is_, conns, self.conn_lists)))
+
+    def get_pin_dir(self, pin_name):
+        if pin_name not in self.pin_dirs:
+            self.pin_dirs[pin_name] = self.module.get_pin_dir(pin_name)
+        return self.pin_dirs[pin_name]
+
+    def get_conn_index(self, conn: List[str]):
+        return self.conn_indices[tuple(conn)]
+
+    def get_instance(self, instance_name: str):
+        instance_name = instance_name.lower()
+        if instance_name in self.instances:
+            return self.instances[instance_name]
+        if instance_name.startswith("x") and instance_name[1:] in self.instances:
+            return self.instances[instance_name[1:]]
+        return None
+
+    def get_net_connections(self, net: str):
+        """yields (instance index, child pin, pin direction) for all instances connected to net"""
+        for inst_index, child_pin in self.net_connections.get(net.lower(), []):
+            child_module = self.module.insts[inst_index].mod
+            pin_dir = get_connectivity_index(child_module).get_pin_dir(child_pin)
+            yield inst_index, child_pin, pin_dir
+
+
+def get_connectivity_index(module: design) -> ConnectivityIndex:
+    """Get cached connectivity index for module. Rebuilt if connections have been edited"""
+    index = getattr(module, "connectivity_index", None)
+    if index is None or not index.is_valid():
+        index = ConnectivityIndex(module)
+        module.connectivity_index = index
+    return index
+
+
 class GraphLoad:
 
     def __init__(self, pin_name: str, module: design, wire_length: float = 0.0, count: int = 1):
@@ -87,6 +161,47 @@ class GraphLoads:
         return "\n".join([str(x) for x in self.loads.values()])
 
 
+class NodeDelayParams:
+    """Slew and corner independent parameters for evaluating a GraphNode's delay
+    The evaluation functions accept numpy arrays for driver parameters and slews"""
+
+    def __init__(self, load_caps: float, wire_res: float = 0.0, is_distributed: bool = False,
+                 cap_per_stage: float = 0.0, res_per_stage: float = 0.0, num_stages: int = 0):
+        self.load_caps = load_caps
+        self.wire_res = wire_res  # resistance of wire connecting to distributed load
+        self.is_distributed = is_distributed
+        self.cap_per_stage = cap_per_stage
+        self.res_per_stage = res_per_stage
+        self.num_stages = num_stages
+
+    @staticmethod
+    def evaluate_driver(node: 'GraphNode', corner=None):
+        """:return (driver resistance, driver gm)"""
+        driver_res = node.evaluate_resistance(corner=corner)
+        driver_gm = node.module.evaluate_driver_gm(pin_name=node.out_net, corner=corner)
+        return driver_res, driver_gm
+
+    def evaluate(self, driver_res, driver_gm, slew_in):
+        """
+        :param driver_res: scalar or array of driver resistances
+        :param driver_gm: scalar or array of driver gm, same shape as driver_res
+        :param slew_in: scalar or array broadcastable against driver_res
+        :return: delay, slew_out
+        """
+        driver_res = driver_res + self.wire_res
+        if self.is_distributed:
+            delay, slew_out = spice.distributed_delay(self.cap_per_stage, self.res_per_stage,
+                                                      self.num_stages, driver_res, driver_gm,
+                                                      self.load_caps, slew_in)
+            ones = np.ones_like(slew_in * driver_res)
+            return delay * ones, slew_out * ones
+
+        tau = self.load_caps * driver_res
+        beta = 1 / (driver_gm * driver_res)
+        alpha = slew_in / tau
+        return spice.horowitz_delay(tau, beta, alpha)
+
+
 class GraphNode:
     """Represent a node on a graph. Includes
             node net name
@@ -108,7 +223,7 @@ class GraphNode:
         self.all_parent_modules = [x for x in all_parent_modules]  # make a copy
         self.conn = conn
 
-        conn_index = self.parent_module.conns.index(conn)
+        conn_index = get_connectivity_index(self.parent_module).get_conn_index(conn)
         self.instance = self.parent_module.insts[conn_index]
         self.instance_name = self.instance.name
 
@@ -119,6 +234,13 @@ class GraphNode:
 
         debug.info(3, "Created GraphNode: %s", self)
 
+    def copy(self):
+        """Copy with independent hierarchy and loads so the copy can be re-parented"""
+        node_copy = copy.copy(self)
+        node_copy.all_parent_modules = [x for x in self.all_parent_modules]
+        node_copy.loads = GraphLoads()
+        return node_copy
+
     def get_next_load(self, next_node: 'GraphNode') -> Tuple[List[GraphLoad], Union[None, GraphLoad]]:
 
         if next_node is None:
@@ -159,7 +281,8 @@ class GraphNode:
         def get_loads_at_net(net: str, conn: List[str], module: design):
             """Gets all the nodes at net except the one at conn"""
 
-            conn_index = module.conns.index(conn)
+            connectivity_index = get_connectivity_index(module)
+            conn_index = connectivity_index.get_conn_index(conn)
             net_index = conn.index(net)
 
             loads = []
@@ -172,25 +295,21 @@ class GraphNode:
             else:
                 driver_pin_name = driver_inst.mod.pins[net_index]
                 driver_pin = driver_inst.get_pin(driver_pin_name)
-            for inst_index in range(len(module.conns)):
-                module_conn = module.conns[inst_index]
-                if net not in module_conn:
+            net_positions = connectivity_index.net_positions.get(net, [])
+            for inst_index, conn_net_index in net_positions:
+                if inst_index == conn_index and conn_net_index == net_index:
+                    # original net we're tracing
                     continue
-                net_indices = [j for j, x in enumerate(module_conn) if x == net]
-                for conn_net_index in net_indices:
-                    if inst_index == conn_index and conn_net_index == net_index:
-                        # original net we're tracing
-                        continue
-                    inst_mod = module.insts[inst_index].mod
-                    pin_index = module_conn.index(net)
-                    input_pin_name = inst_mod.pins[pin_index]
-                    if estimate_wire_lengths:
-                        inst_pin = module.insts[inst_index].get_pin(input_pin_name)
-                        x_distance, y_distance = inst_pin.distance_from(driver_pin)
-                        wire_length = x_distance + y_distance
-                    else:
-                        wire_length = 0.0
-                    loads.append((input_pin_name, inst_mod, wire_length))
+                inst_mod = module.insts[inst_index].mod
+                pin_index = module.conns[inst_index].index(net)
+                input_pin_name = inst_mod.pins[pin_index]
+                if estimate_wire_lengths:
+                    inst_pin = module.insts[inst_index].get_pin(input_pin_name)
+                    x_distance, y_distance = inst_pin.distance_from(driver_pin)
+                    wire_length = x_distance + y_distance
+                else:
+                    wire_length = 0.0
+                loads.append((input_pin_name, inst_mod, wire_length))
             return loads
 
         all_loads = []
@@ -220,6 +339,14 @@ class GraphNode:
         return self.driver_res
 
     def evaluate_delay(self, next_node: 'GraphNode', slew_in, corner=None, swing=0.5):
+        delay_params = self.extract_delay_params(next_node)
+        driver_res, driver_gm = delay_params.evaluate_driver(self, corner=corner)
+        delay, slew_out = delay_params.evaluate(driver_res, driver_gm, slew_in)
+        self.delay = delay_data(float(delay), float(slew_out))
+        return self.delay
+
+    def extract_delay_params(self, next_node: 'GraphNode') -> 'NodeDelayParams':
+        """Extract the slew and corner independent parameters needed for delay evaluation"""
         other_loads, next_node_load = self.get_next_load(next_node)
 
         # Determine if this is a distributed load
@@ -242,27 +369,13 @@ class GraphNode:
                                                      wire_length=0)
         load_caps += intrinsic_cap
 
-        # driver res
-        driver_res = self.evaluate_resistance(corner=corner)
-        driver_gm = self.module.evaluate_driver_gm(pin_name=self.out_net, corner=corner)
-
         if is_distributed:
-            return self.evaluate_distributed_delay(driver_res, driver_gm, load_caps,
-                                                   next_node_load, next_node, slew_in)
-        else:  # Horowitz
-
-            tau = load_caps * driver_res
-            beta = 1 / (driver_gm * driver_res)
-            alpha = slew_in / tau
+            return self.extract_distributed_params(load_caps, next_node_load, next_node)
+        return NodeDelayParams(load_caps)
 
-            delay, slew_out = self.module.horowitz_delay(tau, beta, alpha)
-
-            self.delay = delay_data(delay, slew_out)
-            return self.delay
-
-    def evaluate_distributed_delay(self, driver_res: float, driver_gm: float, load_caps: float,
-                                   next_node_load: GraphLoad, next_node: 'GraphNode',
-                                   slew_in: float):
+    def extract_distributed_params(self, load_caps: float, next_node_load: GraphLoad,
+                                   next_node: 'GraphNode'):
+        wire_res = 0.0
         instances_groups = next_node_load.module.group_pin_instances_by_mod(next_node_load.pin_name)
         # find the most relevant instance group.
         # Just a heuristic, getting more deterministic result is more complicated
@@ -303,10 +416,9 @@ class GraphNode:
                                                                      wire_width=connecting_wire_width,
                                                                      wire_length=connecting_wire_length)
             load_caps += additional_wire_cap
-            additional_wire_res = next_node_load.module.get_wire_res(wire_layer=input_pin.layer,
-                                                                     wire_width=connecting_wire_width,
-                                                                     wire_length=connecting_wire_length)
-            driver_res += additional_wire_res
+            wire_res = next_node_load.module.get_wire_res(wire_layer=input_pin.layer,
+                                                          wire_width=connecting_wire_width,
+                                                          wire_length=connecting_wire_length)
 
         num_elements, pin_name, module = distributed_load
         input_pin = module.get_pin(pin_name)
@@ -317,10 +429,9 @@ class GraphNode:
                                                interpolate=False)
         res_per_stage = module.get_wire_res(wire_layer=input_pin.layer,
                                             wire_width=pin_width, wire_length=pin_length)
-        delay, slew_out = module.distributed_delay(cap_per_unit, res_per_stage, num_elements,
-                                                   driver_res, driver_gm, load_caps, slew_in)
-        self.delay = delay_data(delay, slew_out)
-        return self.delay
+        return NodeDelayParams(load_caps, wire_res=wire_res, is_distributed=True,
+                               cap_per_stage=cap_per_unit, res_per_stage=res_per_stage,
+                               num_stages=num_elements)
 
     def get_full_net(self, in_net=True):
         net = self.parent_in_net if in_net else self.parent_out_net
@@ -343,7 +454,8 @@ class GraphNode:
             return net
         full_net = ""
         for parent_module, conn in all_parent_modules:
-            inst_name = parent_module.insts[parent_module.conns.index(conn)].name
+            conn_index = get_connectivity_index(parent_module).get_conn_index(conn)
+            inst_name = parent_module.insts[conn_index].name
             full_net += "X{}.".format(inst_name)
         full_net += net
         return full_net
@@ -397,6 +509,52 @@ class GraphPath:
             delay_val = graph_node.evaluate_delay(next_node=next_node, slew_in=slew_in)
             slew_in = delay_val.slew
 
+    def extract_delay_params(self, corners=None):
+        """
+        Extract per-node parameters once so delays can be evaluated for multiple slews/corners
+        :param corners: list of (process, vdd, temperature). None uses default corner
+        :return: (list of NodeDelayParams, driver_res array, driver_gm array)
+            driver arrays have shape (num_corners, num_nodes)
+        """
+        if corners is None:
+            corners = [None]
+        node_params = []
+        for i, graph_node in enumerate(self.nodes):
+            next_node = self.nodes[i + 1] if i < len(self.nodes) - 1 else None
+            node_params.append(graph_node.extract_delay_params(next_node))
+
+        driver_res = np.zeros((len(corners), len(self.nodes)))
+        driver_gm = np.zeros_like(driver_res)
+        for corner_index, corner in enumerate(corners):
+            for node_index, graph_node in enumerate(self.nodes):
+                res, gm = NodeDelayParams.evaluate_driver(graph_node, corner=corner)
+                driver_res[corner_index, node_index] = res
+                driver_gm[corner_index, node_index] = gm
+        return node_params, driver_res, driver_gm
+
+    def evaluate_delay_matrix(self, slews, corners=None, delay_params=None):
+        """
+        Evaluate path delays for all combinations of input slews and corners
+        :param slews: list of input slews
+        :param corners: list of (process, vdd, temperature). None uses default corner
+        :param delay_params: previously extracted result of 'extract_delay_params'
+        :return: (delays, slews_out) each with shape (num_corners, num_slews, num_nodes)
+        """
+        if delay_params is None:
+            delay_params = self.extract_delay_params(corners)
+        node_params, driver_res, driver_gm = delay_params
+
+        slew_in = np.tile(np.asarray(slews, dtype=float), (driver_res.shape[0], 1))
+        delays = np.zeros(slew_in.shape + (len(self.nodes),))
+        slews_out = np.zeros_like(delays)
+        for node_index, params in enumerate(node_params):
+            node_res = driver_res[:, node_index][:, np.newaxis]
+            node_gm = driver_gm[:, node_index][:, np.newaxis]
+            delay, slew_in = params.evaluate(node_res, node_gm, slew_in)
+            delays[:, :, node_index] = delay
+            slews_out[:, :, node_index] = slew_in
+        return delays, slews_out
+
     def get_cin(self, pin_name):
         """Assumes first node's parent module is the real parent module"""
         # evaluate instance inputs
@@ -442,21 +600,52 @@ class GraphPath:
         return len(self.nodes)
 
 
-def get_instance_module(instance_name: str, parent_module: design):
-    """Get module for instance given the instance name"""
-    instance_name = instance_name.lower()
+def copy_paths(paths: List[GraphPath]):
+    """Copy paths while preserving nodes that are shared between paths"""
+    node_copies = {}
+    results = []
+    for path in paths:
+        nodes = []
+        for node in path.nodes:
+            if id(node) not in node_copies:
+                node_copies[id(node)] = node.copy()
+            nodes.append(node_copies[id(node)])
+        results.append(GraphPath(nodes))
+    return results
 
-    def name_matches(inst):
-        candidate_name = inst.name.lower().strip()  # type: str
-        return (candidate_name == instance_name or
-                (instance_name and instance_name.startswith("x") and
-                 instance_name[1:] == candidate_name))
 
-    matches = list(filter(name_matches, parent_module.insts))
-    if not matches:
-        raise ValueError("Invalid instance name {} in module {}".format(instance_name, parent_module.name))
+def get_sibling_paths(sibling_module: design, sibling_out_pin: str, current_depth, max_depth,
+                      max_adjacent_modules, driver_exclusions, subpath_cache=None):
+    """Paths driving sibling_out_pin within sibling_module. Memoized in subpath_cache since
+    the same sibling modules are re-derived whenever multiple paths go through them.
+    subpath_cache is created per 'create_graph' call so max_depth, max_adjacent_modules and
+    driver_exclusions are the same for all entries and modules aren't edited during its lifetime.
+    current_depth is part of the key so max_depth is checked as it would be without the cache.
+    :return paths which are copies that can be re-parented by the caller
+    """
+    if subpath_cache is not None:
+        key = (id(sibling_module), sibling_out_pin, current_depth)
+        if key in subpath_cache:
+            return copy_paths(subpath_cache[key][1])
+
+    sibling_hierarchy = get_all_drivers_for_pin(sibling_out_pin, sibling_module)[0]
+    sibling_paths = construct_paths(sibling_hierarchy, current_depth=current_depth + 1,
+                                    max_depth=max_depth,
+                                    max_adjacent_modules=max_adjacent_modules,
+                                    driver_exclusions=driver_exclusions,
+                                    subpath_cache=subpath_cache)
+    if subpath_cache is not None:
+        # module is kept in the entry so its id isn't re-used
+        subpath_cache[key] = (sibling_module, copy_paths(sibling_paths))
+    return sibling_paths
 
-    return matches[0]
+
+def get_instance_module(instance_name: str, parent_module: design):
+    """Get module for instance given the instance name"""
+    instance = get_connectivity_index(parent_module).get_instance(instance_name)
+    if instance is None:
+        raise ValueError("Invalid instance name {} in module {}".format(instance_name, parent_module.name))
+    return instance
 
 
 def get_net_hierarchy(net: str, parent_module: design):
@@ -486,16 +675,9 @@ def get_net_hierarchy(net: str, parent_module: design):
 
 
 def get_all_net_connections(net: str, module: design):
-    net = net.lower()
     # first check if there is an instance whose output is the pin, otherwise, settle for inout
-    for i in range(len(module.conns)):
-        conn = [x.lower() for x in module.conns[i]]
-        if net not in conn:
-            continue
+    for i, child_pin, pin_dir in get_connectivity_index(module).get_net_connections(net):
         child_module = module.insts[i].mod  # type: design
-        pin_index = conn.index(net)
-        child_pin = child_module.pins[pin_index]
-        pin_dir = child_module.get_pin_dir(child_pin)
         yield child_pin, child_module, i, pin_dir
 
 
@@ -546,53 +728,53 @@ def get_driver_for_pin(net: str, parent_module: design):
     return [(parent_module, conn)] + descendants
 
 
+def get_node_key(node: GraphNode):
+    parent_keys = tuple((id(parent_module), tuple(conn))
+                        for parent_module, conn in node.all_parent_modules)
+    return parent_keys, id(node.module), node.in_net, node.out_net, tuple(node.conn)
+
+
 def remove_path_loops(paths: List[GraphPath]):
     valid_paths = []
     for path in paths:
         has_loop = False
-        existing_nodes = []
+        existing_nodes = set()
         for node in path.nodes:
-            node_tuple = (node.all_parent_modules, node.module, node.in_net, node.out_net,
-                          node.conn)
-            if node_tuple in existing_nodes:
+            node_key = get_node_key(node)
+            if node_key in existing_nodes:
                 has_loop = True
                 break
-            existing_nodes.append(node_tuple)
+            existing_nodes.add(node_key)
         if not has_loop:
             valid_paths.append(path)
     return valid_paths
 
 
 def flatten_paths(paths, module, current_depth, max_depth, max_adjacent_modules,
-                  driver_exclusions):
+                  driver_exclusions, subpath_cache=None):
     # Process derived inputs by descending into modules that created them
-    processing_queue = [x for x in paths]  # quick copy
+    # cycles are removed as paths are added to the queue
+    processing_queue = deque(remove_path_loops(paths))
     processed_paths = []
 
     sibling_iterations_count = 0
     while len(processing_queue) > 0:
-        # remove cycles
-        processing_queue = remove_path_loops(processing_queue)
-        if not processing_queue:
-            break
-
-        path = processing_queue[0]
+        path = processing_queue.popleft()
 
         source_node = path.source_node
         if source_node.parent_in_net in module.pins:  # not a derived node
             # check if it's explicitly an input
             if module.get_pin_dir(source_node.parent_in_net) == INPUT:
                 processed_paths.append(path)
-                processing_queue.remove(path)
                 continue
 
         # find module that drives this net within the current hierarchy
         sibling_out_pin, sibling_module, sibling_conn = get_net_driver(
             source_node.parent_in_net, module)
         if sibling_module.name in driver_exclusions:
-            processing_queue.remove(path)
             continue
 
+        new_paths = []
         if sibling_module.is_delay_primitive():
             sibling_input_pins = sibling_module.get_inputs_for_pin(sibling_out_pin)
             for sibling_input_pin in sibling_input_pins:
@@ -605,14 +787,11 @@ def flatten_paths(paths, module, current_depth, max_depth, max_adjacent_modules,
                                          parent_in_net=sibling_conn[sibling_pin_index],
                                          parent_out_net=source_node.parent_in_net,
                                          all_parent_modules=all_parent_modules, conn=sibling_conn)
-                new_path = path.prepend_node(sibling_node)
-                processing_queue.append(new_path)
+                new_paths.append(path.prepend_node(sibling_node))
         else:
-            sibling_hierarchy = get_all_drivers_for_pin(sibling_out_pin, sibling_module)[0]
-            sibling_paths = construct_paths(sibling_hierarchy, current_depth=current_depth + 1,
-                                            max_depth=max_depth,
-                                            max_adjacent_modules=max_adjacent_modules,
-                                            driver_exclusions=driver_exclusions)
+            sibling_paths = get_sibling_paths(sibling_module, sibling_out_pin, current_depth,
+                                              max_depth, max_adjacent_modules, driver_exclusions,
+                                              subpath_cache)
             if len(source_node.all_parent_modules) > 0:
                 module_conn = [ModuleConn(source_node.all_parent_modules[-1][0], sibling_conn)]
             else:
@@ -638,10 +817,9 @@ def flatten_paths(paths, module, current_depth, max_depth, max_adjacent_modules,
                                            node.all_parent_modules)
 
             for sibling_path in sibling_paths:
-                new_path = path.prepend_nodes(sibling_path)
-                processing_queue.append(new_path)
+                new_paths.append(path.prepend_nodes(sibling_path))
 
-        processing_queue.remove(path)
+        processing_queue.extend(remove_path_loops(new_paths))
 
         sibling_iterations_count += 1
         if sibling_iterations_count > max_adjacent_modules:
@@ -651,7 +829,7 @@ def flatten_paths(paths, module, current_depth, max_depth, max_adjacent_modules,
 
 
 def construct_paths(driver_hierarchy, current_depth=0, max_depth=20, max_adjacent_modules=100,
-                    driver_exclusions=None):
+                    driver_exclusions=None, subpath_cache=None):
     """
     Construct list of GraphPath for all input pins to outputs
     :param driver_hierarchy: [mod1, mod2, ..., modn, (pin_name, net, conn)]
@@ -659,6 +837,8 @@ def construct_paths(driver_hierarchy, current_depth=0, max_depth=20, max_adjacen
     :param max_depth: Max hierarchical depth, prevents infinite cyclic routes
     :param max_adjacent_modules: Max number of sibling modules to derive from. Prevents cyclic routes
     :param driver_exclusions: Check 'create_graph' for documentation
+    :param subpath_cache: dict for memoizing sibling paths, check 'get_sibling_paths'.
+            Sibling paths are re-derived each time if None
     :return: List[GraphPath]
     """
 
@@ -687,7 +867,8 @@ def construct_paths(driver_hierarchy, current_depth=0, max_depth=20, max_adjacen
 
     processed_paths = flatten_paths(paths, immediate_parent_module, current_depth,
                                     max_depth, max_adjacent_modules,
-                                    driver_exclusions=driver_exclusions)
+                                    driver_exclusions=driver_exclusions,
+                                    subpath_cache=subpath_cache)
 
     # Process ancestors
     all_ancestors = list(reversed(parent_modules))
@@ -704,7 +885,8 @@ def construct_paths(driver_hierarchy, current_depth=0, max_depth=20, max_adjacen
             source_node.all_parent_modules = source_node.all_parent_modules[:-1]
 
         processed_paths = flatten_paths(processed_paths, ancestor_module, current_depth, max_depth,
-                                        max_adjacent_modules, driver_exclusions=driver_exclusions)
+                                        max_adjacent_modules, driver_exclusions=driver_exclusions,
+                                        subpath_cache=subpath_cache)
 
         immediate_parent_module = ancestor_module
 
@@ -742,6 +924,7 @@ def create_graph(destination_net, module: design, driver_exclusions=None,
         parent_modules.append(ModuleConn(parent_module, child_conn))
 
     all_paths = []
+    subpath_cache = {}
     all_hierarchies = get_all_drivers_for_pin(destination_net, dest_hierarchy[-1])
     # breakpoint()
     for driver_hierarchy in all_hierarchies:
@@ -757,6 +940,7 @@ def create_graph(destination_net, module: design, driver_exclusions=None,
 
         if include and not exclude:
             all_paths.extend(construct_paths(parent_modules + driver_hierarchy,
-                                             driver_exclusions=driver_exclusions))
+                                             driver_exclusions=driver_exclusions,
+                                             subpath_cache=subpath_cache))
 
     return all_paths
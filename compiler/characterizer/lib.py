@@ -7,8 +7,8 @@ import tech
 from globals import OPTS
 from . import charutils as ch
 from . import setup_hold
+from .characterization_jobs import CharacterizationJob, run_jobs
 from .charutils import round_time
-from characterizer.simulation.spice_characterizer import SpiceCharacterizer
 
 
 class lib:
@@ -54,6 +54,7 @@ class lib:
 
         # Enumerate all possible corners
         self.corners = []
+        self.corner_names = []
         self.lib_files = []
         for proc in self.process_corners:
             for temp in self.temperatures:
@@ -67,13 +68,17 @@ class lib:
                     
                     # A corner is a tuple of PVT
                     self.corners.append((proc, volt, temp))
+                    self.corner_names.append(self.corner_name)
                     self.lib_files.append(lib_name)
         
     def characterize_corners(self):
         """ Characterize the list of corners. """
-        for (self.corner,lib_name) in zip(self.corners,self.lib_files):
+        corner_results = self.compute_corner_results()
+        for i, (self.corner, lib_name) in enumerate(zip(self.corners, self.lib_files)):
             debug.info(1,"Corner: " + str(self.corner))
             (self.process, self.voltage, self.temperature) = self.corner
+            self.corner_name = self.corner_names[i]
+            (self.char_results, self.times) = corner_results[i]
 
             with open(lib_name, "w") as lib_file:
                 self.lib = lib_file
@@ -81,11 +86,7 @@ class lib:
                 self.characterize()
 
     def characterize(self):
-        """ Characterize the current corner. """
-
-        self.compute_delay()
-
-        self.compute_setup_hold()
+        """ Write the current corner's characterization results. """
 
         self.write_header()
         
@@ -442,27 +443,95 @@ class lib:
         self.lib.write("    }\n")
         self.lib.write("    }\n")
 
-    def compute_delay(self):
-        """ Do the analysis if we haven't characterized the SRAM yet """
-        if not hasattr(self, 'd'):
-            self.d = SpiceCharacterizer(self.sram, self.sp_file, self.corner)
-            if self.use_model:
-                self.char_results = self.d.analytical_delay(self.sram,self.slews,self.loads)
-            else:
-                probe_address = "1" * self.sram.addr_size
-                probe_data = self.sram.word_size - 1
-                self.char_results = self.d.analyze(probe_address, probe_data, self.slews, self.loads)
-
-
-    def compute_setup_hold(self):
-        """ Do the analysis if we haven't characterized a FF yet """
-        # Do the analysis if we haven't characterized a FF yet
-        try:
-            self.sh
-        except AttributeError:
-            self.sh = setup_hold.setup_hold(self.corner)
-            if self.use_model:
-                self.times = self.sh.analytical_setuphold(self.slews,self.loads)
-            else:
-                self.times = self.sh.analyze(self.slews,self.slews)
-                
+    def compute_corner_results(self):
+        """ Delay/power and setup/hold results of each corner.
+        The simulations are split into independent corner and slew/load point jobs
+        which run concurrently in OPTS.num_characterization_workers processes. """
+        if self.use_model:
+            return [(self.compute_delay(corner), self.compute_setup_hold(corner))
+                    for corner in self.corners]
+
+        # Feasible period of each corner is needed by the delay simulations.
+        # Setup/hold points are independent of the delay simulations so run alongside
+        setup_hold_points = [(corner, related_slew, constrained_slew)
+                             for corner in self.corners
+                             for related_slew in self.slews
+                             for constrained_slew in self.slews]
+        feasible_jobs = [CharacterizationJob("feasible_{}".format(name), self.compute_feasible_period, corner)
+                         for corner, name in zip(self.corners, self.corner_names)]
+        setup_hold_jobs = [CharacterizationJob("setup_hold", self.compute_setup_hold_point, *point)
+                           for point in setup_hold_points]
+        results = run_jobs(feasible_jobs + setup_hold_jobs)
+        feasible_results = results[:len(feasible_jobs)]
+        setup_hold_results = results[len(feasible_jobs):]
+
+        if OPTS.use_parameter_sweeps:
+            # one job per slew simulates all loads
+            sweep_points = [(corner, slew, feasible)
+                            for corner, feasible in zip(self.corners, feasible_results)
+                            for slew in self.slews]
+            delay_jobs = [CharacterizationJob("delay_sweep", self.compute_delay_sweep, *point)
+                          for point in sweep_points]
+        else:
+            delay_points = [(corner, slew, load, feasible)
+                            for corner, feasible in zip(self.corners, feasible_results)
+                            for slew in self.slews
+                            for load in self.loads]
+            delay_jobs = [CharacterizationJob("delay", self.compute_delay_point, *point)
+                          for point in delay_points]
+        min_period_jobs = [CharacterizationJob("min_period_{}".format(name), self.compute_min_period,
+                                               corner, feasible)
+                           for corner, name, feasible in zip(self.corners, self.corner_names,
+                                                             feasible_results)]
+        results = run_jobs(delay_jobs + min_period_jobs)
+        delay_results = results[:len(delay_jobs)]
+        if OPTS.use_parameter_sweeps:
+            delay_results = [result for sweep_results in delay_results for result in sweep_results]
+        min_period_results = results[len(delay_jobs):]
+
+        # Merge in corner then slew/load order
+        from characterizer.simulation.spice_characterizer import SpiceCharacterizer
+        corner_results = []
+        num_delay_points = len(self.slews) * len(self.loads)
+        num_setup_hold_points = len(self.slews) ** 2
+        for i, corner in enumerate(self.corners):
+            point_results = delay_results[i * num_delay_points: (i + 1) * num_delay_points]
+            char_results = SpiceCharacterizer.merge_results(feasible_results[i], point_results,
+                                                            min_period_results[i])
+            times = {}
+            for point_times in setup_hold_results[i * num_setup_hold_points:
+                                                  (i + 1) * num_setup_hold_points]:
+                for key, value in point_times.items():
+                    times.setdefault(key, []).append(value)
+            corner_results.append((char_results, times))
+        return corner_results
+
+    def create_delay_characterizer(self, corner):
+        from characterizer.simulation.spice_characterizer import SpiceCharacterizer
+        return SpiceCharacterizer(self.sram, self.sp_file, corner)
+
+    def compute_feasible_period(self, corner):
+        return self.create_delay_characterizer(corner).characterize_feasible_period(self.slews, self.loads)
+
+    def compute_delay_point(self, corner, slew, load, feasible):
+        return self.create_delay_characterizer(corner).characterize_point(slew, load, feasible)
+
+    def compute_delay_sweep(self, corner, slew, feasible):
+        return self.create_delay_characterizer(corner).characterize_load_sweep(slew, self.loads, feasible)
+
+    def compute_min_period(self, corner, feasible):
+        return self.create_delay_characterizer(corner).characterize_min_period(self.slews, self.loads,
+                                                                               feasible)
+
+    def compute_delay(self, corner):
+        """ Delay and power results of a corner using the analytical model """
+        d = self.create_delay_characterizer(corner)
+        return d.analytical_delay(self.sram, self.slews, self.loads)
+
+    def compute_setup_hold(self, corner):
+        """ Setup/hold times of a corner using the analytical model """
+        return setup_hold.setup_hold(corner).analytical_setuphold(self.slews, self.loads)
+
+    @staticmethod
+    def compute_setup_hold_point(corner, related_slew, constrained_slew):
+        return setup_hold.setup_hold(corner).analyze_point(related_slew, constrained_slew)
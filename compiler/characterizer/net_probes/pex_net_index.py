@@ -0,0 +1,160 @@
+import bisect
+import json
+import os
+import re
+
+import debug
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".netindex.json"
+SCAN_CHUNK_SIZE = 1 << 25
+
+
+class PexNetIndex:
+    """
+    Index of the unique whitespace separated tokens (net and instance names) in an extracted netlist
+    Built in a single streaming pass and persisted next to the pex file so label lookups
+    don't need to re-scan the netlist. Lookups are case insensitive like 'grep -i -m1 -o'
+    """
+    _loaded = {}
+
+    def __init__(self, pex_file, tokens, line_start_tokens):
+        self.pex_file = pex_file
+        # unique tokens preceded by whitespace in order of first appearance
+        self.tokens = tokens
+        # tokens only found at the start of a line (mostly element names),
+        # these can't match a pattern preceded by whitespace
+        self.line_start_tokens = line_start_tokens
+        self._lower_tokens = None
+        self._sorted_indices = None
+        self._sorted_tokens = None
+        self._joined_tokens = None
+        self._joined_lower = None
+
+    @property
+    def lower_tokens(self):
+        if self._lower_tokens is None:
+            self._lower_tokens = [x.lower() for x in self.tokens]
+        return self._lower_tokens
+
+    def get_sorted_tokens(self):
+        if self._sorted_tokens is None:
+            lower_tokens = self.lower_tokens
+            self._sorted_indices = sorted(range(len(lower_tokens)), key=lower_tokens.__getitem__)
+            self._sorted_tokens = [lower_tokens[x] for x in self._sorted_indices]
+        return self._sorted_tokens, self._sorted_indices
+
+    @staticmethod
+    def get_index_file(pex_file):
+        return pex_file + INDEX_SUFFIX
+
+    @staticmethod
+    def get_file_signature(pex_file):
+        stat = os.stat(pex_file)
+        return [stat.st_size, stat.st_mtime]
+
+    @classmethod
+    def scan(cls, pex_file):
+        debug.info(1, "Indexing net names in pex file %s", pex_file)
+        # dict preserves insertion order so keys are in order of first appearance
+        tokens = {}
+        line_start_tokens = {}
+        with open(pex_file, "r") as f:
+            while True:
+                chunk = f.read(SCAN_CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunk += f.readline()  # end chunk at a line boundary
+                remainders = []
+                for line in chunk.splitlines():
+                    if line[:1].isspace():
+                        remainders.append(line)
+                        continue
+                    parts = line.split(None, 1)
+                    if parts:
+                        line_start_tokens[parts[0]] = None
+                        if len(parts) > 1:
+                            remainders.append(parts[1])
+                tokens.update(dict.fromkeys(" ".join(remainders).split()))
+        line_start_tokens = [x for x in line_start_tokens if x not in tokens]
+        return cls(pex_file, list(tokens), line_start_tokens)
+
+    def save(self):
+        data = {
+            "version": INDEX_VERSION,
+            "signature": self.get_file_signature(self.pex_file),
+            "tokens": self.tokens,
+            "line_start_tokens": self.line_start_tokens
+        }
+        index_file = self.get_index_file(self.pex_file)
+        temp_file = index_file + ".{}".format(os.getpid())
+        with open(temp_file, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_file, index_file)
+
+    @classmethod
+    def load_saved(cls, pex_file):
+        index_file = cls.get_index_file(pex_file)
+        if not os.path.exists(index_file):
+            return None
+        try:
+            with open(index_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (data.get("version") != INDEX_VERSION or
+                data.get("signature") != cls.get_file_signature(pex_file)):
+            return None
+        return cls(pex_file, data["tokens"], data["line_start_tokens"])
+
+    @classmethod
+    def load(cls, pex_file):
+        """Load index for pex_file, re-indexing if pex_file was modified since last indexed"""
+        signature = cls.get_file_signature(pex_file)
+        existing = cls._loaded.get(pex_file)
+        if existing is not None and existing[0] == signature:
+            return existing[1]
+        index = cls.load_saved(pex_file)
+        if index is None:
+            index = cls.scan(pex_file)
+            index.save()
+        cls._loaded[pex_file] = (signature, index)
+        return index
+
+    def get_prefix_candidates(self, prefix):
+        """Indices of tokens starting with prefix in order of first appearance"""
+        prefix = prefix.lower()
+        sorted_tokens, sorted_indices = self.get_sorted_tokens()
+        start = bisect.bisect_left(sorted_tokens, prefix)
+        candidates = []
+        for i in range(start, len(sorted_tokens)):
+            if not sorted_tokens[i].startswith(prefix):
+                break
+            candidates.append(sorted_indices[i])
+        return sorted(candidates)
+
+    def search(self, pattern, prefix=None):
+        """First match of regex pattern at the start of a token preceded by whitespace
+        i.e. grep pattern '\\s{pattern}'.
+        prefix is a literal prefix of all matches and limits the tokens searched"""
+        regex = re.compile(pattern, re.IGNORECASE)
+        if prefix is None:
+            candidates = range(len(self.tokens))
+        else:
+            candidates = self.get_prefix_candidates(prefix)
+        for index in candidates:
+            match = regex.match(self.tokens[index])
+            if match:
+                return match.group(0)
+        return None
+
+    def find(self, label):
+        """Fixed string match of label within tokens"""
+        if self._joined_tokens is None:
+            # tokens can't contain new lines so matches don't span tokens
+            self._joined_tokens = "\n".join(self.tokens + self.line_start_tokens)
+            self._joined_lower = self._joined_tokens.lower()
+        position = self._joined_lower.find(label.lower())
+        if position < 0:
+            return None
+        return self._joined_tokens[position:position + len(label)]
@@ -1,12 +1,11 @@
 import itertools
 import re
-import shutil
-from subprocess import check_output, CalledProcessError
 
 import numpy as np
 
 import debug
 from characterizer.dependency_graph import get_instance_module, get_net_driver, get_all_net_drivers
+from characterizer.net_probes.pex_net_index import PexNetIndex
 from characterizer.net_probes.probe_utils import get_current_drivers, get_all_tx_fingers, format_bank_probes, \
     get_voltage_connections, get_extracted_prefix
 from globals import OPTS
@@ -796,31 +795,14 @@ class SramProbe(object):
 
     @staticmethod
     def extract_pex_pattern(label, pex_file):
-        label_sub = label.replace(".", "_").replace("[", r"\[").replace("]", r"\]")
-        prefix = "" if label.startswith("N_") else "N_"
-        pattern = r"\s{}{}_[MX]\S+_[gsd]".format(prefix, label_sub)
-        match = (SramProbe.grep_file(pattern, pex_file, regex=True) or
-                 SramProbe.grep_file(label, pex_file, regex=False))
+        label_prefix = "" if label.startswith("N_") else "N_"
+        label_prefix += label.replace(".", "_") + "_"
+        pattern = r"{}[MX]\S+_[gsd]".format(re.escape(label_prefix))
+        pex_index = PexNetIndex.load(pex_file)
+        match = (pex_index.search(pattern, prefix=label_prefix) or
+                 pex_index.find(label))
         return match, pattern
 
-    @staticmethod
-    def grep_file(pattern, pex_file, regex=True):
-        rg = shutil.which("rg")
-        if rg:
-            executable = "rg"
-            flags = "-ie" if regex else "-iF"
-        else:
-            executable = "grep"
-            flags = "-iE" if regex else "-iF"
-        try:
-            match = check_output([executable, "-m1", "-o", flags, pattern, pex_file])
-            return match.decode().strip()
-        except CalledProcessError as ex:
-            if ex.returncode == 1:  # mismatch
-                return None
-            else:
-                raise ex
-
     def decode_address(self, address):
         if isinstance(address, int):
             address = self.address_to_vector(address)
@@ -4,7 +4,8 @@ import debug
 import tech
 from globals import OPTS
 from . import charutils as ch
-from .charutils import convert_to_float, relative_compare
+from .characterization_jobs import get_num_search_points, map_candidates
+from .charutils import convert_to_float, multi_point_search
 from .stimuli import stimuli
 
 
@@ -37,7 +38,7 @@ class setup_hold():
         """Creates a stimulus file for SRAM setup/hold time calculation"""
 
         # creates and opens the stimulus file for writing
-        temp_stim = OPTS.openram_temp + "stim.sp"
+        temp_stim = os.path.join(OPTS.openram_temp, "stim.sp")
         self.sf = open(temp_stim, "w")
         self.stim = stimuli(self.sf, self.corner)
 
@@ -165,6 +166,10 @@ class setup_hold():
 
 
 
+    @staticmethod
+    def parse_output(key):
+        return ch.parse_output("timing", key, sim_dir=OPTS.openram_temp)
+
     def bidir_search(self, correct_value, mode):
         """ This will perform a bidirectional search for either setup or hold times.
         It starts with the feasible priod and looks a half period beyond or before it
@@ -187,8 +192,8 @@ class setup_hold():
                             target_time=feasible_bound, 
                             correct_value=correct_value)
         self.stim.run_sim()
-        ideal_clk_to_q = ch.convert_to_float(ch.parse_output("timing", "clk2q_delay"))
-        setuphold_time = ch.convert_to_float(ch.parse_output("timing", "setup_hold_time"))
+        ideal_clk_to_q = ch.convert_to_float(self.parse_output("clk2q_delay"))
+        setuphold_time = ch.convert_to_float(self.parse_output("setup_hold_time"))
         debug.info(2,"*** {0} CHECK: {1} Ideal Clk-to-Q: {2} Setup/Hold: {3}".format(mode, correct_value,ideal_clk_to_q,setuphold_time))
 
         if type(ideal_clk_to_q)!=float or type(setuphold_time)!=float:
@@ -206,22 +211,16 @@ class setup_hold():
                                                                                        2*self.period))
         #raw_input("Press Enter to continue...")
             
-        while True:
-            target_time = (feasible_bound + infeasible_bound)/2
+        def evaluate(target_time):
             self.write_stimulus(mode=mode, 
                                 target_time=target_time, 
                                 correct_value=correct_value)
 
-            debug.info(2,"{0} value: {1} Target time: {2} Infeasible: {3} Feasible: {4}".format(mode,
-                                                                                                correct_value,
-                                                                                                target_time,
-                                                                                                infeasible_bound,
-                                                                                                feasible_bound))
-
+            debug.info(2,"{0} value: {1} Target time: {2}".format(mode, correct_value, target_time))
 
             self.stim.run_sim()
-            clk_to_q = convert_to_float(parse_output("timing", "clk2q_delay"))
-            setuphold_time = convert_to_float(parse_output("timing", "setup_hold_time"))
+            clk_to_q = convert_to_float(self.parse_output("clk2q_delay"))
+            setuphold_time = convert_to_float(self.parse_output("setup_hold_time"))
             if type(clk_to_q)==float and (clk_to_q<1.1*ideal_clk_to_q) and type(setuphold_time)==float:
                 if mode == "SETUP": # SETUP is clk-din, not din-clk
                     setuphold_time *= -1e9
@@ -229,17 +228,22 @@ class setup_hold():
                     setuphold_time *= 1e9
 
                 debug.info(2,"PASS Clk-to-Q: {0} Setup/Hold: {1}".format(clk_to_q,setuphold_time))
-                passing_setuphold_time = setuphold_time
-                feasible_bound = target_time
+                return True, setuphold_time
             else:
                 debug.info(2,"FAIL Clk-to-Q: {0} Setup/Hold: {1}".format(clk_to_q,setuphold_time))
-                infeasible_bound = target_time
+                return False, None
 
-            #raw_input("Press Enter to continue...")
-            if relative_compare(feasible_bound, infeasible_bound, error_tolerance=0.001):
-                debug.info(3,"CONVERGE {0} vs {1}".format(feasible_bound,infeasible_bound))
-                break
-            
+        def evaluate_candidates(target_times):
+            return map_candidates("setup_hold_search", evaluate, target_times)
+
+        # Simulate multiple target times concurrently in each round when workers are available
+        feasible_bound, setuphold_time = multi_point_search(evaluate_candidates, feasible_bound,
+                                                            infeasible_bound,
+                                                            num_points=get_num_search_points(),
+                                                            error_tolerance=0.001)
+        debug.info(3,"CONVERGE {0}".format(feasible_bound))
+        if setuphold_time is not None:
+            passing_setuphold_time = setuphold_time
 
         debug.info(2,"Converged on {0} time {1}.".format(mode,passing_setuphold_time))
         return passing_setuphold_time
@@ -273,33 +277,37 @@ class setup_hold():
         setup/hold times for high_to_low and low_to_high transitions
         for all the slew combinations of the data and clock.
         """
-        LH_setup = []
-        HL_setup = []
-        LH_hold = []
-        HL_hold = []
-        for self.related_input_slew in related_slews:
-            for self.constrained_input_slew in constrained_slews:
-                debug.info(1, "Clock slew: {0} Data slew: {1}".format(self.related_input_slew,self.constrained_input_slew))
-                LH_setup_time = self.setup_LH_time()
-                debug.info(1, "  Setup Time for low_to_high transistion: {0}".format(LH_setup_time))
-                HL_setup_time = self.setup_HL_time()
-                debug.info(1, "  Setup Time for high_to_low transistion: {0}".format(HL_setup_time))
-                LH_hold_time = self.hold_LH_time()
-                debug.info(1, "  Hold Time for low_to_high transistion: {0}".format(LH_hold_time))
-                HL_hold_time = self.hold_HL_time()
-                debug.info(1, "  Hold Time for high_to_low transistion: {0}".format(HL_hold_time))
-                LH_setup.append(LH_setup_time)
-                HL_setup.append(HL_setup_time)
-                LH_hold.append(LH_hold_time)
-                HL_hold.append(HL_hold_time)
-                
-        times = {"setup_times_LH": LH_setup,
-                 "setup_times_HL": HL_setup,
-                 "hold_times_LH": LH_hold,
-                 "hold_times_HL": HL_hold
+        times = {"setup_times_LH": [],
+                 "setup_times_HL": [],
+                 "hold_times_LH": [],
+                 "hold_times_HL": []
                  }
+        for related_input_slew in related_slews:
+            for constrained_input_slew in constrained_slews:
+                point_times = self.analyze_point(related_input_slew, constrained_input_slew)
+                for key, value in point_times.items():
+                    times[key].append(value)
         return times
 
+    def analyze_point(self, related_input_slew, constrained_input_slew):
+        """Setup and hold times for a single clock and data slew combination"""
+        self.related_input_slew = related_input_slew
+        self.constrained_input_slew = constrained_input_slew
+        debug.info(1, "Clock slew: {0} Data slew: {1}".format(self.related_input_slew,self.constrained_input_slew))
+        LH_setup_time = self.setup_LH_time()
+        debug.info(1, "  Setup Time for low_to_high transistion: {0}".format(LH_setup_time))
+        HL_setup_time = self.setup_HL_time()
+        debug.info(1, "  Setup Time for high_to_low transistion: {0}".format(HL_setup_time))
+        LH_hold_time = self.hold_LH_time()
+        debug.info(1, "  Hold Time for low_to_high transistion: {0}".format(LH_hold_time))
+        HL_hold_time = self.hold_HL_time()
+        debug.info(1, "  Hold Time for high_to_low transistion: {0}".format(HL_hold_time))
+        return {"setup_times_LH": LH_setup_time,
+                "setup_times_HL": HL_setup_time,
+                "hold_times_LH": LH_hold_time,
+                "hold_times_HL": HL_hold_time
+                }
+
     def analytical_setuphold(self,related_slews, constrained_slews):
         """ Just return the fixed setup/hold times from the technology.
         """
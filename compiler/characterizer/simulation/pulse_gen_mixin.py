@@ -1,3 +1,5 @@
+import numpy as np
+
 from base import utils
 from globals import OPTS
 
@@ -6,6 +8,72 @@ if not SpiceCharacterizer:
     from characterizer.simulation.spice_characterizer import SpiceCharacterizer
 
 
+class PwlBuffer:
+    """
+    Preallocated arrays of pwl breakpoints for all signals.
+    Each entry is a transition (t1, v1) -> (t2, v2) for one signal at a given cycle
+    is_bool records entries whose value was a bool so comments print True/False
+    """
+
+    def __init__(self, keys, capacity=1024):
+        self.keys = keys
+        self.size = 0
+        self.signal = np.zeros(capacity, dtype=np.int32)
+        self.cycle = np.zeros(capacity, dtype=np.int64)
+        self.times = np.zeros((capacity, 2))
+        self.values = np.zeros((capacity, 2))
+        self.is_bool = np.zeros(capacity, dtype=bool)
+
+    def reserve(self, num_entries):
+        required = self.size + num_entries
+        capacity = len(self.signal)
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        self.signal = np.resize(self.signal, capacity)
+        self.cycle = np.resize(self.cycle, capacity)
+        self.times = np.resize(self.times, (capacity, 2))
+        self.values = np.resize(self.values, (capacity, 2))
+        self.is_bool = np.resize(self.is_bool, capacity)
+
+    def append(self, signal_indices, cycle, t1, t2, prev_values, curr_values, is_bool=False):
+        num_entries = len(signal_indices)
+        if num_entries == 0:
+            return
+        self.reserve(num_entries)
+        entries = slice(self.size, self.size + num_entries)
+        self.signal[entries] = signal_indices
+        self.cycle[entries] = cycle
+        self.times[entries] = (t1, t2)
+        self.values[entries, 0] = prev_values
+        self.values[entries, 1] = curr_values
+        self.is_bool[entries] = is_bool
+        self.size += num_entries
+
+    def append_one(self, signal_index, cycle, t1, t2, prev_value, curr_value):
+        self.reserve(1)
+        self.signal[self.size] = signal_index
+        self.cycle[self.size] = cycle
+        self.times[self.size] = (t1, t2)
+        self.values[self.size] = (prev_value, curr_value)
+        self.is_bool[self.size] = isinstance(curr_value, (bool, np.bool_))
+        self.size += 1
+
+    def get_entries(self):
+        """:return {signal_index: (cycles, times, values, is_bool)} in insertion order"""
+        signal = self.signal[:self.size]
+        order = np.argsort(signal, kind="stable")
+        boundaries = np.flatnonzero(np.diff(signal[order])) + 1
+        results = {}
+        for indices in np.split(order, boundaries):
+            if len(indices) == 0:
+                continue
+            results[int(signal[indices[0]])] = (self.cycle[indices], self.times[indices],
+                                                self.values[indices], self.is_bool[indices])
+        return results
+
+
 class PulseGenMixin(SpiceCharacterizer):
     """
     Helper functions to generate pwl signals
@@ -24,8 +92,14 @@ class PulseGenMixin(SpiceCharacterizer):
         self.stim.instantiate_sram(sram=self.sram)
 
         self.sf.write("\n* SRAM output loads\n")
+        load = "{}f".format(self.load)
+        parameter_sweep = getattr(self, "parameter_sweep", None)
+        if parameter_sweep is not None:
+            self.stim.write_sweep_parameters(parameter_sweep)
+            if "load" in parameter_sweep.names:
+                load = self.stim.param_expression("load*1e-15")
         for i in range(self.word_size):
-            self.sf.write("CD{0} d[{0}] 0 {1}f\n".format(i, self.load))
+            self.sf.write("CD{0} d[{0}] 0 {1}\n".format(i, load))
 
         # add access transistors for data-bus
         self.sf.write("\n* Transmission Gates for data-bus and control signals\n")
@@ -69,9 +143,18 @@ class PulseGenMixin(SpiceCharacterizer):
     def initialize_output(self):
         """initialize pwl signals"""
 
-        for key in self.control_sigs + list(self.two_step_pulses.keys()) + self.bus_sigs:
-            self.v_data[key] = "V{0} {0} gnd PWL ( ".format(key)
-            self.v_comments[key] = "* (time, data): [ "
+        all_keys = self.control_sigs + list(self.two_step_pulses.keys()) + self.bus_sigs
+        self.pwl_buffer = PwlBuffer(all_keys)
+        self.pwl_indices = {key: index for index, key in enumerate(all_keys)}
+
+        def get_bus_indices(bus_name, bus_size):
+            return np.array([self.pwl_indices["{}[{}]".format(bus_name, i)]
+                             for i in range(bus_size)], dtype=np.int32)
+
+        self.address_indices = get_bus_indices("A", self.addr_size)
+        self.data_indices = get_bus_indices("data", self.word_size)
+        if self.has_masks:
+            self.mask_indices = get_bus_indices("mask", self.word_size)
 
         self.current_time = self.setup_time + 0.5 * self.slew
         self.update_output(increment_time=False)
@@ -86,10 +169,26 @@ class PulseGenMixin(SpiceCharacterizer):
         for comment in self.command_comments:
             self.sf.write(comment)
         self.sf.write("\n* Generation of control signals\n")
+
+        all_entries = self.pwl_buffer.get_entries()
+        empty_entry = (np.zeros(0, dtype=np.int64), np.zeros((0, 2)), np.zeros((0, 2)),
+                       np.zeros(0, dtype=bool))
         keys = sorted(self.control_sigs + list(self.two_step_pulses.keys()) + self.bus_sigs)
         for key in keys:
-            self.sf.write(self.v_comments[key][:-1] + " ] \n")
-            self.sf.write(self.v_data[key] + " )\n")
+            cycles, times, values, is_bool = all_entries.get(self.pwl_indices[key], empty_entry)
+            num_entries = len(cycles)
+            curr_values = values[:, 1].astype(np.int64)
+            if is_bool.any():
+                curr_values = curr_values.astype(object)
+                curr_values[is_bool] = [bool(x) for x in curr_values[is_bool]]
+            comment_values = np.column_stack((cycles, curr_values))
+            comments = (" ({}, {}) " * num_entries).format(*comment_values.ravel().tolist())
+            # interleave as t1, v1, t2, v2
+            breakpoints = np.column_stack((times[:, 0], values[:, 0] * self.vdd_voltage,
+                                           times[:, 1], values[:, 1] * self.vdd_voltage))
+            data = (" {:8.8g}n {}v {:8.8g}n {}v " * num_entries).format(*breakpoints.ravel().tolist())
+            self.sf.write(("* (time, data): [ " + comments)[:-1] + " ] \n")
+            self.sf.write("V{0} {0} gnd PWL ( ".format(key) + data + " )\n")
 
     def get_setup_time(self, key, prev_val, curr_val):
         if key == "clk":
@@ -125,10 +224,29 @@ class PulseGenMixin(SpiceCharacterizer):
         setup_time = self.get_setup_time(key, prev_val, curr_val)
         t2 = max(self.slew, self.current_time + 0.5 * self.slew - setup_time)
         t1 = max(0.0, self.current_time - 0.5 * self.slew - setup_time)
-        self.v_data[key] += " {0:8.8g}n {1}v {2:8.8g}n {3}v ". \
-            format(t1, self.vdd_voltage * prev_val, t2, self.vdd_voltage * curr_val)
-        self.v_comments[key] += " ({0}, {1}) ".format(int(self.current_time / self.period),
-                                                      curr_val)
+        self.pwl_buffer.append_one(self.pwl_indices[key], int(self.current_time / self.period),
+                                   t1, t2, prev_val, curr_val)
+
+    def write_bus_pwl(self, signal_indices, prev_values, curr_values, setup_time):
+        """Append current time's data for multiple signals sharing the same setup time
+         Only signals with value transitions are added after the initial period"""
+        signal_indices = np.asarray(signal_indices)
+        prev_values = np.asarray(prev_values, dtype=float)
+        curr_values = np.asarray(curr_values)
+        is_bool = curr_values.dtype == bool
+        curr_values = curr_values.astype(float)
+        if self.current_time > 1.5 * self.period:
+            transitions = prev_values != curr_values
+            if not transitions.any():
+                return
+            signal_indices = signal_indices[transitions]
+            prev_values = prev_values[transitions]
+            curr_values = curr_values[transitions]
+
+        t2 = max(self.slew, self.current_time + 0.5 * self.slew - setup_time)
+        t1 = max(0.0, self.current_time - 0.5 * self.slew - setup_time)
+        cycle = int(self.current_time / self.period)
+        self.pwl_buffer.append(signal_indices, cycle, t1, t2, prev_values, curr_values, is_bool)
 
     def write_pwl_from_key(self, key):
         curr_val = getattr(self, key)
@@ -136,26 +254,24 @@ class PulseGenMixin(SpiceCharacterizer):
         self.write_pwl(key, prev_val, curr_val)
         setattr(self, "prev_" + key, curr_val)
 
+    def update_bus(self, bus_name, signal_indices, prev_values, curr_values):
+        setup_time = self.get_setup_time("{}[0]".format(bus_name), prev_values, curr_values)
+        self.write_bus_pwl(signal_indices, prev_values, curr_values, setup_time)
+
     def update_address(self):
         # write address
-        for i in range(self.addr_size):
-            key = "A[{}]".format(i)
-            self.write_pwl(key, self.prev_address[i], self.address[i])
+        self.update_bus("A", self.address_indices, self.prev_address, self.address)
         self.prev_address = self.address
 
     def update_data(self):
         # write data
-        for i in range(self.word_size):
-            key = "data[{}]".format(i)
-            self.write_pwl(key, self.prev_data[i], self.data[i])
+        self.update_bus("data", self.data_indices, self.prev_data, self.data)
         self.prev_data = self.data
 
     def update_mask(self):
         # write mask
         if self.sram.bank.has_mask_in:
-            for i in range(self.word_size):
-                key = "mask[{}]".format(i)
-                self.write_pwl(key, self.prev_mask[i], self.mask[i])
+            self.update_bus("mask", self.mask_indices, self.prev_mask, self.mask)
             self.prev_mask = self.mask
 
     def update_control_sigs(self):
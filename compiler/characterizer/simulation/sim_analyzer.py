@@ -5,8 +5,8 @@ import re
 import numpy as np
 
 import debug
-from characterizer import SpiceReader
-from characterizer.charutils import get_measurement_file, get_sim_file
+from characterizer.charutils import get_measurement_file, get_sim_file, get_sweep_sim_file, \
+    load_sweep_measurements
 from characterizer.simulation.sim_reader import FALLING_EDGE, RISING_EDGE
 from globals import OPTS
 
@@ -117,18 +117,26 @@ class SimAnalyzer:
     RISING_EDGE = RISING_EDGE
     FALLING_EDGE = FALLING_EDGE
 
-    def __init__(self, sim_dir):
+    def __init__(self, sim_dir, sweep_index=None):
+        """
+        :param sim_dir: simulation directory
+        :param sweep_index: point to analyze for a simulation with a parameter sweep
+        """
         self.sim_dir = sim_dir
+        self.sweep_index = sweep_index
 
         self.word_size = OPTS.word_size
 
         self.stim_file = os.path.join(sim_dir, "stim.sp")
-        sim_file = os.path.join(sim_dir, get_sim_file())
+        if sweep_index is None:
+            sim_file = os.path.join(sim_dir, get_sim_file())
+        else:
+            sim_file = os.path.join(sim_dir, get_sweep_sim_file(sweep_index))
         self.sim_file = os.path.join(sim_dir, sim_file)
         measure_file = get_measurement_file()
         self.meas_file = os.path.join(sim_dir, measure_file)
 
-        self.sim_data = SpiceReader(sim_file)
+        self.sim_data = self.create_reader(sim_file)
         self.address_data_threshold = None
 
         self.all_saved_list = list(self.sim_data.get_signal_names())
@@ -142,10 +150,49 @@ class SimAnalyzer:
             else:
                 file_contents.append(None)
         self.meas_str, self.stim_str = file_contents
+        self.sweep_values = None
+        if sweep_index is not None:
+            num_points, self.sweep_values = self.load_sweep_point(self.stim_str, sweep_index)
+            self.meas_str = load_sweep_measurements(num_points, sim_dir)[sweep_index]
 
         self.load_probes()
         self.load_periods()
 
+    def create_reader(self, sim_file):
+        from characterizer import SpiceReader
+        return SpiceReader(sim_file)
+
+    @staticmethod
+    def get_num_sweep_points(stim_str):
+        """Number of points of the parameter sweep in the stimulus, None if there is no sweep"""
+        match = re.search(r"Parameter sweep: names = \[.*\] points = (\d+)", stim_str)
+        if match is None:
+            return None
+        return int(match.group(1))
+
+    @classmethod
+    def load_sweep_point(cls, stim_str, sweep_index):
+        """Number of sweep points and parameter values of the sweep point at sweep_index"""
+        num_points = cls.get_num_sweep_points(stim_str)
+        debug.check(num_points is not None, "No parameter sweep in stimulus file")
+        match = re.search(r"Sweep point {}: (.*)".format(sweep_index), stim_str)
+        debug.check(match is not None,
+                    "Invalid sweep index {} for {} points".format(sweep_index, num_points))
+        values = {}
+        for entry in match.group(1).split():
+            name, value = entry.split("=")
+            values[name] = float(value)
+        return num_points, values
+
+    @classmethod
+    def load_sweep(cls, sim_dir):
+        """Analyzers for each point of a simulation with a parameter sweep"""
+        with open(os.path.join(sim_dir, "stim.sp"), "r") as f:
+            num_points = cls.get_num_sweep_points(f.read())
+        if num_points is None:
+            return [cls(sim_dir)]
+        return [cls(sim_dir, sweep_index=i) for i in range(num_points)]
+
     def load_events(self, op_name):
         event_pattern = r"-- {}.*\[(.*)\]".format(op_name)
         matches = search_str(self.stim_str, event_pattern)
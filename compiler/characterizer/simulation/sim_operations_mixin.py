@@ -177,7 +177,8 @@ class SimOperationsMixin(SpiceCharacterizer):
 
         # run until the end of the cycle time
         # Note run till at least one half cycle, this is because operations blend into each other
-        self.stim.write_control(self.current_time + self.duty_cycle * self.period)
+        self.stim.write_control(self.current_time + self.duty_cycle * self.period,
+                                sweep=getattr(self, "parameter_sweep", None))
 
         self.save_sim_config()
 
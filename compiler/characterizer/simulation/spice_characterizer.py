@@ -4,9 +4,11 @@ import shutil
 import debug
 import tech
 from characterizer import charutils as ch
+from characterizer.characterization_jobs import get_num_search_points, map_candidates
 from characterizer.simulation.pulse_gen_mixin import PulseGenMixin
 from characterizer.simulation.sim_data_mixin import SimDataMixin
 from characterizer.simulation.sim_operations_mixin import SimOperationsMixin
+from characterizer.stimuli import ParameterSweep
 from characterizer.trim_spice import trim_spice
 from globals import OPTS
 
@@ -48,8 +50,7 @@ class SpiceCharacterizer(SimDataMixin, PulseGenMixin, SimOperationsMixin):
         self.set_load_slew(0, 0)
         self.set_corner(corner)
 
-        self.v_data = {}  # saves PWL command for each voltage source
-        self.v_comments = {}
+        self.pwl_buffer = None  # saves PWL breakpoints for each voltage source
         self.saved_nodes = set()
         self.command_comments = []
 
@@ -132,6 +133,11 @@ class SpiceCharacterizer(SimDataMixin, PulseGenMixin, SimOperationsMixin):
         """
 
         feasible_period = float(tech.spice["feasible_period"])
+        self.analytical_period = None
+        if OPTS.analytical_period_search:
+            self.analytical_period = self.estimate_analytical_period()
+            if self.analytical_period:
+                feasible_period = self.analytical_period * (1 + OPTS.analytical_period_margin)
         time_out = 8
         while True:
             debug.info(1, "Trying feasible period: {0}ns".format(feasible_period))
@@ -155,6 +161,24 @@ class SpiceCharacterizer(SimDataMixin, PulseGenMixin, SimOperationsMixin):
             self.period = feasible_period
             return feasible_delay_lh, feasible_delay_hl
 
+    def estimate_analytical_period(self):
+        """Estimate period in ns using the sram's analytical delay model. None if unavailable"""
+        if not hasattr(self.sram, "analytical_delay"):
+            debug.info(1, "Analytical period estimate unavailable for {}".format(
+                self.sram.__class__.__name__))
+            return None
+        try:
+            bank_delay = self.sram.analytical_delay(self.slew, self.load)
+        except NotImplementedError as ex:
+            debug.info(1, "Analytical period estimate unavailable: {}".format(str(ex)))
+            return None
+        # analytical delays are in ps, data is valid after the negative edge
+        estimate = 2 * (bank_delay.delay + bank_delay.slew) / 1e3
+        if not estimate > 0:
+            return None
+        debug.info(1, "Analytical period estimate: {0}ns".format(estimate))
+        return estimate
+
     def run_delay_simulation(self):
         """
         This tries to simulate a period and checks if the result works. If
@@ -166,16 +190,40 @@ class SpiceCharacterizer(SimDataMixin, PulseGenMixin, SimOperationsMixin):
         # Checking from not data_value to data_value
         self.write_delay_stimulus()
         self.stim.run_sim()
-        delay_hl = ch.parse_output("timing", ".*delay_hl.*")
-        delay_lh = ch.parse_output("timing", ".*delay_lh.*")
-        slew_hl = ch.parse_output("timing", ".*slew_hl.*")
-        slew_lh = ch.parse_output("timing", ".*slew_lh.*")
+        return self.get_delay_results(lambda key: ch.parse_output("timing", key))
+
+    def run_delay_sweep(self, loads):
+        """
+        Same as run_delay_simulation for each load using a single simulation
+        which sweeps the output load parameter
+        """
+        self.parameter_sweep = ParameterSweep(["load"], [[load] for load in loads])
+        try:
+            self.write_delay_stimulus()
+        finally:
+            self.parameter_sweep = None
+        self.stim.run_sim()
+
+        results = []
+        measurements = ch.load_sweep_measurements(len(loads), sim_dir=OPTS.openram_temp)
+        for load, contents in zip(loads, measurements):
+            self.load = load
+            results.append(self.get_delay_results(
+                lambda key: ch.parse_output_contents(contents, key)))
+        return results
+
+    def get_delay_results(self, parse_output):
+        """Delays and powers from measurements. parse_output: key -> measured value"""
+        delay_hl = parse_output(".*delay_hl.*")
+        delay_lh = parse_output(".*delay_lh.*")
+        slew_hl = parse_output(".*slew_hl.*")
+        slew_lh = parse_output(".*slew_lh.*")
         delays = (delay_hl, delay_lh, slew_hl, slew_lh)
 
-        read0_power = ch.parse_output("timing", "read0_power.*")
-        write0_power = ch.parse_output("timing", "write0_power.*")
-        read1_power = ch.parse_output("timing", "read1_power.*")
-        write1_power = ch.parse_output("timing", "write1_power.*")
+        read0_power = parse_output("read0_power.*")
+        write0_power = parse_output("write0_power.*")
+        read1_power = parse_output("read1_power.*")
+        write1_power = parse_output("write1_power.*")
 
         if not self.check_valid_delays(delays):
             return False, {}
@@ -249,37 +297,68 @@ class SpiceCharacterizer(SimDataMixin, PulseGenMixin, SimOperationsMixin):
         Searches for the smallest period with output delays being within 5% of 
         long period. 
         """
+        if OPTS.analytical_period_search:
+            return self.find_min_period_analytical(feasible_delay_lh, feasible_delay_hl)
 
-        previous_period = ub_period = self.period
+        ub_period = self.period
         lb_period = 0.0
 
-        # Binary search algorithm to find the min period (max frequency) of design
-        time_out = 25
-        while True:
-            time_out -= 1
-            if time_out <= 0:
-                debug.error("Timed out, could not converge on minimum period.", 2)
+        def evaluate(period):
+            self.period = period
+            return self.try_period(feasible_delay_lh, feasible_delay_hl), None
 
-            target_period = 0.5 * (ub_period + lb_period)
-            self.period = target_period
-            debug.info(1, "MinPeriod Search: {0}ns (ub: {1} lb: {2})".format(target_period,
-                                                                             ub_period,
-                                                                             lb_period))
+        def evaluate_candidates(periods):
+            debug.info(1, "MinPeriod Search: {0}ns".format(", ".join(map(str, periods))))
+            return map_candidates("min_period", evaluate, periods)
 
-            if self.try_period(feasible_delay_lh, feasible_delay_hl):
-                ub_period = target_period
-            else:
-                lb_period = target_period
+        # Multi-point search algorithm to find the min period (max frequency) of design
+        # ub_period is always feasible
+        min_period, _ = ch.multi_point_search(evaluate_candidates, ub_period, lb_period,
+                                              num_points=get_num_search_points(),
+                                              error_tolerance=0.05, time_out=25)
+        return min_period
+
+    def find_min_period_analytical(self, feasible_delay_lh, feasible_delay_hl):
+        """
+        Min period search with bounds seeded from the analytical period estimate
+        followed by a secant search on the measured delays
+        """
+        ub_period = self.period
+        ub_margin = max(-0.05, max(feasible_delay_lh, feasible_delay_hl) / ub_period - 1)
+        lb_period = 0.0
+        lb_margin = None
+
+        def evaluate(period):
+            self.period = period
+            return self.evaluate_period(feasible_delay_lh, feasible_delay_hl)
+
+        if self.analytical_period:
+            target_period = self.analytical_period * (1 - OPTS.analytical_period_margin)
+            if target_period < ub_period:
+                debug.info(1, "MinPeriod lower bound from analytical: {0}ns".format(target_period))
+                success, margin = evaluate(target_period)
+                if success:
+                    ub_period, ub_margin = target_period, margin
+                else:
+                    lb_period, lb_margin = target_period, margin
 
-            if ch.relative_compare(ub_period, lb_period, error_tolerance=0.05):
-                # ub_period is always feasible
-                return ub_period
+        return ch.secant_search(evaluate, lb_period, ub_period, lower_margin=lb_margin,
+                                upper_margin=ub_margin, error_tolerance=0.05)
 
     def try_period(self, feasible_delay_lh, feasible_delay_hl):
         """ 
         This tries to simulate a period and checks if the result
         works. If it does and the delay is within 5% still, it returns True.
         """
+        success, _ = self.evaluate_period(feasible_delay_lh, feasible_delay_hl)
+        return success
+
+    def evaluate_period(self, feasible_delay_lh, feasible_delay_hl, error_tolerance=0.05):
+        """
+        Simulate current period
+        :return: (success, margin) margin is <=0 when successful, > 0 on failure
+                and None if delays couldn't be measured
+        """
 
         # Checking from not data_value to data_value
         self.write_delay_stimulus()
@@ -294,75 +373,128 @@ class SpiceCharacterizer(SimDataMixin, PulseGenMixin, SimOperationsMixin):
             debug.info(2, f"Invalid measures: Period {self.period}, delay_hl={delay_hl}ns,"
                           f" delay_lh={delay_lh}ns slew_hl={slew_hl}ns"
                           f" slew_lh={slew_lh}ns")
-            return False
+            return False, None
         delay_hl *= 1e9
         delay_lh *= 1e9
         slew_hl *= 1e9
         slew_lh *= 1e9
+
+        def relative_error(value, reference):
+            return abs(value - reference) / max(value, reference)
+
+        margin = max(max(delay_hl, delay_lh, slew_hl, slew_lh) / self.period - 1,
+                     relative_error(delay_lh, feasible_delay_lh) - error_tolerance,
+                     relative_error(delay_hl, feasible_delay_hl) - error_tolerance)
+
         if (delay_hl > self.period or delay_lh > self.period or
                 slew_hl > self.period or slew_lh > self.period):
             debug.info(2, f"Too long delay/slew: Period {self.period}, "
                           f"delay_hl={delay_hl}ns, delay_lh={delay_lh}ns "
                           f"slew_hl={slew_hl}ns slew_lh={slew_lh}ns")
-            return False
+            return False, margin
         else:
-            if not ch.relative_compare(delay_lh, feasible_delay_lh, error_tolerance=0.05):
+            if not ch.relative_compare(delay_lh, feasible_delay_lh,
+                                       error_tolerance=error_tolerance):
                 debug.info(2, "Delay too big {0} vs {1}".format(delay_lh, feasible_delay_lh))
-                return False
-            elif not ch.relative_compare(delay_hl, feasible_delay_hl, error_tolerance=0.05):
+                return False, margin
+            elif not ch.relative_compare(delay_hl, feasible_delay_hl,
+                                         error_tolerance=error_tolerance):
                 debug.info(2, "Delay too big {0} vs {1}".format(delay_hl, feasible_delay_hl))
-                return False
+                return False, margin
 
         # key=raw_input("press return to continue")
         debug.info(2, f"Successful period {self.period}, delay_hl={delay_hl}ns,"
                       f" delay_lh={delay_lh}ns slew_hl={slew_hl}ns slew_lh={slew_lh}ns")
-        return True
+        return True, min(margin, 0.0)
 
     def analyze(self, slews, loads):
         """
         Main function to characterize an SRAM for a table. Computes both delay and power characterization.
         """
         # 1) Find a feasible period and it's corresponding delays using the trimmed array.
+        #    Also find the leakage power of the trimmmed and  UNtrimmed arrays.
+        feasible = self.characterize_feasible_period(slews, loads)
+
+        # 2) Measure the delay, slew and power for all slew/load pairs.
+        if OPTS.use_parameter_sweeps:
+            point_results = [result for slew in slews
+                             for result in self.characterize_load_sweep(slew, loads, feasible)]
+        else:
+            point_results = [self.characterize_point(slew, load, feasible)
+                             for slew in slews for load in loads]
+
+        # 3) Finds the minimum period without degrading the delays by X%
+        min_period = self.characterize_min_period(slews, loads, feasible)
+
+        # 4) Pack up the final measurements
+        return self.merge_results(feasible, point_results, min_period)
+
+    def characterize_feasible_period(self, slews, loads):
+        """Find a feasible period at the max load/slew and the leakage power.
+        The results are all that's needed to characterize each slew/load point independently"""
         self.load = max(loads)
         self.slew = max(slews)
         (feasible_delay_lh, feasible_delay_hl) = self.find_feasible_period()
         debug.check(feasible_delay_lh > 0, "Negative delay may not be possible")
         debug.check(feasible_delay_hl > 0, "Negative delay may not be possible")
 
-        # 2) Measure the delay, slew and power for all slew/load pairs.
-        # Make a list for each type of measurement to append results to
-        char_data = {}
-        for m in ["delay_lh", "delay_hl", "slew_lh", "slew_hl", "read0_power",
-                  "read1_power", "write0_power", "write1_power", "leakage_power"]:
-            char_data[m] = []
-
-        # 2a) Find the leakage power of the trimmmed and  UNtrimmed arrays.
         (full_array_leakage, trim_array_leakage) = self.run_power_simulation()
-        char_data["leakage_power"] = full_array_leakage
-
-        for slew in slews:
-            for load in loads:
-                self.set_load_slew(load, slew)
-                # 2c) Find the delay, dynamic power, and leakage power of the trimmed array.
-                (success, delay_results) = self.run_delay_simulation()
-                debug.check(success, "Couldn't run a simulation. slew={0} load={1}\n".format(self.slew, self.load))
-                for k, v in delay_results.items():
-                    if "power" in k:
-                        # Subtract partial array leakage and add full array leakage for the power measures
-                        char_data[k].append(v - trim_array_leakage + full_array_leakage)
-                    else:
-                        char_data[k].append(v)
-
-        # 3) Finds the minimum period without degrading the delays by X%
+        return {"period": self.period,
+                "analytical_period": self.analytical_period,
+                "feasible_delay_lh": feasible_delay_lh,
+                "feasible_delay_hl": feasible_delay_hl,
+                "leakage_power": full_array_leakage,
+                "trim_leakage_power": trim_array_leakage}
+
+    def load_feasible_period(self, feasible):
+        self.period = feasible["period"]
+        self.analytical_period = feasible["analytical_period"]
+
+    def characterize_point(self, slew, load, feasible):
+        """Find the delay, dynamic power, and leakage power of the trimmed array for a slew/load pair"""
+        self.load_feasible_period(feasible)
+        self.set_load_slew(load, slew)
+        (success, delay_results) = self.run_delay_simulation()
+        debug.check(success, "Couldn't run a simulation. slew={0} load={1}\n".format(self.slew, self.load))
+        return self.add_leakage(delay_results, feasible)
+
+    def characterize_load_sweep(self, slew, loads, feasible):
+        """characterize_point for each load using a single simulation"""
+        self.load_feasible_period(feasible)
+        self.set_load_slew(max(loads), slew)
+        point_results = []
+        for load, (success, delay_results) in zip(loads, self.run_delay_sweep(loads)):
+            debug.check(success, "Couldn't run a simulation. slew={0} load={1}\n".format(slew, load))
+            point_results.append(self.add_leakage(delay_results, feasible))
+        return point_results
+
+    @staticmethod
+    def add_leakage(delay_results, feasible):
+        for k, v in delay_results.items():
+            if "power" in k:
+                # Subtract partial array leakage and add full array leakage for the power measures
+                delay_results[k] = v - feasible["trim_leakage_power"] + feasible["leakage_power"]
+        return delay_results
+
+    def characterize_min_period(self, slews, loads, feasible):
+        self.load_feasible_period(feasible)
         self.set_load_slew(max(loads), max(slews))
-        min_period = self.find_min_period(feasible_delay_lh, feasible_delay_hl)
+        min_period = self.find_min_period(feasible["feasible_delay_lh"], feasible["feasible_delay_hl"])
         debug.check(type(min_period) == float, "Couldn't find minimum period.")
-        debug.info(1, "Min Period: {0}n with a delay of {1} / {2}".format(min_period, feasible_delay_lh,
-                                                                          feasible_delay_hl))
-
-        # 4) Pack up the final measurements
+        debug.info(1, "Min Period: {0}n with a delay of {1} / {2}".format(min_period,
+                                                                          feasible["feasible_delay_lh"],
+                                                                          feasible["feasible_delay_hl"]))
+        return min_period
+
+    @staticmethod
+    def merge_results(feasible, point_results, min_period):
+        """Combine results of characterize_point (in slew-major order) into the lib tables"""
+        char_data = {}
+        for m in ["delay_lh", "delay_hl", "slew_lh", "slew_hl", "read0_power",
+                  "read1_power", "write0_power", "write1_power"]:
+            char_data[m] = [x[m] for x in point_results]
+        char_data["leakage_power"] = feasible["leakage_power"]
         char_data["min_period"] = ch.round_time(min_period)
-
         return char_data
 
     def analytical_delay(self, sram, slews, loads):
@@ -0,0 +1,293 @@
+"""
+Asynchronous runner for spice simulations.
+
+Simulations are submitted as SimulationJobs and run in background threads (the simulator is a
+separate process) returning futures. Each job enforces a wall-clock limit
+(OPTS.simulation_timeout) and a memory limit (OPTS.simulation_memory_limit), writes its own
+stdout/stderr logs and optionally re-uses results of identical simulations.
+Cached results are keyed by a hash of the stimulus, the included netlists/models,
+the simulator and the command line options.
+"""
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import debug
+from base import utils
+from globals import OPTS
+
+CACHE_VERSION = 1
+RESULT_FILE = "result.json"
+SIM_DIR_PLACEHOLDER = "<sim_dir>"
+# .include/.inc/.lib in spice, include in spectre
+INCLUDE_PATTERN = re.compile(r"^\s*\.?(?:include|inc|lib)\s+[\"']?([^\"'\s]+)[\"']?",
+                             re.IGNORECASE | re.MULTILINE)
+MAX_INCLUDE_DEPTH = 4
+
+
+class SimulationJob:
+    def __init__(self, command, stim_file, sim_dir=None, name="spice", valid_retcode=0,
+                 timeout=None, memory_limit=None):
+        """
+        :param command: shell command to run the simulation
+        :param stim_file: stimulus file
+        :param sim_dir: directory the simulator runs in and writes its outputs to
+        :param name: prefix of stdout/stderr log files
+        :param valid_retcode: maximum valid return code
+        :param timeout: wall clock limit in seconds, defaults to OPTS.simulation_timeout
+        :param memory_limit: memory limit in MB, defaults to OPTS.simulation_memory_limit
+        """
+        self.command = command
+        self.stim_file = stim_file
+        self.sim_dir = os.path.abspath(sim_dir or OPTS.openram_temp)
+        self.name = name
+        self.valid_retcode = valid_retcode
+        self.timeout = OPTS.simulation_timeout if timeout is None else timeout
+        self.memory_limit = OPTS.simulation_memory_limit if memory_limit is None else memory_limit
+        self.stdout_file = os.path.join(self.sim_dir, "{}_stdout.log".format(name))
+        self.stderr_file = os.path.join(self.sim_dir, "{}_stderr.log".format(name))
+        self.use_cache = OPTS.cache_simulations
+        self.cache_dir = get_cache_dir()
+        self.verbose = OPTS.debug_level >= 1
+
+
+class SimulationResult:
+    def __init__(self, job, returncode, duration, timed_out=False, cached=False):
+        self.job = job
+        self.returncode = returncode
+        self.duration = duration
+        self.timed_out = timed_out
+        self.cached = cached
+        self.stdout_file = job.stdout_file
+        self.stderr_file = job.stderr_file
+
+    @property
+    def success(self):
+        return not self.timed_out and 0 <= self.returncode <= self.job.valid_retcode
+
+    def __str__(self):
+        status = "timed out" if self.timed_out else "return code {}".format(self.returncode)
+        return "{} ({}{}, {:.3g}s)".format(self.job.stim_file, status,
+                                           ", cached" if self.cached else "", self.duration)
+
+
+def get_cache_dir():
+    cache_dir = OPTS.simulation_cache_dir
+    if cache_dir is None:
+        cache_dir = os.path.join(OPTS.openram_temp, "simulation_cache")
+    return os.path.abspath(cache_dir)
+
+
+_file_hashes = {}
+
+
+def hash_file(file_name):
+    """Content hash of file_name, memoized by modification time and size"""
+    stat = os.stat(file_name)
+    signature = (stat.st_mtime, stat.st_size)
+    cached = _file_hashes.get(file_name)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    hasher = hashlib.sha256()
+    with open(file_name, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    _file_hashes[file_name] = (signature, hasher.hexdigest())
+    return _file_hashes[file_name][1]
+
+
+def get_includes(file_name, includes=None, depth=0):
+    """Files included (recursively) by file_name in order of first inclusion"""
+    if includes is None:
+        includes = {}
+    if depth > MAX_INCLUDE_DEPTH:
+        return includes
+    with open(file_name, "r", errors="ignore") as f:
+        contents = f.read()
+    base_dir = os.path.dirname(os.path.abspath(file_name))
+    for match in INCLUDE_PATTERN.finditer(contents):
+        include = os.path.join(base_dir, match.group(1))
+        if include not in includes and os.path.isfile(include):
+            includes[include] = None
+            get_includes(include, includes, depth + 1)
+    return includes
+
+
+def get_cache_key(job):
+    """Hash of the stimulus, included files and simulator command, independent of the sim_dir"""
+    def normalize(text):
+        return text.replace(job.sim_dir, SIM_DIR_PLACEHOLDER)
+
+    hasher = hashlib.sha256()
+    hasher.update(str(CACHE_VERSION).encode())
+    with open(job.stim_file, "r", errors="ignore") as f:
+        hasher.update(normalize(f.read()).encode())
+    for include in get_includes(job.stim_file):
+        # include paths are part of the stimulus so only the contents are needed
+        hasher.update(hash_file(include).encode())
+
+    # simulator and command line options
+    executable = job.command.split()[0]
+    hasher.update(normalize(job.command).encode())
+    exe_path = shutil.which(executable)
+    if exe_path:
+        stat = os.stat(exe_path)
+        hasher.update("{} {} {}".format(exe_path, stat.st_size, stat.st_mtime).encode())
+    return hasher.hexdigest()
+
+
+def get_output_files(sim_dir, start_time, exclude):
+    """Files directly in sim_dir modified since start_time"""
+    outputs = []
+    with os.scandir(sim_dir) as entries:
+        for entry in entries:
+            if (entry.is_file() and entry.path not in exclude and
+                    utils.modified_since(entry.path, start_time)):
+                outputs.append(entry.name)
+    return sorted(outputs)
+
+
+def load_cached_result(job, key):
+    entry_dir = os.path.join(job.cache_dir, key)
+    result_file = os.path.join(entry_dir, RESULT_FILE)
+    if not os.path.exists(result_file):
+        return None
+    try:
+        with open(result_file, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    for file_name in data["files"]:
+        shutil.copy(os.path.join(entry_dir, file_name), os.path.join(job.sim_dir, file_name))
+    debug.info(2, "Restored cached simulation results for %s", job.stim_file)
+    return SimulationResult(job, data["returncode"], 0.0, cached=True)
+
+
+def save_cached_result(job, key, result, output_files):
+    os.makedirs(job.cache_dir, exist_ok=True)
+    entry_dir = os.path.join(job.cache_dir, key)
+    temp_dir = tempfile.mkdtemp(prefix=key + "_", dir=job.cache_dir)
+    for file_name in output_files:
+        shutil.copy(os.path.join(job.sim_dir, file_name), os.path.join(temp_dir, file_name))
+    # result file is written last so partially saved entries are never loaded
+    with open(os.path.join(temp_dir, RESULT_FILE), "w") as f:
+        json.dump({"returncode": result.returncode, "duration": result.duration,
+                   "files": output_files}, f)
+    try:
+        os.rename(temp_dir, entry_dir)
+    except OSError:
+        # another job saved the same result
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def get_limited_command(command, memory_limit):
+    """Apply the memory limit and niceness within the shell running command.
+    A preexec_fn isn't safe to use since jobs are started from threads"""
+    nice_value = os.getenv("OPENRAM_SUBPROCESS_NICE", 15)
+    if nice_value:
+        command = "nice -n {} /bin/sh -c {}".format(int(nice_value), shlex.quote(command))
+    if memory_limit:
+        # ulimit -v is in KB
+        command = "ulimit -v {} && {}".format(int(memory_limit * 1024), command)
+    return command
+
+
+def execute(job):
+    """Run the simulation process enforcing the job's time and memory limits"""
+    start_time = time.time()
+    timed_out = False
+    with open(job.stdout_file, "w") as stdout_f, open(job.stderr_file, "w") as stderr_f:
+        stdout = subprocess.PIPE if job.verbose else stdout_f
+        stderr = subprocess.STDOUT if job.verbose else stderr_f
+        # new session so the simulator and its children can be killed together
+        process = subprocess.Popen(get_limited_command(job.command, job.memory_limit),
+                                   stdout=stdout, stderr=stderr, shell=True,
+                                   cwd=job.sim_dir, start_new_session=True)
+        if job.verbose:
+            reader = threading.Thread(target=forward_output, args=(process, stdout_f), daemon=True)
+            reader.start()
+        try:
+            returncode = process.wait(timeout=job.timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            returncode = process.wait()
+        if job.verbose:
+            reader.join()
+    return SimulationResult(job, returncode, time.time() - start_time, timed_out=timed_out)
+
+
+def forward_output(process, log_file):
+    for line in iter(process.stdout.readline, b""):
+        line = line.decode()
+        debug.print_str(line.rstrip())
+        log_file.write(line)
+    process.stdout.close()
+
+
+def run_job(job):
+    key = None
+    if job.use_cache:
+        key = get_cache_key(job)
+        result = load_cached_result(job, key)
+        if result is not None:
+            return result
+    start_time = time.time()
+    result = execute(job)
+    if result.timed_out:
+        debug.warning("Simulation of %s timed out after %ss", job.stim_file, job.timeout)
+    elif job.use_cache and result.success:
+        exclude = {os.path.abspath(job.stim_file)}
+        output_files = get_output_files(job.sim_dir, start_time, exclude)
+        save_cached_result(job, key, result, output_files)
+    debug.info(2, "Simulation %s", result)
+    return result
+
+
+class SimulationRunner:
+    def __init__(self, num_workers=None):
+        self.num_workers = num_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get_executor(self):
+        with self._lock:
+            # threads aren't inherited by forked characterization workers
+            if self._executor is None or self._pid != os.getpid():
+                num_workers = self.num_workers or OPTS.num_simulation_workers or os.cpu_count()
+                self._executor = ThreadPoolExecutor(max_workers=num_workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, job) -> Future:
+        """Run job in the background. The future's result is a SimulationResult"""
+        return self.get_executor().submit(run_job, job)
+
+    def run(self, job):
+        return run_job(job)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown()
+            self._executor = None
+
+
+runner = SimulationRunner()
+
+
+def get_simulation_runner():
+    return runner
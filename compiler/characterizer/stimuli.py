@@ -10,8 +10,28 @@ import numpy as np
 
 import debug
 import tech
-from base import utils
 from globals import OPTS
+from .charutils import SWEEP_MARKER
+from .simulation_runner import SimulationJob, get_simulation_runner
+
+
+class ParameterSweep:
+    """ Values of simulation parameters at each point of a simulator-native sweep """
+    name = "param_sweep"
+
+    def __init__(self, names, points):
+        self.names = list(names)
+        self.points = [list(x) for x in points]
+
+    def __len__(self):
+        return len(self.points)
+
+    def get_values(self, index):
+        return dict(zip(self.names, self.points[index]))
+
+    def format_values(self, index):
+        return " ".join("{}={}".format(key, value) for key, value in self.get_values(index).items())
+
 
 class stimuli:
     """ Class for providing stimuli functions """
@@ -217,10 +237,45 @@ class stimuli:
                                                                             t_initial,
                                                                             t_final))
 
-    def write_control(self, end_time):
-        """ Write the control cards to run and end the simulation """
+    @staticmethod
+    def param_expression(expression):
+        """ Expression of sweep parameters for an element value """
+        if OPTS.spice_name == "ngspice":
+            return "{" + expression + "}"
+        return "'{}'".format(expression)
+
+    def write_sweep_parameters(self, sweep):
+        """ Define sweep parameters using the values of the first sweep point """
+        self.sf.write("* Parameter sweep: names = [{}] points = {}\n".format(", ".join(sweep.names),
+                                                                             len(sweep)))
+        for i in range(len(sweep)):
+            self.sf.write("* Sweep point {}: {}\n".format(i, sweep.format_values(i)))
+        self.sf.write(".PARAM {}\n".format(sweep.format_values(0)))
+
+    def write_sweep_control(self, sweep):
+        """ Re-run the simulation for the remaining sweep points without re-loading the netlist """
+        if OPTS.spice_name == "ngspice":
+            # measurements of each run are separated by a marker in the output
+            self.sf.write(".control\n")
+            for i in range(len(sweep)):
+                if i > 0:
+                    for key, value in sweep.get_values(i).items():
+                        self.sf.write("alterparam {}={}\n".format(key, value))
+                    self.sf.write("reset\n")
+                self.sf.write("echo \"{} = {}\"\n".format(SWEEP_MARKER, i))
+                self.sf.write("run\n")
+            self.sf.write(".endc\n")
+        else:
+            # each .ALTER writes its own measurement file (.mt1, .mt2...)
+            for i in range(1, len(sweep)):
+                self.sf.write(".ALTER {}_{}\n".format(SWEEP_MARKER, i))
+                self.sf.write(".PARAM {}\n".format(sweep.format_values(i)))
+
+    def write_control(self, end_time, sweep=None):
+        """ Write the control cards to run and end the simulation
+        If sweep is specified, the simulation is repeated for each sweep point """
         if OPTS.spice_name == "spectre":
-            self.write_control_spectre(end_time)
+            self.write_control_spectre(end_time, sweep)
             return
 
         if OPTS.spice_name == "ngspice":
@@ -253,12 +308,16 @@ class stimuli:
                 self.sf.write("*.probe V(*)\n")
                 self.sf.write("*.plot V(*)\n")
 
+        if sweep is not None:
+            self.write_sweep_control(sweep)
+
         # end the stimulus file
         self.sf.write(".end\n\n")
 
-    def write_control_spectre(self, end_time):
+    def write_control_spectre(self, end_time, sweep=None):
         self.sf.write("simulator lang=spectre\n")
         use_ultrasim = OPTS.use_ultrasim
+        debug.check(sweep is None or not use_ultrasim, "Parameter sweeps not supported with ultrasim")
         if use_ultrasim:
             from globals import find_exe
             OPTS.spice_exe = find_exe("ultrasim")
@@ -287,10 +346,19 @@ usim_opt  rcr_fmax=20G
 
             # self.sf.write('dcOp dc write="spectre.dc" readns="spectre.dc" maxiters=150 maxsteps=10000 annotate=status\n')
             tran_options = OPTS.tran_options if hasattr(OPTS, "tran_options") else ""
+            if sweep is not None:
+                self.sf.write("{}_values paramset {{\n".format(sweep.name))
+                self.sf.write(" ".join(sweep.names) + "\n")
+                for point in sweep.points:
+                    self.sf.write(" ".join(map(str, point)) + "\n")
+                self.sf.write("}\n")
+                self.sf.write("{0} sweep paramset={0}_values {{\n".format(sweep.name))
             self.sf.write('tran tran step={} stop={}n ic={} write=spectre.dc'
                           ' annotate=status maxiters=5 {}\n'.format("5p", end_time,
                                                                     OPTS.spectre_ic_mode,
                                                                     tran_options))
+            if sweep is not None:
+                self.sf.write("}\n")
             if OPTS.use_pex:
                 nestlvl = 1
             else:
@@ -365,11 +433,9 @@ usim_opt  rcr_fmax=20G
         self.sf.write("V{0} {0} 0 {1}\n".format("test" + self.vdd_name, self.voltage))
         self.sf.write("V{0} {0} 0 {1}\n".format("test" + self.gnd_name, 0))
 
-    def run_sim(self):
-        """ Run hspice in batch mode and output rawfile to parse. """
+    def get_sim_command(self):
+        """ Simulator command line and the maximum valid return code """
         temp_stim = self.sf.name
-        import datetime
-        start_time = datetime.datetime.now()
         debug.check(OPTS.spice_exe != "", "No spice simulator has been found.")
 
         if OPTS.spice_name == "xa":
@@ -416,15 +482,33 @@ usim_opt  rcr_fmax=20G
                                                        os.path.join(OPTS.openram_temp, "timing.lis"))
             # for some reason, ngspice-25 returns 1 when it only has acceptable warnings
             valid_retcode = 1
+        return cmd, valid_retcode
 
-        retcode = utils.run_command(cmd, stdout_file=os.path.join(OPTS.openram_temp, "spice_stdout.log"),
-                                    stderror_file=os.path.join(OPTS.openram_temp, "spice_stderr.log"),
-                                    verbose_level=1)
+    def create_sim_job(self, name="spice"):
+        if not self.sf.closed:
+            self.sf.flush()
+        cmd, valid_retcode = self.get_sim_command()
+        return SimulationJob(cmd, self.sf.name, sim_dir=OPTS.openram_temp, name=name,
+                             valid_retcode=valid_retcode)
 
-        if retcode > valid_retcode:
-            debug.error("Spice simulation error: " + cmd, -1)
+    def submit_sim(self, name="spice"):
+        """ Run the simulation in the background.
+        The returned future's result is checked with check_sim_result """
+        return get_simulation_runner().submit(self.create_sim_job(name))
+
+    @staticmethod
+    def check_sim_result(result):
+        if result.timed_out:
+            debug.error("Spice simulation timed out after {}s: {}".format(result.job.timeout,
+                                                                          result.job.command), -1)
+        elif result.returncode > result.job.valid_retcode:
+            debug.error("Spice simulation error: " + result.job.command, -1)
         else:
-            end_time = datetime.datetime.now()
-            delta_time = round((end_time - start_time).total_seconds(), 1)
-            debug.info(2, "*** Spice: {} seconds".format(delta_time))
-        return retcode
+            debug.info(2, "*** Spice: {} seconds{}".format(round(result.duration, 1),
+                                                           " (cached)" * result.cached))
+        return result.returncode
+
+    def run_sim(self):
+        """ Run the simulation in batch mode and output rawfile to parse. """
+        result = get_simulation_runner().run(self.create_sim_job())
+        return self.check_sim_result(result)
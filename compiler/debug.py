@@ -25,8 +25,9 @@ file_handler = None
 
 
 def wrap_message(prefix, message):
-    (frame, filename, line_number, function_name, lines,
-     index) = inspect.getouterframes(inspect.currentframe())[2]
+    # walk the frames directly, inspect.getouterframes reads the source of every frame
+    frame = inspect.currentframe().f_back.f_back
+    filename, line_number = frame.f_code.co_filename, frame.f_lineno
     return "{0}: file {1}: line {2}: ".format(prefix, os.path.basename(filename),
                                               line_number) + message
 
@@ -52,14 +53,9 @@ def warning(message, *args):
 def info(lev, message, *args):
     from globals import OPTS
     if OPTS.debug_level >= lev:
-        frm = inspect.stack()[1]
-        mod = inspect.getmodule(frm[0])
-        # classname = frm.f_globals['__name__']
-        if mod.__name__ is None:
-            class_name = ""
-        else:
-            class_name = mod.__name__
-        message = "[{0}/{1}]: ".format(class_name, frm[0].f_code.co_name) + message
+        frame = inspect.currentframe().f_back
+        class_name = frame.f_globals.get("__name__") or ""
+        message = "[{0}/{1}]: ".format(class_name, frame.f_code.co_name) + message
         logger.debug(message, *args)
 
 
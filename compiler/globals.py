@@ -45,7 +45,11 @@ def parse_args():
                              help="Perform characterization to calculate delays (default is analytical models)"),
         optparse.make_option("-d", "--dontpurge", action="store_false", dest="purge_temp",
                              help="Don't purge the contents of the temp directory after a successful run"),
-        optparse.make_option("--config_file", help="Explicitly specify config file")
+        optparse.make_option("--config_file", help="Explicitly specify config file"),
+        optparse.make_option("--profile", action="store_true", dest="profile",
+                             help="Save a trace of the time and memory used by each module"),
+        optparse.make_option("--import_times", action="store_true", dest="report_import_times",
+                             help="Report the time spent importing each package")
         # -h --help is implicit.
     }
 
@@ -114,6 +118,10 @@ def init_openram(config_file, is_unit_test=True, openram_temp=None):
         else:
             OPTS.__dict__[key] = DEFAULT_OPTS.__dict__[key]
 
+    if OPTS.report_import_times:
+        from base import import_timer
+        import_timer.install()
+
     if openram_temp is not None:
         OPTS.set_temp_folder(openram_temp)
 
@@ -135,6 +143,12 @@ def init_openram(config_file, is_unit_test=True, openram_temp=None):
 
     initialize_classes()
 
+    from base import profiler
+    if OPTS.profile:
+        profiler.start()
+    else:
+        profiler.stop()
+
 
 def get_tool(tool_type, preferences, default=None):
     """
@@ -252,7 +266,33 @@ def read_config(config_file, is_unit_test=True, openram_temp=None):
         
 def end_openram():
     """ Clean up openram for a proper exit """
+    if OPTS.check_lvsdrc and OPTS.hierarchical_verification:
+        from verify import get_hierarchical_verifier
+        get_hierarchical_verifier().report()
+    save_profile()
+    report_import_times()
     cleanup_paths()
+
+
+def save_profile():
+    """ Save the profile trace and print the summary if profiling is enabled """
+    from base import profiler
+    if not profiler.is_enabled():
+        return
+    trace_file = OPTS.profile_trace_file or os.path.join(OPTS.output_path,
+                                                         OPTS.output_name + "_profile.json")
+    profiler.write_trace(trace_file)
+    debug.print_str(profiler.format_summary())
+    profiler.stop()
+
+
+def report_import_times():
+    """ Print the time spent importing each package if import timing is enabled """
+    from base import import_timer
+    if not import_timer.is_installed():
+        return
+    debug.print_str(import_timer.format_report())
+    import_timer.uninstall()
     
 
     
@@ -412,8 +452,10 @@ def initialize_classes():
     else:
         import verify
         reload(verify)
-    # only bitcell is preloaded here because most unit tests only require loading bitcell to get it's dimensions
-    reload(__import__(OPTS.bitcell))
+    # the bitcell is imported on first use, reload it if a previous run imported it
+    # so it picks up the new options
+    if OPTS.bitcell in sys.modules:
+        reload(sys.modules[OPTS.bitcell])
     OPTS.check_lvsdrc = check_lvsdrc
 
 def print_time(name, now_time, last_time=None):
@@ -27,6 +27,20 @@ class options(optparse.Values):
     drc_exe = None
     lvs_exe = None
     pex_exe = None
+    # Reuse DRC/LVS/PEX results when the gds, netlist, rule decks and options are unchanged
+    cache_verification = False
+    # Directory for cached verification results, defaults to <openram_temp>/verification_cache
+    verification_cache_dir = None
+    # Maximum number of concurrent verification runs in verify.verify_modules, defaults to cpu count
+    num_verification_workers = None
+    # Verify each unique module once and check parents of verified modules hierarchically
+    hierarchical_verification = False
+    # Record the time and peak memory of module creation, file writing, verification and optimization
+    profile = False
+    # Chrome trace of the profile, defaults to <output_path>/<output_name>_profile.json
+    profile_trace_file = None
+    # Print the time spent importing each package at the end of the run
+    report_import_times = False
 
     simulator_threads = 24
 
@@ -42,12 +56,34 @@ class options(optparse.Values):
     trim_netlist = False
     # Use detailed LEF blockages
     detailed_blockages = True
+    # Merge overlapping and abutting LEF obstructions into their union
+    lef_merge_obstructions = True
+    # Grid (in microns) LEF obstructions are expanded to before merging, coarsens the outline
+    lef_obstruction_resolution = None
     # Define the output file paths
     output_path = "."
     # Define the output file base name
     output_name = ""
     # Use analytical delay models by default rather than (slow) characterization
     analytical_delay = True
+    # Seed feasible/min period search from analytical delay and use secant search
+    analytical_period_search = False
+    # relative distance of initial upper/lower period bounds from the analytical estimate
+    analytical_period_margin = 0.25
+    # Number of processes for concurrent corner/point characterization jobs in lib generation
+    num_characterization_workers = 1
+    # Simulate all output loads of a slew in one simulation using simulator parameter sweeps
+    use_parameter_sweeps = False
+    # Wall clock limit in seconds for each spice simulation, None for no limit
+    simulation_timeout = None
+    # Memory (address space) limit in MB for each spice simulation, None for no limit
+    simulation_memory_limit = None
+    # Maximum number of concurrent simulations submitted to the simulation runner, defaults to cpu count
+    num_simulation_workers = None
+    # Reuse simulation outputs when the stimulus, included netlists and simulator options are unchanged
+    cache_simulations = False
+    # Directory for cached simulation results, defaults to <openram_temp>/simulation_cache
+    simulation_cache_dir = None
     # Purge the temp directory after a successful run (doesn't purge on errors, anyhow)
     purge_temp = False
 
@@ -494,6 +494,7 @@ class ptx(design.design):
 
         self.insts = [x for i, x in enumerate(self.insts) if i not in cont_indices]
         self.conns = [x for i, x in enumerate(self.conns) if i not in cont_indices]
+        self.invalidate_geometry()
 
     def add_active(self):
         """ 
@@ -7,6 +7,7 @@ import debug
 import verify
 from base import contact
 from base import design
+from base import profiler
 from base.vector import vector
 from characterizer import lib
 from globals import OPTS, print_time
@@ -1035,7 +1036,8 @@ class sram(design.design, sram_power_grid_old.Mixin):
                 debug.print_str("Performing simulation-based characterization with {}".format(OPTS.spice_name))
             if OPTS.trim_netlist:
                 debug.print_str("Trimming netlist to speed up characterization.")
-        lib(out_dir=OPTS.output_path, sram=self, sp_file=sp_file)
+        with profiler.span("lib", "characterization", module=self.name):
+            lib(out_dir=OPTS.output_path, sram=self, sp_file=sp_file)
         print_time("Characterization", datetime.datetime.now(), start_time)
 
         # Write the layout
@@ -1055,5 +1057,6 @@ class sram(design.design, sram_power_grid_old.Mixin):
         start_time = datetime.datetime.now()
         vname = os.path.join(OPTS.output_path, self.name + ".v")
         debug.print_str("Verilog: Writing to {0}".format(vname))
-        self.verilog_write(vname)
+        with profiler.span("verilog_write", "verilog", module=self.name):
+            self.verilog_write(vname)
         print_time("Verilog", datetime.datetime.now(), start_time)
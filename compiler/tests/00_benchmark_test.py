@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the benchmark baseline comparison and the synthetic simulation fixtures
+"""
+import os
+import tempfile
+
+from testutils import OpenRamTest
+
+
+class BenchmarkTest(OpenRamTest):
+
+    def setUp(self):
+        super().setUp()
+        from globals import OPTS
+        self.work_dir = tempfile.mkdtemp(dir=OPTS.openram_temp)
+
+    @staticmethod
+    def create_result(name, min_time, peak_memory, params=None):
+        return {"name": name, "params": params or {}, "times": [min_time], "min": min_time,
+                "median": min_time, "mean": min_time, "peak_memory": peak_memory,
+                "run_memory": 0.0}
+
+    def test_compare_baseline(self):
+        import benchmark
+        baseline_file = os.path.join(self.work_dir, "baseline.json")
+        baseline_results = [self.create_result("same", 1.0, 100),
+                            self.create_result("slower", 1.0, 100),
+                            self.create_result("more_memory", 1.0, 100),
+                            self.create_result("faster", 1.0, 100),
+                            self.create_result("resized", 1.0, 100, {"num_rows": 16})]
+        benchmark.compare_results(baseline_results, None, 0.2, 0.2)
+        self.assertTrue(all(x["status"] == benchmark.NEW for x in baseline_results))
+        benchmark.save_baseline(baseline_file, baseline_results, "sky130")
+
+        results = [self.create_result("same", 1.1, 110),
+                   self.create_result("slower", 1.3, 100),
+                   self.create_result("more_memory", 1.0, 130),
+                   self.create_result("faster", 0.7, 100),
+                   self.create_result("resized", 2.0, 100, {"num_rows": 32}),
+                   self.create_result("added", 1.0, 100),
+                   {"name": "broken", "status": benchmark.FAILED}]
+        baseline = benchmark.load_baseline(baseline_file)
+        benchmark.compare_results(results, baseline, 0.2, 0.2)
+        statuses = {x["name"]: x["status"] for x in results}
+        self.assertEqual(statuses, {"same": benchmark.OK, "slower": benchmark.REGRESSION,
+                                    "more_memory": benchmark.REGRESSION,
+                                    "faster": benchmark.IMPROVED, "resized": benchmark.NEW,
+                                    "added": benchmark.NEW, "broken": benchmark.FAILED})
+        self.assertAlmostEqual(results[1]["time_ratio"], 1.3)
+        self.assertIn("regression", benchmark.format_report(results))
+
+        # failed benchmarks keep their previous baseline
+        benchmark.save_baseline(baseline_file, results, "sky130")
+        benchmarks = benchmark.load_baseline(baseline_file)["benchmarks"]
+        self.assertEqual(benchmarks["slower"]["min"], 1.3)
+        self.assertNotIn("broken", benchmarks)
+        self.assertIn("added", benchmarks)
+
+    def test_synthetic_simulation(self):
+        import benchmark
+        options, _ = benchmark.parse_args(["--sim_word_size", "8", "--sim_addresses", "4",
+                                           "--sim_operations", "12"])
+        for benchmark_class in [benchmark.SimReaderBenchmark, benchmark.SimAnalyzerBenchmark]:
+            bench = benchmark_class(options, self.work_dir)
+            result = benchmark.run_benchmark(bench, repeat=1)
+            self.assertEqual(len(result["times"]), 1)
+            self.assertEqual(result["params"]["sim_operations"], 12)
+
+        events = bench.simulation.load_events()
+        self.assertEqual(len(events), 12)
+        self.assertEqual(set(x[0] for x in events), {"READ", "WRITE"})
+        # a wrong data output is detected
+        _, address, read_time, period = [x for x in events if x[0] == "READ"][0]
+        sim_data = bench.analyzer.sim_data
+        sim_data.cache["D[0]"] = sim_data.vdd - sim_data.get_signal("D[0]")
+        self.assertFalse(bench.analyzer.verify_read_event(read_time, address, period,
+                                                          bench.simulation.duty))
+
+
+BenchmarkTest.run_tests(__name__)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Check the startup time of generating a single pinv netlist in a new process
+and that the characterizer simulation classes, verification backends and scipy are not imported
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from testutils import OpenRamTest
+
+cold_start_script = """import json
+import sys
+import time
+start_time = time.time()
+sys.path.insert(0, {compiler_dir!r})
+sys.path.insert(0, {tests_dir!r})
+sys.argv = [sys.argv[0], "-t", {tech_name!r}, "--import_times"]
+import globals
+from globals import OPTS
+globals.parse_args()
+globals.init_openram("config_20_{{}}".format(OPTS.tech_name), openram_temp={temp_dir!r})
+init_time = time.time() - start_time
+from pgates.pinv import pinv
+cell = pinv(size=1)
+cell.sp_write({sp_file!r})
+from base import import_timer
+print(json.dumps({{"init_time": init_time, "total_time": time.time() - start_time,
+                  "import_times": import_timer.get_package_times(),
+                  "modules": list(sys.modules.keys())}}))
+"""
+
+
+class ColdStartTest(OpenRamTest):
+    # seconds from process start to the written pinv netlist, excluding the interpreter startup
+    cold_start_budget = 5.0
+    lazy_modules = ["scipy", "characterizer.simulation.spice_characterizer",
+                    "characterizer.simulation.psf_reader", "characterizer.delay_optimizer",
+                    "verify.calibre", "verify.assura", "verify.magic", "verify.klayout"]
+
+    def test_pinv_netlist_cold_start(self):
+        from globals import OPTS
+        temp_dir = tempfile.mkdtemp(dir=OPTS.openram_temp)
+        sp_file = os.path.join(temp_dir, "pinv.sp")
+        tests_dir = os.path.abspath(os.path.dirname(__file__))
+        script = cold_start_script.format(compiler_dir=os.path.dirname(tests_dir),
+                                          tests_dir=tests_dir, tech_name=OPTS.tech_name,
+                                          temp_dir=temp_dir, sp_file=sp_file)
+        process = subprocess.run([sys.executable, "-c", script], stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE, cwd=tests_dir, universal_newlines=True)
+        self.assertEqual(process.returncode, 0, process.stderr)
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        self.assertTrue(os.path.exists(sp_file))
+        self.assertLess(result["total_time"], self.cold_start_budget)
+        for module in self.lazy_modules:
+            self.assertNotIn(module, result["modules"])
+        packages = [x[0] for x in result["import_times"]]
+        self.assertIn("pgates", packages)
+
+    def test_import_timer(self):
+        from globals import OPTS
+        from base import import_timer
+        module_dir = tempfile.mkdtemp(dir=OPTS.openram_temp)
+        with open(os.path.join(module_dir, "timed_import_module.py"), "w") as f:
+            f.write("import time\ntime.sleep(0.05)\n")
+        sys.path.insert(0, module_dir)
+        installed = import_timer.is_installed()
+        try:
+            import_timer.install()
+            import timed_import_module
+        finally:
+            sys.path.remove(module_dir)
+            if not installed:
+                import_timer.uninstall()
+        times = {x[0]: x[1] for x in import_timer.get_package_times()}
+        self.assertGreaterEqual(times["timed_import_module"], 0.05)
+        self.assertIn("timed_import_module", import_timer.format_report())
+
+
+ColdStartTest.run_tests(__name__)
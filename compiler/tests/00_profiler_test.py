@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Check the profiler records module creation and file writing and records nothing when disabled
+"""
+import json
+import os
+
+from testutils import OpenRamTest
+
+
+class ProfilerTest(OpenRamTest):
+
+    def tearDown(self):
+        from base import profiler
+        profiler.stop()
+        super().tearDown()
+
+    def test_disabled(self):
+        from base import profiler
+        from pgates.pinv import pinv
+        profiler.start()
+        profiler.stop()
+        pinv(size=2.5)
+        self.assertEqual(len(profiler.events), 0)
+
+    def test_trace(self):
+        from base import profiler
+        from globals import OPTS
+        from pgates.pinv import pinv
+        profiler.start()
+        # sizes not used by other tests since pinv instances are cached
+        cell = pinv(size=2.25)
+        sp_file = os.path.join(OPTS.openram_temp, cell.name + ".sp")
+        cell.sp_write(sp_file)
+        profiler.stop()
+
+        events = {(x["cat"], x["name"]): x for x in profiler.events}
+        create_event = events[("create", "pinv.__init__")]
+        self.assertEqual(create_event["args"]["module"], cell.name)
+        # super().__init__ calls are merged into the outermost __init__
+        self.assertEqual(len([x for x in profiler.events
+                              if x["name"] == "pinv.__init__" and
+                              x["args"]["module"] == cell.name]), 1)
+        layout_event = events[("layout", "pinv.create_layout")]
+        self.assertGreaterEqual(layout_event["ts"], create_event["ts"])
+        self.assertLessEqual(layout_event["ts"] + layout_event["dur"],
+                             create_event["ts"] + create_event["dur"])
+        self.assertIn(("spice", "pinv.sp_write"), events)
+        for event in profiler.events:
+            self.assertEqual(event["ph"], "X")
+            self.assertGreaterEqual(event["args"]["self_time_s"], 0)
+            self.assertGreater(event["args"]["peak_rss_mb"], 0)
+
+        trace_file = os.path.join(OPTS.openram_temp, "profile.json")
+        profiler.write_trace(trace_file)
+        with open(trace_file, "r") as f:
+            trace = json.load(f)
+        self.assertEqual(len(trace["traceEvents"]), len(profiler.events))
+        summary = {(x["category"], x["name"]): x for x in profiler.get_summary()}
+        self.assertEqual(summary[("create", "pinv.__init__")]["count"], 1)
+        self.assertIn("pinv.create_layout", profiler.format_summary())
+
+
+ProfilerTest.run_tests(__name__)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test the parallel regression runner using fake test files
+"""
+import os
+import tempfile
+
+from testutils import OpenRamTest
+
+fake_test = """import os
+import sys
+import time
+with open(os.path.join(os.environ["SCRATCH"], "marker"), "w") as f:
+    f.write("{name}")
+time.sleep({delay})
+print("Ran 2 tests in {delay}s")
+print("{summary}")
+sys.exit({returncode})
+"""
+
+
+class RegressTest(OpenRamTest):
+
+    def setUp(self):
+        super().setUp()
+        from globals import OPTS
+        self.test_dir = tempfile.mkdtemp(dir=OPTS.openram_temp)
+
+    def write_test(self, name, delay=0.0, returncode=0):
+        summary = "OK" if returncode == 0 else "FAILED (failures=1)"
+        with open(os.path.join(self.test_dir, name), "w") as f:
+            f.write(fake_test.format(name=name, delay=delay, summary=summary,
+                                     returncode=returncode))
+
+    def create_runner(self, **kwargs):
+        from regress import RegressionRunner, find_tests
+        test_files = find_tests(self.test_dir)
+        return RegressionRunner(test_files, work_dir=os.path.join(self.test_dir, "work"),
+                                **kwargs)
+
+    def test_isolation_and_report(self):
+        from regress import PASSED, FAILED, format_report
+        self.write_test("01_a_test.py")
+        self.write_test("02_b_test.py", returncode=1)
+        self.write_test("03_c_test.py")
+        self.write_test("helper.py")
+        runner = self.create_runner(num_workers=2)
+        results = runner.run()
+        self.assertEqual([x.name for x in results], ["01_a_test.py", "02_b_test.py",
+                                                      "03_c_test.py"])
+        self.assertEqual([x.status for x in results], [PASSED, FAILED, PASSED])
+        for result in results:
+            # each test has its own temp directory
+            temp_dir = os.path.join(runner.work_dir, os.path.splitext(result.name)[0])
+            with open(os.path.join(temp_dir, "marker"), "r") as f:
+                self.assertEqual(f.read(), result.name)
+            self.assertEqual(result.num_tests, 2)
+            self.assertGreater(result.peak_memory, 0)
+        self.assertEqual(results[1].summary, "FAILED (failures=1)")
+        report = format_report(results)
+        self.assertIn("1 failed, 2 passed", report)
+        self.assertIn(results[1].log_file, report)
+
+    def test_failfast_and_timeout(self):
+        from regress import PASSED, FAILED, TIMEOUT, CANCELLED
+        self.write_test("01_a_test.py", returncode=1)
+        self.write_test("02_b_test.py")
+        results = self.create_runner(num_workers=1, failfast=True).run()
+        self.assertEqual([x.status for x in results], [FAILED, CANCELLED])
+
+        self.write_test("01_a_test.py", delay=10)
+        results = self.create_runner(num_workers=2, timeout=0.5).run()
+        self.assertEqual([x.status for x in results], [TIMEOUT, PASSED])
+        self.assertLess(results[0].duration, 5)
+
+
+OpenRamTest.run_tests(__name__)
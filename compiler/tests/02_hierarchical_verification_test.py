@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test hierarchical verification verifies each unique module once using stub DRC/LVS tools
+"""
+from testutils import OpenRamTest
+
+
+class HierarchicalVerificationTest(OpenRamTest):
+
+    def setUp(self):
+        super().setUp()
+        from globals import OPTS
+        import verify
+        self.runs = []
+        self.saved_opts = (OPTS.drc_exe, OPTS.lvs_exe)
+        self.saved_funcs = {x: getattr(verify, x, None) for x in ["run_drc", "run_lvs"]}
+        OPTS.drc_exe = ("magic", "")
+        OPTS.lvs_exe = ("netgen", "")
+
+        def run_drc(cell_name, gds_name, exception_group="", flatten=None):
+            self.runs.append(("drc", cell_name, flatten))
+            return 0
+
+        def run_lvs(cell_name, gds_name, sp_name, final_verification=False, flatten=None):
+            self.runs.append(("lvs", cell_name, flatten))
+            return 0
+
+        verify.run_drc = run_drc
+        verify.run_lvs = run_lvs
+
+    def tearDown(self):
+        from globals import OPTS
+        import verify
+        OPTS.drc_exe, OPTS.lvs_exe = self.saved_opts
+        for name, func in self.saved_funcs.items():
+            if func is None:
+                delattr(verify, name)
+            else:
+                setattr(verify, name, func)
+        super().tearDown()
+
+    def test_unique_modules_verified_once(self):
+        from modules.buffer_stage import BufferStage
+        from verify.hierarchical import HierarchicalVerifier
+
+        buffer = BufferStage(buffer_stages=[1, 2, 4], height=3.9)
+        verifier = HierarchicalVerifier()
+        verifier.verify_hierarchy(buffer, final_verification=True)
+
+        unique_modules = list(verifier.get_descendants(buffer).values()) + [buffer]
+        drc_runs = [x for x in self.runs if x[0] == "drc"]
+        self.assertEqual(sorted(x[1] for x in drc_runs), sorted(x.name for x in unique_modules))
+        for op_name, cell_name, flatten in self.runs:
+            module = next(x for x in unique_modules if x.name == cell_name)
+            if module.insts:
+                self.assertFalse(flatten, "Parents of verified modules should not be flattened")
+            else:
+                self.assertIsNone(flatten, "Leaf modules use the default flatten option")
+
+        num_runs = len(self.runs)
+        verifier.verify_hierarchy(buffer, final_verification=True)
+        self.assertEqual(len(self.runs), num_runs, "Verified modules should be skipped")
+        summary = verifier.report()
+        self.assertEqual(summary["skipped"], len(unique_modules))
+        self.assertEqual(summary["runs"], len(unique_modules))
+        # hierarchical runs still check the sub-cells, only skipped runs save time
+        self.assertAlmostEqual(summary["time_saved"], summary["run_time"])
+
+    def test_verified_children_are_not_rewritten(self):
+        from unittest import mock
+        from modules.buffer_stage import BufferStage
+        from verify.hierarchical import HierarchicalVerifier
+
+        buffer = BufferStage(buffer_stages=[1, 2, 4], height=3.9)
+        verifier = HierarchicalVerifier()
+        for child in verifier.get_descendants(buffer).values():
+            verifier.verify(child)
+        with mock.patch.object(HierarchicalVerifier, "write_content",
+                               wraps=HierarchicalVerifier.write_content) as write_content:
+            verifier.verify(buffer)
+        self.assertEqual([x[0][0] for x in write_content.call_args_list], [buffer])
+        self.assertEqual([x[2] for x in self.runs if x[1] == buffer.name], [False, False])
+
+    def test_modified_module_is_reverified(self):
+        from modules.buffer_stage import BufferStage
+        from verify.hierarchical import HierarchicalVerifier
+
+        buffer = BufferStage(buffer_stages=[1, 2, 4], height=3.9)
+        verifier = HierarchicalVerifier()
+        verifier.verify_hierarchy(buffer)
+        modified = buffer.insts[0].mod
+        conn_index = next(i for i, conn in enumerate(modified.conns) if conn)
+
+        # only the modified module and its parents are re-verified
+        modified.conns[conn_index] = ["modified_net"] + modified.conns[conn_index][1:]
+        del self.runs[:]
+        verifier.verify_hierarchy(buffer)
+        self.assertEqual(sorted(set(x[1] for x in self.runs)), sorted([modified.name, buffer.name]))
+        self.assertEqual([x[2] for x in self.runs if x[1] == buffer.name], [False, False])
+
+        # sub-module changed since it was verified so parent is flattened
+        modified.conns = list(modified.conns)
+        modified.conns[conn_index] = ["modified_net_2"] + modified.conns[conn_index][1:]
+        del self.runs[:]
+        verifier.verify(buffer)
+        self.assertEqual(self.runs, [("drc", buffer.name, None), ("lvs", buffer.name, None)])
+
+    def test_unsupported_tool_is_flat(self):
+        from globals import OPTS
+        from pgates.pinv import pinv
+        from verify.hierarchical import HierarchicalVerifier
+
+        OPTS.drc_exe = ("calibre", "")
+        inverter = pinv(size=3)
+        verifier = HierarchicalVerifier()
+        verifier.verify_hierarchy(inverter, lvs=False)
+        self.assertTrue(all(x[2] is None for x in self.runs))
+
+
+HierarchicalVerificationTest.run_tests(__name__)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test streaming of klayout DRC reports
+"""
+import os
+import tempfile
+import tracemalloc
+
+from testutils import OpenRamTest
+
+item_template = """<item><tags/><category>'{category}'</category><cell>{cell}</cell><visited>false</visited>
+<multiplicity>1</multiplicity><values><value>polygon: ({index},0;{index},1;1,1)</value></values></item>
+"""
+
+
+class KlayoutReportTest(OpenRamTest):
+
+    def setUp(self):
+        super().setUp()
+        from globals import OPTS
+        self.work_dir = tempfile.mkdtemp(dir=OPTS.openram_temp)
+
+    def write_report(self, num_items):
+        categories = ["m1.1", "m1.2", "licon.1"]
+        cells = ["top", "sub"]
+        report_file = os.path.join(self.work_dir, "cell.drc.report")
+        with open(report_file, "w") as f:
+            f.write("<?xml version=\"1.0\" encoding=\"utf-8\"?>\n<report-database>\n<categories>\n")
+            for category in categories:
+                f.write(f"<category><name>{category}</name><description>{category} rule"
+                        f"</description><categories/></category>\n")
+            f.write("</categories>\n<cells><cell><name>top</name></cell></cells>\n<items>\n")
+            for i in range(num_items):
+                f.write(item_template.format(category=categories[i % 3], cell=cells[i % 2], index=i))
+            f.write("</items>\n</report-database>\n")
+        return report_file
+
+    def test_counts(self):
+        from verify.klayout import DrcReport
+        report = DrcReport(self.write_report(60), ignored=["licon.1"], max_examples=3)
+        self.assertEqual(report.num_errors, 40)
+        self.assertEqual(report.rules["m1.2"], "m1.2 rule")
+        self.assertEqual(report.counts, {("top", "m1.1"): 10, ("sub", "m1.1"): 10,
+                                         ("top", "m1.2"): 10, ("sub", "m1.2"): 10})
+        self.assertTrue(all(len(x) == 3 for x in report.examples.values()))
+        self.assertEqual(report.examples[("top", "m1.1")][1].values, ["polygon: (6,0;6,1;1,1)"])
+
+    def test_bounded_memory(self):
+        from verify.klayout import DrcReport
+        peaks = []
+        for num_items in [2000, 40000]:
+            report_file = self.write_report(num_items)
+            tracemalloc.start()
+            report = DrcReport(report_file)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self.assertEqual(report.num_errors, num_items)
+        self.assertLess(peaks[1], 2 * peaks[0],
+                        "Memory shouldn't grow with report size ({} vs {})".format(*peaks))
+
+
+KlayoutReportTest.run_tests(__name__)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test cached DRC/PEX results are reused for unchanged inputs, using a stub verifier which counts
+its invocations
+"""
+import os
+import stat
+import tempfile
+import time
+
+from testutils import OpenRamTest
+
+stub_verifier = """#!/usr/bin/env python3
+import sys
+count_file = "{count_file}"
+count = int(open(count_file).read()) if __import__("os").path.exists(count_file) else 0
+open(count_file, "w").write(str(count + 1))
+report_file = [x.split("=", 1)[1] for x in sys.argv[1:] if x.endswith(".report")][0]
+with open(report_file, "w") as f:
+    f.write("<report-database><categories></categories><items></items></report-database>")
+"""
+
+
+class VerificationCacheTest(OpenRamTest):
+
+    def setUp(self):
+        super().setUp()
+        from globals import OPTS
+        self.work_dir = tempfile.mkdtemp(dir=OPTS.openram_temp)
+        self.count_file = os.path.join(self.work_dir, "count.txt")
+
+        stub_file = os.path.join(self.work_dir, "stub_klayout")
+        with open(stub_file, "w") as f:
+            f.write(stub_verifier.format(count_file=self.count_file))
+        os.chmod(stub_file, os.stat(stub_file).st_mode | stat.S_IEXEC)
+
+        self.rule_deck = os.path.join(self.work_dir, "rules.drc")
+        self.write_file(self.rule_deck, "rules")
+        self.gds_file = os.path.join(self.work_dir, "cell.gds")
+        self.write_file(self.gds_file, "layout")
+
+        self.saved_env = os.environ.get("KLAYOUT_DRC_DECK")
+        os.environ["KLAYOUT_DRC_DECK"] = self.rule_deck
+        self.saved_opts = (OPTS.drc_exe, OPTS.verification_cache_dir)
+        OPTS.drc_exe = ("klayout", stub_file)
+        OPTS.verification_cache_dir = os.path.join(self.work_dir, "cache")
+
+    def tearDown(self):
+        from globals import OPTS
+        OPTS.drc_exe, OPTS.verification_cache_dir = self.saved_opts
+        if self.saved_env is None:
+            del os.environ["KLAYOUT_DRC_DECK"]
+        else:
+            os.environ["KLAYOUT_DRC_DECK"] = self.saved_env
+        super().tearDown()
+
+    @staticmethod
+    def write_file(file_name, contents):
+        with open(file_name, "w") as f:
+            f.write(contents)
+
+    def get_count(self):
+        if not os.path.exists(self.count_file):
+            return 0
+        with open(self.count_file, "r") as f:
+            return int(f.read())
+
+    def test_drc_cache(self):
+        from verify import klayout
+        from verify.result_cache import wrap_verification, list_entries, prune
+
+        run_drc = wrap_verification("drc", klayout.run_drc)
+        report_file = klayout.get_output_file("cell", self.gds_file, "drc")
+
+        self.assertEqual(run_drc("cell", self.gds_file), 0)
+        self.assertEqual(self.get_count(), 1)
+        os.remove(report_file)
+        self.assertEqual(run_drc("cell", self.gds_file), 0)
+        self.assertEqual(self.get_count(), 1, "Unchanged inputs should be served from cache")
+        self.assertTrue(os.path.exists(report_file), "Cached report should be restored")
+
+        # same contents with a new timestamp is still a hit
+        time.sleep(0.01)
+        self.write_file(self.gds_file, "layout")
+        run_drc("cell", self.gds_file)
+        self.assertEqual(self.get_count(), 1)
+
+        self.write_file(self.gds_file, "modified layout")
+        run_drc("cell", self.gds_file)
+        self.assertEqual(self.get_count(), 2, "Modified gds should re-run DRC")
+
+        self.write_file(self.rule_deck, "modified rules")
+        run_drc("cell", self.gds_file)
+        self.assertEqual(self.get_count(), 3, "Modified rule deck should re-run DRC")
+
+        run_drc("cell", self.gds_file, exception_group="latchup")
+        self.assertEqual(self.get_count(), 4, "Different options should re-run DRC")
+
+        entries = list_entries(operation="drc")
+        self.assertEqual(len(entries), 4)
+        self.assertEqual(len(prune(max_size=entries[0]["size"])), 3)
+        self.assertEqual(len(list_entries()), 1)
+        self.assertEqual(len(prune()), 1)
+        self.assertEqual(len(list_entries()), 0)
+
+    def test_gds_dates_ignored(self):
+        from verify.result_cache import hash_gds
+
+        def gds_stream(second, layer):
+            # HEADER, BGNLIB with dates, LAYER, ENDLIB
+            records = [b"\x00\x06\x00\x02\x00\x05",
+                       b"\x00\x1c\x01\x02" + b"\x00\x01" * 11 + second.to_bytes(2, "big"),
+                       b"\x00\x06\x0d\x02" + layer.to_bytes(2, "big"),
+                       b"\x00\x04\x04\x00"]
+            file_name = os.path.join(self.work_dir, "stream_{}_{}.gds".format(second, layer))
+            with open(file_name, "wb") as f:
+                f.write(b"".join(records))
+            return file_name
+
+        self.assertEqual(hash_gds(gds_stream(1, 1)), hash_gds(gds_stream(2, 1)))
+        self.assertNotEqual(hash_gds(gds_stream(1, 1)), hash_gds(gds_stream(1, 2)))
+
+    def test_pex_cache(self):
+        from verify.result_cache import wrap_verification
+
+        invocations = []
+        sp_file = os.path.join(self.work_dir, "cell.sp")
+        self.write_file(sp_file, ".SUBCKT cell a b\n.ENDS\n")
+        pex_file = os.path.join(self.work_dir, "cell_pex.sp")
+
+        def stub_pex(cell_name, gds_name, sp_name, output=None, run_drc_lvs=True):
+            invocations.append(cell_name)
+            self.write_file(output, "extracted {}".format(len(invocations)))
+            return 0
+
+        run_pex = wrap_verification("pex", stub_pex)
+        run_pex("cell", self.gds_file, sp_file, pex_file, run_drc_lvs=False)
+        os.remove(pex_file)
+        run_pex("cell", self.gds_file, sp_file, pex_file, run_drc_lvs=False)
+        self.assertEqual(len(invocations), 1)
+        with open(pex_file, "r") as f:
+            self.assertEqual(f.read(), "extracted 1")
+
+        self.write_file(sp_file, ".SUBCKT cell a b c\n.ENDS\n")
+        run_pex("cell", self.gds_file, sp_file, pex_file, run_drc_lvs=False)
+        self.assertEqual(len(invocations), 2, "Modified netlist should re-run PEX")
+
+
+VerificationCacheTest.run_tests(__name__)
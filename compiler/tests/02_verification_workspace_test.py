@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test concurrent verification of modules in isolated workspaces using a stub DRC tool
+"""
+import os
+import stat
+import tempfile
+import time
+
+from testutils import OpenRamTest
+
+stub_verifier = """#!/usr/bin/env python3
+import os
+import sys
+import time
+options = dict(x.split("=", 1) for x in sys.argv[1:] if "=" in x)
+report_file = [value for value in options.values() if value.endswith(".report")][0]
+with open(os.path.join("{log_dir}", options["topcell"]), "w") as f:
+    f.write(os.getcwd() + "\\n" + os.path.dirname(options["input"]))
+time.sleep({delay})
+with open(report_file, "w") as f:
+    f.write("<report-database><categories></categories><items></items></report-database>")
+"""
+
+
+class VerificationWorkspaceTest(OpenRamTest):
+    delay = 0.5
+
+    def setUp(self):
+        super().setUp()
+        from globals import OPTS
+        import verify
+        from verify import klayout
+        self.work_dir = tempfile.mkdtemp(dir=OPTS.openram_temp)
+        self.log_dir = os.path.join(self.work_dir, "log")
+        os.makedirs(self.log_dir)
+
+        stub_file = os.path.join(self.work_dir, "stub_klayout")
+        with open(stub_file, "w") as f:
+            f.write(stub_verifier.format(log_dir=self.log_dir, delay=self.delay))
+        os.chmod(stub_file, os.stat(stub_file).st_mode | stat.S_IEXEC)
+        rule_deck = os.path.join(self.work_dir, "rules.drc")
+        with open(rule_deck, "w") as f:
+            f.write("rules")
+
+        self.saved_env = os.environ.get("KLAYOUT_DRC_DECK")
+        os.environ["KLAYOUT_DRC_DECK"] = rule_deck
+        self.saved_exe = OPTS.drc_exe
+        OPTS.drc_exe = ("klayout", stub_file)
+        self.saved_run_drc = getattr(verify, "run_drc", None)
+        verify.run_drc = klayout.run_drc
+
+    def tearDown(self):
+        from globals import OPTS
+        import verify
+        OPTS.drc_exe = self.saved_exe
+        if self.saved_run_drc is None:
+            del verify.run_drc
+        else:
+            verify.run_drc = self.saved_run_drc
+        if self.saved_env is None:
+            del os.environ["KLAYOUT_DRC_DECK"]
+        else:
+            os.environ["KLAYOUT_DRC_DECK"] = self.saved_env
+        super().tearDown()
+
+    def test_concurrent_drc(self):
+        from pgates.pinv import pinv
+        from verify import verify_modules
+
+        modules = [pinv(size=size) for size in [1, 2, 3, 4]]
+        start_time = time.time()
+        results = verify_modules(modules, drc=True, lvs=False, num_workers=4)
+        duration = time.time() - start_time
+
+        self.assertEqual([x.module_name for x in results], [x.name for x in modules])
+        for result in results:
+            self.assertTrue(result.passed, str(result))
+            self.assertFalse(os.path.exists(result.work_dir), "Passing workspace should be removed")
+
+        run_dirs = set()
+        for module in modules:
+            with open(os.path.join(self.log_dir, module.name), "r") as f:
+                cwd, gds_dir = f.read().split("\n")
+            self.assertEqual(cwd, gds_dir, "Tool should run in the module's workspace")
+            run_dirs.add(cwd)
+        self.assertEqual(len(run_dirs), len(modules), "Each module should have its own workspace")
+        self.assertTrue(duration < 0.75 * len(modules) * self.delay,
+                        "Runs should be concurrent ({:.3g}s)".format(duration))
+
+    def test_workspace_isolation(self):
+        from globals import OPTS
+        from verify import verification_workspace, get_work_dir
+
+        with verification_workspace("outer") as outer_dir:
+            self.assertEqual(get_work_dir(), outer_dir)
+            with verification_workspace("inner") as inner_dir:
+                self.assertNotEqual(inner_dir, outer_dir)
+                self.assertEqual(get_work_dir(), inner_dir)
+            self.assertEqual(get_work_dir(), outer_dir)
+        self.assertEqual(get_work_dir(), OPTS.openram_temp)
+        self.assertFalse(os.path.exists(outer_dir))
+
+
+VerificationWorkspaceTest.run_tests(__name__)
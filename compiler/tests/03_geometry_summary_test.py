@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Check cached geometry summaries match walking the hierarchy and are invalidated by changes
+"""
+import copy
+
+from testutils import OpenRamTest
+
+
+class GeometrySummaryTest(OpenRamTest):
+
+    @staticmethod
+    def make_parent(child, name="geometry_summary_parent"):
+        from base.design import design
+        from base.vector import vector
+
+        class Parent(design):
+            def __init__(self):
+                if name in design.name_map:
+                    design.name_map.remove(name)
+                design.__init__(self, name)
+                self.add_pin_list(["A"])
+                for i, (mirror, rotate) in enumerate([("R0", 0), ("MX", 0), ("MY", 0),
+                                                      ("XY", 0), ("R0", 90), ("R0", 270)]):
+                    self.add_inst("inst{}".format(i), mod=child, mirror=mirror, rotate=rotate,
+                                  offset=vector(10 * i, 5))
+                    self.connect_inst([], check=False)
+                self.add_rect("metal1", offset=vector(0, 0), width=1, height=0.5)
+                self.add_layout_pin("A", "metal1", offset=vector(1, 1))
+                self.width, self.height = 70, 20
+
+        return Parent()
+
+    @staticmethod
+    def reference_shapes(mod, layer, recursive):
+        """Uncached get_layer_shapes by transforming each shape at every level"""
+        from base.vector import vector
+        shapes = mod.get_own_layer_shapes(layer)
+        if not recursive:
+            return shapes
+        for inst in mod.insts:
+            angle, mirr = inst.get_angle_mirror()
+            for rect in GeometrySummaryTest.reference_shapes(inst.mod, layer, recursive):
+                rect = copy.copy(rect)
+                ll, ur = inst.transform_coords([rect.ll(), rect.ur()], inst.offset, mirr, angle)
+                rect.boundary = [ll, ur]
+                rect.normalize()
+                rect.offset = rect.ll()
+                rect.width = rect.rx() - rect.lx()
+                rect.height = rect.uy() - rect.by()
+                rect.size = vector(rect.width, rect.height)
+                shapes.append(rect)
+        return shapes
+
+    @staticmethod
+    def reference_blockages(mod, layer_num, top_level):
+        blockages = [x for obj in mod.objs for x in obj.get_blockages(layer_num)]
+        for inst in mod.insts:
+            angle, mirr = inst.get_angle_mirror()
+            for blockage in GeometrySummaryTest.reference_blockages(inst.mod, layer_num, False):
+                blockages.append(inst.transform_coords(blockage, inst.offset, mirr, angle))
+        if not top_level:
+            blockages.extend(mod.get_pin_blockages(layer_num))
+        return blockages
+
+    @staticmethod
+    def to_tuples(rects):
+        return [(rect.layerNumber, rect.layerPurpose, rect.lx(), rect.by(), rect.rx(),
+                 rect.uy(), rect.width, rect.height) for rect in rects]
+
+    @staticmethod
+    def blockages_to_tuples(blockages):
+        return [(first[0], first[1], second[0], second[1]) for first, second in blockages]
+
+    def assert_matches_reference(self, mod):
+        from tech import layer as tech_layers
+        for layer in ["metal1", "metal2", "poly", "active"]:
+            for recursive in [False, True]:
+                self.assertEqual(self.to_tuples(mod.get_layer_shapes(layer, recursive=recursive)),
+                                 self.to_tuples(self.reference_shapes(mod, layer, recursive)))
+            self.assertEqual(
+                self.blockages_to_tuples(mod.get_blockages(tech_layers[layer], top_level=True)),
+                self.blockages_to_tuples(self.reference_blockages(mod, tech_layers[layer], True)))
+
+    def test_matches_hierarchy_walk(self):
+        from pgates.pinv import pinv
+        child = pinv(size=2)
+        parent = self.make_parent(child)
+        self.assert_matches_reference(parent)
+        # cached results are copies
+        first = parent.get_layer_shapes("metal1", recursive=True)
+        first[-1].boundary[0].x += 100
+        self.assert_matches_reference(parent)
+
+    def test_cache_reuse(self):
+        from pgates.pinv import pinv
+        child = pinv(size=2)
+        parent = self.make_parent(child)
+        summary = parent.insts[0].get_layer_shapes_summary("metal1", recursive=True)
+        cached = child.geometry_summaries[("shapes", "metal1", None, True)][1]
+        self.assertIs(summary.sources, cached.sources)
+        parent.get_layer_shapes("metal1", recursive=True)
+        self.assertIs(child.geometry_summaries[("shapes", "metal1", None, True)][1], cached)
+
+    def test_invalidation(self):
+        from pgates.pinv import pinv
+        from base.vector import vector
+        child = pinv(size=2)
+        parent = self.make_parent(child)
+        num_shapes = len(parent.get_layer_shapes("metal2", recursive=True))
+        num_blockages = len(parent.get_blockages("metal2"))
+
+        # new shape in child
+        child.add_rect("metal2", offset=vector(0, 0), width=1, height=1)
+        self.assertEqual(len(parent.get_layer_shapes("metal2", recursive=True)),
+                         num_shapes + len(parent.insts))
+        self.assertEqual(len(parent.get_blockages("metal2")), num_blockages + len(parent.insts))
+        self.assert_matches_reference(parent)
+
+        # instance moved outside the layout API
+        parent.insts[1].offset = vector(3, 4)
+        parent.invalidate_geometry()
+        self.assert_matches_reference(parent)
+        child.translate_all(vector(0.5, 0.5))
+        self.assert_matches_reference(parent)
+
+        # pins replaced in place
+        child.remove_layout_pin("A")
+        child.add_layout_pin("A", "metal1", offset=vector(0.1, 0.2))
+        self.assert_matches_reference(parent)
+
+        # geometry changed outside the layout API
+        child.objs[0].boundary = [vector(-5, -5), vector(-4, -4)]
+        child.invalidate_geometry()
+        self.assert_matches_reference(parent)
+
+    def test_clean_module_skips_hierarchy(self):
+        from unittest import mock
+        from pgates.pinv import pinv
+        from base.vector import vector
+        child = pinv(size=2)
+        parent = self.make_parent(child)
+        grandparent = self.make_parent(parent, name="geometry_summary_grandparent")
+        num_shapes = len(grandparent.get_layer_shapes("metal2", recursive=True))
+        # cached summaries are returned without visiting the sub-modules
+        with mock.patch.object(type(child), "get_geometry_token",
+                               side_effect=AssertionError("child visited")):
+            self.assertEqual(len(grandparent.get_layer_shapes("metal2", recursive=True)),
+                             num_shapes)
+        self.assertIn(id(grandparent), parent.geometry_parents)
+
+        # changes in the child reach all the modules above it
+        child.add_rect("metal2", offset=vector(0, 0), width=1, height=1)
+        self.assertEqual(len(grandparent.get_layer_shapes("metal2", recursive=True)),
+                         num_shapes + len(parent.insts) * len(grandparent.insts))
+        self.assert_matches_reference(grandparent)
+
+
+GeometrySummaryTest.run_tests(__name__)
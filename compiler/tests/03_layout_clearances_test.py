@@ -33,6 +33,21 @@ class LayoutClearancesTest(OpenRamTest):
         self.assertFalse(get_range_overlap((0, 1), (1.1, 1.3)))
         self.assertTrue(get_range_overlap((1, 0), (0.2, 0.3)))
 
+    def test_round_array_to_grid(self):
+        """Test vectorized rounding matches round_to_grid"""
+        import numpy as np
+        import tech
+        from base.utils import round_to_grid, round_array_to_grid
+        grid = tech.drc["grid"]
+        values = np.array([[0.0, 196.5 * grid, -196.5 * grid],
+                           [2.5 * grid, 1.23456, 1.23456],
+                           [-0.7 * grid, 1e3 + 0.49 * grid, 1e-9]])
+        rounded = round_array_to_grid(values)
+        self.assertEqual(rounded.shape, values.shape)
+        self.assertEqual(rounded.tolist(), [[round_to_grid(x) for x in row]
+                                            for row in values.tolist()])
+        self.assertEqual(round_array_to_grid([]).shape, (0,))
+
     def test_empty_layout(self):
         """Empty layout should return full width"""
         mod = self.make_design()
@@ -99,5 +114,57 @@ class LayoutClearancesTest(OpenRamTest):
         self.assertEqual(clearances[0], (0, edges_1[0]), "Left clearance")
         self.assertEqual(clearances[1], (edges_2[1], mod.width), "Right clearance")
 
+    @staticmethod
+    def reference_clearances(rects, direction, existing, region):
+        """Previous implementation subtracting one rect at a time"""
+        from base.layout_clearances import (get_extremities, get_range_overlap,
+                                            validate_clearances, HORIZONTAL, VERTICAL)
+        full_range = (min(map(min, existing)), max(map(max, existing)))
+        for rect in rects:
+            region_edges = get_extremities(rect, HORIZONTAL if direction == VERTICAL else VERTICAL)
+            if not get_range_overlap(region_edges, region):
+                continue
+            edges = get_extremities(rect, direction)
+            if not get_range_overlap(full_range, edges):
+                continue
+            new_clearances = []
+            for clearance in existing:
+                if get_range_overlap(clearance, edges):
+                    if clearance[0] <= edges[0]:
+                        new_clearances.extend([(clearance[0], edges[0]), (edges[1], clearance[1])])
+                    else:
+                        new_clearances.append((edges[1], clearance[1]))
+                else:
+                    new_clearances.append(clearance)
+            existing = validate_clearances(new_clearances)
+        return existing
+
+    def test_random_blockages(self):
+        """Compare to subtracting one rect at a time, including batched queries"""
+        import random
+        from base.design import METAL1, METAL2
+        from base.layout_clearances import find_clearances_batch, HORIZONTAL, VERTICAL
+        from base.vector import vector
+        random.seed(2)
+        mod = self.make_design([20.0, 20.0])
+        for layer in [METAL1, METAL2]:
+            for _ in range(200):
+                width = random.choice([0, 0.14, 0.5, 2])
+                mod.add_rect(layer, vector(random.uniform(-1, 20), random.uniform(-1, 20)),
+                             width=width, height=random.uniform(0.1, 3))
+        queries = []
+        for _ in range(50):
+            start = random.uniform(-1, 20)
+            region = (start, start + random.uniform(0, 5))
+            existing = random.choice([None, [(1, 9), (12, 18.5)], [(3, 3), (4, 15)]])
+            queries.append((random.choice([METAL1, METAL2]), region, existing))
+        for direction in [HORIZONTAL, VERTICAL]:
+            results = find_clearances_batch(mod, queries, direction)
+            for (layer, region, existing), actual in zip(queries, results):
+                rects = mod.get_layer_shapes(layer, recursive=True)
+                expected = self.reference_clearances(rects, direction,
+                                                     existing or [(0, 20.0)], region)
+                self.assertEqual(actual, expected)
+
 
 OpenRamTest.run_tests(__name__)
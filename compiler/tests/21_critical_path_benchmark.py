@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark derivation of read/write critical paths using dependency_graph.create_graph
+"""
+import argparse
+import sys
+import time
+
+from testutils import OpenRamTest
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--num_rows", default=256, type=int)
+parser.add_argument("--num_cols", default=256, type=int)
+
+first_arg = sys.argv[0]
+options, other_args = parser.parse_known_args()
+# restore args for further OpenRAM options processing
+sys.argv = [first_arg] + other_args
+
+
+class CriticalPathBenchmark(OpenRamTest):
+
+    def time_graph(self, desc, net, bank, **kwargs):
+        from characterizer.dependency_graph import create_graph
+        start_time = time.time()
+        paths = create_graph(net, bank, **kwargs)
+        duration = time.time() - start_time
+        print("{} ({}): {} paths in {:.3g}s".format(desc, net, len(paths), duration),
+              flush=True)
+        self.assertTrue(len(paths) > 0, "No path derived for {}".format(net))
+        return paths
+
+    def test_bank_critical_paths(self):
+        from bank_test_base import BankTestBase
+
+        bank_class, kwargs = BankTestBase.get_bank_class()
+        start_time = time.time()
+        bank = bank_class(name="bank1", word_size=options.num_cols, num_words=options.num_rows,
+                          words_per_row=1, **kwargs)
+        print("Bank {}x{} created in {:.3g}s".format(options.num_rows, options.num_cols,
+                                                    time.time() - start_time), flush=True)
+
+        last_row = options.num_rows - 1
+        last_col = options.num_cols - 1
+
+        self.time_graph("Wordline", "wl[{}]".format(last_row), bank)
+        self.time_graph("Precharge", "bl[{}]".format(last_col), bank,
+                        driver_inclusions=[bank.precharge_array.name])
+        self.time_graph("Write", "bl[{}]".format(last_col), bank,
+                        driver_inclusions=[bank.write_driver_array.name],
+                        driver_exclusions=[bank.bitcell_array.name])
+        if hasattr(bank, "tri_gate_array"):
+            self.time_graph("Read", "DATA[{}]".format(last_col), bank,
+                            driver_inclusions=[bank.tri_gate_array.name])
+
+
+CriticalPathBenchmark.run_tests(__name__)
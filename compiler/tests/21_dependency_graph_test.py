@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test the dependency graph connectivity lookups
+"""
+
+from testutils import OpenRamTest
+
+
+class DependencyGraphTest(OpenRamTest):
+
+    def create_inverter_chain(self, name, num_stages=2):
+        from base.design import design
+        from base.vector import vector
+        from pgates.pinv import pinv
+        inv = pinv(size=1)
+        module = design(name)
+        module.add_pin_list(["in", "out", "vdd", "gnd"])
+        nets = ["in"] + ["net{}".format(i) for i in range(num_stages - 1)] + ["out"]
+        for i in range(num_stages):
+            module.add_inst("inv{}".format(i), mod=inv)
+            module.connect_inst([nets[i], nets[i + 1], "vdd", "gnd"])
+        module.width = num_stages * inv.width
+        module.height = inv.height
+        for pin_name in ["in", "out"]:
+            module.add_layout_pin(pin_name, "metal1", offset=vector(0, 0))
+        return module
+
+    def test_connectivity_index(self):
+        from characterizer.dependency_graph import get_connectivity_index
+        module = self.create_inverter_chain("connectivity_index_chain")
+        index = get_connectivity_index(module)
+        self.assertIs(get_connectivity_index(module), index)
+        self.assertEqual(index.get_conn_index(["net0", "out", "vdd", "gnd"]), 1)
+        self.assertIs(index.get_instance("Xinv1"), module.insts[1])
+        self.assertEqual(list(index.get_net_connections("NET0")),
+                         [(0, "Z", "OUTPUT"), (1, "A", "INPUT")])
+
+        # appended instance
+        module.add_inst("inv2", mod=module.insts[0].mod)
+        module.connect_inst(["out", "out_bar", "vdd", "gnd"])
+        index = get_connectivity_index(module)
+        self.assertEqual(index.get_conn_index(["out", "out_bar", "vdd", "gnd"]), 2)
+
+        # replaced connection list of the same length
+        module.conns[1] = ["net0", "out_b", "vdd", "gnd"]
+        index = get_connectivity_index(module)
+        self.assertEqual(index.get_conn_index(["net0", "out_b", "vdd", "gnd"]), 1)
+        self.assertEqual([x[0] for x in index.get_net_connections("out")], [2])
+
+        # replaced conns with the same number of instances
+        module.conns = [["in", "x", "vdd", "gnd"], ["x", "y", "vdd", "gnd"],
+                        ["y", "z", "vdd", "gnd"]]
+        index = get_connectivity_index(module)
+        self.assertEqual(index.get_conn_index(["x", "y", "vdd", "gnd"]), 1)
+        self.assertEqual(list(index.get_net_connections("net0")), [])
+
+    def test_memoized_sibling_paths(self):
+        from base.design import design
+        from pgates.pnand2 import pnand2
+        from characterizer.dependency_graph import (create_graph, construct_paths,
+                                                    get_all_drivers_for_pin)
+        chain = self.create_inverter_chain("memoized_paths_chain")
+        nand = pnand2(size=1)
+        module = design("memoized_paths_top")
+        module.add_pin_list(["in", "out", "vdd", "gnd"])
+        # chain_1 and chain_2 share chain_0's sub-paths, chain_2 reuses chain_1's sub-paths
+        for name, conn in [("chain_0", ["in", "a", "vdd", "gnd"]),
+                           ("chain_1", ["a", "b", "vdd", "gnd"]),
+                           ("chain_2", ["a", "c", "vdd", "gnd"])]:
+            module.add_inst(name, mod=chain)
+            module.connect_inst(conn)
+        module.add_inst("nand", mod=nand)
+        module.connect_inst(["b", "c", "out", "vdd", "gnd"])
+
+        driver_hierarchies = get_all_drivers_for_pin("out", module)
+        subpath_cache = {}
+        memoized_paths = []
+        derived_paths = []
+        for driver_hierarchy in driver_hierarchies:
+            memoized_paths.extend(construct_paths(driver_hierarchy, driver_exclusions=[],
+                                                  subpath_cache=subpath_cache))
+            derived_paths.extend(construct_paths(driver_hierarchy, driver_exclusions=[]))
+        self.assertTrue(subpath_cache)
+        self.assertEqual(len(derived_paths), 2)
+        self.assertEqual([str(x) for x in memoized_paths], [str(x) for x in derived_paths])
+        self.assertEqual([str(x) for x in create_graph("out", module)],
+                         [str(x) for x in derived_paths])
+        for memoized_path, derived_path in zip(memoized_paths, derived_paths):
+            self.assertEqual([(x.module.name, x.parent_in_net, x.parent_out_net,
+                               [y[0].name for y in x.all_parent_modules])
+                              for x in memoized_path.nodes],
+                             [(x.module.name, x.parent_in_net, x.parent_out_net,
+                               [y[0].name for y in x.all_parent_modules])
+                              for x in derived_path.nodes])
+
+        # memoized sub-paths still count towards the limits
+        for max_depth, max_adjacent_modules in [(1, 100), (20, 1)]:
+            with self.assertRaises(ValueError):
+                construct_paths(driver_hierarchies[0], max_depth=max_depth,
+                                max_adjacent_modules=max_adjacent_modules,
+                                driver_exclusions=[], subpath_cache={})
+
+    def test_delay_matrix(self):
+        from globals import OPTS
+        from base.design import design
+        from base.vector import vector
+        from pgates.pinv import pinv
+        from characterizer.dependency_graph import create_graph
+        inv = pinv(size=1)
+        buffer = pinv(size=2)
+        module = design("delay_matrix_fanout")
+        module.add_pin_list(["in", "out", "vdd", "gnd"])
+        module.add_inst("buffer", mod=buffer)
+        module.connect_inst(["in", "in_bar", "vdd", "gnd"])
+        module.add_inst("driver", mod=inv)
+        module.connect_inst(["in_bar", "out", "vdd", "gnd"])
+        # distributed load on the output net
+        load = self.create_inverter_chain("delay_matrix_load", num_stages=1)
+        for i in range(OPTS.distributed_load_threshold):
+            module.add_inst("load{}".format(i), mod=load)
+            module.connect_inst(["out", "x{}".format(i), "vdd", "gnd"])
+        module.add_layout_pin("out", "metal1", offset=vector(0, 0))
+
+        path = create_graph("out", module)[0]
+        path.traverse_loads(estimate_wire_lengths=False, top_level_module=module)
+        self.assertEqual(len(path.nodes), 2)
+        node_params = path.extract_delay_params()[0]
+        self.assertEqual([x.is_distributed for x in node_params], [False, True])
+
+        slews = [5e-12, 20e-12, 80e-12]
+        corners = [("TT", 1.8, 25), ("SS", 1.6, 100)]
+        delays, slews_out = path.evaluate_delay_matrix(slews, corners)
+        self.assertEqual(delays.shape, (len(corners), len(slews), len(path.nodes)))
+        for corner_index, corner in enumerate(corners):
+            for slew_index, slew in enumerate(slews):
+                slew_in = slew
+                for node_index, node in enumerate(path.nodes):
+                    next_node = path.nodes[node_index + 1] if node_index == 0 else None
+                    delay = node.evaluate_delay(next_node, slew_in, corner=corner)
+                    slew_in = delay.slew
+                    self.assertAlmostEqual(delays[corner_index, slew_index, node_index] /
+                                           delay.delay, 1.0)
+                    self.assertAlmostEqual(slews_out[corner_index, slew_index, node_index] /
+                                           delay.slew, 1.0)
+        # default corner matches evaluate_delays
+        delays, slews_out = path.evaluate_delay_matrix(slews)
+        for slew_index, slew in enumerate(slews):
+            path.evaluate_delays(slew)
+            for node_index, node in enumerate(path.nodes):
+                self.assertAlmostEqual(delays[0, slew_index, node_index] / node.delay.delay, 1.0)
+                self.assertAlmostEqual(slews_out[0, slew_index, node_index] / node.delay.slew,
+                                       1.0)
+
+
+DependencyGraphTest.run_tests(__name__)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test simulator-native parameter sweeps in stimulus files and splitting of sweep measurements
+"""
+import io
+import os
+import tempfile
+
+from testutils import OpenRamTest
+
+
+class ParameterSweepTest(OpenRamTest):
+    loads = [1.5, 6.0, 48.0]
+
+    def setUp(self):
+        super().setUp()
+        from globals import OPTS
+        self.saved_spice_name = OPTS.spice_name
+        self.sim_dir = tempfile.mkdtemp(dir=OPTS.openram_temp)
+
+    def tearDown(self):
+        from globals import OPTS
+        OPTS.spice_name = self.saved_spice_name
+        super().tearDown()
+
+    def write_control(self, spice_name):
+        from globals import OPTS
+        from characterizer.stimuli import stimuli, ParameterSweep
+        OPTS.spice_name = spice_name
+        corner = (OPTS.process_corners[0], OPTS.supply_voltages[0], OPTS.temperatures[0])
+        sweep = ParameterSweep(["load"], [[x] for x in self.loads])
+        stim_file = io.StringIO()
+        stim = stimuli(stim_file, corner)
+        stim.write_sweep_parameters(sweep)
+        stim_file.write("CD0 d[0] 0 {}\n".format(stim.param_expression("load*1e-15")))
+        stim.write_control(10, sweep=sweep)
+        return stim_file.getvalue()
+
+    def test_hspice_alter(self):
+        contents = self.write_control("hspice")
+        self.assertIn(".PARAM load=1.5\n", contents)
+        self.assertIn("CD0 d[0] 0 'load*1e-15'", contents)
+        self.assertEqual(contents.count(".ALTER"), len(self.loads) - 1)
+        self.assertEqual(contents.count(".TRAN"), 1)
+        self.assertTrue(contents.index(".ALTER") > contents.index(".TRAN"))
+        self.assertTrue(contents.rindex(".PARAM load=48.0") < contents.index(".end\n"))
+
+    def test_ngspice_control(self):
+        contents = self.write_control("ngspice")
+        self.assertIn("CD0 d[0] 0 {load*1e-15}", contents)
+        control = contents[contents.index(".control"): contents.index(".endc")]
+        self.assertEqual(control.count("run\n"), len(self.loads))
+        self.assertEqual(control.count("reset\n"), len(self.loads) - 1)
+        self.assertIn("alterparam load=6.0\n", control)
+        self.assertIn("alterparam load=48.0\n", control)
+
+    def test_spectre_sweep(self):
+        contents = self.write_control("spectre")
+        self.assertIn("param_sweep_values paramset {\nload\n1.5\n6.0\n48.0\n}\n", contents)
+        sweep_start = contents.index("param_sweep sweep paramset=param_sweep_values {\n")
+        self.assertTrue(contents.index("tran tran") > sweep_start)
+
+    def test_split_measurements(self):
+        from globals import OPTS
+        from characterizer import charutils as ch
+
+        def write_measurement(file_name, contents):
+            with open(os.path.join(self.sim_dir, file_name), "w") as f:
+                f.write(contents)
+
+        OPTS.spice_name = "hspice"
+        for i, load in enumerate(self.loads):
+            write_measurement("timing.mt{}".format(i), "delay_hl_0 = {}e-10 \n".format(load))
+        self.assertEqual(ch.parse_sweep_output("delay_hl.*", len(self.loads), sim_dir=self.sim_dir),
+                         [x * 1e-10 for x in self.loads])
+
+        OPTS.spice_name = "ngspice"
+        contents = "Circuit: sram\n"
+        for i, load in enumerate(self.loads):
+            contents += "{} = {}\n".format(ch.SWEEP_MARKER, i)
+            contents += "delay_hl_0 = {}e-10 \n".format(load)
+            contents += "slew_hl_0 = {}e-10 \n".format(2 * load)
+        write_measurement(ch.get_measurement_file(), contents)
+        self.assertEqual(ch.parse_sweep_output("delay_hl.*", len(self.loads), sim_dir=self.sim_dir),
+                         [x * 1e-10 for x in self.loads])
+        self.assertEqual(ch.parse_sweep_output("slew_hl.*", len(self.loads), sim_dir=self.sim_dir),
+                         [2 * x * 1e-10 for x in self.loads])
+
+        # without markers, points are split at repeats of the first measurement
+        OPTS.spice_name = "spectre"
+        contents = "".join("delay_hl_0 = {}e-10 \ndelay_lh_0 = 1e-10 \n".format(x) for x in self.loads)
+        write_measurement(ch.get_measurement_file(), contents)
+        self.assertEqual(ch.parse_sweep_output("delay_hl.*", len(self.loads), sim_dir=self.sim_dir),
+                         [x * 1e-10 for x in self.loads])
+
+
+ParameterSweepTest.run_tests(__name__)
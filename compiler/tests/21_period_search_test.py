@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test secant search used for analytical-seeded min period search
+"""
+from testutils import OpenRamTest
+
+
+class PeriodSearchTest(OpenRamTest):
+    min_period = 1.3
+
+    def evaluate(self, period):
+        self.num_evaluations += 1
+        if period < 0.2 * self.min_period:
+            return False, None
+        margin = self.min_period / period - 1
+        return margin <= 0, margin
+
+    def setUp(self):
+        super().setUp()
+        self.num_evaluations = 0
+
+    def test_secant_search(self):
+        from characterizer import charutils as ch
+        period = ch.secant_search(self.evaluate, 0.0, 8.0, upper_margin=self.min_period / 8 - 1,
+                                  error_tolerance=0.05)
+        self.assertTrue(ch.relative_compare(period, self.min_period, error_tolerance=0.05))
+        self.assertTrue(period >= self.min_period, "Result must be feasible")
+
+    def test_seeded_bounds(self):
+        """Tight bounds around the estimate need fewer evaluations than bisection from 0"""
+        from characterizer import charutils as ch
+        lower, upper = 0.75 * self.min_period, 1.25 * self.min_period
+        # upper bound is the feasible period so its margin is already known
+        period = ch.secant_search(self.evaluate, lower, upper,
+                                  lower_margin=self.evaluate(lower)[1],
+                                  upper_margin=self.min_period / upper - 1, error_tolerance=0.05)
+        seeded_evaluations = self.num_evaluations
+        self.assertTrue(ch.relative_compare(period, self.min_period, error_tolerance=0.05))
+
+        self.num_evaluations = 0
+        upper, lower = 8.0, 0.0
+        while not ch.relative_compare(upper, lower, error_tolerance=0.05):
+            candidate = 0.5 * (upper + lower)
+            if self.evaluate(candidate)[0]:
+                upper = candidate
+            else:
+                lower = candidate
+        self.assertTrue(seeded_evaluations <= 0.5 * self.num_evaluations)
+
+    def test_multi_point_search(self):
+        """Evaluating N points per round shrinks the bracket by N+1"""
+        from characterizer import charutils as ch
+        rounds = []
+
+        def evaluate(periods):
+            rounds.append(periods)
+            return [self.evaluate(x) for x in periods]
+
+        bisection, _ = ch.multi_point_search(evaluate, 8.0, 0.0, num_points=1, error_tolerance=0.05)
+        bisection_rounds = len(rounds)
+        self.assertTrue(all(len(x) == 1 for x in rounds))
+        self.assertTrue(ch.relative_compare(bisection, self.min_period, error_tolerance=0.05))
+        self.assertTrue(bisection >= self.min_period, "Result must be feasible")
+
+        rounds.clear()
+        period, margin = ch.multi_point_search(evaluate, 8.0, 0.0, num_points=4, error_tolerance=0.05)
+        self.assertTrue(ch.relative_compare(period, self.min_period, error_tolerance=0.05))
+        self.assertTrue(period >= self.min_period, "Result must be feasible")
+        self.assertEqual(margin, self.evaluate(period)[1])
+        self.assertTrue(all(len(x) == 4 for x in rounds))
+        self.assertTrue(len(rounds) <= 0.5 * bisection_rounds)
+
+    def test_multi_point_search_direction(self):
+        """Feasible bound can be larger or smaller than the infeasible bound"""
+        from characterizer import charutils as ch
+        boundary = 2.3
+
+        def evaluate(values):
+            return [(x <= boundary, x) for x in values]
+
+        for num_points in [1, 3]:
+            value, result = ch.multi_point_search(evaluate, 1.0, 3.0, num_points=num_points)
+            self.assertTrue(value <= boundary)
+            self.assertTrue(ch.relative_compare(value, boundary, error_tolerance=0.001))
+            self.assertEqual(value, result)
+
+    def create_characterizer(self, analytical_period, feasible_period=8.0):
+        from characterizer.simulation.spice_characterizer import SpiceCharacterizer
+        test = self
+
+        class StubCharacterizer(SpiceCharacterizer):
+            def __init__(self):
+                self.period = feasible_period
+                self.analytical_period = analytical_period
+                self.periods = []
+
+            def evaluate_period(self, feasible_delay_lh, feasible_delay_hl, error_tolerance=0.05):
+                self.periods.append(self.period)
+                return test.evaluate(self.period)
+
+        return StubCharacterizer()
+
+    def test_find_min_period_analytical(self):
+        from globals import OPTS
+        from characterizer import charutils as ch
+        feasible_delay = 0.5
+        margin = OPTS.analytical_period_margin
+        # seeded bound is feasible, infeasible, above the feasible period or unavailable
+        for analytical_period, lower, upper in [(2.0, 0.0, 2.0 * (1 - margin)),
+                                                (1.5, 1.5 * (1 - margin), 8.0),
+                                                (20.0, 0.0, 8.0), (None, 0.0, 8.0)]:
+            characterizer = self.create_characterizer(analytical_period)
+            period = characterizer.find_min_period_analytical(feasible_delay, feasible_delay)
+            self.assertTrue(ch.relative_compare(period, self.min_period, error_tolerance=0.05))
+            self.assertTrue(period >= self.min_period, "Result must be feasible")
+            periods = characterizer.periods
+            if analytical_period is not None and analytical_period * (1 - margin) < 8.0:
+                self.assertEqual(periods[0], analytical_period * (1 - margin))
+                periods = periods[1:]
+            else:
+                self.assertEqual(periods[0], 4.0, "Bisection from zero")
+            # search stays within the seeded bracket
+            self.assertTrue(all(lower < x < upper for x in periods))
+
+    def test_analytical_period_errors(self):
+        from types import SimpleNamespace
+        from characterizer.simulation.spice_characterizer import SpiceCharacterizer
+        from base.hierarchy_spice import delay_data
+
+        characterizer = object.__new__(SpiceCharacterizer)
+        characterizer.slew, characterizer.load = 0.01, 1.0
+
+        characterizer.sram = SimpleNamespace()
+        self.assertIsNone(characterizer.estimate_analytical_period())
+
+        def not_implemented(slew, load):
+            raise NotImplementedError("no model")
+        characterizer.sram = SimpleNamespace(analytical_delay=not_implemented)
+        self.assertIsNone(characterizer.estimate_analytical_period())
+
+        characterizer.sram = SimpleNamespace(analytical_delay=lambda slew, load: delay_data(400, 100))
+        self.assertAlmostEqual(characterizer.estimate_analytical_period(), 1.0)
+
+        # errors in the model aren't hidden
+        def broken(slew, load):
+            return slew.missing_attribute
+        characterizer.sram = SimpleNamespace(analytical_delay=broken)
+        with self.assertRaises(AttributeError):
+            characterizer.estimate_analytical_period()
+
+
+OpenRamTest.run_tests(__name__)
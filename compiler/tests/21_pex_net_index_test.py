@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test lookup of extracted net names from pex net name index
+"""
+import os
+import tempfile
+
+from testutils import OpenRamTest
+
+pex_netlist = """* extracted sram
+.subckt sram clk decoder_clk N_XBANK0_BL[0]_XMM1_d
+XMM1 N_Xbank0_bl[0]_XMM1_d N_Xbank0_wl[3]_MM2_g vdd vdd nfet w=1 l=0.15
+N_Xbank0_sense_MM1_d dummy
+XMM2 N_Xbank0_br[0]_MM1_s N_Xbank0_wl[3]_XMM4_g gnd gnd nfet
+R1 N_decoder_clk_XMM5_d N_decoder_clk_MM9_g 0.1
+C1 Xbank0_int_node 0 1f
+C2 N_Xbank0_sense_MM1_d 0 1f
+.ends
+"""
+
+
+class PexNetIndexTest(OpenRamTest):
+
+    def setUp(self):
+        super().setUp()
+        from globals import OPTS
+        self.pex_file = os.path.join(tempfile.mkdtemp(dir=OPTS.openram_temp), "pex.sp")
+        with open(self.pex_file, "w") as f:
+            f.write(pex_netlist)
+
+    def test_extract_pattern(self):
+        from characterizer.net_probes.sram_probe import SramProbe
+
+        def extract(label):
+            return SramProbe.extract_pex_pattern(label, self.pex_file)[0]
+
+        # first match in file, case insensitive
+        self.assertEqual(extract("Xbank0.bl[0]"), "N_XBANK0_BL[0]_XMM1_d")
+        self.assertEqual(extract("XBANK0.wl[3]"), "N_Xbank0_wl[3]_MM2_g")
+        self.assertEqual(extract("N_Xbank0_br[0]"), "N_Xbank0_br[0]_MM1_s")
+        self.assertEqual(extract("decoder_clk"), "N_decoder_clk_XMM5_d")
+        # net names must be preceded by whitespace
+        self.assertEqual(extract("Xbank0.sense"), "N_Xbank0_sense_MM1_d")
+        # fixed string fallback
+        self.assertEqual(extract("INT_node"), "int_node")
+        self.assertEqual(extract("clk"), "clk")
+        self.assertIsNone(extract("missing"))
+
+    def test_index_persistence(self):
+        from characterizer.net_probes.pex_net_index import PexNetIndex
+
+        index = PexNetIndex.load(self.pex_file)
+        index_file = PexNetIndex.get_index_file(self.pex_file)
+        self.assertTrue(os.path.exists(index_file))
+        self.assertIsNotNone(PexNetIndex.load_saved(self.pex_file))
+        self.assertEqual(PexNetIndex.load_saved(self.pex_file).tokens, index.tokens)
+
+        with open(self.pex_file, "a") as f:
+            f.write("C3 N_Xbank0_new_MM3_d 0 1f\n")
+        self.assertIsNone(PexNetIndex.load_saved(self.pex_file),
+                          "Index should be invalidated when the pex file changes")
+        updated = PexNetIndex.load(self.pex_file)
+        self.assertEqual(updated.search(r"N_Xbank0_new_[MX]\S+_[gsd]", prefix="N_Xbank0_new_"),
+                         "N_Xbank0_new_MM3_d")
+
+
+PexNetIndexTest.run_tests(__name__)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark generation of pwl stimulus for long simulations
+"""
+import argparse
+import io
+import sys
+import time
+from random import randint, seed
+from types import SimpleNamespace
+
+from testutils import OpenRamTest
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--num_ops", default=10000, type=int)
+parser.add_argument("--word_size", default=64, type=int)
+parser.add_argument("--addr_size", default=10, type=int)
+
+first_arg = sys.argv[0]
+options, other_args = parser.parse_known_args()
+# restore args for further OpenRAM options processing
+sys.argv = [first_arg] + other_args
+
+
+class PwlStimulusBenchmark(OpenRamTest):
+
+    def create_generator(self):
+        from globals import OPTS
+        from characterizer.simulation.pulse_gen_mixin import PulseGenMixin
+
+        OPTS.sense_trigger_delay = getattr(OPTS, "sense_trigger_delay", 0.1)
+        OPTS.sense_trigger_setup = getattr(OPTS, "sense_trigger_setup", 0.05)
+        OPTS.precharge_trigger_delay = getattr(OPTS, "precharge_trigger_delay", 0.1)
+
+        class PulseGenerator(PulseGenMixin):
+            def __init__(self):
+                self.sram = SimpleNamespace(pins=["clk", "sense_trig", "precharge_trig"],
+                                            bank=SimpleNamespace(has_mask_in=True))
+                self.word_size = options.word_size
+                self.addr_size = options.addr_size
+                self.command_comments = []
+                self.read_period = self.write_period = self.period = 2.0
+                self.read_duty_cycle = self.write_duty_cycle = self.duty_cycle = 0.5
+                self.slew = 0.05
+                self.setup_time = 0.15
+                self.vdd_voltage = 1.8
+                self.define_signals()
+                self.initialize_output()
+
+        return PulseGenerator()
+
+    def test_generate_stimulus(self):
+        seed(0)
+        word_size = options.word_size
+        ops = []
+        for i in range(options.num_ops):
+            address = [randint(0, 1) for _ in range(options.addr_size)]
+            data = [randint(0, 1) for _ in range(word_size)]
+            mask = [randint(0, 1) for _ in range(word_size)]
+            ops.append((i % 2 == 1, address, data, mask))
+
+        start_time = time.time()
+        generator = self.create_generator()
+        for is_read, address, data, mask in ops:
+            generator.address = address
+            generator.chip_enable = 1
+            generator.read = int(is_read)
+            generator.acc_en = int(is_read)
+            generator.acc_en_inv = int(not is_read)
+            if not is_read:
+                generator.data = data
+                generator.mask = mask
+            generator.update_output()
+        generation_time = time.time() - start_time
+
+        generator.sf = io.StringIO()
+        generator.finalize_output()
+        total_time = time.time() - start_time
+        stimulus = generator.sf.getvalue()
+
+        print("{} ops: generation {:.3g}s, total {:.3g}s, {:.3g} MB".format(
+            options.num_ops, generation_time, total_time, len(stimulus) / 1e6), flush=True)
+        num_sources = len(generator.pwl_indices)
+        self.assertEqual(stimulus.count(" PWL ( "), num_sources)
+
+
+PwlStimulusBenchmark.run_tests(__name__)
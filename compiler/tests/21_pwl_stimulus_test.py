@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Check the buffered pwl stimulus matches the string based pwl generation
+"""
+import io
+from random import randint, seed
+from types import SimpleNamespace
+
+from testutils import OpenRamTest
+
+
+class PwlStimulusTest(OpenRamTest):
+
+    @staticmethod
+    def create_generator(reference):
+        from globals import OPTS
+        from characterizer.simulation.pulse_gen_mixin import PulseGenMixin
+
+        OPTS.sense_trigger_delay = getattr(OPTS, "sense_trigger_delay", 0.1)
+        OPTS.sense_trigger_setup = getattr(OPTS, "sense_trigger_setup", 0.05)
+        OPTS.precharge_trigger_delay = getattr(OPTS, "precharge_trigger_delay", 0.1)
+
+        class PulseGenerator(PulseGenMixin):
+            def __init__(self):
+                self.sram = SimpleNamespace(pins=["clk", "sense_trig", "precharge_trig"],
+                                            bank=SimpleNamespace(has_mask_in=True))
+                self.word_size = 8
+                self.addr_size = 4
+                self.command_comments = ["* first command\n"]
+                self.read_period = self.write_period = self.period = 2.0
+                self.read_duty_cycle = self.write_duty_cycle = self.duty_cycle = 0.5
+                self.slew = 0.05
+                self.setup_time = 0.15
+                self.vdd_voltage = 1.8
+                self.v_data = {}
+                self.v_comments = {}
+                self.define_signals()
+                self.initialize_output()
+
+        class ReferenceGenerator(PulseGenerator):
+            """String based pwl generation used before the breakpoints were buffered"""
+
+            def initialize_output(self):
+                for key in self.control_sigs + list(self.two_step_pulses.keys()) + self.bus_sigs:
+                    self.v_data[key] = "V{0} {0} gnd PWL ( ".format(key)
+                    self.v_comments[key] = "* (time, data): [ "
+
+                self.current_time = self.setup_time + 0.5 * self.slew
+                self.update_output(increment_time=False)
+                self.current_time += 2 * self.slew
+                self.current_time += abs(self.read_period * self.read_duty_cycle -
+                                         self.write_period * self.write_duty_cycle)
+
+            def finalize_output(self):
+                self.sf.write("\n* Command comments\n")
+                for comment in self.command_comments:
+                    self.sf.write(comment)
+                self.sf.write("\n* Generation of control signals\n")
+                keys = sorted(self.control_sigs + list(self.two_step_pulses.keys()) +
+                              self.bus_sigs)
+                for key in keys:
+                    self.sf.write(self.v_comments[key][:-1] + " ] \n")
+                    self.sf.write(self.v_data[key] + " )\n")
+
+            def write_pwl(self, key, prev_val, curr_val):
+                if prev_val == curr_val and self.current_time > 1.5 * self.period:
+                    return
+
+                setup_time = self.get_setup_time(key, prev_val, curr_val)
+                t2 = max(self.slew, self.current_time + 0.5 * self.slew - setup_time)
+                t1 = max(0.0, self.current_time - 0.5 * self.slew - setup_time)
+                self.v_data[key] += " {0:8.8g}n {1}v {2:8.8g}n {3}v ". \
+                    format(t1, self.vdd_voltage * prev_val, t2, self.vdd_voltage * curr_val)
+                self.v_comments[key] += " ({0}, {1}) ".format(
+                    int(self.current_time / self.period), curr_val)
+
+            def update_address(self):
+                for i in range(self.addr_size):
+                    self.write_pwl("A[{}]".format(i), self.prev_address[i], self.address[i])
+                self.prev_address = self.address
+
+            def update_data(self):
+                for i in range(self.word_size):
+                    self.write_pwl("data[{}]".format(i), self.prev_data[i], self.data[i])
+                self.prev_data = self.data
+
+            def update_mask(self):
+                for i in range(self.word_size):
+                    self.write_pwl("mask[{}]".format(i), self.prev_mask[i], self.mask[i])
+                self.prev_mask = self.mask
+
+        if reference:
+            return ReferenceGenerator()
+        return PulseGenerator()
+
+    def generate_stimulus(self, ops, reference):
+        generator = self.create_generator(reference)
+        for is_read, chip_enable, address, data, mask in ops:
+            generator.address = address
+            generator.chip_enable = chip_enable
+            generator.read = int(is_read)
+            generator.acc_en = int(is_read)
+            generator.acc_en_inv = int(not is_read)
+            if not is_read:
+                generator.data = data
+                generator.mask = mask
+            generator.update_output()
+        generator.sf = io.StringIO()
+        generator.finalize_output()
+        return generator.sf.getvalue()
+
+    def test_matches_string_pwl(self):
+        seed(0)
+        ops = []
+        for i in range(300):
+            # few bits per bus change between operations
+            address = [randint(0, 3) // 3 for _ in range(4)]
+            data = [randint(0, 1) for _ in range(8)]
+            mask = [randint(0, 4) > 0 for _ in range(8)]
+            ops.append((randint(0, 1) == 1, randint(0, 5) > 0, address, data, mask))
+
+        stimulus = self.generate_stimulus(ops, reference=False)
+        self.assertEqual(stimulus, self.generate_stimulus(ops, reference=True))
+        # csb comments print the bool values like the string based generation
+        self.assertIn("True", stimulus)
+
+
+PwlStimulusTest.run_tests(__name__)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test simulation runner timeouts and result caching using a fake simulator
+"""
+import os
+import stat
+import tempfile
+import time
+
+from testutils import OpenRamTest
+
+fake_simulator = """#!/bin/sh
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -i) stim="$2"; shift;;
+        -o) out="$2"; shift;;
+    esac
+    shift
+done
+echo "$stim" >> {log_file}
+echo "simulating $stim"
+sleep {delay}
+printf "delay_lh = 1.5e-10 \\n" > "$out.mt0"
+"""
+
+
+class SimulationRunnerTest(OpenRamTest):
+
+    def setUp(self):
+        super().setUp()
+        from globals import OPTS
+        self.work_dir = tempfile.mkdtemp(dir=OPTS.openram_temp)
+        self.log_file = os.path.join(self.work_dir, "sim.log")
+        self.simulator = os.path.join(self.work_dir, "fake_hspice")
+        self.write_simulator(0)
+        self.netlist = os.path.join(self.work_dir, "sram.sp")
+        self.write_netlist("R1 a b 1\n")
+
+        self.saved_opts = {key: getattr(OPTS, key) for key in
+                           ["spice_name", "spice_exe", "openram_temp", "cache_simulations",
+                            "simulation_cache_dir", "simulation_timeout"]}
+        OPTS.spice_name = "hspice"
+        OPTS.spice_exe = self.simulator
+        OPTS.cache_simulations = True
+        OPTS.simulation_cache_dir = os.path.join(self.work_dir, "cache")
+
+    def tearDown(self):
+        from globals import OPTS
+        for key, value in self.saved_opts.items():
+            setattr(OPTS, key, value)
+        super().tearDown()
+
+    def write_simulator(self, delay):
+        with open(self.simulator, "w") as f:
+            f.write(fake_simulator.format(log_file=self.log_file, delay=delay))
+        os.chmod(self.simulator, os.stat(self.simulator).st_mode | stat.S_IEXEC)
+
+    def write_netlist(self, contents):
+        with open(self.netlist, "w") as f:
+            f.write(contents)
+
+    def write_stimulus(self, sim_dir):
+        """Stimulus in sim_dir including the shared netlist"""
+        from globals import OPTS
+        from characterizer.stimuli import stimuli
+        os.makedirs(sim_dir, exist_ok=True)
+        OPTS.openram_temp = sim_dir
+        corner = (OPTS.process_corners[0], OPTS.supply_voltages[0], OPTS.temperatures[0])
+        stim_file = open(os.path.join(sim_dir, "stim.sp"), "w")
+        stim = stimuli(stim_file, corner)
+        stim_file.write(".include {}\n".format(self.netlist))
+        stim_file.write("* sim_dir {}\n".format(sim_dir))
+        stim_file.close()
+        return stim
+
+    def get_num_runs(self):
+        if not os.path.exists(self.log_file):
+            return 0
+        with open(self.log_file, "r") as f:
+            return len(f.read().splitlines())
+
+    def run_sim(self, sim_dir):
+        from characterizer import charutils as ch
+        stim = self.write_stimulus(sim_dir)
+        stim.run_sim()
+        return ch.parse_output("timing", "delay_lh", sim_dir=sim_dir)
+
+    def test_cache(self):
+        first_dir = os.path.join(self.work_dir, "first")
+        self.assertEqual(self.run_sim(first_dir), 1.5e-10)
+        self.assertEqual(self.get_num_runs(), 1)
+        with open(os.path.join(first_dir, "spice_stdout.log"), "r") as f:
+            self.assertIn("simulating", f.read())
+
+        # identical stimulus in a different directory re-uses the result
+        second_dir = os.path.join(self.work_dir, "second")
+        self.assertEqual(self.run_sim(second_dir), 1.5e-10)
+        self.assertEqual(self.get_num_runs(), 1)
+        self.assertTrue(os.path.exists(os.path.join(second_dir, "timing.mt0")))
+
+        # included netlist changes
+        self.write_netlist("R1 a b 2\n")
+        self.run_sim(second_dir)
+        self.assertEqual(self.get_num_runs(), 2)
+
+        # simulator options change
+        from globals import OPTS
+        simulator_threads = OPTS.simulator_threads
+        try:
+            OPTS.simulator_threads = simulator_threads + 1
+            self.run_sim(second_dir)
+        finally:
+            OPTS.simulator_threads = simulator_threads
+        self.assertEqual(self.get_num_runs(), 3)
+
+    def test_timeout(self):
+        from globals import OPTS
+        OPTS.cache_simulations = False
+        OPTS.simulation_timeout = 0.2
+        self.write_simulator(10)
+        stim = self.write_stimulus(os.path.join(self.work_dir, "timeout"))
+        start_time = time.time()
+        result = stim.submit_sim().result()
+        self.assertLess(time.time() - start_time, 5)
+        self.assertTrue(result.timed_out)
+        self.assertFalse(result.success)
+        with self.assertRaises(AssertionError):
+            stim.check_sim_result(result)
+
+    def test_limits(self):
+        from characterizer.simulation_runner import SimulationJob, run_job
+        limits_file = os.path.join(self.work_dir, "limits.txt")
+        command = "ulimit -v > {0} && nice >> {0}".format(limits_file)
+        job = SimulationJob(command, self.netlist, sim_dir=self.work_dir, memory_limit=256)
+        job.use_cache = False
+        saved_nice = os.environ.get("OPENRAM_SUBPROCESS_NICE")
+        os.environ["OPENRAM_SUBPROCESS_NICE"] = "5"
+        try:
+            self.assertTrue(run_job(job).success)
+        finally:
+            if saved_nice is None:
+                del os.environ["OPENRAM_SUBPROCESS_NICE"]
+            else:
+                os.environ["OPENRAM_SUBPROCESS_NICE"] = saved_nice
+        with open(limits_file, "r") as f:
+            memory_limit, nice_value = f.read().split()
+        self.assertEqual(int(memory_limit), 256 * 1024)
+        self.assertEqual(int(nice_value), os.nice(0) + 5)
+
+    def test_output_files(self):
+        from characterizer.simulation_runner import get_output_files
+        sim_dir = os.path.join(self.work_dir, "outputs")
+        os.makedirs(sim_dir)
+        start_time = int(time.time()) + 0.9
+        # coarse modification times may be earlier than a fractional start time
+        for file_name, mtime in [("old.mt0", start_time - 10), ("new.mt0", int(start_time)),
+                                 ("stim.sp", int(start_time))]:
+            file_name = os.path.join(sim_dir, file_name)
+            open(file_name, "w").close()
+            os.utime(file_name, (mtime, mtime))
+        stim_file = os.path.join(sim_dir, "stim.sp")
+        self.assertEqual(get_output_files(sim_dir, start_time, {stim_file}), ["new.mt0"])
+
+    def test_concurrent_submit(self):
+        from globals import OPTS
+        from characterizer.simulation_runner import SimulationRunner
+        OPTS.cache_simulations = False
+        self.write_simulator(0.3)
+        runner = SimulationRunner(num_workers=4)
+        jobs = [self.write_stimulus(os.path.join(self.work_dir, "job{}".format(i))).create_sim_job()
+                for i in range(4)]
+        start_time = time.time()
+        futures = [runner.submit(job) for job in jobs]
+        results = [future.result() for future in futures]
+        duration = time.time() - start_time
+        runner.shutdown()
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(self.get_num_runs(), 4)
+        self.assertLess(duration, 1.0, "Simulations should run concurrently")
+
+
+SimulationRunnerTest.run_tests(__name__)
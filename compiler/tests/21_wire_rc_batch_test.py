@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized wire RC lookup matches scalar get_rc per wire
+"""
+import math
+
+from testutils import OpenRamTest
+
+
+class WireRcBatchTest(OpenRamTest):
+
+    def setUp(self):
+        super().setUp()
+        from characterizer.delay_params_base import DelayParamsBase, RC
+
+        class TableParams(DelayParamsBase):
+            rc_map = {}
+            rc_tables = {}
+            min_width = 0.25
+            min_space = 0.25
+            # widths defined out of order, 0.375 is equidistant from 0.25 and 0.5
+            metal1 = [RC(0.5, 0.25, 2.0, 20.0), RC(0.5, 0.75, 3.0, 30.0),
+                      RC(0.25, 0.5, 4.0, 40.0), RC(0.25, 0.25, 5.0, 50.0),
+                      RC(1.0, 0.25, 6.0, 60.0)]
+            metal2 = [RC(0.5, 0.5, 7.0, 70.0)]
+
+        self.params = TableParams
+
+    def assert_batch_matches(self, layers, widths, spaces):
+        caps, res = self.params.get_rc_batch(layers, widths, spaces)
+        for i in range(len(layers)):
+            width = None if math.isnan(widths[i]) else widths[i]
+            space = None if math.isnan(spaces[i]) else spaces[i]
+            scalar_cap, scalar_res = self.params.get_rc(layers[i], width, space)
+            self.assertAlmostEqual(caps[i], scalar_cap, msg="wire {}".format(i))
+            self.assertAlmostEqual(res[i], scalar_res, msg="wire {}".format(i))
+
+    def test_ties_use_definition_order(self):
+        widths = [0.375, 0.75, 0.375, 0.375, 0.1, 1.5, 0.3]
+        spaces = [0.5, 0.25, 0.375, 0.0, 0.25, 0.9, 0.6]
+        self.assert_batch_matches(["metal1"] * len(widths), widths, spaces)
+        rc_map = self.params.rc_map["metal1"]
+        # width tie between 0.25 and 0.5 goes to 0.5 which is defined first
+        self.assertIs(self.params.find_closest("metal1", 0.375, 0.25), rc_map[0.5][0.25])
+        # space tie between 0.25 and 0.75 goes to 0.25 which is defined first
+        self.assertIs(self.params.find_closest("metal1", 0.5, 0.5), rc_map[0.5][0.25])
+        # space tie between 0.5 and 0.25 goes to 0.5 which is defined first
+        self.assertIs(self.params.find_closest("metal1", 0.25, 0.375), rc_map[0.25][0.5])
+
+    def test_single_entry_table(self):
+        widths = [0.1, 0.5, 2.0]
+        spaces = [0.1, 0.5, 2.0]
+        self.assert_batch_matches(["metal2"] * len(widths), widths, spaces)
+
+    def test_zero_and_nan_widths(self):
+        nan = float("nan")
+        layers = ["metal1", "metal1", "metal2", "metal1", "metal2"]
+        widths = [0.0, nan, nan, 0.4, 0.0]
+        spaces = [nan, 0.0, 0.5, nan, 0.0]
+        self.assert_batch_matches(layers, widths, spaces)
+
+    def test_wire_rc_batch(self):
+        from base.hierarchy_spice import spice
+        import tech
+        layers = ["metal1", "metal2", "metal3", "metal1"]
+        widths = [0.0, 0.5, 1.5, tech.drc["minwidth_metal1"]]
+        lengths = [1.0, 2.0, 3.0, 0.5]
+        caps, res = spice.get_wire_rc_batch(layers, widths, lengths)
+        for i in range(len(layers)):
+            self.assertAlmostEqual(caps[i], spice.get_wire_cap(None, layers[i], widths[i],
+                                                               lengths[i]))
+            self.assertAlmostEqual(res[i], spice.get_wire_res(None, layers[i], widths[i],
+                                                              lengths[i]))
+
+
+WireRcBatchTest.run_tests(__name__)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test concurrent setup/hold point characterization jobs using a fake simulator
+"""
+import os
+import stat
+import tempfile
+import time
+
+from testutils import OpenRamTest
+
+fake_simulator = """#!/bin/sh
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -i) stim="$2"; shift;;
+        -o) out="$2"; shift;;
+    esac
+    shift
+done
+echo "$(dirname $stim) $(pwd)" >> {log_file}
+sleep {delay}
+printf "clk2q_delay = 1.5e-10 targ= 1 trig= 0\\nsetup_hold_time = -5.0e-11 targ= 1 trig= 0\\n" > "$out.mt0"
+"""
+
+
+class LibParallelCharacterizationTest(OpenRamTest):
+    delay = 0.05
+
+    def setUp(self):
+        super().setUp()
+        from globals import OPTS
+        self.work_dir = tempfile.mkdtemp(dir=OPTS.openram_temp)
+        self.log_file = os.path.join(self.work_dir, "sim.log")
+        self.simulator = os.path.join(self.work_dir, "fake_hspice")
+        self.write_simulator(self.delay)
+        self.model_file = os.path.join(self.work_dir, "ms_flop.sp")
+        with open(self.model_file, "w") as f:
+            f.write("* flip flop model\n")
+
+        self.saved_opts = (OPTS.spice_name, OPTS.spice_exe)
+        OPTS.spice_name = "hspice"
+        OPTS.spice_exe = self.simulator
+
+    def write_simulator(self, delay):
+        with open(self.simulator, "w") as f:
+            f.write(fake_simulator.format(log_file=self.log_file, delay=delay))
+        os.chmod(self.simulator, os.stat(self.simulator).st_mode | stat.S_IEXEC)
+
+    def tearDown(self):
+        from globals import OPTS
+        OPTS.spice_name, OPTS.spice_exe = self.saved_opts
+        super().tearDown()
+
+    def create_setup_hold_jobs(self):
+        from globals import OPTS
+        from characterizer import setup_hold
+        from characterizer.characterization_jobs import CharacterizationJob
+
+        def analyze_point(corner, related_slew, constrained_slew):
+            sh = setup_hold(corner)
+            sh.model_location = self.model_file
+            return sh.analyze_point(related_slew, constrained_slew)
+
+        corner = (OPTS.process_corners[0], OPTS.supply_voltages[0], OPTS.temperatures[0])
+        slews = [0.01, 0.04]
+        return [CharacterizationJob("setup_hold", analyze_point, corner, related_slew, constrained_slew)
+                for related_slew in slews for constrained_slew in slews]
+
+    def test_parallel_setup_hold(self):
+        from characterizer.characterization_jobs import run_jobs
+
+        start_time = time.time()
+        serial_results = run_jobs(self.create_setup_hold_jobs(), num_workers=1)
+        serial_time = time.time() - start_time
+        os.remove(self.log_file)
+
+        jobs = self.create_setup_hold_jobs()
+        start_time = time.time()
+        parallel_results = run_jobs(jobs, num_workers=len(jobs))
+        parallel_time = time.time() - start_time
+
+        self.assertEqual(serial_results, parallel_results)
+        self.assertEqual(len(parallel_results), len(jobs))
+        self.assertEqual(set(parallel_results[0].keys()), {"setup_times_LH", "setup_times_HL",
+                                                           "hold_times_LH", "hold_times_HL"})
+
+        with open(self.log_file, "r") as f:
+            runs = [x.split() for x in f.read().splitlines()]
+        for stim_dir, cwd in runs:
+            self.assertEqual(stim_dir, cwd, "Simulation should run in the job's temp dir")
+        self.assertEqual(len(set(x[0] for x in runs)), len(jobs),
+                         "Each job should have its own temp dir")
+        self.assertTrue(parallel_time < 0.5 * serial_time,
+                        "Jobs should run concurrently ({:.3g}s vs {:.3g}s serial)".format(
+                            parallel_time, serial_time))
+
+    def test_multi_point_search(self):
+        from globals import OPTS
+        from characterizer import setup_hold
+
+        corner = (OPTS.process_corners[0], OPTS.supply_voltages[0], OPTS.temperatures[0])
+        sh = setup_hold(corner)
+        sh.model_location = self.model_file
+        sh.constrained_input_slew = 0.01
+        # long enough simulations to dominate the cost of starting workers in each round
+        self.write_simulator(0.2)
+
+        num_workers = OPTS.num_characterization_workers
+        search_times = []
+        results = []
+        try:
+            for OPTS.num_characterization_workers in [1, 4]:
+                start_time = time.time()
+                results.append(sh.bidir_search(1, "SETUP"))
+                search_times.append(time.time() - start_time)
+        finally:
+            OPTS.num_characterization_workers = num_workers
+        self.assertEqual(results[0], results[1])
+        self.assertTrue(search_times[1] < 0.75 * search_times[0],
+                        "Search points should be simulated concurrently ({:.3g}s vs {:.3g}s)".format(
+                            search_times[1], search_times[0]))
+
+    def test_frozen_options(self):
+        from globals import OPTS
+        from characterizer.characterization_jobs import CharacterizationJob, run_jobs
+
+        def job_func(index):
+            temp_dir = OPTS.openram_temp
+            OPTS.trim_netlist = "modified"
+            return index, OPTS.spice_name, temp_dir
+
+        openram_temp = OPTS.openram_temp
+        trim_netlist = OPTS.trim_netlist
+        jobs = [CharacterizationJob("job", job_func, i) for i in range(3)]
+        OPTS.spice_name = "spectre"
+        for num_workers in [1, 3]:
+            results = run_jobs(jobs, num_workers=num_workers)
+            self.assertEqual([x[0] for x in results], list(range(3)))
+            self.assertTrue(all(x[1] == "hspice" for x in results),
+                            "Jobs should use options from when they were created")
+            self.assertEqual(len(set(x[2] for x in results)), 3)
+            self.assertTrue(all(x[2].startswith(openram_temp) for x in results))
+            self.assertEqual(OPTS.openram_temp, openram_temp)
+            self.assertEqual(OPTS.trim_netlist, trim_netlist)
+            self.assertEqual(OPTS.spice_name, "spectre")
+
+
+LibParallelCharacterizationTest.run_tests(__name__)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Check merging of LEF obstructions into their rectilinear union
+"""
+import os
+import random
+
+import numpy as np
+
+from testutils import OpenRamTest
+
+
+class LefObstructionsTest(OpenRamTest):
+
+    @staticmethod
+    def rasterize(rects, size):
+        raster = np.zeros((size, size), dtype=int)
+        for x1, y1, x2, y2 in rects:
+            raster[x1:x2, y1:y2] += 1
+        return raster
+
+    def test_abutting_and_overlapping(self):
+        from base.lef import merge_rectangles
+        rects = np.array([[0, 0, 10, 5], [10, 0, 20, 5],  # abutting
+                          [0, 5, 20, 8],  # abutting on top
+                          [2, 1, 4, 3],  # contained
+                          [30, 0, 40, 10], [35, 5, 45, 15]])  # overlapping
+        merged = merge_rectangles(rects)
+        self.assertEqual(sorted(merged.tolist())[0], [0, 0, 20, 8])
+        self.assertEqual(len(merged), 4)
+        raster = self.rasterize(merged, 50)
+        self.assertEqual(raster.max(), 1, "Merged rectangles shouldn't overlap")
+        self.assertTrue(np.array_equal(raster > 0, self.rasterize(rects, 50) > 0))
+
+    def test_random_union(self):
+        from base.lef import merge_rectangles
+        random.seed(1)
+        rects = []
+        for _ in range(300):
+            x, y = random.randint(0, 90), random.randint(0, 90)
+            rects.append([x, y, x + random.randint(0, 10), y + random.randint(1, 10)])
+        rects = np.array(rects)
+        expected = self.rasterize(rects, 100) > 0
+        for max_cells in [10 ** 6, 50]:
+            merged = merge_rectangles(rects, max_cells=max_cells)
+            self.assertTrue(np.array_equal(self.rasterize(merged, 100) > 0, expected))
+            self.assertLessEqual(len(merged), len(rects))
+
+    def test_tiled_array(self):
+        from base.lef import merge_rectangles
+        # cell array with abutting cells and a rail in each row
+        rects = []
+        for row in range(20):
+            for col in range(30):
+                rects.append([col * 10, row * 10, col * 10 + 10, row * 10 + 4])
+                rects.append([col * 10 + 2, row * 10 + 6, col * 10 + 8, row * 10 + 8])
+        merged = merge_rectangles(np.array(rects))
+        self.assertEqual(len(merged), 20 + 20 * 30)
+        raster = self.rasterize(merged, 300)
+        self.assertEqual(raster.max(), 1)
+        self.assertTrue(np.array_equal(raster > 0, self.rasterize(rects, 300) > 0))
+
+    def test_coarse_outline(self):
+        from base.lef import collect_rectangles, merge_rectangles
+        blockages = [[[0.1, 0.1], [0.3, 0.2]], [[0.45, 0.1], [0.6, 0.2]],
+                     [[0.9, 0.25], [0.7, 0.15]]]
+        exact = merge_rectangles(collect_rectangles(blockages, 1000))
+        self.assertEqual(len(exact), 3)
+        self.assertEqual(exact.tolist()[-1], [700, 150, 900, 250])
+        coarse = merge_rectangles(collect_rectangles(blockages, 1000, resolution=0.5))
+        self.assertEqual(coarse.tolist(), [[0, 0, 1000, 500]])
+
+    def test_write_lef(self):
+        from globals import OPTS
+        from pgates.pinv import pinv
+        cell = pinv(size=4)
+        lef_file = os.path.join(OPTS.openram_temp, "pinv.lef")
+        merge = OPTS.lef_merge_obstructions
+        try:
+            OPTS.lef_merge_obstructions = False
+            cell.lef_write(lef_file)
+            with open(lef_file, "r") as f:
+                num_detailed = f.read().count("RECT")
+            OPTS.lef_merge_obstructions = True
+            cell.lef_write(lef_file)
+            with open(lef_file, "r") as f:
+                contents = f.read()
+        finally:
+            OPTS.lef_merge_obstructions = merge
+        self.assertLessEqual(contents.count("RECT"), num_detailed)
+        self.assertTrue(contents.endswith("END    LIBRARY\n"))
+        for layer, (num_rects, num_merged) in cell.lef_stats["obstructions"].items():
+            self.assertLessEqual(num_merged, num_rects)
+        self.assertEqual(cell.lef_stats["size"], len(contents))
+
+
+LefObstructionsTest.run_tests(__name__)
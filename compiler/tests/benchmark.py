@@ -0,0 +1,885 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiler's hot paths: GDS read/write of a bank, sp_write of an SRAM,
+SpiceParser capacitance extraction, SimReader delay extraction, SimAnalyzer event verification,
+LoadOptimizer solves and dependency_graph.create_graph.
+The fixtures are generated from the config (banks and SRAMs) or are synthetic (simulation
+waveforms) so no simulator or EDA tool is needed. They are cached in the work directory.
+Each benchmark runs in its own python process so the peak memory is per benchmark.
+Results can be saved as a json baseline and benchmarks that are slower or use more memory
+than the baseline by more than the threshold are reported as regressions.
+
+Usage: benchmark.py [-t tech] [--config_file config] [--list] [--benchmarks regex]
+                    [--repeat N] [--min_time seconds] [--timeout seconds]
+                    [--baseline baseline.json] [--save_baseline baseline.json]
+                    [--threshold 0.2] [--memory_threshold 0.2] [--report report.json]
+                    [--work_dir dir] [--num_rows rows] [--num_cols cols] [extra OpenRAM arguments]
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+module_dir = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(os.path.abspath(os.path.join(module_dir, "../")))
+sys.path.append(os.path.join(module_dir, "reram"))
+
+DEFAULT_CONFIG = "config_reram_{}"
+BASELINE_VERSION = 1
+
+OK = "ok"
+REGRESSION = "regression"
+IMPROVED = "improved"
+NEW = "new"
+FAILED = "failed"
+
+
+def get_peak_memory():
+    """Peak resident set size in MB since the process started or since reset_peak_memory"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_current_memory():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return get_peak_memory()
+
+
+def reset_peak_memory():
+    """Reset the peak RSS to the current RSS (linux only, no-op elsewhere)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+# Fixtures: created in the benchmark process and saved in the fixtures directory
+# so later benchmarks (and later runs with the same work directory) reuse them
+
+
+def write_atomic(file_name, write_func):
+    """Write to a temporary file first so an interrupted run doesn't leave a partial fixture"""
+    temp_name = file_name + ".tmp"
+    write_func(temp_name)
+    os.replace(temp_name, file_name)
+
+
+def create_bank(options):
+    from bank_test_base import BankTestBase
+    bank_class, kwargs = BankTestBase.get_bank_class()
+    return bank_class(name="bank1", word_size=options.num_cols, num_words=options.num_rows,
+                      words_per_row=1, **kwargs)
+
+
+def create_sram(options):
+    from base.design import design
+    from globals import OPTS
+    sram_class = design.import_mod_class_from_str(OPTS.sram_class)
+    return sram_class(word_size=options.sram_word_size, num_words=options.sram_num_words,
+                      words_per_row=1, num_banks=1, name="sram1", add_power_grid=True)
+
+
+def get_bank_gds(options, fixture_dir):
+    gds_file = os.path.join(fixture_dir, "bank_{}x{}.gds".format(options.num_rows,
+                                                                 options.num_cols))
+    if not os.path.exists(gds_file):
+        bank = create_bank(options)
+        write_atomic(gds_file, bank.gds_write)
+    return gds_file
+
+
+def get_sram_netlist(options, fixture_dir):
+    sp_file = os.path.join(fixture_dir, "sram_{}x{}.sp".format(options.sram_num_words,
+                                                               options.sram_word_size))
+    if not os.path.exists(sp_file):
+        sram = create_sram(options)
+        write_atomic(sp_file, sram.sp_write)
+    return sp_file
+
+
+class SyntheticSimulation:
+    """
+    Waveforms of writes and reads to random addresses with the stimulus and probe files
+    that SimAnalyzer expects. Signal values change as follows relative to an operation at time t:
+        data and mask: t - 0.2*period for writes
+        clk: rises at t, falls at t + duty*period
+        memory state: t + 0.6*period for writes
+        data out: t + 0.7*period for reads
+    """
+    vdd = 1.8
+    duty = 0.5
+    rise_time = 20e-12
+    clk = "clk"
+    state_pattern = "state_a{}_b{}"
+
+    def __init__(self, sim_dir, word_size, num_addresses, num_operations,
+                 period=2e-9, time_step=5e-12, seed=0):
+        self.sim_dir = sim_dir
+        self.word_size = word_size
+        self.num_addresses = num_addresses
+        self.num_operations = num_operations
+        self.period = period
+        self.time_step = time_step
+        self.seed = seed
+        self.waveform_file = os.path.join(sim_dir, "waveform.npz")
+        self.stim_file = os.path.join(sim_dir, "stim.sp")
+
+    @property
+    def probe_files(self):
+        return [os.path.join(self.sim_dir, "{}.json".format(x))
+                for x in ["state_probes", "voltage_probes", "current_probes"]]
+
+    def exists(self):
+        return all(map(os.path.exists, [self.waveform_file, self.stim_file] + self.probe_files))
+
+    def create_waveform(self, time, transitions, initial_value):
+        """Piecewise linear waveform from (time, value) transitions"""
+        import numpy as np
+        t_points = [0.0]
+        v_points = [initial_value * self.vdd]
+        for t, value in transitions:
+            t_points.extend([t, t + self.rise_time])
+            v_points.extend([v_points[-1], value * self.vdd])
+        return np.interp(time, t_points, v_points)
+
+    def generate(self):
+        import numpy as np
+        rng = np.random.default_rng(self.seed)
+        word_size, period = self.word_size, self.period
+
+        # one idle period at the start and at the end
+        op_times = period * (1 + np.arange(self.num_operations))
+        # alternate the first operations so there are at least two of each
+        is_write = rng.random(self.num_operations) < 0.5
+        is_write[:4] = [True, False, True, False]
+        addresses = rng.integers(0, self.num_addresses, self.num_operations)
+        time = np.arange(0, (self.num_operations + 2) * period, self.time_step)
+
+        state = rng.integers(0, 2, (self.num_addresses, word_size))
+        initial_state = state.copy()
+        data = np.zeros(word_size, dtype=int)
+        mask = np.ones(word_size, dtype=int)
+        dout = np.zeros(word_size, dtype=int)
+
+        state_transitions = [[[] for _ in range(word_size)] for _ in range(self.num_addresses)]
+        data_transitions = [[] for _ in range(word_size)]
+        mask_transitions = [[] for _ in range(word_size)]
+        dout_transitions = [[] for _ in range(word_size)]
+        clk_transitions = []
+
+        def add_transitions(all_transitions, previous, new, t):
+            for bit in np.nonzero(previous != new)[0]:
+                all_transitions[bit].append((t, new[bit]))
+
+        events = []
+        for t, write, address in zip(op_times, is_write, addresses):
+            clk_transitions.extend([(t, 1), (t + self.duty * period, 0)])
+            if write:
+                new_data = rng.integers(0, 2, word_size)
+                new_mask = (rng.random(word_size) < 0.8).astype(int)
+                add_transitions(data_transitions, data, new_data, t - 0.2 * period)
+                add_transitions(mask_transitions, mask, new_mask, t - 0.2 * period)
+                data, mask = new_data, new_mask
+                new_state = np.where(mask, data, state[address])
+                add_transitions(state_transitions[address], state[address], new_state,
+                                t + 0.6 * period)
+                state[address] = new_state
+            else:
+                new_dout = state[address].copy()
+                add_transitions(dout_transitions, dout, new_dout, t + 0.7 * period)
+                dout = new_dout
+            events.append(("WRITE" if write else "READ", address, t))
+
+        signals = {"time": time, self.clk: self.create_waveform(time, clk_transitions, 0)}
+        for bit in range(word_size):
+            signals["DATA[{}]".format(bit)] = self.create_waveform(time, data_transitions[bit], 0)
+            signals["MASK[{}]".format(bit)] = self.create_waveform(time, mask_transitions[bit], 1)
+            signals["D[{}]".format(bit)] = self.create_waveform(time, dout_transitions[bit], 0)
+            for address in range(self.num_addresses):
+                signals[self.state_pattern.format(address, bit)] = self.create_waveform(
+                    time, state_transitions[address][bit], initial_state[address][bit])
+
+        os.makedirs(self.sim_dir, exist_ok=True)
+
+        def save_waveform(file_name):
+            with open(file_name, "wb") as f:
+                np.savez(f, vdd=self.vdd, **signals)
+        write_atomic(self.waveform_file, save_waveform)
+        self.write_probes()
+        self.write_stimulus(events)
+
+    def write_probes(self):
+        bits = [str(x) for x in range(self.word_size)]
+        state_probes = {str(address): [self.state_pattern.format(address, bit)
+                                       for bit in range(self.word_size)]
+                        for address in range(self.num_addresses)}
+        voltage_probes = {"clk": {"0": self.clk},
+                          "data_in": {x: "DATA[{}]".format(x) for x in bits},
+                          "mask": {x: "MASK[{}]".format(x) for x in bits},
+                          "dout": {x: "D[{}]".format(x) for x in bits}}
+        for file_name, probes in zip(self.probe_files, [state_probes, voltage_probes, {}]):
+            with open(file_name, "w") as f:
+                json.dump(probes, f)
+
+    def write_stimulus(self, events):
+        bits = ", ".join(map(str, range(self.word_size)))
+        period_ns = "{:.4g}".format(self.period * 1e9)
+        lines = ["* Synthetic benchmark stimulus",
+                 "* Probe cols = [{}]".format(bits),
+                 "* Probe bits = [{}]".format(bits),
+                 "* read period = {}n".format(period_ns),
+                 "* write period = {}n".format(period_ns)]
+        for op_name, address, t in events:
+            # [address, row, col_index, bank, time (ns), period (ns), duty]
+            lines.append("* -- {} : [{}, {}, 0, 0, {:.6g}, {}, {}]".format(
+                op_name, address, address, t * 1e9, period_ns, self.duty))
+        with open(self.stim_file, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def load_events(self):
+        """(op_name, address, time, period) of each event in the stimulus"""
+        with open(self.stim_file, "r") as f:
+            matches = re.findall(r"-- (READ|WRITE) : \[(.*)\]", f.read())
+        events = []
+        for op_name, values in matches:
+            values = values.split(",")
+            events.append((op_name, int(values[0]), float(values[4]) * 1e-9,
+                           float(values[5]) * 1e-9))
+        return events
+
+
+def get_simulation(options, fixture_dir):
+    sim_dir = os.path.join(fixture_dir, "sim_{}x{}_{}ops".format(
+        options.sim_addresses, options.sim_word_size, options.sim_operations))
+    simulation = SyntheticSimulation(sim_dir, word_size=options.sim_word_size,
+                                     num_addresses=options.sim_addresses,
+                                     num_operations=options.sim_operations)
+    if not simulation.exists():
+        simulation.generate()
+    return simulation
+
+
+def create_npz_reader_class():
+    from characterizer.simulation.sim_reader import SimReader
+
+    class NpzSimReader(SimReader):
+        """Reads waveforms saved by SyntheticSimulation, signals are loaded on first use"""
+        data = None
+
+        def initialize(self):
+            import numpy as np
+            self.data = np.load(self.simulation_file)
+            self.time = self.data["time"]
+            self.vdd = float(self.data["vdd"])
+            self.all_signal_names = [x for x in self.data.files if x not in ["time", "vdd"]]
+            self.signal_names_set = set(self.all_signal_names)
+            self.cache = {}
+
+        def close(self):
+            self.data.close()
+
+        def get_signal_names(self):
+            return self.all_signal_names
+
+        def convert_signal_name(self, signal_name):
+            if signal_name in self.signal_names_set:
+                return signal_name
+            if signal_name.startswith("v(") and signal_name.endswith(")"):
+                signal_name = signal_name[2:-1]
+                if signal_name in self.signal_names_set:
+                    return signal_name
+            return None
+
+        def is_valid_signal(self, signal_name):
+            return self.convert_signal_name(signal_name) is not None
+
+        def get_signal(self, signal_name, from_t=0.0, to_t=None):
+            if signal_name in self.cache:
+                signal = self.cache[signal_name]
+            else:
+                real_signal_name = self.convert_signal_name(signal_name)
+                if real_signal_name is None:
+                    raise ValueError("Signal {} not found".format(signal_name))
+                signal = self.data[real_signal_name]
+                self.cache[signal_name] = signal
+            return self.slice_array(signal, from_t, to_t)
+
+    return NpzSimReader
+
+
+# Benchmarks
+
+
+class Benchmark:
+    """
+    create_fixtures saves the fixtures which are reused between runs, it runs in its own process
+    so the memory used to create the fixtures isn't included in the benchmark's peak memory.
+    setup loads the fixtures and isn't timed, run is timed 'repeat' times.
+    Baselines are only compared if get_params is unchanged
+    """
+    name = None
+    description = ""
+    repeat = 3
+
+    def __init__(self, options, fixture_dir):
+        self.options = options
+        self.fixture_dir = fixture_dir
+
+    def get_params(self):
+        return {}
+
+    def create_fixtures(self):
+        pass
+
+    def setup(self):
+        pass
+
+    def run(self):
+        raise NotImplementedError
+
+
+class BankBenchmark(Benchmark):
+    def get_params(self):
+        return {"num_rows": self.options.num_rows, "num_cols": self.options.num_cols}
+
+
+class GdsBenchmark(BankBenchmark):
+    def create_fixtures(self):
+        get_bank_gds(self.options, self.fixture_dir)
+
+
+class GdsReadBenchmark(GdsBenchmark):
+    name = "gds_read"
+    description = "Gds2reader load of a bank"
+
+    def setup(self):
+        self.gds_file = get_bank_gds(self.options, self.fixture_dir)
+
+    def run(self):
+        from gdsMill import gdsMill
+        from tech import GDS
+        # VlsiLayout(from_file=...) is cached so read into a new layout
+        layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        gdsMill.Gds2reader(layout).loadFromFile(self.gds_file)
+
+
+class GdsWriteBenchmark(GdsBenchmark):
+    name = "gds_write"
+    description = "Gds2writer write of a bank"
+
+    def setup(self):
+        from gdsMill import gdsMill
+        from globals import OPTS
+        from tech import GDS
+        self.layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        gdsMill.Gds2reader(self.layout).loadFromFile(get_bank_gds(self.options, self.fixture_dir))
+        self.gds_file = os.path.join(OPTS.openram_temp, "bank.gds")
+
+    def run(self):
+        from gdsMill import gdsMill
+        gdsMill.Gds2writer(self.layout).writeToFile(self.gds_file)
+
+
+class SramBenchmark(Benchmark):
+    def get_params(self):
+        return {"sram_word_size": self.options.sram_word_size,
+                "sram_num_words": self.options.sram_num_words}
+
+
+class SpWriteBenchmark(SramBenchmark):
+    name = "sp_write"
+    description = "sp_write of an SRAM"
+
+    def setup(self):
+        from globals import OPTS
+        self.sram = create_sram(self.options)
+        self.sp_file = os.path.join(OPTS.openram_temp, "sram.sp")
+
+    def run(self):
+        self.sram.sp_write(self.sp_file)
+
+
+class SpiceParserBenchmark(SramBenchmark):
+    name = "spice_parser"
+    description = "SpiceParser load of an SRAM netlist and extract_caps_for_pin of its inputs"
+    input_pin_pattern = re.compile(r"^(clk|csb|web|addr|data|mask)(\[\d+\])?$", re.IGNORECASE)
+
+    def create_fixtures(self):
+        get_sram_netlist(self.options, self.fixture_dir)
+
+    def setup(self):
+        self.sp_file = get_sram_netlist(self.options, self.fixture_dir)
+
+    def run(self):
+        from base.spice_parser import SpiceParser
+        parser = SpiceParser(self.sp_file)
+        top_module = parser.mods[-1]
+        for pin in top_module.pins:
+            if self.input_pin_pattern.match(pin):
+                parser.extract_caps_for_pin(pin, top_module.name)
+
+
+class SimulationBenchmark(Benchmark):
+    def get_params(self):
+        return {"sim_word_size": self.options.sim_word_size,
+                "sim_addresses": self.options.sim_addresses,
+                "sim_operations": self.options.sim_operations}
+
+    def create_fixtures(self):
+        get_simulation(self.options, self.fixture_dir)
+
+    def setup(self):
+        self.simulation = get_simulation(self.options, self.fixture_dir)
+
+
+class SimReaderBenchmark(SimulationBenchmark):
+    name = "sim_reader"
+    description = "SimReader load and clk to data delays of each read and write"
+
+    def run(self):
+        from characterizer.simulation.sim_reader import RISING_EDGE, FALLING_EDGE
+        reader = create_npz_reader_class()(self.simulation.waveform_file)
+        word_size = self.simulation.word_size
+        for op_name, address, start_time, period in self.simulation.load_events():
+            if op_name == "READ":
+                reader.ref_to_bus_delay("clk", RISING_EDGE, "D[{}]", start_time,
+                                        start_time + period, num_bits=word_size)
+            else:
+                reader.ref_to_bus_delay("clk", FALLING_EDGE,
+                                        self.simulation.state_pattern.format(address, "{}"),
+                                        start_time, start_time + period, num_bits=word_size)
+        reader.close()
+
+
+class SimAnalyzerBenchmark(SimulationBenchmark):
+    name = "sim_analyzer"
+    description = "SimAnalyzer verification of each read and write"
+
+    def setup(self):
+        super().setup()
+        from characterizer.simulation.sim_analyzer import SimAnalyzer
+        from globals import OPTS
+        OPTS.word_size = self.simulation.word_size
+        # SimAnalyzer loads the probes from the temp directory
+        for file_name in self.simulation.probe_files:
+            shutil.copy(file_name, OPTS.openram_temp)
+
+        reader_class = create_npz_reader_class()
+        waveform_file = self.simulation.waveform_file
+
+        class NpzSimAnalyzer(SimAnalyzer):
+            def create_reader(self, sim_file):
+                return reader_class(waveform_file)
+
+        self.analyzer = NpzSimAnalyzer(self.simulation.sim_dir)
+        # load the signals so only the verification is timed
+        for signal_name in self.analyzer.sim_data.get_signal_names():
+            self.analyzer.sim_data.get_signal(signal_name)
+
+    def run(self):
+        for op_name, verify_func in [("WRITE", self.analyzer.verify_write_event),
+                                     ("READ", self.analyzer.verify_read_event)]:
+            for event in self.analyzer.load_events(op_name):
+                if not verify_func(event[0], event[1], event[2], event[3]):
+                    raise AssertionError("{} verification failed at {:.3g}ns".format(
+                        op_name, event[0] * 1e9))
+
+
+class LoadOptimizerBenchmark(BankBenchmark):
+    name = "load_optimizer"
+    description = "LoadOptimizer min delay and min size solves of en and en/en_bar buffers"
+
+    def get_params(self):
+        return {"num_cols": self.options.num_cols,
+                "optimizer_stages": self.options.optimizer_stages}
+
+    def setup(self):
+        # imported by minimize_delays, import it here so it isn't timed
+        import scipy.optimize
+        from characterizer.delay_loads import DistributedLoad, WireLoad
+        from tech import delay_params_class, parameter, spice
+        # the min inverter parameters are only defined by techs that run the optimizer,
+        # derive them from the min transistor parameters otherwise
+        params_class = delay_params_class()
+        beta = parameter["beta"]
+        for name, value in [("beta", beta),
+                            ("c_gate", (1 + beta) * spice["min_tx_gate_c"] * 1e-15),
+                            ("c_drain", (1 + beta) * spice["min_tx_drain_c"] * 1e-15),
+                            ("r_intrinsic", spice["min_tx_r_n"])]:
+            if not hasattr(params_class, name):
+                setattr(params_class, name, value)
+
+        num_cols = self.options.num_cols
+        WireLoad.initialize_class()
+        bitcell_width = WireLoad.bitcell.width
+        c_gate = params_class.c_gate
+
+        def create_load(gate_size):
+            driver = WireLoad(None, num_cols * bitcell_width)
+            return DistributedLoad(driver, cap_per_stage=gate_size * c_gate,
+                                   stage_width=bitcell_width, num_stages=num_cols)
+        self.create_load = create_load
+
+    def run(self):
+        from characterizer.delay_optimizer import LoadOptimizer
+        max_size = 4 * self.options.num_cols
+        for num_stages in range(2, 2 + self.options.optimizer_stages):
+            loads = [self.create_load(4), self.create_load(2)]
+            initial_guess, opt_func, total_delay, stage_delays = \
+                LoadOptimizer.generate_en_delay(num_stages, loads)
+            result = LoadOptimizer.minimize_delays(opt_func, initial_guess, max_size=max_size)
+            LoadOptimizer.minimize_sizes(opt_func, initial_guess, 1.5 * total_delay(result.x),
+                                         stage_delays, final_stage=True)
+
+            initial_guess, opt_func, total_delay, stage_delays = \
+                LoadOptimizer.generate_en_en_bar_delay(num_stages + 1, [self.create_load(4)],
+                                                       [self.create_load(2)])
+            result = LoadOptimizer.minimize_delays(opt_func, initial_guess, max_size=max_size)
+            # minimize_sizes constrains both the en_bar and en delays
+            delays = stage_delays(result.x)
+            max_delay = max(sum(delays[:-1]), sum(delays) - delays[-2])
+            LoadOptimizer.minimize_sizes(opt_func, initial_guess, 1.5 * max_delay, stage_delays)
+
+
+class DependencyGraphBenchmark(BankBenchmark):
+    name = "dependency_graph"
+    description = "create_graph of the wordline, read data and control enable paths of a bank"
+
+    def setup(self):
+        self.bank = create_bank(self.options)
+        last_row = self.options.num_rows - 1
+        last_col = self.options.num_cols - 1
+        # bitline paths aren't included since SpiceParser can't read the reram bitcell netlist
+        self.nets = ["wl[{}]".format(last_row), "DATA[{}]".format(last_col), "sense_en",
+                     "wordline_en"]
+        # deduce the pin directions of the modules, these are kept between runs
+        self.create_graphs()
+
+    def clear_graph_caches(self):
+        """Clear the connectivity indices so each run starts cold"""
+        visited = set()
+        modules = [self.bank]
+        while modules:
+            module = modules.pop()
+            if id(module) not in visited:
+                visited.add(id(module))
+                module.connectivity_index = None
+                modules.extend(module.mods)
+
+    def create_graphs(self):
+        from characterizer.dependency_graph import create_graph
+        self.clear_graph_caches()
+        for net in self.nets:
+            if len(create_graph(net, self.bank)) == 0:
+                raise AssertionError("No path derived for {}".format(net))
+
+    def run(self):
+        self.create_graphs()
+
+
+BENCHMARKS = [GdsReadBenchmark, GdsWriteBenchmark, SpWriteBenchmark, SpiceParserBenchmark,
+              SimReaderBenchmark, SimAnalyzerBenchmark, LoadOptimizerBenchmark,
+              DependencyGraphBenchmark]
+
+
+def get_benchmark_class(name):
+    for benchmark_class in BENCHMARKS:
+        if benchmark_class.name == name:
+            return benchmark_class
+    raise ValueError("Invalid benchmark {}".format(name))
+
+
+# Running a single benchmark in a child process
+
+
+def initialize_openram(openram_args, temp_dir):
+    sys.argv = [sys.argv[0]] + openram_args
+    import globals
+    from globals import OPTS
+    globals.parse_args()
+    config_file = getattr(OPTS, "config_file", None) or DEFAULT_CONFIG
+    globals.init_openram(config_file.format(OPTS.tech_name), openram_temp=temp_dir)
+    OPTS.check_lvsdrc = False
+    # use the buffer sizes in the config so the bank and SRAM fixtures are deterministic
+    OPTS.run_optimizations = False
+
+
+def run_benchmark(benchmark: Benchmark, repeat, min_time=0.0, max_repeat=100):
+    """
+    Run setup once and then run at least 'repeat' times,
+    fast benchmarks are repeated until they have run for min_time seconds in total
+    """
+    start_time = time.perf_counter()
+    benchmark.setup()
+    setup_time = time.perf_counter() - start_time
+    setup_memory = get_peak_memory()
+
+    reset_peak_memory()
+    start_memory = get_current_memory()
+    times = []
+    while len(times) < repeat or (sum(times) < min_time and len(times) < max_repeat):
+        start_time = time.perf_counter()
+        benchmark.run()
+        times.append(time.perf_counter() - start_time)
+    peak_memory = get_peak_memory()
+    return {"name": benchmark.name, "params": benchmark.get_params(), "times": times,
+            "min": min(times), "median": statistics.median(times),
+            "mean": statistics.mean(times), "setup_time": setup_time,
+            "setup_memory": setup_memory, "peak_memory": max(peak_memory, setup_memory),
+            "run_memory": peak_memory - start_memory}
+
+
+def run_child(options, openram_args):
+    temp_dir = os.path.join(options.work_dir, options.child)
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    fixture_dir = os.path.join(options.work_dir, "fixtures")
+    os.makedirs(fixture_dir, exist_ok=True)
+
+    initialize_openram(openram_args, temp_dir)
+    benchmark_class = get_benchmark_class(options.child)
+    benchmark = benchmark_class(options, fixture_dir)
+    if options.fixtures_only:
+        benchmark.create_fixtures()
+        return 0
+    result = run_benchmark(benchmark, options.repeat or benchmark_class.repeat,
+                           min_time=options.min_time)
+    with open(options.result_file, "w") as f:
+        json.dump(result, f, indent=2)
+    return 0
+
+
+# Comparison with baseline
+
+
+def compare_result(result, baseline, threshold, memory_threshold):
+    """
+    Compare a result with its baseline using the fastest time and the peak memory
+    :return: (status, time ratio, memory ratio) ratios are None if there's no comparable baseline
+    """
+    if result.get("status") == FAILED:
+        return FAILED, None, None
+    if baseline is None or baseline.get("params") != result["params"]:
+        return NEW, None, None
+    time_ratio = result["min"] / baseline["min"] if baseline["min"] > 0 else 1.0
+    memory_ratio = (result["peak_memory"] / baseline["peak_memory"]
+                    if baseline["peak_memory"] > 0 else 1.0)
+    if time_ratio > 1 + threshold or memory_ratio > 1 + memory_threshold:
+        status = REGRESSION
+    elif time_ratio < 1 - threshold:
+        status = IMPROVED
+    else:
+        status = OK
+    return status, time_ratio, memory_ratio
+
+
+def compare_results(results, baseline, threshold, memory_threshold):
+    """Add status, time_ratio and memory_ratio to each result"""
+    baseline_results = (baseline or {}).get("benchmarks", {})
+    for result in results:
+        status, time_ratio, memory_ratio = compare_result(
+            result, baseline_results.get(result["name"]), threshold, memory_threshold)
+        result.update({"status": status, "time_ratio": time_ratio,
+                       "memory_ratio": memory_ratio})
+    return results
+
+
+def load_baseline(file_name):
+    with open(file_name, "r") as f:
+        baseline = json.load(f)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError("Unsupported baseline version in {}".format(file_name))
+    return baseline
+
+
+def save_baseline(file_name, results, tech_name):
+    """Benchmarks that failed or weren't run keep their previous baseline"""
+    benchmarks = {}
+    if os.path.exists(file_name):
+        benchmarks = load_baseline(file_name)["benchmarks"]
+    for result in results:
+        if result["status"] != FAILED:
+            benchmarks[result["name"]] = {key: result[key] for key in
+                                          ["params", "times", "min", "median", "mean",
+                                           "peak_memory", "run_memory"]}
+    with open(file_name, "w") as f:
+        json.dump({"version": BASELINE_VERSION, "tech_name": tech_name,
+                   "benchmarks": benchmarks}, f, indent=2)
+
+
+def format_ratio(ratio):
+    if ratio is None:
+        return "-"
+    return "{:+.1f}%".format(100 * (ratio - 1))
+
+
+def format_report(results):
+    lines = ["{:<18} {:<11} {:>10} {:>10} {:>9} {:>12} {:>11} {:>9}".format(
+        "Benchmark", "Status", "Min (s)", "Median (s)", "Change", "Memory (MB)", "Run (MB)",
+        "Change")]
+    for result in results:
+        if result["status"] == FAILED:
+            lines.append("{:<18} {:<11} log: {}".format(result["name"], result["status"],
+                                                        result.get("log_file")))
+            continue
+        lines.append("{:<18} {:<11} {:>10.3f} {:>10.3f} {:>9} {:>12.1f} {:>11.1f} {:>9}".format(
+            result["name"], result["status"], result["min"], result["median"],
+            format_ratio(result["time_ratio"]), result["peak_memory"], result["run_memory"],
+            format_ratio(result["memory_ratio"])))
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    lines.append(", ".join("{} {}".format(value, key) for key, value in sorted(counts.items())))
+    return "\n".join(lines)
+
+
+def run_command(command, log_file, timeout):
+    with open(log_file, "w") as log:
+        try:
+            process = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT,
+                                     stdin=subprocess.DEVNULL, cwd=module_dir, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return None
+    return process.returncode
+
+
+def run_in_process(name, options, openram_args):
+    """Create the fixtures and then run one benchmark, each in a new python process"""
+    result_file = os.path.join(options.work_dir, name + ".json")
+    log_file = os.path.join(options.work_dir, name + ".log")
+    if os.path.exists(result_file):
+        os.remove(result_file)
+    command = [sys.executable, os.path.abspath(__file__), "--child", name,
+               "--result_file", result_file, "--work_dir", options.work_dir]
+    for option_name in ["repeat", "min_time", "num_rows", "num_cols", "sram_word_size", "sram_num_words",
+                        "sim_word_size", "sim_addresses", "sim_operations", "optimizer_stages"]:
+        value = getattr(options, option_name)
+        if value is not None:
+            command.extend(["--" + option_name, str(value)])
+    command.extend(openram_args)
+
+    returncode = 0
+    if get_benchmark_class(name).create_fixtures is not Benchmark.create_fixtures:
+        fixtures_log_file = os.path.join(options.work_dir, name + "_fixtures.log")
+        returncode = run_command(command + ["--fixtures_only"], fixtures_log_file, None)
+        if returncode != 0:
+            log_file = fixtures_log_file
+    if returncode == 0:
+        returncode = run_command(command, log_file, options.timeout)
+
+    if returncode == 0 and os.path.exists(result_file):
+        with open(result_file, "r") as f:
+            result = json.load(f)
+    else:
+        result = {"name": name, "status": FAILED}
+    result["log_file"] = log_file
+    return result
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark the compiler's hot paths")
+    parser.add_argument("-t", "--tech", dest="tech_name", default=None, help="Technology name")
+    parser.add_argument("--benchmarks", default=".*", help="Regex of benchmark names to run")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks")
+    parser.add_argument("--repeat", type=int, default=None,
+                        help="Number of timed runs per benchmark")
+    parser.add_argument("--min_time", type=float, default=1.0,
+                        help="Repeat fast benchmarks until they have run for this many seconds")
+    parser.add_argument("--baseline", default=None, help="Baseline json to compare with")
+    parser.add_argument("--save_baseline", default=None,
+                        help="Save the results to this baseline json")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative increase in time reported as a regression")
+    parser.add_argument("--memory_threshold", type=float, default=0.2,
+                        help="Relative increase in peak memory reported as a regression")
+    parser.add_argument("--report", default=None, help="Save the results as json")
+    parser.add_argument("--work_dir", default=None,
+                        help="Directory for logs and fixtures, fixtures are reused between runs")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Wall clock limit per benchmark in seconds")
+
+    parser.add_argument("--num_rows", type=int, default=128, help="Bank rows")
+    parser.add_argument("--num_cols", type=int, default=128, help="Bank columns")
+    parser.add_argument("--sram_word_size", type=int, default=32)
+    parser.add_argument("--sram_num_words", type=int, default=128)
+    parser.add_argument("--sim_word_size", type=int, default=32)
+    parser.add_argument("--sim_addresses", type=int, default=8,
+                        help="Number of addresses with saved memory states in the waveform")
+    parser.add_argument("--sim_operations", type=int, default=64,
+                        help="Number of reads and writes in the waveform")
+    parser.add_argument("--optimizer_stages", type=int, default=4,
+                        help="Number of buffer chain lengths to optimize")
+
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result_file", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--fixtures_only", action="store_true", help=argparse.SUPPRESS)
+    options, openram_args = parser.parse_known_args(args)
+    if options.tech_name:
+        openram_args = ["-t", options.tech_name] + openram_args
+    return options, openram_args
+
+
+def main():
+    options, openram_args = parse_args()
+    if options.child:
+        return run_child(options, openram_args)
+
+    names = [x.name for x in BENCHMARKS if re.search(options.benchmarks, x.name)]
+    if options.list:
+        for benchmark_class in BENCHMARKS:
+            print("{:<18} {}".format(benchmark_class.name, benchmark_class.description))
+        return 0
+
+    options.work_dir = os.path.abspath(options.work_dir or
+                                       tempfile.mkdtemp(prefix="openram_benchmark_"))
+    os.makedirs(options.work_dir, exist_ok=True)
+    baseline = load_baseline(options.baseline) if options.baseline else None
+    print("Running {} benchmarks, logs and fixtures in {}".format(len(names), options.work_dir),
+          flush=True)
+
+    results = []
+    for name in names:
+        result = run_in_process(name, options, openram_args)
+        compare_results([result], baseline, options.threshold, options.memory_threshold)
+        if result["status"] == FAILED:
+            print("{:<18} {}".format(name, FAILED), flush=True)
+        else:
+            print("{:<18} {:.3f}s {:.1f}MB {}".format(name, result["min"],
+                                                      result["peak_memory"], result["status"]),
+                  flush=True)
+        results.append(result)
+
+    print(format_report(results))
+    if options.report:
+        with open(options.report, "w") as f:
+            json.dump({"work_dir": options.work_dir, "threshold": options.threshold,
+                       "memory_threshold": options.memory_threshold, "results": results},
+                      f, indent=2)
+    if options.save_baseline:
+        save_baseline(options.save_baseline, results, options.tech_name)
+    return 0 if all(x["status"] not in [FAILED, REGRESSION] for x in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
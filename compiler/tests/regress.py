@@ -1,34 +1,236 @@
 #!/usr/bin/env python3
+"""
+Run the regression tests in a directory (tests/ by default or e.g. tests/reram/).
+Each test file runs in its own python process with its own temp directory
+(SCRATCH is set per test so OPTS.openram_temp is unique) so globals.init_openram,
+the module name caches and the temp files aren't shared between tests.
+Results are aggregated into one report with the wall time and peak memory of each test file.
+
+Usage: regress.py [-t tech] [-j jobs] [--pattern regex] [--failfast] [--timeout seconds]
+                  [--report report.json] [test directory] [extra test arguments]
+"""
+import argparse
+import json
 import os
 import re
+import shutil
+import signal
+import subprocess
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PATTERN = r"^[0-2]?[0-9].*test\.py$"
+
+PASSED = "passed"
+FAILED = "failed"
+TIMEOUT = "timeout"
+CANCELLED = "cancelled"
+
+
+class TestFileResult:
+    def __init__(self, test_file):
+        self.test_file = test_file
+        self.status = CANCELLED
+        self.returncode = None
+        self.duration = 0.0
+        self.peak_memory = 0.0  # MB
+        self.num_tests = 0
+        self.summary = ""
+        self.log_file = None
+
+    @property
+    def name(self):
+        return os.path.basename(self.test_file)
+
+    def parse_output(self, output):
+        """Number of tests and the final unittest summary line e.g. FAILED (errors=1)"""
+        match = re.findall(r"^Ran (\d+) tests? in", output, re.MULTILINE)
+        if match:
+            self.num_tests = int(match[-1])
+        match = re.findall(r"^(OK.*|FAILED.*)$", output, re.MULTILINE)
+        if match:
+            self.summary = match[-1].strip()
+
+    def to_dict(self):
+        return {"name": self.name, "status": self.status, "returncode": self.returncode,
+                "duration": self.duration, "peak_memory": self.peak_memory,
+                "num_tests": self.num_tests, "summary": self.summary, "log_file": self.log_file}
+
+
+class RegressionRunner:
+    def __init__(self, test_files, test_args=None, num_workers=None, failfast=False,
+                 timeout=None, work_dir=None):
+        """
+        :param test_files: test scripts to run
+        :param test_args: extra command line arguments for each test e.g. ["-t", "sky130"]
+        :param num_workers: number of concurrent test processes, defaults to cpu count
+        :param failfast: stop running tests after the first failure
+        :param timeout: wall clock limit per test file in seconds
+        :param work_dir: directory for logs and temp directories, a new temp dir by default
+        """
+        self.test_files = [os.path.abspath(x) for x in test_files]
+        self.test_args = list(test_args or [])
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.failfast = failfast
+        self.timeout = timeout
+        self.work_dir = os.path.abspath(work_dir or tempfile.mkdtemp(prefix="openram_regress_"))
+        self.stopped = threading.Event()
+        self.processes = set()
+        self.lock = threading.Lock()
+
+    def create_command(self, test_file):
+        return [sys.executable, test_file] + self.test_args
+
+    def create_environment(self, temp_dir):
+        env = dict(os.environ)
+        env["SCRATCH"] = temp_dir
+        env["PYTHONUNBUFFERED"] = "1"
+        return env
+
+    def run_test(self, test_file):
+        result = TestFileResult(test_file)
+        if self.stopped.is_set():
+            return result
+        test_name = os.path.splitext(result.name)[0]
+        temp_dir = os.path.join(self.work_dir, test_name)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+        result.log_file = os.path.join(self.work_dir, test_name + ".log")
+
+        start_time = time.time()
+        with open(result.log_file, "w") as log:
+            process = subprocess.Popen(self.create_command(test_file), stdout=log,
+                                       stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(test_file),
+                                       env=self.create_environment(temp_dir))
+            with self.lock:
+                self.processes.add(process)
+            timer = None
+            if self.timeout:
+                def kill():
+                    result.status = TIMEOUT
+                    process.kill()
+                timer = threading.Timer(self.timeout, kill)
+                timer.start()
+            # wait4 gives the peak memory of the child process
+            _, status, rusage = os.wait4(process.pid, 0)
+            if timer:
+                timer.cancel()
+            with self.lock:
+                self.processes.discard(process)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        result.duration = time.time() - start_time
+        result.returncode = process.returncode
+        # ru_maxrss is in KB on linux
+        result.peak_memory = rusage.ru_maxrss / 1024
+        with open(result.log_file, "r", errors="replace") as log:
+            result.parse_output(log.read())
+        if result.status == TIMEOUT:
+            pass
+        elif self.stopped.is_set() and process.returncode == -signal.SIGKILL:
+            result.status = CANCELLED  # killed after another test failed
+        else:
+            result.status = PASSED if process.returncode == 0 else FAILED
+        if result.status != PASSED and self.failfast:
+            self.stop()
+        return result
+
+    def stop(self):
+        """Skip the remaining tests and kill running tests"""
+        self.stopped.set()
+        with self.lock:
+            for process in self.processes:
+                process.kill()
+
+    def run(self, callback=None):
+        """
+        Run all the test files
+        :param callback: called with each TestFileResult as soon as it completes
+        :return: list of TestFileResult in the order of test_files
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            futures = [executor.submit(self.run_test, x) for x in self.test_files]
+            if callback:
+                for future in futures:
+                    future.add_done_callback(lambda x: callback(x.result()))
+            results = [future.result() for future in futures]
+        return results
+
+
+def find_tests(test_dir, pattern=DEFAULT_PATTERN):
+    name_test = re.compile(pattern, re.IGNORECASE)
+    files = sorted(filter(name_test.search, os.listdir(test_dir)))
+    return [os.path.join(test_dir, x) for x in files]
+
+
+def format_report(results, total_duration=None):
+    lines = ["{:<50} {:<10} {:>6} {:>10} {:>12}  {}".format("Test", "Status", "Tests",
+                                                            "Time (s)", "Memory (MB)",
+                                                            "Summary")]
+    for result in results:
+        lines.append("{:<50} {:<10} {:>6} {:>10.1f} {:>12.1f}  {}".format(
+            result.name, result.status, result.num_tests, result.duration,
+            result.peak_memory, result.summary))
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    summary = ", ".join("{} {}".format(value, key) for key, value in sorted(counts.items()))
+    if total_duration is not None:
+        summary += " in {:.1f}s".format(total_duration)
+    lines.append(summary)
+    for result in results:
+        if result.status in [FAILED, TIMEOUT]:
+            lines.append("{} log: {}".format(result.name, result.log_file))
+    return "\n".join(lines)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Run OpenRAM regression tests in parallel")
+    parser.add_argument("test_dir", nargs="?", default=os.path.abspath(os.path.dirname(__file__)),
+                        help="Directory with the tests e.g. tests/reram")
+    parser.add_argument("-t", "--tech", dest="tech_name", default=None, help="Technology name")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Number of concurrent tests, defaults to cpu count")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help="Test file name regex")
+    parser.add_argument("--failfast", action="store_true", help="Stop after the first failure")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Wall clock limit per test file in seconds")
+    parser.add_argument("--work_dir", default=None, help="Directory for logs and temp files")
+    parser.add_argument("--report", default=None, help="Save the results as json")
+    options, test_args = parser.parse_known_args(args)
+    if options.tech_name:
+        test_args = ["-t", options.tech_name] + test_args
+    return options, test_args
+
+
+def main():
+    options, test_args = parse_args()
+    test_files = find_tests(options.test_dir, options.pattern)
+    runner = RegressionRunner(test_files, test_args, num_workers=options.jobs,
+                              failfast=options.failfast, timeout=options.timeout,
+                              work_dir=options.work_dir)
+    print("Running {} test files with {} workers, logs in {}".format(
+        len(test_files), runner.num_workers, runner.work_dir), flush=True)
+
+    def print_result(result: TestFileResult):
+        if result.status != CANCELLED:
+            print("{:<50} {:<10} {:.1f}s".format(result.name, result.status, result.duration),
+                  flush=True)
+
+    start_time = time.time()
+    results = runner.run(callback=print_result)
+    total_duration = time.time() - start_time
+    print(format_report(results, total_duration))
+    if options.report:
+        with open(options.report, "w") as f:
+            json.dump({"duration": total_duration, "work_dir": runner.work_dir,
+                       "results": [x.to_dict() for x in results]}, f, indent=2)
+    return 0 if all(x.status == PASSED for x in results) else 1
+
 
-import unittest
-
-from testutils import header
-import globals
-(OPTS, args) = globals.parse_args()
-del sys.argv[1:]
-header(__file__, OPTS.tech_name)
-
-# get a list of all files in the tests directory
-files = os.listdir(os.path.abspath(os.path.dirname(__file__)))
-
-# assume any file that ends in "test.py" in it is a regression test
-#nametest = re.compile(".*(ptx|pinv|pnand*|pnor).*test\.py$", re.IGNORECASE)
-#nametest = re.compile(".*(pinv|pnand*|pnor).*test\.py$", re.IGNORECASE)
-#nametest = re.compile(".*(pinv*).*test\.py$", re.IGNORECASE)
-#nametest = re.compile("^(0[3-9])|(1[0-4]).*test\.py$", re.IGNORECASE)
-nametest = re.compile(r"^[0-2]?[0-9].*test\.py$", re.IGNORECASE)
-nametest = re.compile(r"^[1-2]?[4-9].*test\.py$", re.IGNORECASE)
-#nametest = re.compile("^2[3-9].*test\.py$", re.IGNORECASE)
-tests = list(filter(nametest.search, files))
-tests.sort()
-
-# import all of the modules
-moduleNames = list(map(lambda f: os.path.splitext(f)[0], tests))
-modules = list(map(__import__, moduleNames))
-suite = unittest.TestSuite()
-load = unittest.defaultTestLoader.loadTestsFromModule
-suite.addTests(list(map(load, modules)))
-unittest.TextTestRunner(verbosity=2, failfast=False).run(suite)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark evaluation of vertical spacing and well fills between bitline aligned arrays.
+Results are compared to the previous implementation which looped over all pairs of rects
+"""
+import argparse
+import itertools
+import sys
+import time
+
+from reram_test_base import ReRamTestBase
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--columns", default=64, type=int)
+parser.add_argument("--repeats", default=3, type=int)
+
+first_arg = sys.argv[0]
+options, other_args = parser.parse_known_args()
+# restore args for further OpenRAM options processing
+sys.argv = [first_arg] + other_args
+
+
+def reference_layer_spacing(layer, top_inst, bottom_inst, top_module, bottom_module,
+                            min_space, num_cols):
+    """Previous implementation of the per layer loop in evaluate_vertical_module_spacing"""
+    from base.design import design, POLY, PO_DUMMY, NIMP, PIMP
+    wide_space = design.get_wide_space(layer)
+
+    top_rects = top_inst.get_layer_shapes(layer, recursive=True)
+    top_rects = [x for x in top_rects if x.by() < wide_space]
+    top_rects = list(sorted(top_rects, key=lambda x: x.by()))
+
+    bottom_rects = bottom_inst.get_layer_shapes(layer, recursive=True)
+    bottom_rects = [x for x in bottom_rects
+                    if x.uy() > bottom_module.height - wide_space]
+    bottom_rects = list(sorted(bottom_rects, key=lambda x: x.uy(), reverse=True))
+
+    for bottom_rect in bottom_rects:
+        bottom_clearance = bottom_module.height - bottom_rect.uy()
+        for top_rect in top_rects:
+            top_clearance = top_rect.by()
+            total_clearance = top_clearance + bottom_clearance + min_space
+            if total_clearance > wide_space:
+                continue
+            if layer in [NIMP, PIMP] and total_clearance <= 0:
+                continue
+            widths = [bottom_rect.rx() - bottom_rect.lx(),
+                      top_rect.rx() - top_rect.lx()]
+            heights = [bottom_rect.uy() - bottom_rect.by(),
+                       top_rect.uy() - top_rect.by()]
+
+            if ((bottom_rect.rx() - bottom_rect.lx()) >= bottom_module.width and
+                    (top_rect.rx() - top_rect.lx()) >= top_module.width):
+                run_length = num_cols * bottom_module.width
+            else:
+                right_most = max([top_rect, bottom_rect], key=lambda x: x.lx())
+                left_most = min([top_rect, bottom_rect], key=lambda x: x.lx())
+                run_length = min(abs(right_most.rx()),
+                                 abs(left_most.rx() - right_most.lx()))
+
+            target_space = design.get_space_by_width_and_length(layer, max_width=max(widths),
+                                                                min_width=min(widths),
+                                                                run_length=run_length,
+                                                                heights=heights)
+            if layer in [POLY, PO_DUMMY]:
+                if top_rect.rx() - top_rect.lx() > top_rect.uy() - top_rect.by():
+                    target_space = bottom_module.poly_space
+                else:
+                    target_space = bottom_module.poly_vert_space
+            evaluated_space = -top_clearance + -bottom_clearance + target_space
+            if evaluated_space > min_space:
+                min_space = evaluated_space
+    return min_space
+
+
+def reference_fills(left_mod, right_mod, layer):
+    """Previous implementation of create_wells_and_implants_fills for one layer"""
+    from base.design import design
+    from base.geometry import instance
+    from base.utils import round_to_grid as round_g
+    all_fills = []
+    left_mod_rects = left_mod.get_layer_shapes(layer, recursive=True)
+    right_mod_rects = right_mod.get_layer_shapes(layer, recursive=True)
+    for left_mod_rect in left_mod_rects:
+        if (round_g(left_mod_rect.rx()) < round_g(left_mod.width) and
+                isinstance(left_mod, design)):
+            continue
+        for right_mod_rect in right_mod_rects:
+            if round_g(right_mod_rect.lx()) > 0 and isinstance(right_mod, design):
+                continue
+            if isinstance(left_mod, instance):
+                if round_g(right_mod_rect.lx()) > round_g(right_mod.lx()):
+                    continue
+                if round_g(left_mod_rect.rx()) < round_g(left_mod.rx()):
+                    continue
+                if round_g(right_mod_rect.lx()) <= round_g(left_mod_rect.lx()):
+                    continue
+            if left_mod_rect.by() < right_mod_rect.by():
+                lowest_rect, highest_rect = left_mod_rect, right_mod_rect
+            else:
+                lowest_rect, highest_rect = right_mod_rect, left_mod_rect
+            if lowest_rect.uy() < highest_rect.by():
+                continue
+            rect_top = min(right_mod_rect.uy(), left_mod_rect.uy())
+            rect_bottom = max(right_mod_rect.by(), left_mod_rect.by())
+            all_fills.append((layer, rect_bottom, rect_top, left_mod_rect, right_mod_rect))
+    return all_fills
+
+
+class VerticalModuleSpacingBenchmark(ReRamTestBase):
+
+    def create_arrays(self):
+        columns = options.columns
+        return {
+            "precharge": self.create_class_from_opts("precharge_array", columns=columns),
+            "sense_amp": self.create_class_from_opts("sense_amp_array", columns=columns,
+                                                     word_size=columns),
+            "write_driver": self.create_class_from_opts("write_driver_array", columns=columns,
+                                                        word_size=columns)
+        }
+
+    @staticmethod
+    def time_function(func):
+        start_time = time.time()
+        for _ in range(options.repeats):
+            result = func()
+        return result, (time.time() - start_time) / options.repeats
+
+    def test_vertical_module_spacing(self):
+        from base.design import METAL1, POLY, NIMP, PIMP, NWELL
+        from base.well_implant_fills import evaluate_layer_vertical_spacing
+        arrays = self.create_arrays()
+        layers = [METAL1, POLY, NIMP, PIMP, NWELL]
+        for (top_name, top_array), (bottom_name, bottom_array) in itertools.permutations(
+                arrays.items(), 2):
+            for kind in ["cell", "array"]:
+                if kind == "cell":
+                    top, bottom = top_array.child_mod, bottom_array.child_mod
+                else:
+                    top, bottom = top_array, bottom_array
+                for min_space in [-top.height, 0]:
+                    def reference():
+                        space = min_space
+                        for layer_ in layers:
+                            space = reference_layer_spacing(layer_, top, bottom, top, bottom,
+                                                            space, options.columns)
+                        return space
+
+                    def evaluate():
+                        space = min_space
+                        for layer_ in layers:
+                            top_rects = top.get_layer_shapes_summary(layer_, recursive=True)
+                            bottom_rects = bottom.get_layer_shapes_summary(layer_, recursive=True)
+                            space = evaluate_layer_vertical_spacing(
+                                layer_, top_rects.corners, bottom_rects.corners, top, bottom,
+                                space, options.columns)
+                        return space
+
+                    expected, reference_time = self.time_function(reference)
+                    actual, vectorized_time = self.time_function(evaluate)
+                    print("{} over {} {} (min_space={:.3g}): {:.3g}s -> {:.3g}s".format(
+                        top_name, bottom_name, kind, min_space, reference_time,
+                        vectorized_time), flush=True)
+                    self.assertEqual(expected, actual)
+
+    def test_well_implant_fills(self):
+        from base.design import NIMP, PIMP, NWELL
+        from base.vector import vector
+        from base.well_implant_fills import create_wells_and_implants_fills
+        arrays = self.create_arrays()
+        for name, array in arrays.items():
+            cell = array.child_mod
+            insts = array.child_insts[:2]
+            for left, right in [(cell, cell), (insts[0], insts[1])]:
+                for layer in [NIMP, PIMP, NWELL]:
+                    expected, reference_time = self.time_function(
+                        lambda: reference_fills(left, right, layer))
+                    actual, vectorized_time = self.time_function(
+                        lambda: create_wells_and_implants_fills(left, right, [layer]))
+                    print("{} {} fills: {:.3g}s -> {:.3g}s".format(
+                        name, layer, reference_time, vectorized_time), flush=True)
+
+                    def to_tuples(fills):
+                        return [(x[0], x[1], x[2], vector(x[3].lx(), x[3].by()),
+                                 vector(x[4].lx(), x[4].by())) for x in fills]
+                    self.assertEqual(to_tuples(expected), to_tuples(actual))
+
+
+VerticalModuleSpacingBenchmark.run_tests(__name__)
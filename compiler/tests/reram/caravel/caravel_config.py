@@ -28,6 +28,9 @@ rail_pitch = rail_width + rail_space
 
 mid_control_pins = ["clk", "sense_trig", "web"]
 
+# route sram to caravel connections with the A* maze router instead of fixed patterns
+use_maze_router = False
+
 
 class SramConfig:
     sram = None
@@ -0,0 +1,255 @@
+"""
+A* maze router on the m3 (horizontal) and m4 (vertical) tracks of a RoutingGrid.
+
+Cells are (layer, x_index, y_index): m3 cells move along x on a y track, m4 cells move along y
+on an x track and vias switch layers at the same grid point. Rails already in the RoutingGrid
+block other nets. Nets compete for cells using negotiated congestion: nets sharing cells
+are ripped up and rerouted with increasing present and history congestion costs until no
+cell is used by more than one net.
+"""
+import heapq
+import time
+from typing import Dict, List, Tuple
+
+import debug
+from router_mixin import GridNode, RoutingGrid
+
+M3 = 0
+M4 = 1
+
+Cell = Tuple[int, int, int]
+
+
+class NetRoute:
+    def __init__(self, name, net, sources: List[Cell], targets: List[Cell]):
+        """
+        :param name: unique name of the connection
+        :param net: electrical net, connections of the same net may share cells
+        :param sources: cells the route may start from
+        :param targets: cells the route may end at
+        """
+        self.name = name
+        self.net = net
+        self.sources = list(sources)
+        self.targets = list(targets)
+        self.cells = []  # type: List[Cell]
+        self.runtime = 0.0
+        self.num_routes = 0  # number of times the net was routed (including rip-ups)
+        self.wirelength = 0.0
+        self.num_vias = 0
+
+    @property
+    def routed(self):
+        return len(self.cells) > 0
+
+    def get_segments(self):
+        """(layer, start_cell, end_cell) for each straight run of the path"""
+        segments = []
+        if not self.cells:
+            return segments
+        start = previous = self.cells[0]
+        for cell in self.cells[1:]:
+            if cell[0] != start[0]:
+                segments.append((start[0], start, previous))
+                start = cell
+            previous = cell
+        segments.append((start[0], start, previous))
+        return segments
+
+    def get_corners(self):
+        """Grid points (x_index, y_index) at the ends of the path and at each via"""
+        corners = []
+        for _, start, end in self.get_segments():
+            for cell in [start, end]:
+                point = (cell[1], cell[2])
+                if not corners or corners[-1] != point:
+                    corners.append(point)
+        return corners
+
+    def __str__(self):
+        if not self.routed:
+            return f"{self.name}: unrouted"
+        return (f"{self.name}: wirelength = {self.wirelength:.4g}, vias = {self.num_vias}, "
+                f"runtime = {self.runtime:.3g}s ({self.num_routes} routes)")
+
+
+class MazeRouter:
+    def __init__(self, grid: RoutingGrid, via_cost=4, present_cost=1.0, present_cost_growth=2.0,
+                 history_cost=1.0, max_iterations=20):
+        """
+        :param grid: RoutingGrid with blockages and previously added rails
+        :param via_cost: cost of a via in units of track steps
+        :param present_cost: initial penalty per other net using a cell
+        :param present_cost_growth: growth factor of present_cost after each iteration
+        :param history_cost: penalty added to overused cells after each iteration
+        :param max_iterations: maximum number of rip-up and reroute iterations
+        """
+        self.grid = grid
+        self.via_cost = via_cost
+        self.present_cost = present_cost
+        self.present_cost_growth = present_cost_growth
+        self.history_cost = history_cost
+        self.max_iterations = max_iterations
+
+        self.num_x = len(grid.grid_x_offsets)
+        self.num_y = len(grid.grid_y_offsets)
+        self.routes = {}  # type: Dict[str, NetRoute]
+        # cell -> {net: number of routes of the net using the cell}
+        self.usage = {}  # type: Dict[Cell, Dict[str, int]]
+        self.history = {}  # type: Dict[Cell, float]
+
+    def add_route(self, name, sources: List[Cell], targets: List[Cell], net=None):
+        debug.check(name not in self.routes, "Route {} already added".format(name))
+        self.routes[name] = NetRoute(name, net or name, sources, targets)
+        return self.routes[name]
+
+    def get_route_order(self):
+        """Shorter routes first, ties broken by name so results are deterministic"""
+        def half_perimeter(route: NetRoute):
+            cells = route.sources + route.targets
+            x_indices = [x[1] for x in cells]
+            y_indices = [x[2] for x in cells]
+            return max(x_indices) - min(x_indices) + max(y_indices) - min(y_indices)
+        return sorted(self.routes.values(), key=lambda x: (half_perimeter(x), x.name))
+
+    def is_blocked(self, cell: Cell, net):
+        layer, x_index, y_index = cell
+        if layer == M3:
+            return self.grid.grid_x_nodes.overlaps(y_index, x_index, x_index, net)
+        return self.grid.grid_y_nodes.overlaps(x_index, y_index, y_index, net)
+
+    def get_neighbors(self, cell: Cell):
+        layer, x_index, y_index = cell
+        if layer == M3:
+            if x_index > 0:
+                yield (M3, x_index - 1, y_index), 1
+            if x_index < self.num_x - 1:
+                yield (M3, x_index + 1, y_index), 1
+            yield (M4, x_index, y_index), self.via_cost
+        else:
+            if y_index > 0:
+                yield (M4, x_index, y_index - 1), 1
+            if y_index < self.num_y - 1:
+                yield (M4, x_index, y_index + 1), 1
+            yield (M3, x_index, y_index), self.via_cost
+
+    def get_cell_cost(self, cell: Cell, net, present_cost):
+        users = self.usage.get(cell)
+        num_others = len(users) - (net in users) if users else 0
+        return (1 + self.history.get(cell, 0)) * (1 + present_cost * num_others)
+
+    def find_path(self, route: NetRoute, present_cost):
+        targets = set(route.targets)
+        x_indices = [x[1] for x in targets]
+        y_indices = [x[2] for x in targets]
+        min_x, max_x, min_y, max_y = min(x_indices), max(x_indices), min(y_indices), max(y_indices)
+
+        def heuristic(cell_):
+            _, x_, y_ = cell_
+            return max(min_x - x_, 0, x_ - max_x) + max(min_y - y_, 0, y_ - max_y)
+
+        terminals = set(route.sources) | targets
+        costs = {}
+        parents = {}
+        queue = []
+        counter = 0  # heap tie breaker, first pushed is first popped
+        for source in route.sources:
+            costs[source] = 0
+            parents[source] = None
+            heapq.heappush(queue, (heuristic(source), counter, 0, source))
+            counter += 1
+
+        while queue:
+            _, _, cell_cost, cell = heapq.heappop(queue)
+            if cell_cost > costs[cell]:
+                # a cheaper path to the cell was found after this was queued
+                continue
+            if cell in targets:
+                path = []
+                while cell is not None:
+                    path.append(cell)
+                    cell = parents[cell]
+                return list(reversed(path))
+            for neighbor, step_cost in self.get_neighbors(cell):
+                if neighbor not in terminals and self.is_blocked(neighbor, route.net):
+                    continue
+                cost = cell_cost + step_cost * self.get_cell_cost(neighbor, route.net, present_cost)
+                if cost < costs.get(neighbor, float("inf")):
+                    costs[neighbor] = cost
+                    parents[neighbor] = cell
+                    heapq.heappush(queue, (cost + heuristic(neighbor), counter, cost, neighbor))
+                    counter += 1
+        return []
+
+    def rip_up(self, route: NetRoute):
+        for cell in route.cells:
+            users = self.usage[cell]
+            users[route.net] -= 1
+            if users[route.net] == 0:
+                del users[route.net]
+        route.cells = []
+
+    def route_net(self, route: NetRoute, present_cost):
+        start_time = time.time()
+        self.rip_up(route)
+        route.cells = self.find_path(route, present_cost)
+        for cell in route.cells:
+            users = self.usage.setdefault(cell, {})
+            users[route.net] = users.get(route.net, 0) + 1
+        route.num_routes += 1
+        route.runtime += time.time() - start_time
+
+    def get_overused_cells(self):
+        return [cell for cell, users in self.usage.items() if len(users) > 1]
+
+    def route(self):
+        """Route all connections, rerouting connections on cells shared by different nets
+        until there is no congestion
+        :return: list of overused cells, empty on success"""
+        present_cost = self.present_cost
+        route_order = self.get_route_order()
+        to_route = route_order
+        overused = []
+        for iteration in range(self.max_iterations):
+            for route in to_route:
+                self.route_net(route, present_cost)
+            overused = self.get_overused_cells()
+            debug.info(2, "Maze routing iteration %d: %d overused cells", iteration, len(overused))
+            if not overused:
+                break
+            for cell in overused:
+                self.history[cell] = self.history.get(cell, 0) + self.history_cost
+            present_cost *= self.present_cost_growth
+            congested_nets = set(net for cell in overused for net in self.usage[cell])
+            to_route = [x for x in route_order if x.net in congested_nets]
+
+        for route in route_order:
+            self.evaluate_route(route)
+            debug.info(2, "Maze route %s", route)
+        unrouted = [x.name for x in route_order if not x.routed]
+        debug.check(not unrouted, "Maze router could not route: {}".format(unrouted))
+        return overused
+
+    def evaluate_route(self, route: NetRoute):
+        pitch = self.grid.grid_pitch
+        segments = route.get_segments()
+        route.num_vias = max(0, len(segments) - 1)
+        route.wirelength = pitch * sum(abs(end[1] - start[1]) + abs(end[2] - start[2])
+                                       for _, start, end in segments)
+
+    def add_routes_to_grid(self):
+        """Add routed segments to the RoutingGrid so they block subsequent routes"""
+        for route in self.get_route_order():
+            for layer, start, end in route.get_segments():
+                if layer == M3:
+                    self.grid.add_x_node(GridNode(start[2], route.net, start[1], end[1]))
+                else:
+                    self.grid.add_y_node(GridNode(start[1], route.net, start[2], end[2]))
+
+    def report(self):
+        routes = self.get_route_order()
+        lines = [str(x) for x in routes]
+        lines.append("Total: wirelength = {:.4g}, vias = {}, runtime = {:.3g}s".format(
+            sum(x.wirelength for x in routes), sum(x.num_vias for x in routes),
+            sum(x.runtime for x in routes)))
+        return "\n".join(lines)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test the A* maze router on synthetic pin sets over a RoutingGrid
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from reram_test_base import ReRamTestBase
+
+
+def create_bounding_box(x, y, width, height):
+    return SimpleNamespace(width=width, height=height, lx=lambda: x, rx=lambda: x + width,
+                           by=lambda: y, uy=lambda: y + height, cx=lambda: x + 0.5 * width,
+                           cy=lambda: y + 0.5 * height)
+
+
+class MazeRouterTest(ReRamTestBase):
+
+    @staticmethod
+    def create_grid():
+        """40 x 40 tracks with the sram in the middle"""
+        from router_mixin import RoutingGrid
+        caravel_box = create_bounding_box(0, 0, 245, 245)
+        sram_box = create_bounding_box(100, 100, 40, 40)
+        return RoutingGrid(sram_box, caravel_box)
+
+    def check_routes(self, router):
+        from maze_router import M3
+        cell_nets = {}
+        for route in router.routes.values():
+            self.assertTrue(route.routed, route.name)
+            self.assertIn(route.cells[0], route.sources)
+            self.assertIn(route.cells[-1], route.targets)
+            for previous, cell in zip(route.cells[:-1], route.cells[1:]):
+                if previous[0] == cell[0]:
+                    # m3 moves along x, m4 along y
+                    axis = 1 if cell[0] == M3 else 2
+                    other_axis = 3 - axis
+                    self.assertEqual(abs(previous[axis] - cell[axis]), 1)
+                    self.assertEqual(previous[other_axis], cell[other_axis])
+                else:
+                    self.assertEqual(previous[1:], cell[1:], "Vias don't move")
+            for cell in route.cells:
+                cell_nets.setdefault(cell, set()).add(route.net)
+                if cell not in route.sources + route.targets:
+                    self.assertFalse(router.is_blocked(cell, route.net))
+        shared = {cell: nets for cell, nets in cell_nets.items() if len(nets) > 1}
+        self.assertEqual(shared, {}, "Cells shouldn't be shared by different nets")
+
+    def test_via_cost_and_report(self):
+        from maze_router import MazeRouter, M3, M4
+        grid = self.create_grid()
+        router = MazeRouter(grid, via_cost=10)
+        route = router.add_route("a", [(M3, 2, 2)], [(M4, 8, 10)])
+        self.assertEqual(router.route(), [])
+        self.check_routes(router)
+        self.assertEqual(route.num_vias, 1)
+        self.assertAlmostEqual(route.wirelength, 14 * grid.grid_pitch)
+        self.assertEqual(route.get_corners(), [(2, 2), (8, 2), (8, 10)])
+        self.assertIn("a: wirelength", router.report())
+
+    def test_avoid_blockages(self):
+        from maze_router import MazeRouter, M3
+        grid = self.create_grid()
+        router = MazeRouter(grid)
+        # straight line through the sram region is blocked
+        y_index = grid.find_closest_index(120, grid.grid_y_offsets)
+        route = router.add_route("a", [(M3, 2, y_index)], [(M3, 37, y_index)])
+        router.route()
+        self.check_routes(router)
+        self.assertGreater(route.num_vias, 0)
+
+    def add_wall(self, grid, x_index, gaps):
+        """Block x_index on both layers except at gaps"""
+        from router_mixin import GridNode
+        num_y = len(grid.grid_y_offsets)
+        for y_index in range(num_y):
+            if y_index not in gaps:
+                grid.add_x_node(GridNode(y_index, "wall", x_index, x_index))
+                grid.add_y_node(GridNode(x_index, "wall", y_index, y_index))
+
+    def test_rip_up_and_reroute(self):
+        from maze_router import MazeRouter, M3
+        grid = self.create_grid()
+        self.add_wall(grid, 10, gaps=[5, 30])
+
+        def create_router():
+            router_ = MazeRouter(grid)
+            router_.add_route("a", [(M3, 2, 5)], [(M3, 18, 5)])
+            router_.add_route("b", [(M3, 2, 6)], [(M3, 18, 6)])
+            return router_
+
+        router = create_router()
+        self.assertEqual(router.route(), [])
+        self.check_routes(router)
+        # both nets initially use the closest gap, one is moved to the other gap after rip-up
+        gap_users = [name for name, route in router.routes.items() if (M3, 10, 30) in route.cells]
+        self.assertEqual(len(gap_users), 1)
+        self.assertTrue(all(x.num_routes > 1 for x in router.routes.values()))
+
+        # deterministic
+        other_router = create_router()
+        other_router.route()
+        for name, route in router.routes.items():
+            self.assertEqual(route.cells, other_router.routes[name].cells)
+
+        # committed routes block other nets
+        router.add_routes_to_grid()
+        self.assertTrue(router.is_blocked((M3, 10, 30), "c"))
+        self.assertFalse(router.is_blocked((M3, 10, 30), gap_users[0]))
+
+    def test_same_net_sharing(self):
+        from maze_router import MazeRouter, M3
+        grid = self.create_grid()
+        self.add_wall(grid, 10, gaps=[5])
+        router = MazeRouter(grid)
+        router.add_route("a_0", [(M3, 2, 5)], [(M3, 18, 5)], net="a")
+        router.add_route("a_1", [(M3, 2, 6)], [(M3, 18, 6)], net="a")
+        self.assertEqual(router.route(), [])
+        self.check_routes(router)
+        self.assertTrue(all(x.num_routes == 1 for x in router.routes.values()))
+
+    def test_terminal_index(self):
+        from router_mixin import RouterMixin, GridNode, INCREASING, DECREASING
+        grid = self.create_grid()
+        num_x = len(grid.grid_x_offsets)
+        grid.add_x_node(GridNode(5, "wall", 0, 3))
+        grid.add_x_node(GridNode(5, "wall", num_x - 2, num_x - 1))
+
+        def find(start_index, net, direction):
+            return RouterMixin.find_terminal_index(grid.grid_x_nodes, 5, start_index, num_x,
+                                                   net, direction)
+        self.assertEqual(find(1, "a", INCREASING), 4)
+        self.assertEqual(find(-3, "a", INCREASING), 4)
+        self.assertEqual(find(1, "wall", INCREASING), 1)
+        self.assertEqual(find(num_x + 3, "a", DECREASING), num_x - 3)
+        with self.assertRaises(AssertionError):
+            find(2, "a", DECREASING)
+        with self.assertRaises(AssertionError):
+            find(num_x - 2, "a", INCREASING)
+
+    def test_route_path_conversion(self):
+        from base.vector import vector
+        from maze_router import NetRoute, M3, M4
+        from router_mixin import RouterMixin
+
+        wrapper = RouterMixin.__new__(RouterMixin)
+        wrapper.grid_x_offsets = wrapper.grid_y_offsets = [2.0 * i for i in range(40)]
+        wrapper.mid_x = 40
+        wrapper.wrapper_inst = create_bounding_box(0, 0, 80, 200)
+        sram_pin = create_bounding_box(3.5, 10.2, 0.5, 0.4)  # cy = 10.4
+        right_pin = create_bounding_box(70, 20.5, 5, 1)  # cy = 21
+        left_pin = create_bounding_box(2, 30.5, 5, 1)  # cy = 31, rx = 7
+        top_pin = create_bounding_box(30.5, 190, 1, 5)  # cx = 31
+
+        def convert(cells, caravel_pin):
+            route = NetRoute("a", "a", cells[:1], cells[-1:])
+            route.cells = cells
+            return wrapper.get_maze_route_path(route, sram_pin, caravel_pin, sram_pin.rx())
+
+        def m3_cells(y_index, x_indices):
+            return [(M3, x, y_index) for x in x_indices]
+
+        def m4_cells(x_index, y_indices):
+            return [(M4, x_index, y) for y in y_indices]
+
+        # terminal segments jog from the grid to the pins
+        cells = m3_cells(5, range(2, 6)) + m4_cells(5, range(5, 11)) + m3_cells(10, range(5, 30))
+        self.assertEqual(convert(cells, right_pin),
+                         ([vector(4, 10.4), vector(10, 10.4), vector(10, 21), vector(70, 21)],
+                          False))
+        # single m3 segment jogs vertically to the pin
+        self.assertEqual(convert(m3_cells(5, range(2, 4)), left_pin),
+                         ([vector(4, 10.4), vector(6, 10.4), vector(6, 31), vector(7, 31)],
+                          False))
+        # top pins are connected from the caravel pin
+        cells = m3_cells(5, range(2, 16)) + m4_cells(15, range(5, 30))
+        self.assertEqual(convert(cells, top_pin),
+                         ([vector(31, 190), vector(31, 10.4), vector(4, 10.4)], True))
+        # via at the source
+        cells = m4_cells(2, range(5, 8)) + m3_cells(7, range(2, 30))
+        self.assertEqual(convert([(M3, 2, 5)] + cells, right_pin),
+                         ([vector(4, 10.4), vector(4, 21), vector(70, 21)], False))
+
+    def test_simplify_path(self):
+        from base.vector import vector
+        from router_mixin import RouterMixin
+        path = [vector(0, 0), vector(0, 0), vector(2, 0), vector(5, 0), vector(5, 3),
+                vector(5, 3), vector(5, 6), vector(1, 6)]
+        self.assertEqual(RouterMixin.simplify_path(path),
+                         [vector(0, 0), vector(5, 0), vector(5, 6), vector(1, 6)])
+
+
+MazeRouterTest.run_tests(__name__)
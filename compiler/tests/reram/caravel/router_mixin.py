@@ -1,3 +1,4 @@
+import bisect
 import math
 from typing import TYPE_CHECKING, List
 
@@ -87,6 +88,58 @@ class GridNode:
         return f"({self.grid_index}{net}): ({self.perp_start_index}, {self.perp_end_index})"
 
 
+class TrackOccupancy:
+    """
+    Occupied perpendicular index ranges of each track as sorted, disjoint (inclusive) segments.
+    Each segment holds the nets covering all of it so overlapping nodes are split at their
+    boundaries and collisions are checked with bisect over the segments on one track.
+    """
+
+    def __init__(self):
+        self.tracks = {}  # grid_index -> (starts, ends, nets)
+
+    def add_node(self, node: GridNode):
+        starts, ends, nets = self.tracks.setdefault(node.grid_index, ([], [], []))
+        start, end, net = node.perp_start_index, node.perp_end_index, node.net
+
+        first = bisect.bisect_left(ends, start)
+        last = bisect.bisect_right(starts, end)
+        new_segments = []
+        position = start
+        for i in range(first, last):
+            seg_start, seg_end, seg_nets = starts[i], ends[i], nets[i]
+            if seg_start < start:
+                new_segments.append((seg_start, start - 1, seg_nets))
+                seg_start = start
+            if position < seg_start:
+                new_segments.append((position, seg_start - 1, frozenset([net])))
+            new_segments.append((seg_start, min(seg_end, end), seg_nets | {net}))
+            if seg_end > end:
+                new_segments.append((end + 1, seg_end, seg_nets))
+            position = seg_end + 1
+        if position <= end:
+            new_segments.append((position, end, frozenset([net])))
+
+        starts[first:last] = [x[0] for x in new_segments]
+        ends[first:last] = [x[1] for x in new_segments]
+        nets[first:last] = [x[2] for x in new_segments]
+
+    def overlaps(self, grid_index, start_index, end_index, net):
+        """Whether a node of a net other than 'net' overlaps start_index->end_index on the track"""
+        track = self.tracks.get(grid_index)
+        if track is None:
+            return False
+        starts, ends, nets = track
+        start_index, end_index = sorted([start_index, end_index])
+        first = bisect.bisect_left(ends, start_index)
+        last = bisect.bisect_right(starts, end_index)
+        for i in range(first, last):
+            seg_nets = nets[i]
+            if len(seg_nets) > 1 or net not in seg_nets:
+                return True
+        return False
+
+
 class RoutingGrid:
     def __init__(self, sram_inst: instance, caravel_inst: instance):
         self.sram_inst = sram_inst
@@ -112,7 +165,7 @@ class RoutingGrid:
             sram_nodes.append(GridNode(grid_index=index, net="sram"))
 
         grid_indices = list(range(num_points))
-        grid_offsets = [start + x * grid_pitch for x in grid_indices]
+        grid_offsets = start + np.arange(num_points) * grid_pitch
 
         return grid_indices, grid_offsets, sram_nodes, start, end
 
@@ -127,51 +180,64 @@ class RoutingGrid:
         res = self.create_grid(span=self.caravel_inst.width,
                                sram_start=self.sram_inst.lx(),
                                sram_end=self.sram_inst.rx())
-        (self.grid_x_indices, self.grid_x_offsets, self.grid_y_nodes,
+        (self.grid_x_indices, self.grid_x_offsets, sram_y_nodes,
          self.start_x, self.end_x) = res
 
         res = self.create_grid(span=self.caravel_inst.height,
                                sram_start=self.sram_inst.by(),
                                sram_end=self.sram_inst.uy())
-        (self.grid_y_indices, self.grid_y_offsets, self.grid_x_nodes,
+        (self.grid_y_indices, self.grid_y_offsets, sram_x_nodes,
          self.start_y, self.end_y) = res
 
-        self.set_sram_start_end(self.grid_x_nodes, self.grid_y_nodes)
-        self.set_sram_start_end(self.grid_y_nodes, self.grid_x_nodes)
+        self.set_sram_start_end(sram_x_nodes, sram_y_nodes)
+        self.set_sram_start_end(sram_y_nodes, sram_x_nodes)
+
+        # x nodes are horizontal rails on y tracks, y nodes are vertical rails on x tracks
+        self.grid_x_nodes = self.create_occupancy()
+        self.grid_y_nodes = self.create_occupancy()
+        for node in sram_x_nodes:
+            self.add_x_node(node)
+        for node in sram_y_nodes:
+            self.add_y_node(node)
+
+    @staticmethod
+    def create_occupancy():
+        return TrackOccupancy()
+
+    def add_x_node(self, node: GridNode):
+        self.grid_x_nodes.add_node(node)
+
+    def add_y_node(self, node: GridNode):
+        self.grid_y_nodes.add_node(node)
 
     @staticmethod
     def find_closest_index(offset, all_offsets):
-        return np.argmin([abs(x - offset) for x in all_offsets])
+        # first index of the closest offset, like argmin, using the sorted offsets
+        index = int(np.searchsorted(all_offsets, offset))
+        if index == len(all_offsets) or (index > 0 and offset - all_offsets[index - 1] <=
+                                         all_offsets[index] - offset):
+            index -= 1
+        return index
 
     def find_open_index(self, offset, start, end, net, all_offsets, perp_offsets,
-                        grid_nodes: List[GridNode],
+                        grid_nodes: TrackOccupancy,
                         direction, closest):
         grid_index = self.find_closest_index(offset, all_offsets)
 
         start_index = self.find_closest_index(start, perp_offsets)
         end_index = self.find_closest_index(end, perp_offsets)
 
-        grid_nodes = sorted(grid_nodes, key=lambda x: x.grid_index)
         if direction == INCREASING:
-            candidate_nodes = [x for x in grid_nodes if x.grid_index >= grid_index]
-            valid_indices = [x for x in range(len(all_offsets)) if x >= grid_index]
+            valid_indices = range(grid_index, len(all_offsets))
         else:
-            valid_indices = [x for x in range(len(all_offsets)) if x <= grid_index]
-            candidate_nodes = [x for x in reversed(grid_nodes) if x.grid_index <= grid_index]
-            valid_indices = list(reversed(valid_indices))
+            valid_indices = range(grid_index, -1, -1)
 
         if not closest:
-            valid_indices = list(reversed(valid_indices))
-            candidate_nodes = list(reversed(candidate_nodes))
+            valid_indices = reversed(valid_indices)
 
         index = None
         for index in valid_indices:
-            collision = False
-            for node in candidate_nodes:
-                if node.grid_index == index and node.overlaps(start_index, end_index, net):
-                    collision = True
-                    break
-            if not collision:
+            if not grid_nodes.overlaps(index, start_index, end_index, net):
                 break
 
         return all_offsets[index]
@@ -255,7 +321,7 @@ class RouterMixin(CaravelWrapper):
         grid_index = self.grid.find_closest_index(y_mid, self.grid_y_offsets)
         node = GridNode(grid_index, net, start_index, end_index)
 
-        self.grid.grid_x_nodes.append(node)
+        self.grid.add_x_node(node)
 
     def add_y_rail(self, y_start, y_end, x_mid, net):
         y_start, y_end = sorted([y_start, y_end])
@@ -270,7 +336,7 @@ class RouterMixin(CaravelWrapper):
 
         node = GridNode(grid_index, net, start_index, end_index)
 
-        self.grid.grid_y_nodes.append(node)
+        self.grid.add_y_node(node)
 
     def add_m3m4_path(self, path, net, from_caravel):
 
@@ -428,6 +494,12 @@ class RouterMixin(CaravelWrapper):
 
         pin_names = self.sram_to_wrapper_conns.keys()
         pin_names = list(sorted(pin_names, key=process_order))
+
+        import caravel_config
+        if caravel_config.use_maze_router:
+            self.maze_route_sram_connections(pin_names, get_caravel_pin)
+            return
+
         for pin_name in pin_names:
             if "gnd" in pin_name or "vdd" in pin_name:
                 continue
@@ -435,6 +507,119 @@ class RouterMixin(CaravelWrapper):
             for pin in self.sram_inst.get_pins(pin_name):
                 self.route_sram_to_caravel(pin, caravel_pin_)
 
+    @staticmethod
+    def find_terminal_index(grid_nodes, track_index, start_index, num_indices, net, direction):
+        """First index in [0, num_indices) from start_index in direction that's not blocked
+        on the track"""
+        step = 1 if direction == INCREASING else -1
+        index = min(max(start_index, 0), num_indices - 1)
+        while 0 <= index < num_indices:
+            if not grid_nodes.overlaps(track_index, index, index, net):
+                return index
+            index += step
+        debug.error("No open terminal for net {} on track {} from index {}".format(
+            net, track_index, start_index), -1)
+
+    def maze_route_sram_connections(self, pin_names, get_caravel_pin):
+        from maze_router import MazeRouter, M3, M4
+
+        def x_index(offset):
+            return self.grid.find_closest_index(offset, self.grid_x_offsets)
+
+        def y_index(offset):
+            return self.grid.find_closest_index(offset, self.grid_y_offsets)
+
+        num_x, num_y = len(self.grid_x_offsets), len(self.grid_y_offsets)
+        router = MazeRouter(self.grid)
+        connections = []
+        for pin_name in pin_names:
+            if "gnd" in pin_name or "vdd" in pin_name:
+                continue
+            caravel_pin = get_caravel_pin(pin_name)
+            net = caravel_pin.name
+            for i, sram_pin in enumerate(self.sram_inst.get_pins(pin_name)):
+                # exit the sram horizontally on m3 at the first open x track
+                if caravel_pin.lx() <= sram_pin.cx():
+                    x_dir, x_start = DECREASING, sram_pin.lx()
+                else:
+                    x_dir, x_start = INCREASING, sram_pin.rx()
+                source_y = y_index(sram_pin.cy())
+                source_x = self.find_terminal_index(self.grid.grid_x_nodes, source_y,
+                                                    x_index(x_start), num_x, net, x_dir)
+                if self.is_top_pin(caravel_pin):
+                    target_x = x_index(caravel_pin.cx())
+                    target_y = self.find_terminal_index(self.grid.grid_y_nodes, target_x,
+                                                        num_y - 1, num_y, net, DECREASING)
+                    target = (M4, target_x, target_y)
+                else:
+                    if caravel_pin.cx() > self.mid_x:
+                        x_end, edge_dir = caravel_pin.lx(), DECREASING
+                    else:
+                        x_end, edge_dir = caravel_pin.rx(), INCREASING
+                    target_y = y_index(caravel_pin.cy())
+                    target_x = self.find_terminal_index(self.grid.grid_x_nodes, target_y,
+                                                        x_index(x_end), num_x, net, edge_dir)
+                    target = (M3, target_x, target_y)
+                route = router.add_route(f"{pin_name}_{i}", [(M3, source_x, source_y)],
+                                         [target], net=net)
+                connections.append((route, sram_pin, caravel_pin, x_start))
+
+        overused = router.route()
+        debug.info(1, "Maze routes:\n%s", router.report())
+        debug.check(not overused, "Maze router couldn't resolve congestion at cells {}".format(
+            overused[:10]))
+
+        for route, sram_pin, caravel_pin, x_start in connections:
+            path, from_caravel = self.get_maze_route_path(route, sram_pin, caravel_pin, x_start)
+            self.add_m3m4_path(path, route.net, from_caravel=from_caravel)
+
+    def get_maze_route_path(self, route, sram_pin, caravel_pin, x_start):
+        """Convert grid route to m3/m4 path from x_start on the sram pin to the caravel pin
+        :return: (path, from_caravel) path starts at the caravel pin if from_caravel"""
+        from maze_router import M3, M4
+        corners = route.get_corners()
+        points = [[self.grid_x_offsets[x], self.grid_y_offsets[y]] for x, y in corners]
+        # terminal segments connect to the pins which aren't on the grid
+        segments = route.get_segments()
+        points[0][1] = sram_pin.cy()
+        if segments[0][1] != segments[0][2]:
+            points[1][1] = sram_pin.cy()
+        points.insert(0, [x_start, sram_pin.cy()])
+        last_segment_length = int(segments[-1][1] != segments[-1][2])
+        if segments[-1][0] == M4:
+            for point in points[-1 - last_segment_length:]:
+                point[0] = caravel_pin.cx()
+            points.append([caravel_pin.cx(), caravel_pin.by()])
+        elif len(segments) == 1:
+            # straight m3 route, jog to the pin
+            points.append([points[-1][0], caravel_pin.cy()])
+        else:
+            for point in points[-1 - last_segment_length:]:
+                point[1] = caravel_pin.cy()
+        if segments[-1][0] == M3:
+            if caravel_pin.cx() > self.mid_x:
+                points.append([caravel_pin.lx(), caravel_pin.cy()])
+            else:
+                points.append([caravel_pin.rx(), caravel_pin.cy()])
+        path = self.simplify_path([vector(x, y) for x, y in points])
+        if self.is_top_pin(caravel_pin):
+            return list(reversed(path)), True
+        return path, False
+
+    @staticmethod
+    def simplify_path(path):
+        """Remove repeated points and points in the middle of straight lines"""
+        result = []
+        for point in path:
+            if result and point == result[-1]:
+                continue
+            if len(result) > 1 and (result[-2].x == result[-1].x == point.x or
+                                    result[-2].y == result[-1].y == point.y):
+                result[-1] = point
+            else:
+                result.append(point)
+        return result
+
     def add_power_grid(self):
         self.vert_power_grid = {key: [] for key in self.grid_names_set}
         self.horz_power_grid = {key: [] for key in self.grid_names_set}
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark finding open tracks in the caravel RoutingGrid for a synthetic wrapper.
+Results are compared to the previous implementation which scanned every node of the grid
+"""
+import argparse
+import os
+import sys
+import time
+from random import choice, seed, uniform
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from reram_test_base import ReRamTestBase
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--num_pins", default=1000, type=int)
+
+first_arg = sys.argv[0]
+options, other_args = parser.parse_known_args()
+# restore args for further OpenRAM options processing
+sys.argv = [first_arg] + other_args
+
+
+def create_bounding_box(x, y, width, height):
+    return SimpleNamespace(width=width, height=height, lx=lambda: x, rx=lambda: x + width,
+                           by=lambda: y, uy=lambda: y + height)
+
+
+class RoutingGridBenchmark(ReRamTestBase):
+
+    @staticmethod
+    def create_list_grid_class():
+        from router_mixin import RoutingGrid, GridNode, INCREASING
+
+        class ListRoutingGrid(RoutingGrid):
+            """Previous implementation: list of nodes sorted and scanned for each query"""
+
+            def create_x_y_grid(self):
+                super().create_x_y_grid()
+                self.grid_x_offsets = list(self.grid_x_offsets)
+                self.grid_y_offsets = list(self.grid_y_offsets)
+
+            @staticmethod
+            def create_occupancy():
+                return []
+
+            def add_x_node(self, node):
+                self.grid_x_nodes.append(node)
+
+            def add_y_node(self, node):
+                self.grid_y_nodes.append(node)
+
+            @staticmethod
+            def find_closest_index(offset, all_offsets):
+                return np.argmin([abs(x - offset) for x in all_offsets])
+
+            def find_open_index(self, offset, start, end, net, all_offsets, perp_offsets,
+                                grid_nodes, direction, closest):
+                grid_index = self.find_closest_index(offset, all_offsets)
+
+                start_index = self.find_closest_index(start, perp_offsets)
+                end_index = self.find_closest_index(end, perp_offsets)
+
+                grid_nodes = sorted(grid_nodes, key=lambda x: x.grid_index)
+                if direction == INCREASING:
+                    candidate_nodes = [x for x in grid_nodes if x.grid_index >= grid_index]
+                    valid_indices = [x for x in range(len(all_offsets)) if x >= grid_index]
+                else:
+                    valid_indices = [x for x in range(len(all_offsets)) if x <= grid_index]
+                    candidate_nodes = [x for x in reversed(grid_nodes) if x.grid_index <= grid_index]
+                    valid_indices = list(reversed(valid_indices))
+
+                if not closest:
+                    valid_indices = list(reversed(valid_indices))
+                    candidate_nodes = list(reversed(candidate_nodes))
+
+                index = None
+                for index in valid_indices:
+                    collision = False
+                    for node in candidate_nodes:
+                        if node.grid_index == index and node.overlaps(start_index, end_index, net):
+                            collision = True
+                            break
+                    if not collision:
+                        break
+
+                return all_offsets[index]
+
+        return ListRoutingGrid
+
+    @staticmethod
+    def create_pins(num_pins, sram_box, caravel_box):
+        from router_mixin import INCREASING, DECREASING
+        pins = []
+        for i in range(num_pins):
+            net = "net{}".format(i // 2)
+            sram_y = uniform(sram_box.by(), sram_box.uy())
+            if i % 2 == 0:
+                x_start, x_dir = sram_box.lx(), DECREASING
+                x_edge, edge_dir = 60, INCREASING
+            else:
+                x_start, x_dir = sram_box.rx(), INCREASING
+                x_edge, edge_dir = caravel_box.width - 60, DECREASING
+            caravel_y = uniform(60, caravel_box.height - 60)
+            y_dir = INCREASING if caravel_y <= sram_y else DECREASING
+            pins.append((net, x_start, x_dir, sram_y, caravel_y, y_dir, x_edge, edge_dir,
+                         choice([True, True, True, False])))
+        return pins
+
+    @staticmethod
+    def route_pins(grid, pins):
+        """Emulate route_sram_to_caravel: two vertical and one horizontal rail per pin"""
+        from router_mixin import GridNode
+        results = []
+        for net, x_start, x_dir, sram_y, caravel_y, y_dir, x_edge, edge_dir, closest in pins:
+            x_offset = grid.find_open_x(x_start, sram_y, caravel_y, net, direction=x_dir,
+                                        closest=closest)
+            y_offset = grid.find_open_y(caravel_y, x_offset, x_edge, net,
+                                        direction=y_dir, closest=closest)
+            x_bend = grid.find_open_x(x_edge, y_offset, caravel_y, net,
+                                      direction=edge_dir, closest=True)
+
+            def index(offset, offsets):
+                return grid.find_closest_index(offset, offsets)
+
+            x_offsets, y_offsets = grid.grid_x_offsets, grid.grid_y_offsets
+            for x, y_start, y_end in [(x_offset, sram_y, y_offset), (x_bend, y_offset, caravel_y)]:
+                grid.add_y_node(GridNode(index(x, x_offsets), net, index(y_start, y_offsets),
+                                         index(y_end, y_offsets)))
+            grid.add_x_node(GridNode(index(y_offset, y_offsets), net, index(x_offset, x_offsets),
+                                     index(x_bend, x_offsets)))
+            results.append((float(x_offset), float(y_offset), float(x_bend)))
+        return results
+
+    def test_find_open_tracks(self):
+        from router_mixin import RoutingGrid
+        seed(0)
+        caravel_box = create_bounding_box(0, 0, 2920, 3520)
+        sram_box = create_bounding_box(900, 1000, 1100, 1400)
+        pins = self.create_pins(options.num_pins, sram_box, caravel_box)
+
+        results = []
+        for grid_class in [self.create_list_grid_class(), RoutingGrid]:
+            start_time = time.time()
+            grid = grid_class(sram_box, caravel_box)
+            results.append(self.route_pins(grid, pins))
+            print("{}: {} pins in {:.3g}s".format(grid_class.__name__, options.num_pins,
+                                                  time.time() - start_time), flush=True)
+        self.assertEqual(results[0], results[1])
+
+
+RoutingGridBenchmark.run_tests(__name__)
@@ -9,8 +9,11 @@ If not, OpenRAM will continue as if nothing happened!
 """
 
 import debug
+from base import profiler
 from globals import OPTS, get_tool
 import tech
+from .workspace import verification_workspace, verify_modules, get_work_dir
+from .hierarchical import get_hierarchical_verifier
 
 debug.info(2,"Initializing verify...")
 
@@ -31,37 +34,44 @@ else:
 if OPTS.check_lvsdrc and OPTS.tech_name == "freepdk45":
     debug.check(OPTS.drc_exe[0]!="magic","Magic does not support FreePDK45 for DRC.")
 
-if OPTS.drc_exe == None:
-    pass
-elif "calibre" == OPTS.drc_exe[0]:
-    from .calibre import run_drc
-elif "assura" == OPTS.drc_exe[0]:
-    from .assura import run_drc
-elif "magic" == OPTS.drc_exe[0]:
-    from .magic import run_drc
-elif "klayout" == OPTS.drc_exe[0]:
-    from .klayout import run_drc
-else:
-    debug.warning("Did not find a supported DRC tool.")
+# tool name to the module implementing run_drc, run_lvs and run_pex for the tool
+BACKENDS = {
+    "drc": {"calibre": "calibre", "assura": "assura", "magic": "magic", "klayout": "klayout"},
+    "lvs": {"calibre": "calibre", "assura": "assura", "netgen": "magic"},
+    "pex": {"calibre": "calibre", "magic": "magic"},
+}
 
-if OPTS.lvs_exe == None:
-    pass
-elif "calibre"==OPTS.lvs_exe[0]:
-    from .calibre import run_lvs
-elif "assura"==OPTS.lvs_exe[0]:
-    from .assura import run_lvs
-elif "netgen"==OPTS.lvs_exe[0]:
-    from .magic import run_lvs
-else:
-    debug.warning("Did not find a supported LVS tool.")
+# The backend modules are imported on first use of run_drc/run_lvs/run_pex
+selected_backends = {}
+cache_verification = OPTS.cache_verification
+for _op_name in ["drc", "lvs", "pex"]:
+    # remove the functions loaded before a reload since the tools may have changed
+    globals().pop(f"run_{_op_name}", None)
+    _exe = getattr(OPTS, f"{_op_name}_exe")
+    if _exe is None:
+        continue
+    if _exe[0] in BACKENDS[_op_name]:
+        selected_backends[_op_name] = BACKENDS[_op_name][_exe[0]]
+    else:
+        debug.warning(f"Did not find a supported {_op_name.upper()} tool.")
 
 
-if OPTS.pex_exe == None:
-    pass
-elif "calibre"==OPTS.pex_exe[0]:
-    from .calibre import run_pex
-elif "magic"==OPTS.pex_exe[0]:
-    from .magic import run_pex
-else:
-    debug.warning("Did not find a supported PEX tool.")
+def load_backend(op_name):
+    """Import run_<op_name> from the selected tool module and wrap it for caching and profiling"""
+    import importlib
+    module = importlib.import_module("." + selected_backends[op_name], __name__)
+    run_func = getattr(module, f"run_{op_name}")
+    if cache_verification:
+        from .result_cache import wrap_verification
+        run_func = wrap_verification(op_name, run_func)
+    run_func = profiler.profile_function("verification", name=f"run_{op_name}",
+                                         module_arg=0)(run_func)
+    globals()[f"run_{op_name}"] = run_func
+    return run_func
+
 
+def __getattr__(name):
+    op_name = name[len("run_"):]
+    if name.startswith("run_") and op_name in selected_backends:
+        return load_backend(op_name)
+    raise AttributeError(f"module {__name__} has no attribute {name}")
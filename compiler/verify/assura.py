@@ -21,9 +21,10 @@ inserted in the runset.
 
 import os
 import re
+import subprocess
 
 import debug
-from globals import OPTS
+from .workspace import get_work_dir
 
 
 def run_drc(name, gds_name):
@@ -32,8 +33,9 @@ def run_drc(name, gds_name):
 
     from tech import drc
     drc_rules = drc["drc_rules"]
-    drc_runset = os.path.join(OPTS.openram_temp, name + ".rsf")
-    drc_log_file = os.path.join(OPTS.openram_temp, "{0}.log".format(name))
+    work_dir = get_work_dir()
+    drc_runset = os.path.join(work_dir, name + ".rsf")
+    drc_log_file = os.path.join(work_dir, "{0}.log".format(name))
 
     # write the runset file
     # the runset file contains all the options to run Assura
@@ -51,7 +53,7 @@ def run_drc(name, gds_name):
     f.write("avParameters(\n")
     f.write("  ?inputLayout ( \"gds2\" \"{}\" )\n".format(gds_name))
     f.write("  ?cellName \"{}\"\n".format(name))
-    f.write("  ?workingDirectory \"{}\"\n".format(OPTS.openram_temp))
+    f.write("  ?workingDirectory \"{}\"\n".format(work_dir))
     f.write("  ?rulesFile \"{}\"\n".format(drc_rules))
     f.write("  ?set ( \"GridCheck\" )\n")
     f.write("  ?avrpt t\n")
@@ -59,17 +61,14 @@ def run_drc(name, gds_name):
     f.close()
 
     # run drc
-    cwd = os.getcwd()
-    os.chdir(OPTS.openram_temp)
     cmd = "assura {0} 2> {1} 1> {2}".format(drc_runset, drc_log_file, drc_log_file)
     debug.info(1, cmd)
-    os.system(cmd)
-    os.chdir(cwd)
+    subprocess.call(cmd, shell=True, cwd=work_dir)
 
     # count and report errors
     errors = 0
     try:
-        f = open(OPTS.openram_temp+name+".err", "r")
+        f = open(os.path.join(work_dir, name + ".err"), "r")
     except:
         debug.error("Unable to retrieve DRC results file.",1)
     results = f.readlines()
@@ -91,12 +90,13 @@ def run_lvs(name, gds_name, sp_name):
        implemented in gds_name and sp_name. """
     from tech import drc
     lvs_rules = drc["lvs_rules"]
-    lvs_runset = os.path.join(OPTS.openram_temp, name + ".rsf")
+    work_dir = get_work_dir()
+    lvs_runset = os.path.join(work_dir, name + ".rsf")
     # The LVS compare rules must be defined in the tech file for Assura.
     lvs_compare = drc["lvs_compare"]
     # Define the must-connect names for disconnected LVS nets for Assura
     lvs_bindings = drc["lvs_bindings"]
-    lvs_log_file = os.path.join(OPTS.openram_temp, "{}.log".format(name))
+    lvs_log_file = os.path.join(work_dir, "{}.log".format(name))
     # Needed when FET models are sub-circuits
     if drc.has_key("lvs_subcircuits"):
         lvs_sub_file = drc["lvs_subcircuits"]
@@ -110,7 +110,7 @@ def run_lvs(name, gds_name, sp_name):
     f.write("avParameters(\n")
     f.write("  ?inputLayout ( \"gds2\" \"{}\" )\n".format(gds_name))
     f.write("  ?cellName \"{}\"\n".format(name))
-    f.write("  ?workingDirectory \"{}\"\n".format(OPTS.openram_temp))
+    f.write("  ?workingDirectory \"{}\"\n".format(work_dir))
     f.write("  ?rulesFile \"{}\"\n".format(lvs_rules))
     f.write("  ?autoGrid nil\n")
     f.write("  ?avrpt t\n")
@@ -143,16 +143,13 @@ def run_lvs(name, gds_name, sp_name):
     f.close()
 
     # run lvs
-    cwd = os.getcwd()
-    os.chdir(OPTS.openram_temp)
     cmd = "assura {0} 2> {1} 1> {2}".format(lvs_runset, lvs_log_file, lvs_log_file)
     debug.info(1, cmd)
-    os.system(cmd)
-    os.chdir(cwd)
+    subprocess.call(cmd, shell=True, cwd=work_dir)
 
     errors = 0
     try:
-        f = open(OPTS.openram_temp+name+".csm", "r")
+        f = open(os.path.join(work_dir, name + ".csm"), "r")
     except:
         debug.error("Unable to retrieve LVS results file.",1)
     results = f.readlines()
@@ -63,7 +63,7 @@ import re
 
 import debug
 from base import utils
-from base.utils import get_temp_file
+from .workspace import get_temp_file, get_work_dir
 from globals import OPTS
 import tech
 from tech import drc
@@ -106,7 +106,7 @@ def run_drc(cell_name, gds_name, exception_group=""):
 
     drc_runset = {
         'drcRulesFile': drc_rules,
-        'drcRunDir': OPTS.openram_temp,
+        'drcRunDir': get_work_dir(),
         'drcLayoutPaths': gds_name,
         'drcLayoutPrimary': cell_name,
         'drcLayoutSystem': 'GDSII',
@@ -135,7 +135,7 @@ def run_drc(cell_name, gds_name, exception_group=""):
 
     cmd = "{0} -gui -drc {1} -batch".format(OPTS.drc_exe[1], get_temp_file("drc_runset"))
     debug.info(2, cmd)
-    utils.run_command(cmd, outfile, errfile, verbose_level=3, cwd=OPTS.openram_temp)
+    utils.run_command(cmd, outfile, errfile, verbose_level=3, cwd=get_work_dir())
 
 
     # check the result for these lines in the summary:
@@ -207,7 +207,7 @@ def run_lvs(cell_name, gds_name, sp_name, final_verification=False):
     lvs_rules = drc["lvs_rules"]
     lvs_runset = {
         'lvsRulesFile': lvs_rules,
-        'lvsRunDir': OPTS.openram_temp,
+        'lvsRunDir': get_work_dir(),
         'lvsLayoutPaths': gds_name,
         'lvsLayoutPrimary': cell_name,
         'lvsSourcePath': sp_name,
@@ -249,7 +249,7 @@ def run_lvs(cell_name, gds_name, sp_name, final_verification=False):
 
     cmd = "{0} -gui -lvs {1} -batch".format(OPTS.lvs_exe[1], get_temp_file("lvs_runset"))
     debug.info(2, cmd)
-    utils.run_command(cmd, outfile, errfile, verbose_level=3, cwd=OPTS.openram_temp)
+    utils.run_command(cmd, outfile, errfile, verbose_level=3, cwd=get_work_dir())
 
     summary_errors = get_lvs_summary_errors(lvs_runset['lvsReportFile'])
 
@@ -335,7 +335,7 @@ def run_pex(cell_name, gds_name, sp_name, output=None, run_drc_lvs=True, correct
     pex_rules = drc["xrc_rules"]
     pex_runset = {
         'pexRulesFile': pex_rules,
-        'pexRunDir': OPTS.openram_temp,
+        'pexRunDir': get_work_dir(),
         'pexLayoutPaths': gds_name,
         'pexLayoutPrimary': cell_name,
         #'pexSourcePath' : OPTS.openram_temp+"extracted.sp",
@@ -373,7 +373,7 @@ def run_pex(cell_name, gds_name, sp_name, output=None, run_drc_lvs=True, correct
     cmd = "{0} -gui -pex {1} -batch ".format(OPTS.pex_exe[1],
                                                        get_temp_file("pex_runset"))
     debug.info(2, cmd)
-    utils.run_command(cmd, outfile, errfile, verbose_level=3, cwd=OPTS.openram_temp)
+    utils.run_command(cmd, outfile, errfile, verbose_level=3, cwd=get_work_dir())
 
     summary_errors = get_lvs_summary_errors(get_temp_file(cell_name + ".lvs.report"))
     if summary_errors > 0:
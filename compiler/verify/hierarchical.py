@@ -0,0 +1,214 @@
+"""
+Hierarchical DRC/LVS which verifies each unique module once.
+
+Modules which have passed are recorded by name (unique per Unique/design cache)
+and a hash of their gds/spice. A module is never re-verified while its content is unchanged.
+A parent whose sub-modules have all passed with their current content is verified in
+hierarchical (non-flattened) mode when the tool supports it. The sub-cells are not black-boxed
+in that mode so it still checks them; only skipped runs are counted as time saved.
+"""
+import hashlib
+import os
+import time
+
+import debug
+from globals import OPTS
+from .workspace import verification_workspace
+
+# tools for which sub-cells of an already verified hierarchy don't need to be flattened
+HIERARCHICAL_TOOLS = {
+    "drc": ["magic"],
+    "lvs": ["netgen"]
+}
+
+
+class VerificationRecord:
+    def __init__(self, module, content_hash, content_token):
+        self.name = module.name
+        self.content_hash = content_hash
+        # module's content token when content_hash was computed
+        self.content_token = content_token
+        self.drc = False
+        self.lvs = False
+        self.final_verification = False
+        # measured tool run time of the checks the module passed with its content
+        self.run_time = 0
+        self.hierarchical = False
+
+
+class HierarchicalVerifier:
+    def __init__(self):
+        self.records = {}
+        self.num_runs = 0
+        self.num_skipped = 0
+        self.time_saved = 0
+        self.run_time = 0
+
+    @staticmethod
+    def supports_hierarchical(op_name):
+        tool = getattr(OPTS, f"{op_name}_exe", None)
+        return bool(tool) and tool[0] in HIERARCHICAL_TOOLS[op_name]
+
+    @staticmethod
+    def get_unique_children(module):
+        children = {}
+        for inst in module.insts:
+            children[inst.mod.name] = inst.mod
+        return list(children.values())
+
+    def get_descendants(self, module, descendants=None):
+        """Unique sub-modules in post order (children before parents)"""
+        if descendants is None:
+            descendants = {}
+        for child in self.get_unique_children(module):
+            if child.name not in descendants:
+                self.get_descendants(child, descendants)
+                descendants[child.name] = child
+        return descendants
+
+    def is_verified(self, module, content_hash=None, drc=True, lvs=True,
+                    final_verification=False):
+        """Whether module has passed. Only checks the record if content_hash is None"""
+        record = self.records.get(module.name)
+        return (record is not None and
+                (content_hash is None or record.content_hash == content_hash) and
+                (record.drc or not drc) and (record.lvs or not lvs) and
+                (record.final_verification or not final_verification))
+
+    @staticmethod
+    def get_content_token(module):
+        """Cheap fingerprint of module's content. Changes when the layout of the module or its
+        sub-modules is changed through the layout API or when the module's conns are replaced"""
+        return module.get_geometry_token(), id(module.conns), len(module.conns)
+
+    @staticmethod
+    def write_content(module, work_dir):
+        """:return (gds file, spice file)"""
+        gds_file = os.path.join(work_dir, "temp.gds")
+        spice_file = os.path.join(work_dir, "temp.sp")
+        module.gds_write(gds_file)
+        module.sp_write(spice_file)
+        return gds_file, spice_file
+
+    def get_content_hash(self, module):
+        """Hash of module's current content.
+        Only re-writes the module if its content token changed since it was recorded"""
+        record = self.records.get(module.name)
+        content_token = self.get_content_token(module)
+        if record is not None and record.content_token == content_token:
+            return record.content_hash
+        with verification_workspace(module.name) as work_dir:
+            content_hash = self.hash_content(*self.write_content(module, work_dir))
+        if record is not None and record.content_hash == content_hash:
+            record.content_token = content_token
+        return content_hash
+
+    def children_verified(self, module, drc, lvs):
+        """Whether all of module's sub-modules have passed with their current content"""
+        descendants = list(self.get_descendants(module).values())
+        # check the records before writing the sub-modules for hashing
+        if not descendants or not all(self.is_verified(x, drc=drc, lvs=lvs) for x in descendants):
+            return False
+        return all(self.is_verified(x, self.get_content_hash(x), drc, lvs) for x in descendants)
+
+    @staticmethod
+    def hash_content(gds_file, spice_file):
+        from .result_cache import hash_gds, hash_file
+        hasher = hashlib.sha256()
+        hasher.update(hash_gds(gds_file).encode())
+        hasher.update(hash_file(spice_file).encode())
+        return hasher.hexdigest()
+
+    def verify(self, module, final_verification=False, drc=True, lvs=True):
+        """Verify module, skipping if it has already passed with the same content.
+        Runs in hierarchical mode if all of module's sub-modules have been verified."""
+        import verify
+
+        with verification_workspace(module.name) as work_dir:
+            content_token = self.get_content_token(module)
+            tempgds, tempspice = self.write_content(module, work_dir)
+            content_hash = self.hash_content(tempgds, tempspice)
+
+            previous = self.records.get(module.name)
+            if self.is_verified(module, content_hash, drc, lvs, final_verification):
+                previous.content_token = content_token
+                self.skip(previous)
+                return
+
+            children_verified = False
+            if ((drc and self.supports_hierarchical("drc")) or
+                    (lvs and self.supports_hierarchical("lvs"))):
+                children_verified = self.children_verified(module, drc, lvs)
+
+            record = VerificationRecord(module, content_hash, content_token)
+            start_time = time.time()
+            hierarchical = False
+            if drc:
+                kwargs = {}
+                if children_verified and self.supports_hierarchical("drc"):
+                    kwargs["flatten"] = False
+                    hierarchical = True
+                debug.check(verify.run_drc(module.name, tempgds,
+                                           exception_group=module.__class__.__name__,
+                                           **kwargs) == 0,
+                            "DRC failed for {0}".format(module.name))
+            if lvs:
+                kwargs = {}
+                if children_verified and self.supports_hierarchical("lvs"):
+                    kwargs["flatten"] = False
+                    hierarchical = True
+                debug.check(verify.run_lvs(module.name, tempgds, tempspice,
+                                           final_verification, **kwargs) == 0,
+                            "LVS failed for {0}".format(module.name))
+            run_time = time.time() - start_time
+
+        record.drc, record.lvs = drc, lvs
+        record.final_verification = final_verification
+        record.run_time = run_time
+        if previous is not None and previous.content_hash == content_hash:
+            record.drc |= previous.drc
+            record.lvs |= previous.lvs
+            record.final_verification |= previous.final_verification
+            record.run_time += previous.run_time
+        record.hierarchical = hierarchical
+        self.records[module.name] = record
+        self.num_runs += 1
+        self.run_time += run_time
+        debug.info(2, "Verified %s in %.3gs (%s)", module.name, run_time,
+                   "hierarchical" if hierarchical else "flat")
+
+    def skip(self, record):
+        self.num_skipped += 1
+        # hierarchical runs still check the sub-cells so only skipped runs save time
+        self.time_saved += record.run_time
+        debug.info(2, "Skipping verification of already verified %s", record.name)
+
+    def verify_hierarchy(self, module, final_verification=False, drc=True, lvs=True):
+        """Verify all unique modules in module's hierarchy from the leaves up"""
+        for child in self.get_descendants(module).values():
+            self.verify(child, drc=drc, lvs=lvs)
+        self.verify(module, final_verification=final_verification, drc=drc, lvs=lvs)
+
+    def report(self):
+        """Summary of verification runs and the time saved by skipped runs"""
+        summary = {
+            "runs": self.num_runs,
+            "skipped": self.num_skipped,
+            "hierarchical_runs": sum(x.hierarchical for x in self.records.values()),
+            "run_time": self.run_time,
+            "time_saved": self.time_saved
+        }
+        debug.info(1, "Verification: {runs} runs ({hierarchical_runs} hierarchical), "
+                      "{skipped} skipped, {run_time:.3g}s, "
+                      "{time_saved:.3g}s saved by skipped runs".format(**summary))
+        return summary
+
+    def clear(self):
+        self.__init__()
+
+
+verifier = HierarchicalVerifier()
+
+
+def get_hierarchical_verifier():
+    return verifier
@@ -5,15 +5,17 @@ from xml.etree import ElementTree
 import debug
 from base import utils
 from globals import OPTS
+from .workspace import get_work_dir
 
 
 def run_klayout(command_name, cell_name, rule_file, options):
     command = f"{OPTS.drc_exe[1]} -b -r {rule_file} {options}"
-    err_file = os.path.join(OPTS.openram_temp, f"{cell_name}.{command_name}.err")
-    out_file = os.path.join(OPTS.openram_temp, f"{cell_name}.{command_name}.out")
+    work_dir = get_work_dir()
+    err_file = os.path.join(work_dir, f"{cell_name}.{command_name}.err")
+    out_file = os.path.join(work_dir, f"{cell_name}.{command_name}.out")
 
     return_code = utils.run_command(command, stdout_file=out_file, stderror_file=err_file,
-                                    verbose_level=2, cwd=OPTS.openram_temp)
+                                    verbose_level=2, cwd=work_dir)
     return return_code, out_file, err_file
 
 
@@ -31,48 +33,86 @@ def create_options_str(cell_name, gds_name, command_name):
     return " ".join([f"-rd {key}={value}" for key, value in options.items()]), report_file
 
 
+# number of example violations kept per cell and category
+MAX_EXAMPLES = 10
+
+
 class DrcError:
     def __init__(self, item_node):
-        self.cell = item_node.find('cell').text
-        self.category = item_node.find('category').text.replace("'", "")
-        self.multiplicity = int(item_node.find('multiplicity').text)
-        self.values = item_node.find("values")
-
-    @staticmethod
-    def parse_rules(tree):
-        rules = tree.getroot().findall('./categories/category')
-        for rule in rules:
-            yield rule.find("name").text, rule.find("description").text
+        self.cell = item_node.findtext('cell')
+        self.category = item_node.findtext('category').replace("'", "")
+        self.multiplicity = int(item_node.findtext('multiplicity') or 1)
+        self.values = [value.text for value in item_node.iterfind("values/value")]
 
     @staticmethod
     def get_drc_exceptions(exception_group):
         from tech import drc_exceptions
-        ignored = drc_exceptions.get(exception_group, [])
+        ignored = list(drc_exceptions.get(exception_group, []))
         ignored += drc_exceptions.get("all", [])
         return ignored
 
     @staticmethod
-    def parse_errors(report_file, exception_group):
+    def parse_errors(report_file, exception_group, max_examples=MAX_EXAMPLES):
         ignored = DrcError.get_drc_exceptions(exception_group)
-
-        tree = ElementTree.parse(report_file)
-        rules = {key: value for key, value in DrcError.parse_rules(tree)}
-        errors = map(DrcError, tree.getroot().findall('./items/item'))
-        errors = [x for x in errors if x.category not in ignored]
-
-        errors = sorted(errors, key=lambda x: x.cell)
-        for cell, cell_errors in itertools.groupby(errors, key=lambda x: x.cell):
-            cell_errors = sorted(cell_errors, key=lambda x: x.category)
+        report = DrcReport(report_file, ignored=ignored, max_examples=max_examples)
+        report.print_summary()
+        return report.num_errors
+
+
+class DrcReport:
+    """
+    Violation counts per cell and category from a lyrdb report.
+    The report is streamed with iterparse and items are discarded once counted so memory
+    is bounded by the number of categories and examples kept rather than the report size.
+    """
+    def __init__(self, report_file, ignored=None, max_examples=MAX_EXAMPLES):
+        self.ignored = set(ignored or [])
+        self.max_examples = max_examples
+        self.rules = {}
+        self.counts = {}  # (cell, category) -> number of errors
+        self.examples = {}  # (cell, category) -> first max_examples DrcErrors
+        self.num_errors = 0
+        self.parse(report_file)
+
+    def parse(self, report_file):
+        # stack of open elements, needed to tell top level categories from item categories
+        stack = []
+        for event, element in ElementTree.iterparse(report_file, events=("start", "end")):
+            if event == "start":
+                stack.append(element)
+                continue
+            stack.pop()
+            parent = stack[-1] if stack else None
+            if parent is None:
+                continue
+            if element.tag == "item" and parent.tag == "items":
+                self.add_error(DrcError(element))
+                # drop processed items
+                parent.clear()
+            elif element.tag == "category" and parent.tag == "categories" and len(stack) == 2:
+                self.rules[element.findtext("name")] = element.findtext("description")
+                parent.remove(element)
+
+    def add_error(self, error):
+        if error.category in self.ignored:
+            return
+        self.num_errors += 1
+        key = (error.cell, error.category)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        examples = self.examples.setdefault(key, [])
+        if len(examples) < self.max_examples:
+            examples.append(error)
+
+    def print_summary(self):
+        for cell, cell_keys in itertools.groupby(sorted(self.counts), key=lambda x: x[0]):
             print(f"cell: {cell}")
-            for category, category_errors in itertools.groupby(cell_errors, key=lambda x: x.category):
-                category_errors = list(category_errors)
-                num_errors = (str(len(category_errors)) + " " * 5)[:5]
-                print(f"\t {num_errors}  {rules[category]}")
+            for key in cell_keys:
+                num_errors = (str(self.counts[key]) + " " * 5)[:5]
+                print(f"\t {num_errors}  {self.rules.get(key[1], key[1])}")
                 if OPTS.debug_level > 1:
-                    for category_error in category_errors:
-                        for value in category_error.values.findall("value"):
-                            print(f"\t\t\t\t {value.text}")
-        return len(errors)
+                    for example in self.examples[key]:
+                        for value in example.values:
+                            print(f"\t\t\t\t {value}")
 
 
 def run_drc(cell_name, gds_name, exception_group="", flatten=None):
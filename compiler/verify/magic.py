@@ -6,9 +6,11 @@ import os
 import pathlib
 import re
 import shutil
+import stat
 import subprocess
 
 import debug
+from .workspace import get_work_dir, copy_runset
 
 # for exporting from gds to mag
 magic_template = """
@@ -109,22 +111,17 @@ exit
 
 
 def get_run_script(op_name):
-    from globals import OPTS
-    work_dir = OPTS.openram_temp
+    work_dir = get_work_dir()
     return os.path.join(work_dir, f"setup_{op_name}.tcl")
 
 
 def generate_magic_script(gds, cell_name, flatten, op_name, template=None, **kwargs):
-    from globals import OPTS
     template = template or magic_template
     gds_file = os.path.abspath(gds)
 
-    work_dir = OPTS.openram_temp
+    work_dir = get_work_dir()
     pathlib.Path(work_dir).mkdir(parents=True, exist_ok=True)
-    magic_rc = os.environ.get("MAGIC_RC")
-
-    magic_rc_dest = os.path.join(work_dir, ".magicrc")
-    os.system(f"cp {magic_rc} {magic_rc_dest}")
+    copy_runset(os.environ.get("MAGIC_RC"), work_dir, ".magicrc")
 
     kwargs["cell_name"] = cell_name
     kwargs["gds_file"] = gds_file
@@ -193,16 +190,16 @@ def export_gds_to_magic(gds_file, cell_name=None, flatten=False):
 
 
 def run_script(script_file_name, cell_name, op_name, command_template=None):
-    from globals import OPTS
-    err_file = os.path.join(OPTS.openram_temp, f"{cell_name}.{op_name}.err")
-    out_file = os.path.join(OPTS.openram_temp, f"{cell_name}.{op_name}.out")
+    work_dir = get_work_dir()
+    err_file = os.path.join(work_dir, f"{cell_name}.{op_name}.err")
+    out_file = os.path.join(work_dir, f"{cell_name}.{op_name}.out")
     from base import utils
     if not command_template:
         command_template = "magic -dnull -noconsole {script_file_name}"
     command = command_template.format(script_file_name=script_file_name)
     debug.info(2, command)
     return_code = utils.run_command(command, stdout_file=out_file, stderror_file=err_file,
-                                    verbose_level=2, cwd=OPTS.openram_temp)
+                                    verbose_level=2, cwd=work_dir)
     return return_code, out_file, err_file
 
 
@@ -231,7 +228,8 @@ def run_drc(cell_name, gds_name, exception_group="", flatten=None):
     from tech import drc_exceptions
     debug.info(1, f"Running DRC for cell {cell_name}")
 
-    flatten = getattr(OPTS, "flat_drc", True)
+    if flatten is None:
+        flatten = getattr(OPTS, "flat_drc", True)
 
     if flatten:
         drc_cell_name = f"{cell_name}_flat"
@@ -355,7 +353,7 @@ def run_netgen(cell_name, lvs_cell_name, layout_spice, source_spice):
 
     with open(setup_script, "w") as f:
         f.write(netgen_template.format(**kwargs))
-    os.system("chmod +x {}".format(setup_script))
+    os.chmod(setup_script, os.stat(setup_script).st_mode | stat.S_IEXEC)
 
     return_code, out_file, err_file = run_script(None, cell_name, "lvs",
                                                  command_template=setup_script)
@@ -364,15 +362,18 @@ def run_netgen(cell_name, lvs_cell_name, layout_spice, source_spice):
     return return_code, out_file, report_file
 
 
-def run_lvs(cell_name, gds_name, sp_name, final_verification=False):
+def run_lvs(cell_name, gds_name, sp_name, final_verification=False, flatten=None):
     """Run LVS check on a given top-level name which is
     implemented in gds_name and sp_name. Final verification will
-    ensure that there are no remaining virtual conections. """
+    ensure that there are no remaining virtual conections.
+    Sub-cells are compared hierarchically if flatten is False"""
     from globals import OPTS
 
-    flatten = getattr(OPTS, "flat_lvs", True)
+    if flatten is None:
+        flatten = getattr(OPTS, "flat_lvs", True)
+    work_dir = get_work_dir()
 
-    mag_file = os.path.join(OPTS.openram_temp, f"{cell_name}.mag")
+    mag_file = os.path.join(work_dir, f"{cell_name}.mag")
     if not os.path.exists(mag_file) or os.path.getmtime(mag_file) < os.path.getmtime(gds_name):
         run_script(generate_magic_script(gds_name, cell_name, True,
                                          "export", **{"other_commands": "writeall force\n"}),
@@ -380,9 +381,9 @@ def run_lvs(cell_name, gds_name, sp_name, final_verification=False):
 
     generate_lvs_spice(mag_file, sp_name, final_verification, flatten)
 
-    gen_layout_spice = os.path.join(OPTS.openram_temp, f"{cell_name}.spice")
+    gen_layout_spice = os.path.join(work_dir, f"{cell_name}.spice")
     # to prevent overwrites during pex
-    layout_spice = os.path.join(OPTS.openram_temp, f"{cell_name}.lvs.spice")
+    layout_spice = os.path.join(work_dir, f"{cell_name}.lvs.spice")
     shutil.copy2(gen_layout_spice, layout_spice)
 
     if os.path.getmtime(layout_spice) < os.path.getmtime(gds_name):
@@ -438,8 +439,7 @@ def run_pex(cell_name, gds_name, sp_name, output=None,
             exception_group=""):
     """Run pex on a given top-level name which is
        implemented in gds_name and sp_name. """
-    from globals import OPTS
-    work_dir = OPTS.openram_temp
+    work_dir = get_work_dir()
 
     port_spice_file = port_spice_file or sp_name
 
@@ -448,7 +448,7 @@ def run_pex(cell_name, gds_name, sp_name, output=None,
 
     lvs_report = os.path.join(work_dir, f"{cell_name}.lvs.report")
 
-    mag_file = os.path.join(OPTS.openram_temp, f"{cell_name}.mag")
+    mag_file = os.path.join(work_dir, f"{cell_name}.mag")
 
     if run_drc_lvs or not os.path.exists(mag_file) or not os.path.exists(lvs_report):
         debug.info(1, "Forcing DRC + LVS runs before PEX")
@@ -0,0 +1,305 @@
+"""
+Content-addressed cache of DRC/LVS/PEX results.
+
+Each result is keyed by a hash of the gds, the spice netlist, the tech rule decks, the tool
+and the options that affect the verification run. A cache entry is a directory holding
+result.json (return value of the verification function and metadata) together with copies of
+the reports and extracted netlists generated by the run. Cache hits restore those files to the
+current work directory (or original locations for explicit outputs) without invoking the
+verification tool.
+"""
+import glob
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import debug
+from base import utils
+from globals import OPTS
+from .workspace import get_work_dir
+
+RESULT_FILE = "result.json"
+CACHE_VERSION = 2
+
+# arguments whose file contents (rather than file names) determine the result
+FILE_ARGUMENTS = ["gds_name", "sp_name", "port_spice_file"]
+# arguments that only specify where outputs are written
+OUTPUT_ARGUMENTS = ["output"]
+# BGNLIB and BGNSTR gds record types
+DATED_GDS_RECORDS = [0x01, 0x05]
+# rule decks and tool setup files
+RULE_DECK_ENV = ["KLAYOUT_DRC_DECK", "KLAYOUT_LVS_DECK", "MAGIC_RC", "NETGEN_RC"]
+RULE_DECK_TECH = ["drc_rules", "lvs_rules", "xrc_rules"]
+# OPTS attributes that modify verification behavior
+OPTION_NAMES = {
+    "drc": ["flat_drc", "klayout_drc_options", "klayout_report_name"],
+    "lvs": ["flat_lvs", "lvs_extract_style"],
+    "pex": ["flat_lvs", "lvs_extract_style"]
+}
+
+
+def get_cache_dir():
+    cache_dir = OPTS.verification_cache_dir
+    if cache_dir is None:
+        cache_dir = os.path.join(OPTS.openram_temp, "verification_cache")
+    return os.path.abspath(cache_dir)
+
+
+def hash_file(file_name, hasher=None):
+    hasher = hasher or hashlib.sha256()
+    with open(file_name, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def hash_gds(file_name, hasher=None):
+    """Hash gds records excluding the dates in BGNLIB/BGNSTR records
+    which change each time the same layout is generated"""
+    hasher = hasher or hashlib.sha256()
+    with open(file_name, "rb") as f:
+        data = f.read()
+    offset = 0
+    data_len = len(data)
+    while offset + 4 <= data_len:
+        record_len = int.from_bytes(data[offset:offset + 2], "big")
+        if record_len < 4:  # null padding at the end of the stream
+            break
+        if data[offset + 2] in DATED_GDS_RECORDS:
+            hasher.update(data[offset:offset + 4])
+        else:
+            hasher.update(data[offset:offset + record_len])
+        offset += record_len
+    hasher.update(data[offset:])
+    return hasher.hexdigest()
+
+
+def hash_input_file(file_name):
+    if file_name.lower().endswith(".gds"):
+        return hash_gds(file_name)
+    return hash_file(file_name)
+
+
+def get_rule_decks():
+    """Rule deck/setup files currently in use"""
+    import tech
+    rule_decks = [os.environ.get(x) for x in RULE_DECK_ENV]
+    tech_drc = getattr(tech, "drc", {})
+    rule_decks += [tech_drc[x] for x in RULE_DECK_TECH if x in tech_drc]
+    return [x for x in rule_decks if isinstance(x, str) and os.path.isfile(x)]
+
+
+def get_tool(op_name):
+    tool = getattr(OPTS, f"{op_name}_exe", None)
+    if tool is None:
+        return None
+    tool = list(tool)
+    executable = tool[-1]
+    if isinstance(executable, str) and os.path.isfile(executable):
+        # detect tool upgrades
+        tool.append(os.path.getmtime(executable))
+    return tool
+
+
+def get_cache_key(op_name, arguments):
+    """Hash of everything that could change the result of op_name(**arguments)"""
+    import tech
+    key_data = {
+        "version": CACHE_VERSION,
+        "operation": op_name,
+        "tool": get_tool(op_name),
+        "rule_decks": {x: hash_file(x) for x in get_rule_decks()},
+        "options": {x: getattr(OPTS, x, None) for x in OPTION_NAMES.get(op_name, [])},
+        "arguments": {}
+    }
+    for name, value in arguments.items():
+        if name in OUTPUT_ARGUMENTS:
+            continue
+        if name in FILE_ARGUMENTS and value is not None:
+            value = hash_input_file(value)
+        key_data["arguments"][name] = value
+    exception_group = arguments.get("exception_group")
+    if exception_group is not None:
+        drc_exceptions = getattr(tech, "drc_exceptions", {})
+        key_data["drc_exceptions"] = [drc_exceptions.get(exception_group),
+                                      drc_exceptions.get("all")]
+    key_str = json.dumps(key_data, sort_keys=True, default=str)
+    return hashlib.sha256(key_str.encode()).hexdigest()
+
+
+def get_output_dirs(arguments):
+    """Directories reports are written to. Cached files are stored relative to these
+    since each verification run may use a different workspace"""
+    return {
+        "work_dir": os.path.abspath(get_work_dir()),
+        "gds_dir": os.path.dirname(os.path.abspath(arguments["gds_name"]))
+    }
+
+
+def get_output_files(op_name, arguments, start_time):
+    """Reports and netlists generated by the verification run"""
+    cell_name = arguments["cell_name"]
+    search_dirs = set(get_output_dirs(arguments).values())
+    candidates = set()
+    for search_dir in search_dirs:
+        candidates.update(glob.glob(os.path.join(search_dir, f"{cell_name}.{op_name}*")))
+    for name in OUTPUT_ARGUMENTS:
+        if arguments.get(name):
+            candidates.add(arguments[name])
+    output_files = []
+    for file_name in sorted(candidates):
+        file_name = os.path.abspath(file_name)
+        if os.path.isfile(file_name) and utils.modified_since(file_name, start_time):
+            output_files.append(file_name)
+    return output_files
+
+
+def load_entry(key):
+    entry_dir = os.path.join(get_cache_dir(), key)
+    result_file = os.path.join(entry_dir, RESULT_FILE)
+    if not os.path.exists(result_file):
+        return None
+    try:
+        with open(result_file, "r") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    entry["key"] = key
+    entry["directory"] = entry_dir
+    entry["last_used"] = os.path.getmtime(result_file)
+    return entry
+
+
+def restore_entry(entry, arguments):
+    """Copy cached reports back to where the verification tool would have written them"""
+    output_dirs = get_output_dirs(arguments)
+    for stored_name, (location, file_name) in entry["files"].items():
+        stored_path = os.path.join(entry["directory"], stored_name)
+        if not os.path.exists(stored_path):
+            return False
+        if location in output_dirs:
+            file_name = os.path.join(output_dirs[location], file_name)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        shutil.copy(stored_path, file_name)
+    os.utime(os.path.join(entry["directory"], RESULT_FILE))
+    return True
+
+
+def save_entry(key, op_name, arguments, result, output_files, run_time):
+    cache_dir = get_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    # populate a temporary directory first so concurrent readers never see partial entries
+    temp_dir = tempfile.mkdtemp(prefix=f".{key}.", dir=cache_dir)
+    output_dirs = get_output_dirs(arguments)
+    explicit_outputs = [os.path.abspath(arguments[x]) for x in OUTPUT_ARGUMENTS
+                        if arguments.get(x)]
+    files = {}
+    for i, file_name in enumerate(output_files):
+        stored_name = f"{i}_{os.path.basename(file_name)}"
+        shutil.copy2(file_name, os.path.join(temp_dir, stored_name))
+        location = "absolute"
+        if file_name not in explicit_outputs:
+            for dir_name, output_dir in output_dirs.items():
+                if os.path.dirname(file_name) == output_dir:
+                    location, file_name = dir_name, os.path.basename(file_name)
+                    break
+        files[stored_name] = [location, file_name]
+    entry = {
+        "operation": op_name,
+        "cell_name": arguments["cell_name"],
+        "result": result,
+        "files": files,
+        "created": time.time(),
+        "run_time": run_time
+    }
+    with open(os.path.join(temp_dir, RESULT_FILE), "w") as f:
+        json.dump(entry, f, indent=2)
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.exists(entry_dir):
+        shutil.rmtree(entry_dir, ignore_errors=True)
+    try:
+        os.rename(temp_dir, entry_dir)
+    except OSError:
+        # another process saved the same entry
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def wrap_verification(op_name, run_func):
+    """Wrap verify.run_drc/run_lvs/run_pex to be served from the cache when inputs are unchanged.
+    Results are only saved when run_func returns, failing runs abort before then"""
+    signature = inspect.signature(run_func)
+
+    def wrapped(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        key = get_cache_key(op_name, arguments)
+
+        entry = load_entry(key)
+        if entry is not None and restore_entry(entry, arguments):
+            debug.info(1, "Using cached %s result for %s (%s)", op_name.upper(),
+                       arguments["cell_name"], key[:12])
+            return entry["result"]
+
+        start_time = time.time()
+        result = run_func(*args, **kwargs)
+        run_time = time.time() - start_time
+        output_files = get_output_files(op_name, arguments, start_time)
+        save_entry(key, op_name, arguments, result, output_files, run_time)
+        return result
+
+    wrapped.__wrapped__ = run_func
+    wrapped.__doc__ = run_func.__doc__
+    return wrapped
+
+
+def list_entries(operation=None, cell_name=None):
+    """All cache entries sorted by most recently used first"""
+    cache_dir = get_cache_dir()
+    if not os.path.isdir(cache_dir):
+        return []
+    entries = []
+    for key in os.listdir(cache_dir):
+        if key.startswith("."):
+            continue
+        entry = load_entry(key)
+        if entry is None:
+            continue
+        if operation is not None and entry["operation"] != operation:
+            continue
+        if cell_name is not None and entry["cell_name"] != cell_name:
+            continue
+        entry["size"] = sum(os.path.getsize(x) for x in
+                            glob.glob(os.path.join(entry["directory"], "*")))
+        entries.append(entry)
+    return list(sorted(entries, key=lambda x: x["last_used"], reverse=True))
+
+
+def prune(max_age=None, max_size=None, operation=None, cell_name=None):
+    """Remove entries not used within max_age seconds and then least recently used entries
+    until the total cache size is at most max_size bytes.
+    With neither max_age nor max_size, all matching entries are removed.
+    Returns the list of removed entries"""
+    entries = list_entries(operation=operation, cell_name=cell_name)
+    current_time = time.time()
+    removed = []
+    total_size = 0
+    for entry in entries:
+        if max_age is None and max_size is None:
+            remove = True
+        elif max_age is not None and current_time - entry["last_used"] > max_age:
+            remove = True
+        elif max_size is not None and total_size + entry["size"] > max_size:
+            remove = True
+        else:
+            remove = False
+            total_size += entry["size"]
+        if remove:
+            shutil.rmtree(entry["directory"], ignore_errors=True)
+            removed.append(entry)
+    debug.info(1, "Pruned %d verification cache entries", len(removed))
+    return removed
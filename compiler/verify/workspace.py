@@ -0,0 +1,138 @@
+"""
+Isolated scratch directories for verification runs.
+
+Each verification request gets a unique directory (created with mkdtemp so it is unique across
+threads and processes) holding the gds/spice inputs, tool runsets and reports.
+The active directory is tracked per thread so concurrent checks don't overwrite each other.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import debug
+from globals import OPTS
+
+_thread_state = threading.local()
+
+
+def get_work_dir():
+    """Work directory of the current thread's verification or OPTS.openram_temp"""
+    work_dir = getattr(_thread_state, "work_dir", None)
+    return work_dir or OPTS.openram_temp
+
+
+def get_temp_file(file_name):
+    return os.path.join(get_work_dir(), file_name)
+
+
+def get_workspace_root():
+    return os.path.join(OPTS.openram_temp, "workspaces")
+
+
+def create_workspace(name):
+    workspace_root = get_workspace_root()
+    os.makedirs(workspace_root, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f"{name}_", dir=workspace_root)
+
+
+@contextmanager
+def use_work_dir(work_dir):
+    """Use work_dir for verification runs in the current thread"""
+    previous = getattr(_thread_state, "work_dir", None)
+    _thread_state.work_dir = work_dir
+    try:
+        yield work_dir
+    finally:
+        _thread_state.work_dir = previous
+
+
+@contextmanager
+def verification_workspace(name):
+    """Create a unique workspace and use it for verification runs in the current thread.
+    The workspace is removed if no exception is raised otherwise it's preserved for debugging"""
+    work_dir = create_workspace(name)
+    with use_work_dir(work_dir):
+        yield work_dir
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def copy_runset(source, work_dir, dest_name=None):
+    """Copy tool setup file into work_dir if it is missing or outdated"""
+    if not source or not os.path.exists(source):
+        return None
+    dest = os.path.join(work_dir, dest_name or os.path.basename(source))
+    if os.path.exists(dest) and os.path.getmtime(dest) >= os.path.getmtime(source):
+        return dest
+    # copy to a unique name first so concurrent copies never leave a partial file
+    fd, temp_name = tempfile.mkstemp(prefix=".runset", dir=work_dir)
+    os.close(fd)
+    shutil.copy(source, temp_name)
+    os.replace(temp_name, dest)
+    return dest
+
+
+class VerificationResult:
+    def __init__(self, module_name, work_dir):
+        self.module_name = module_name
+        self.work_dir = work_dir
+        self.drc_errors = None
+        self.lvs_errors = None
+        self.error = None
+
+    @property
+    def passed(self):
+        return self.error is None and not self.drc_errors and not self.lvs_errors
+
+    def __repr__(self):
+        return f"VerificationResult({self.module_name}: drc={self.drc_errors}, " \
+               f"lvs={self.lvs_errors}, error={self.error})"
+
+
+def run_module_verification(module, result, drc, lvs, final_verification):
+    import verify
+    tempgds = os.path.join(result.work_dir, "temp.gds")
+    tempspice = os.path.join(result.work_dir, "temp.sp")
+    with use_work_dir(result.work_dir):
+        try:
+            if drc:
+                result.drc_errors = verify.run_drc(module.name, tempgds,
+                                                   exception_group=module.__class__.__name__)
+            if lvs:
+                result.lvs_errors = verify.run_lvs(module.name, tempgds, tempspice,
+                                                   final_verification)
+        except (AssertionError, OSError) as ex:
+            result.error = str(ex) or ex.__class__.__name__
+    return result
+
+
+def verify_modules(modules, drc=True, lvs=True, final_verification=False, num_workers=None):
+    """Verify modules concurrently with at most num_workers simultaneous tool runs.
+    Netlists and layouts are written serially since modules share sub-modules.
+    Workspaces of modules that pass are removed, failing workspaces are preserved.
+    Returns list of VerificationResult in the same order as modules"""
+    num_workers = num_workers or OPTS.num_verification_workers or os.cpu_count()
+    results = []
+    for module in modules:
+        result = VerificationResult(module.name, create_workspace(module.name))
+        module.gds_write(os.path.join(result.work_dir, "temp.gds"))
+        if lvs:
+            module.sp_write(os.path.join(result.work_dir, "temp.sp"))
+        results.append(result)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(num_workers, len(modules)))) as executor:
+        futures = [executor.submit(run_module_verification, module, result, drc, lvs,
+                                   final_verification)
+                   for module, result in zip(modules, results)]
+        for future in futures:
+            future.result()
+
+    for result in results:
+        if result.passed:
+            shutil.rmtree(result.work_dir, ignore_errors=True)
+        else:
+            debug.warning("Verification failed for %s, see %s", result.module_name,
+                          result.work_dir)
+    return results